@@ -0,0 +1,125 @@
+"""
+Augmentation Pipeline Module
+
+This module runs the provider-agnostic stage that happens before provider dispatch:
+- RAG retrieval from the knowledge base (shared, cached retrieval in `ai.rag`)
+- Context packing of the retrieved articles into the system prompt
+- MCP tool discovery (shared sessions in `mcp_toolbox`), executed by each provider's tool loop
+
+Public API:
+    - aprepare_augmentation(): Build the augmentation for a request
+    - start_augmentation(): Start building it in the background so it can overlap other work
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+from dataclasses import dataclass, field
+
+from ..ai_constants import RAG_SYSTEM_CONTENT_TEMPLATE
+from ..event_loop import get_shared_loop
+from ..rag import retrieve_context
+from .mcp_toolbox import MCPToolbox, get_mcp_toolbox
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on knowledge base text packed into the system prompt (~3k tokens)
+MAX_RAG_CONTEXT_CHARS = 12000
+
+# Agentic tool loops are limited to 2 iterations to prevent token burnout
+MAX_TOOL_ITERATIONS = 2
+
+
+@dataclass
+class Augmentation:
+    """Everything a provider needs beyond the user's prompt."""
+
+    system_content: str
+    rag_sources: list[dict] = field(default_factory=list)
+    toolbox: MCPToolbox | None = None
+
+
+def pack_system_content(system_content: str, rag_context: str) -> str:
+    """
+    Inject retrieved knowledge base articles into the system prompt.
+
+    Args:
+        system_content: The command's system prompt
+        rag_context: Formatted document chunks from `retrieve_context()`
+
+    Returns:
+        The system prompt to send to the provider
+    """
+    if not rag_context:
+        return system_content
+    if len(rag_context) > MAX_RAG_CONTEXT_CHARS:
+        logger.warning(
+            f"Trimming RAG context from {len(rag_context)} to {MAX_RAG_CONTEXT_CHARS} characters"
+        )
+        rag_context = rag_context[:MAX_RAG_CONTEXT_CHARS]
+    return RAG_SYSTEM_CONTENT_TEMPLATE.format(
+        rag_context=rag_context, system_content=system_content
+    )
+
+
+async def aprepare_augmentation(
+    prompt: str, system_content: str, use_rag: bool = False, use_mcp: bool = False
+) -> Augmentation:
+    """
+    Retrieve knowledge base context and connect MCP tools for a request.
+
+    Args:
+        prompt: The user's prompt/question (used as the retrieval query)
+        system_content: System prompt to augment
+        use_rag: Whether to retrieve and use RAG knowledge base (default: False)
+        use_mcp: Whether to expose MCP tools (default: False)
+
+    Returns:
+        Augmentation with the packed system prompt, RAG sources and optional toolbox
+    """
+    toolbox = get_mcp_toolbox() if use_mcp else None
+
+    async def retrieve():
+        if not use_rag:
+            return {"context": "", "sources": []}
+        logger.debug(f"Retrieving RAG context for prompt: {prompt[:100]}...")
+        # Retrieval is blocking I/O, keep it off the event loop
+        return await asyncio.to_thread(retrieve_context, prompt)
+
+    # Retrieval and MCP startup are independent, so run them concurrently
+    if toolbox is not None:
+        rag_result, _ = await asyncio.gather(retrieve(), toolbox.start())
+    else:
+        rag_result = await retrieve()
+
+    rag_context = rag_result.get("context", "")
+    rag_sources = rag_result.get("sources", [])
+    if use_rag:
+        logger.debug(
+            f"RAG context retrieved: {len(rag_context)} characters from {len(rag_sources)} sources"
+        )
+        if not rag_context:
+            logger.warning(
+                "No RAG context retrieved - responding without knowledge base"
+            )
+
+    return Augmentation(
+        system_content=pack_system_content(system_content, rag_context),
+        rag_sources=rag_sources,
+        toolbox=toolbox,
+    )
+
+
+def start_augmentation(
+    prompt: str, system_content: str, use_rag: bool = False, use_mcp: bool = False
+) -> concurrent.futures.Future:
+    """
+    Start `aprepare_augmentation()` on the shared event loop without waiting for it.
+
+    The returned future can be passed to `get_provider_response(augmentation=...)`,
+    letting retrieval overlap with other work such as posting the loading message.
+    """
+    return asyncio.run_coroutine_threadsafe(
+        aprepare_augmentation(prompt, system_content, use_rag, use_mcp),
+        get_shared_loop(),
+    )
@@ -0,0 +1,348 @@
+"""
+MCP Toolbox Module
+
+This module owns the process-wide MCP server connections. Servers listed in
+server_config.json are connected on the shared provider event loop, and their
+tools are exposed to every AI provider through a provider-neutral schema.
+Each server has its own session; if one fails to start or its connection is lost,
+only that session is reopened on the next use (at most once per MCP_RECONNECT_SECONDS).
+Tool results are truncated, and results of the read-only tools in
+MCP_CACHEABLE_TOOLS are briefly cached so repeated lookups are cheap.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import AsyncExitStack
+from typing import TYPE_CHECKING
+
+from observability import start_span
+from observability.journal import record_tool_call
+from observability.metrics import histogram
+
+from ..event_loop import get_shared_loop, run_on_shared_loop
+
+# The MCP SDK is imported when the first server is connected
+if TYPE_CHECKING:
+    from mcp import ClientSession
+
+logger = logging.getLogger(__name__)
+
+MCP_SERVER_CONFIG = os.environ.get("MCP_SERVER_CONFIG", "server_config.json")
+
+# Limit each tool result to ~4k chars (~1k tokens) to prevent token explosion
+MAX_TOOL_RESULT_LENGTH = 4000
+
+# Identical calls of these read-only tools (e.g. the same GitHub search) within the TTL reuse the
+# cached result; every other tool, and anything that writes, is always called
+MCP_CACHEABLE_TOOLS = frozenset(
+    name.strip()
+    for name in os.environ.get(
+        "MCP_CACHEABLE_TOOLS",
+        "search_code,search_repositories,search_issues,get_file_contents,list_commits,"
+        "get_issue,list_issues,get_pull_request,list_pull_requests,get_pull_request_files",
+    ).split(",")
+    if name.strip()
+)
+TOOL_RESULT_CACHE_TTL_SECONDS = float(
+    os.environ.get("MCP_TOOL_CACHE_TTL_SECONDS", "60")
+)
+TOOL_RESULT_CACHE_SIZE = 256
+
+# Shortest interval between attempts to reopen a failed MCP session
+MCP_RECONNECT_SECONDS = float(os.environ.get("MCP_RECONNECT_SECONDS", "30"))
+
+# Errors raised by a session whose server process has exited or closed its pipes
+_CONNECTION_ERROR_NAMES = {
+    "BrokenResourceError",
+    "ClosedResourceError",
+    "EndOfStream",
+    "BrokenPipeError",
+    "ConnectionResetError",
+}
+# JSON-RPC error code the MCP SDK uses for a closed connection
+_CONNECTION_CLOSED = -32000
+
+TOOL_CALL_SECONDS = histogram(
+    "mcp_tool_call_duration_seconds", "MCP tool call latency", ("tool", "status")
+)
+
+
+def _expand_env_vars(config):
+    """Recursively expand environment variables in config."""
+    if isinstance(config, dict):
+        return {k: _expand_env_vars(v) for k, v in config.items()}
+    elif isinstance(config, list):
+        return [_expand_env_vars(item) for item in config]
+    elif isinstance(config, str):
+        # Replace ${VAR_NAME} with environment variable value
+        def replace_env_var(match):
+            var_name = match.group(1)
+            value = os.environ.get(var_name, "")
+            if not value:
+                logger.warning(f"Environment variable {var_name} is not set")
+            return value
+
+        return re.sub(r"\$\{([^}]+)\}", replace_env_var, config)
+    else:
+        return config
+
+
+def _is_connection_error(error: Exception) -> bool:
+    if type(error).__name__ in _CONNECTION_ERROR_NAMES:
+        return True
+    # mcp.shared.exceptions.McpError carries the JSON-RPC error
+    return getattr(getattr(error, "error", None), "code", None) == _CONNECTION_CLOSED
+
+
+class _MCPServer:
+    """One configured server: its session and tools, and the task that owns them."""
+
+    def __init__(self, name: str, config: dict):
+        self.name = name
+        self.config = config
+        self.session: ClientSession | None = None
+        self.tools: list[dict] = []
+        self.task: asyncio.Task | None = None
+        self.ready: asyncio.Event | None = None
+        self.shutdown: asyncio.Event | None = None
+        self.started_at = 0.0
+        self.failed = False
+
+    def needs_restart(self) -> bool:
+        if self.task is None:
+            return True
+        lost = self.failed or (self.task.done() and not self.shutdown.is_set())
+        return lost and time.monotonic() - self.started_at >= MCP_RECONNECT_SECONDS
+
+
+class MCPToolbox:
+    """Long-lived MCP sessions plus a provider-neutral view of their tools."""
+
+    def __init__(self):
+        # Each tool is {"name", "description", "input_schema"} (JSON schema)
+        self.tools: list[dict] = []
+        self.sessions: dict[str, ClientSession] = {}
+        # Configured servers by name (None until the config is read) and the server of each tool
+        self._servers: dict[str, _MCPServer] | None = None
+        self._tool_servers: dict[str, _MCPServer] = {}
+        self._result_cache: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    async def _connect_to_mcp_server(
+        self, exit_stack: AsyncExitStack, server: _MCPServer
+    ) -> bool:
+        """Connect to an MCP server and list its tools; returns False if it could not be started."""
+        from mcp import ClientSession, StdioServerParameters
+        from mcp.client.stdio import stdio_client
+
+        try:
+            server_params = StdioServerParameters(**server.config)
+            read, write = await exit_stack.enter_async_context(
+                stdio_client(server_params)
+            )
+            session = await exit_stack.enter_async_context(ClientSession(read, write))
+            await session.initialize()
+
+            # List available tools from the server
+            response = await session.list_tools()
+            server.tools = [
+                {
+                    "name": tool.name,
+                    "description": tool.description or "",
+                    "input_schema": tool.inputSchema,
+                }
+                for tool in response.tools
+            ]
+            for tool in response.tools:
+                logger.debug(f"Tool '{tool.name}' schema: {tool.inputSchema}")
+            server.session = session
+            logger.info(
+                f"Connected to {server.name} with {len(response.tools)} tools: {[t.name for t in response.tools]}"
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Error connecting to {server.name} MCP server: {e}")
+            return False
+
+    async def _run(
+        self, server: _MCPServer, ready: asyncio.Event, shutdown: asyncio.Event
+    ):
+        """
+        Open one server and keep its session alive until shutdown.
+        The stdio transport must be entered and exited by the same task, so one task owns it.
+        """
+        try:
+            async with AsyncExitStack() as exit_stack:
+                try:
+                    if await self._connect_to_mcp_server(exit_stack, server):
+                        self._publish_tools()
+                    else:
+                        server.failed = True
+                        return
+                finally:
+                    ready.set()
+                await shutdown.wait()
+        except Exception as e:
+            # e.g. the server process exited and its transport failed
+            logger.error(f"{server.name} MCP session closed unexpectedly: {e}")
+        finally:
+            ready.set()
+
+    def _publish_tools(self):
+        # Replaced rather than mutated, so a provider iterating the old list is unaffected
+        servers = [s for s in self._servers.values() if s.session is not None]
+        self.tools = [tool for server in servers for tool in server.tools]
+        self.sessions = {
+            tool["name"]: server.session for server in servers for tool in server.tools
+        }
+        self._tool_servers = {
+            tool["name"]: server for server in servers for tool in server.tools
+        }
+
+    def _load_servers(self) -> dict[str, _MCPServer]:
+        try:
+            with open(MCP_SERVER_CONFIG, "r") as file:
+                data = json.load(file)
+            return {
+                name: _MCPServer(name, _expand_env_vars(config))
+                for name, config in data.get("mcpServers", {}).items()
+            }
+        except Exception as e:
+            logger.error(f"Error initializing MCP: {e}")
+            return {}
+
+    async def _start(self):
+        if self._servers is None:
+            self._servers = self._load_servers()
+        restarted = [s for s in self._servers.values() if s.needs_restart()]
+        for server in restarted:
+            if server.task is not None:
+                logger.warning(
+                    f"Reopening the {server.name} MCP session after a failure"
+                )
+                # The old task closes its session and server process on its own
+                server.shutdown.set()
+                server.session = None
+                server.tools = []
+                self._publish_tools()
+            server.failed = False
+            server.started_at = time.monotonic()
+            server.ready = asyncio.Event()
+            server.shutdown = asyncio.Event()
+            server.task = asyncio.get_running_loop().create_task(
+                self._run(server, server.ready, server.shutdown)
+            )
+        await asyncio.gather(*(s.ready.wait() for s in self._servers.values()))
+        if restarted:
+            logger.info(f"MCP initialized with {len(self.tools)} tools")
+
+    async def start(self):
+        """Connect to the configured MCP servers, or reconnect the ones that failed."""
+        await run_on_shared_loop(self._start())
+
+    def close(self):
+        """Close all MCP sessions."""
+        for server in (self._servers or {}).values():
+            if server.shutdown is not None:
+                get_shared_loop().call_soon_threadsafe(server.shutdown.set)
+
+    async def call_tool(self, name: str, arguments: dict) -> tuple[str, bool]:
+        """
+        Execute a tool call.
+
+        Args:
+            name: Tool name as advertised to the model
+            arguments: Tool arguments produced by the model
+
+        Returns:
+            Tuple of (result_text, is_error)
+        """
+        started_at = time.perf_counter()
+        with start_span("mcp.tool_call", tool=name) as span:
+            result_content, is_error, cached = await self._call_tool(name, arguments)
+            span.set_attributes(
+                is_error=is_error, cached=cached, result_chars=len(result_content)
+            )
+        duration = time.perf_counter() - started_at
+        status = "error" if is_error else "cached" if cached else "ok"
+        TOOL_CALL_SECONDS.labels(tool=name, status=status).observe(duration)
+        record_tool_call(name, arguments, result_content, is_error, cached, duration)
+        return result_content, is_error
+
+    async def _call_tool(self, name: str, arguments: dict) -> tuple[str, bool, bool]:
+        # Returns (result_text, is_error, served_from_cache)
+        session = self.sessions.get(name)
+        if session is None:
+            logger.warning(f"No session found for tool: {name}")
+            return f"Error: Tool {name} not available", True, False
+
+        # Only read-only tools are cached; a repeated write must reach the server
+        cache_key = None
+        if name in MCP_CACHEABLE_TOOLS and TOOL_RESULT_CACHE_TTL_SECONDS > 0:
+            cache_key = f"{name}:{json.dumps(arguments, sort_keys=True, default=str)}"
+            with self._cache_lock:
+                cached = self._result_cache.get(cache_key)
+            if cached and time.monotonic() - cached[0] < TOOL_RESULT_CACHE_TTL_SECONDS:
+                logger.debug(f"Tool {name} served from cache")
+                return cached[1], False, True
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                f"Calling tool: {name} with args: {json.dumps(arguments, default=str)[:500]}"
+            )
+        try:
+            result = await run_on_shared_loop(
+                session.call_tool(name, arguments=arguments)
+            )
+        except Exception as e:
+            logger.error(f"Tool {name} failed: {e}")
+            server = self._tool_servers.get(name)
+            if server is not None and _is_connection_error(e):
+                # Reopen this server's session on the next start()
+                server.failed = True
+            return f"Error: {str(e) or type(e).__name__}", True, False
+
+        # Flatten the array of content blocks into plain text
+        result_content = "\n".join(
+            block.text if hasattr(block, "text") else str(block)
+            for block in result.content
+        )
+
+        if len(result_content) > MAX_TOOL_RESULT_LENGTH:
+            logger.warning(
+                f"Truncated tool result for {name} from {len(result_content)} to {MAX_TOOL_RESULT_LENGTH} chars"
+            )
+            result_content = (
+                result_content[:MAX_TOOL_RESULT_LENGTH]
+                + f"\n\n[... truncated {len(result_content) - MAX_TOOL_RESULT_LENGTH} characters ...]"
+            )
+        logger.debug(
+            f"Tool {name} succeeded (result length: {len(result_content)} chars)"
+        )
+
+        if cache_key is not None and not result.isError:
+            with self._cache_lock:
+                self._result_cache[cache_key] = (time.monotonic(), result_content)
+                self._result_cache.move_to_end(cache_key)
+                while len(self._result_cache) > TOOL_RESULT_CACHE_SIZE:
+                    self._result_cache.popitem(last=False)
+        return result_content, bool(result.isError), False
+
+
+_toolbox: MCPToolbox | None = None
+_toolbox_lock = threading.Lock()
+
+
+def get_mcp_toolbox() -> MCPToolbox:
+    """Get or create the global MCP toolbox instance."""
+    global _toolbox
+    with _toolbox_lock:
+        if _toolbox is None:
+            _toolbox = MCPToolbox()
+        return _toolbox
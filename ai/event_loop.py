@@ -0,0 +1,66 @@
+"""
+Shared Event Loop Module
+
+Provider calls are implemented natively with asyncio. Synchronous callers (the
+threaded Bolt app) run them on one long-lived event loop in a background thread
+instead of creating and tearing down a loop per request, so async clients,
+connection pools and MCP sessions can be reused across requests.
+"""
+
+import asyncio
+import logging
+import threading
+from collections.abc import Awaitable
+from typing import TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_lock = threading.Lock()
+
+
+def get_shared_loop() -> asyncio.AbstractEventLoop:
+    """Get the shared event loop, starting its background thread on first use."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            thread = threading.Thread(
+                target=_loop.run_forever, name="ai-provider-loop", daemon=True
+            )
+            thread.start()
+            logger.info("Started shared provider event loop")
+        return _loop
+
+
+def run_sync(coro: Awaitable[T]) -> T:
+    """
+    Run a coroutine on the shared event loop and block until it completes.
+
+    Args:
+        coro: The coroutine to run
+
+    Returns:
+        The coroutine's result (exceptions are re-raised in the calling thread)
+    """
+    loop = get_shared_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        raise RuntimeError("run_sync() cannot be called from the shared event loop")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+
+async def run_on_shared_loop(coro: Awaitable[T]) -> T:
+    """
+    Await a coroutine that must execute on the shared loop (e.g. one using MCP sessions)
+    from any other event loop.
+    """
+    loop = get_shared_loop()
+    if asyncio.get_running_loop() is loop:
+        return await coro
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
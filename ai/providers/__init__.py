@@ -1,58 +1,263 @@
-from typing import List, Optional
+import asyncio
+import concurrent.futures
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
 
+from observability import start_span
+from observability.journal import record_generation
+from observability.metrics import counter, histogram
+from observability.usage import record_response_usage, use_usage_attribution
+from shared_state import asingle_flight, get_shared_state
 from state_store.get_user_state import get_user_state
 
 from ..ai_constants import DEFAULT_SYSTEM_CONTENT
+from ..augmentation import Augmentation, aprepare_augmentation
+from ..event_loop import get_shared_loop, run_sync
 from .anthropic import AnthropicAPI
 from .openai import OpenAI_API
+from .rate_limiter import ProviderUnavailableError, get_rate_limiter, is_retryable_error
 from .vertexai import VertexAPI
 
+logger = logging.getLogger(__name__)
+
 """
-New AI providers must be added below.
+New AI providers must be added to `PROVIDERS` below.
 `get_available_providers()`
 This function retrieves available API models from different AI providers.
 It combines the available models into a single dictionary.
+`get_provider_catalog()`
+Cached `get_available_providers()` plus a version that changes whenever the provider configuration does.
 `_get_provider()`
 This function returns an instance of the appropriate API provider based on the given provider name.
-`get_provider_response`()
+`get_provider_response`() / `aget_provider_response()` / `start_provider_response()`
 This function retrieves the user's selected API provider and model,
 sets the model, and generates a response.
 Note that context is an optional parameter because some functionalities,
 such as commands, do not allow access to conversation history if the bot
 isn't in the channel where the command is run.
+Every model request goes through the provider's shared rate limiter; if the
+selected provider is unhealthy the request is routed to a fallback provider.
+When AI_RESPONSE_CACHE_TTL_SECONDS is set, responses to stateless requests (no conversation
+context, no MCP tools) are cached in shared state, shared between users, and computed once
+across replicas while identical requests are in flight.
+Token usage and cost are accounted per user, command, model and cache status (`observability.usage`).
 """
 
+# Opt-in (0 disables the response cache and single-flight). Cached responses are shared between
+# users: anyone sending the same stateless prompt to the same model within the TTL gets the same answer
+AI_RESPONSE_CACHE_TTL_SECONDS = float(
+    os.environ.get("AI_RESPONSE_CACHE_TTL_SECONDS", "0")
+)
+
+LLM_GENERATE_SECONDS = histogram(
+    "llm_generate_duration_seconds",
+    "Latency of a full response, including rate-limiter waits, retries and tool-use iterations",
+    ("provider", "model", "status"),
+)
+AI_RESPONSE_CACHE = counter(
+    "ai_response_cache_total",
+    "Response cache lookups for stateless requests",
+    ("result",),
+)
+
+
+# Provider name (as stored in the user's selection) -> provider class
+PROVIDERS = {
+    "anthropic": AnthropicAPI,
+    "openai": OpenAI_API,
+    "vertexai": VertexAPI,
+}
+
 
 def get_available_providers():
-    return {
-        **AnthropicAPI().get_models(),
-        **OpenAI_API().get_models(),
-        **VertexAPI().get_models(),
-    }
+    models = {}
+    for provider_class in PROVIDERS.values():
+        models.update(provider_class().get_models())
+    return models
+
+
+_catalog: tuple[str, dict] | None = None
+_catalog_lock = threading.Lock()
+
+
+def _provider_config_fingerprint() -> str:
+    digest = hashlib.sha1()
+    for name, provider_class in PROVIDERS.items():
+        digest.update(
+            f"{name}={provider_class.__module__}.{provider_class.__qualname__};".encode()
+        )
+        for env_var in provider_class.CONFIG_ENV_VARS:
+            digest.update(f"{env_var}={os.environ.get(env_var, '')};".encode())
+    return digest.hexdigest()[:12]
+
+
+def get_provider_catalog() -> tuple[str, dict]:
+    """
+    Get the available models without constructing every provider on each call.
+
+    Returns:
+        Tuple of (catalog_version, models); the version changes when providers are
+        registered or their configuration (API keys, project) changes
+    """
+    global _catalog
+    version = _provider_config_fingerprint()
+    with _catalog_lock:
+        if _catalog is None or _catalog[0] != version:
+            _catalog = (version, get_available_providers())
+        return _catalog
 
 
 def _get_provider(provider_name: str):
-    if provider_name.lower() == "anthropic":
-        return AnthropicAPI()
-    elif provider_name.lower() == "openai":
-        return OpenAI_API()
-    elif provider_name.lower() == "vertexai":
-        return VertexAPI()
-    else:
+    provider_class = PROVIDERS.get(provider_name.lower())
+    if provider_class is None:
         raise ValueError(f"Unknown provider: {provider_name}")
+    return provider_class()
 
 
-def get_provider_response(
+def _get_fallback_providers(provider_name: str) -> list[tuple[str, str]]:
+    """
+    List (provider, model) pairs to try when the given provider is unhealthy.
+
+    Uses AI_FALLBACK_PROVIDERS (e.g. "openai:gpt-4.1-mini,vertexai:gemini-1.5-flash-002") when set,
+    otherwise the first model of every other configured provider.
+    """
+    configured = os.environ.get("AI_FALLBACK_PROVIDERS", "")
+    if configured:
+        fallbacks = [
+            tuple(entry.strip().split(":", 1))
+            for entry in configured.split(",")
+            if ":" in entry
+        ]
+    else:
+        fallbacks = []
+        for name in PROVIDERS:
+            models = _get_provider(name).get_models()
+            if models:
+                fallbacks.append((name, next(iter(models))))
+
+    return [
+        (name, model)
+        for name, model in fallbacks
+        if name.lower() != provider_name.lower()
+        and not get_rate_limiter(name).breaker.is_open()
+    ]
+
+
+async def _agenerate(
+    provider_name: str, model_name: str, full_prompt: str, augmentation: Augmentation
+) -> str:
+    provider = _get_provider(provider_name)
+    provider.set_model(model_name)
+
+    logger.debug(
+        f"Provider: {provider_name}, Model: {model_name}, "
+        f"RAG sources: {len(augmentation.rag_sources)}, MCP tools: {augmentation.toolbox is not None}"
+    )
+
+    started_at = time.perf_counter()
+    status = "error"
+    try:
+        # Each model request inside is rate limited and retried on its own (`BaseAPIProvider._limited`)
+        # and is an `llm.call` span; this span covers the whole tool loop
+        with (
+            start_span("llm.generate", provider=provider_name, model=model_name),
+            record_generation(
+                provider_name, model_name, augmentation.system_content, full_prompt
+            ) as generation,
+        ):
+            response = await provider.agenerate_response(
+                full_prompt, augmentation.system_content, toolbox=augmentation.toolbox
+            )
+            if generation is not None:
+                generation.response = response
+        status = "ok"
+        return response
+    finally:
+        LLM_GENERATE_SECONDS.labels(
+            provider=provider_name, model=model_name, status=status
+        ).observe(time.perf_counter() - started_at)
+
+
+async def _agenerate_with_fallback(
+    provider_name: str, model_name: str, full_prompt: str, augmentation: Augmentation
+) -> tuple[str, str, str]:
+    """
+    Generate with the given provider, or with the fallback providers while it is unavailable.
+
+    Returns:
+        Tuple of (response, name of the provider that produced it, its model)
+    """
+    try:
+        return (
+            await _agenerate(provider_name, model_name, full_prompt, augmentation),
+            provider_name,
+            model_name,
+        )
+    except Exception as e:
+        if not (isinstance(e, ProviderUnavailableError) or is_retryable_error(e)):
+            raise e
+        for fallback_name, fallback_model in _get_fallback_providers(provider_name):
+            logger.warning(
+                f"{provider_name} unavailable ({e}), falling back to {fallback_name}/{fallback_model}"
+            )
+            try:
+                response = await _agenerate(
+                    fallback_name, fallback_model, full_prompt, augmentation
+                )
+                return response, fallback_name, fallback_model
+            except Exception as fallback_error:
+                logger.error(
+                    f"Fallback provider {fallback_name} failed: {fallback_error}"
+                )
+        raise e
+
+
+def _response_cache_key(
+    provider_name: str,
+    model_name: str,
+    full_prompt: str,
+    context: list | None,
+    augmentation: Augmentation,
+) -> str | None:
+    """Cache key for a stateless request, or None when its response must not be shared."""
+    if (
+        AI_RESPONSE_CACHE_TTL_SECONDS <= 0
+        or context
+        or augmentation.toolbox is not None
+    ):
+        return None
+    digest = hashlib.sha256()
+    for part in (provider_name, model_name, augmentation.system_content, full_prompt):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return f"ai_response:{digest.hexdigest()}"
+
+
+async def aget_provider_response(
     user_id: str,
     prompt: str,
-    context: Optional[List] = [],
+    context: list | None = [],
     system_content=DEFAULT_SYSTEM_CONTENT,
     use_rag: bool = False,
     use_mcp: bool = False,
+    augmentation: Augmentation
+    | concurrent.futures.Future
+    | asyncio.Future
+    | None = None,
 ) -> dict:
     """
     Get a response from the user's selected AI provider.
 
+    RAG retrieval, context packing and MCP tool discovery run once in the augmentation
+    pipeline before provider dispatch, so every provider gets the same context and tools.
+    If the selected provider keeps failing with 429/5xx errors or its circuit breaker
+    is open, the request is retried once on each fallback provider in turn.
+    Stateless requests share cached responses for AI_RESPONSE_CACHE_TTL_SECONDS (off by default).
+
     Args:
         user_id: The Slack user ID
         prompt: The user's prompt/question
@@ -60,6 +265,9 @@ def get_provider_response(
         system_content: System prompt to use
         use_rag: Whether to use RAG knowledge base retrieval (default: False)
         use_mcp: Whether to use MCP tools (default: False)
+        augmentation: Optional result (or pending future/task) of `start_augmentation()`
+            or `aprepare_augmentation()`;
+            when given, use_rag/use_mcp/system_content are taken from it
 
     Returns:
         Dictionary containing:
@@ -67,45 +275,104 @@ def get_provider_response(
             - 'rag_sources': List of source metadata dicts (empty if no RAG used)
             - 'provider': The provider name used
     """
-    import logging
-    logger = logging.getLogger(__name__)
-
     formatted_context = "\n".join([f"{msg['user']}: {msg['text']}" for msg in context])
     full_prompt = f"Prompt: {prompt}\nContext: {formatted_context}"
-    try:
-        provider_name, model_name = get_user_state(user_id, False)
-        provider = _get_provider(provider_name)
-        provider.set_model(model_name)
-
-        logger.info(f"Provider: {provider_name}, Model: {model_name}, RAG requested: {use_rag}, MCP requested: {use_mcp}")
-
-        # Pass use_rag and use_mcp flags to provider (only Anthropic supports them)
-        if hasattr(provider, 'generate_response') and provider_name.lower() == "anthropic":
-            if use_rag:
-                logger.info("✓ RAG will be used (Anthropic provider)")
-            if use_mcp:
-                logger.info("✓ MCP will be used (Anthropic provider)")
-            response = provider.generate_response(full_prompt, system_content, use_rag=use_rag, use_mcp=use_mcp)
-        else:
-            if use_rag:
-                logger.warning(f"⚠️  RAG requested but provider '{provider_name}' does not support RAG. Only Anthropic supports RAG.")
-            if use_mcp:
-                logger.warning(f"⚠️  MCP requested but provider '{provider_name}' does not support MCP. Only Anthropic supports MCP.")
-            response = provider.generate_response(full_prompt, system_content)
-
-        # Handle different response formats
-        # Anthropic returns dict with 'response' and 'rag_sources'
-        # Other providers return string
-        if isinstance(response, dict):
-            return {
-                **response,
-                "provider": provider_name
-            }
-        else:
-            return {
-                "response": response,
-                "rag_sources": [],
-                "provider": provider_name
-            }
-    except Exception as e:
-        raise e
+
+    # The user state store may hit disk or the network; keep it off the shared event loop
+    provider_name, model_name = await asyncio.to_thread(get_user_state, user_id, False)
+
+    if augmentation is None:
+        augmentation = await aprepare_augmentation(
+            prompt, system_content, use_rag=use_rag, use_mcp=use_mcp
+        )
+    elif isinstance(augmentation, concurrent.futures.Future):
+        augmentation = await asyncio.wrap_future(augmentation)
+    elif asyncio.isfuture(augmentation):
+        # asyncio.Task created on the caller's event loop (AsyncApp listeners)
+        augmentation = await augmentation
+
+    started_at = time.perf_counter()
+    cache_key = _response_cache_key(
+        provider_name, model_name, full_prompt, context, augmentation
+    )
+    if cache_key is None:
+        cache_status = "uncached"
+        with use_usage_attribution(user_id=user_id, cache=cache_status):
+            response, provider_name, model_name = await _agenerate_with_fallback(
+                provider_name, model_name, full_prompt, augmentation
+            )
+    else:
+        computed = False
+
+        async def compute() -> str:
+            nonlocal computed
+            computed = True
+            with use_usage_attribution(user_id=user_id, cache="miss"):
+                result = await _agenerate_with_fallback(
+                    provider_name, model_name, full_prompt, augmentation
+                )
+            return json.dumps(
+                {"response": result[0], "provider": result[1], "model": result[2]}
+            )
+
+        cached = json.loads(
+            await asingle_flight(
+                get_shared_state(), cache_key, compute, AI_RESPONSE_CACHE_TTL_SECONDS
+            )
+        )
+        response, provider_name = cached["response"], cached["provider"]
+        model_name = cached.get("model", model_name)
+        # A hit includes joining an identical request that was already in flight
+        cache_status = "miss" if computed else "hit"
+        AI_RESPONSE_CACHE.labels(result=cache_status).inc()
+    with use_usage_attribution(user_id=user_id, cache=cache_status):
+        record_response_usage(
+            provider_name, model_name, time.perf_counter() - started_at
+        )
+
+    return {
+        "response": response,
+        "rag_sources": augmentation.rag_sources,
+        "provider": provider_name,
+    }
+
+
+def get_provider_response(
+    user_id: str,
+    prompt: str,
+    context: list | None = [],
+    system_content=DEFAULT_SYSTEM_CONTENT,
+    use_rag: bool = False,
+    use_mcp: bool = False,
+    augmentation: Augmentation | concurrent.futures.Future | None = None,
+) -> dict:
+    """
+    Synchronous wrapper around `aget_provider_response()` for the threaded Bolt app.
+    Runs on the shared provider event loop; see `aget_provider_response()` for arguments.
+    """
+    return run_sync(
+        aget_provider_response(
+            user_id, prompt, context, system_content, use_rag, use_mcp, augmentation
+        )
+    )
+
+
+def start_provider_response(
+    user_id: str,
+    prompt: str,
+    context: list | None = [],
+    system_content=DEFAULT_SYSTEM_CONTENT,
+    use_rag: bool = False,
+    use_mcp: bool = False,
+    augmentation: Augmentation | concurrent.futures.Future | None = None,
+) -> concurrent.futures.Future:
+    """
+    Start `aget_provider_response()` on the shared provider event loop without waiting for it,
+    so the caller can post progress updates while the provider generates.
+    """
+    return asyncio.run_coroutine_threadsafe(
+        aget_provider_response(
+            user_id, prompt, context, system_content, use_rag, use_mcp, augmentation
+        ),
+        get_shared_loop(),
+    )
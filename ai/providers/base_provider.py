@@ -1,12 +1,140 @@
 # A base class for API providers, defining the interface and common properties for subclasses.
+# Subclasses implement the async methods; the sync `generate_response` runs them on the shared event loop.
 
+import json
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterator
+from contextlib import contextmanager
+from typing import TypeVar
+
+from observability import Span, start_span
+from observability.journal import record_llm_call
+from observability.metrics import TOKEN_BUCKETS, counter, histogram
+from observability.usage import model_cost, record_llm_usage
+
+from ..event_loop import run_sync
+from .rate_limiter import estimate_tokens, get_rate_limiter
+
+T = TypeVar("T")
+
+LLM_CALL_SECONDS = histogram(
+    "llm_call_duration_seconds",
+    "Latency of single model requests",
+    ("provider", "model"),
+)
+LLM_TOKENS = counter(
+    "llm_tokens_total",
+    "Tokens reported by the provider APIs",
+    ("provider", "model", "direction"),
+)
+LLM_CALL_TOKENS = histogram(
+    "llm_call_input_tokens",
+    "Input tokens per model request",
+    ("provider", "model"),
+    buckets=TOKEN_BUCKETS,
+)
+LLM_COST = counter(
+    "llm_cost_usd_total",
+    "Estimated spend from the model prices in MODELS",
+    ("provider", "model"),
+)
+
+
+class BaseAPIProvider:
+    # Key of the provider in `ai.providers.PROVIDERS`, used to label metrics
+    NAME: str | None = None
+    # Environment variables that decide which models `get_models()` returns
+    CONFIG_ENV_VARS = ()
+    # Model name -> {"name", "provider", "max_tokens", "input_price"/"output_price" (USD per million tokens), ...}
+    MODELS: dict = {}
 
-class BaseAPIProvider(object):
     def set_model(self, model_name: str):
         raise NotImplementedError("Subclass must implement set_model")
 
     def get_models(self) -> dict:
         raise NotImplementedError("Subclass must implement get_models")
 
-    def generate_response(self, prompt: str, system_content: str) -> str:
-        raise NotImplementedError("Subclass must implement generate_response")
+    async def agenerate_response(
+        self, prompt: str, system_content: str, toolbox=None
+    ) -> str:
+        # `toolbox` is the shared MCPToolbox from `ai.augmentation` when tools are enabled
+        raise NotImplementedError("Subclass must implement agenerate_response")
+
+    async def agenerate_response_stream(
+        self, prompt: str, system_content: str
+    ) -> AsyncIterator[str]:
+        # Providers without native streaming yield the full response as a single chunk
+        yield await self.agenerate_response(prompt, system_content)
+
+    @contextmanager
+    def _llm_call(self, iteration: int = 1) -> Iterator[Span]:
+        # One span and latency sample per model request; subclasses report token usage with `_record_usage`
+        provider, model = self._metrics_name(), self.current_model
+        self._usage = (0, 0)
+        error = None
+        started_at = time.perf_counter()
+        try:
+            with start_span(
+                "llm.call", provider=provider, model=model, iteration=iteration
+            ) as span:
+                yield span
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            duration = time.perf_counter() - started_at
+            LLM_CALL_SECONDS.labels(provider=provider, model=model).observe(duration)
+            record_llm_call(iteration, duration, *self._usage, error=error)
+            cost = model_cost(self.MODELS.get(model, {}), *self._usage)
+            if cost:
+                LLM_COST.labels(provider=provider, model=model).inc(cost)
+            record_llm_usage(
+                provider, model, *self._usage, duration, cost, error is not None
+            )
+
+    async def _limited(
+        self, request: Callable[[], Awaitable[T]], estimated_tokens: int
+    ) -> T:
+        """
+        Send one model request through the provider's shared rate limiter.
+
+        Args:
+            request: Zero-argument coroutine function making the request (inside `_llm_call`);
+                for a streaming response, the call that opens the stream, since text that was
+                already yielded can't be retried
+            estimated_tokens: Estimated input tokens of the request, see `_estimate_tokens()`
+
+        Returns:
+            The result of request(); 429/5xx errors retry this request only, not earlier tool-loop iterations
+        """
+        return await get_rate_limiter(self._metrics_name()).acall(
+            request, estimated_tokens=estimated_tokens
+        )
+
+    @staticmethod
+    def _estimate_tokens(*inputs) -> int:
+        # Request parameters hold SDK objects (earlier responses) as well as plain JSON
+        return estimate_tokens(
+            *(
+                part if isinstance(part, str) else json.dumps(part, default=str)
+                for part in inputs
+            )
+        )
+
+    def _record_usage(self, span: Span, input_tokens: int, output_tokens: int):
+        self._usage = (input_tokens, output_tokens)
+        span.set_attributes(input_tokens=input_tokens, output_tokens=output_tokens)
+        provider, model = self._metrics_name(), self.current_model
+        LLM_TOKENS.labels(provider=provider, model=model, direction="input").inc(
+            input_tokens
+        )
+        LLM_TOKENS.labels(provider=provider, model=model, direction="output").inc(
+            output_tokens
+        )
+        LLM_CALL_TOKENS.labels(provider=provider, model=model).observe(input_tokens)
+
+    def _metrics_name(self) -> str:
+        return self.NAME or type(self).__name__
+
+    def generate_response(self, prompt: str, system_content: str, toolbox=None) -> str:
+        return run_sync(self.agenerate_response(prompt, system_content, toolbox))
@@ -1,28 +1,60 @@
-import openai
-from .base_provider import BaseAPIProvider
-import os
+import asyncio
+import functools
+import json
 import logging
+import os
+import weakref
+from collections.abc import AsyncIterator
+from typing import TYPE_CHECKING
+
+from ..augmentation import MAX_TOOL_ITERATIONS
+from ..augmentation.mcp_toolbox import MCPToolbox
+from .base_provider import BaseAPIProvider
+
+# The SDK is imported on first use, so app startup does not pay for unused providers
+if TYPE_CHECKING:
+    import openai
 
-logging.basicConfig(level=logging.ERROR)
 logger = logging.getLogger(__name__)
 
+_async_clients = weakref.WeakKeyDictionary()
+
 
 class OpenAI_API(BaseAPIProvider):
+    NAME = "openai"
     MODELS = {
-        "gpt-4.1": {"name": "GPT-4.1", "provider": "OpenAI", "max_tokens": 10000},
+        "gpt-4.1": {
+            "name": "GPT-4.1",
+            "provider": "OpenAI",
+            "max_tokens": 10000,
+            "input_price": 2.0,
+            "output_price": 8.0,
+        },
         "gpt-4.1-mini": {
             "name": "GPT-4.1 Mini",
             "provider": "OpenAI",
             "max_tokens": 10000,
+            "input_price": 0.4,
+            "output_price": 1.6,
         },
         "gpt-4.1-nano": {
             "name": "GPT-4.1 Nano",
             "provider": "OpenAI",
             "max_tokens": 10000,
+            "input_price": 0.1,
+            "output_price": 0.4,
+        },
+        "o4-mini": {
+            "name": "o4-mini",
+            "provider": "OpenAI",
+            "max_tokens": 50000,
+            "input_price": 1.1,
+            "output_price": 4.4,
         },
-        "o4-mini": {"name": "o4-mini", "provider": "OpenAI", "max_tokens": 50000},
     }
 
+    CONFIG_ENV_VARS = ("OPENAI_API_KEY",)
+
     def __init__(self):
         self.api_key = os.environ.get("OPENAI_API_KEY")
 
@@ -37,29 +69,151 @@ class OpenAI_API(BaseAPIProvider):
         else:
             return {}
 
-    def generate_response(self, prompt: str, system_content: str) -> str:
+    def _get_client(self) -> "openai.AsyncOpenAI":
+        import openai
+
+        # Async clients hold a connection pool bound to the running loop, so keep one per loop
+        loop = asyncio.get_running_loop()
+        client = _async_clients.get(loop)
+        if client is None:
+            # Retries are handled by the shared rate limiter in `ai.providers.rate_limiter`
+            client = openai.AsyncOpenAI(api_key=self.api_key, max_retries=0)
+            _async_clients[loop] = client
+        return client
+
+    def _build_request(self, prompt: str, system_content: str) -> dict:
+        return {
+            "model": self.current_model,
+            "input": [
+                {"role": "developer", "content": system_content},
+                {"role": "user", "content": prompt},
+            ],
+            "max_output_tokens": self.MODELS[self.current_model]["max_tokens"],
+        }
+
+    async def _create(self, request: dict, iteration: int):
+        async def create():
+            with self._llm_call(iteration) as span:
+                response = await self.client.responses.create(**request)
+                if response.usage is not None:
+                    self._record_usage(
+                        span, response.usage.input_tokens, response.usage.output_tokens
+                    )
+                return response
+
+        return await self._limited(create, self._estimate_tokens(request))
+
+    async def agenerate_response(
+        self,
+        prompt: str,
+        system_content: str,
+        toolbox: MCPToolbox | None = None,
+    ) -> str:
+        import openai
+
         try:
-            self.client = openai.OpenAI(api_key=self.api_key)
-            response = self.client.responses.create(
-                model=self.current_model,
-                input=[
-                    {"role": "developer", "content": system_content},
-                    {"role": "user", "content": prompt},
-                ],
-                max_output_tokens=self.MODELS[self.current_model]["max_tokens"],
+            self.client = self._get_client()
+            request = self._build_request(prompt, system_content)
+            if toolbox is None or not toolbox.tools:
+                response = await self._create(request, 1)
+                return response.output_text
+
+            request["tools"] = [
+                {
+                    "type": "function",
+                    "name": tool["name"],
+                    "description": tool["description"],
+                    "parameters": tool["input_schema"],
+                    "strict": False,
+                }
+                for tool in toolbox.tools
+            ]
+            for iteration in range(1, MAX_TOOL_ITERATIONS + 1):
+                response = await self._create(request, iteration)
+                calls = [
+                    item for item in response.output if item.type == "function_call"
+                ]
+                if not calls:
+                    return response.output_text
+
+                logger.debug(
+                    f"Processing {len(calls)} tool calls in iteration {iteration}"
+                )
+                results = await asyncio.gather(
+                    *(
+                        toolbox.call_tool(call.name, _parse_arguments(call.arguments))
+                        for call in calls
+                    )
+                )
+                request["input"] += [
+                    item.model_dump(exclude_none=True) for item in response.output
+                ]
+                request["input"] += [
+                    {
+                        "type": "function_call_output",
+                        "call_id": call.call_id,
+                        "output": result_content,
+                    }
+                    for call, (result_content, _) in zip(calls, results)
+                ]
+
+            logger.warning(f"Hit max iterations ({MAX_TOOL_ITERATIONS}) in tool loop")
+            response = await self._create(request, MAX_TOOL_ITERATIONS + 1)
+            return response.output_text or (
+                "I've gathered information but need to limit my analysis to stay within token limits. "
+                "Please ask a more specific question."
             )
-            return response.output_text
-        except openai.APIConnectionError as e:
-            logger.error(f"Server could not be reached: {e.__cause__}")
-            raise e
-        except openai.RateLimitError as e:
-            logger.error(f"A 429 status code was received. {e}")
+        except openai.APIError as e:
+            _log_api_error(e)
             raise e
-        except openai.AuthenticationError as e:
-            logger.error(f"There's an issue with your API key. {e}")
-            raise e
-        except openai.APIStatusError as e:
-            logger.error(
-                f"Another non-200-range status code was received: {e.status_code}"
-            )
+
+    async def agenerate_response_stream(
+        self, prompt: str, system_content: str
+    ) -> AsyncIterator[str]:
+        import openai
+
+        try:
+            self.client = self._get_client()
+            request = self._build_request(prompt, system_content)
+            with self._llm_call() as span:
+                stream = await self._limited(
+                    functools.partial(
+                        self.client.responses.create, **request, stream=True
+                    ),
+                    self._estimate_tokens(request),
+                )
+                async for event in stream:
+                    if event.type == "response.output_text.delta":
+                        yield event.delta
+                    elif (
+                        event.type == "response.completed"
+                        and event.response.usage is not None
+                    ):
+                        usage = event.response.usage
+                        self._record_usage(
+                            span, usage.input_tokens, usage.output_tokens
+                        )
+        except openai.APIError as e:
+            _log_api_error(e)
             raise e
+
+
+def _parse_arguments(arguments: str) -> dict:
+    try:
+        return json.loads(arguments or "{}")
+    except json.JSONDecodeError:
+        logger.warning(f"Could not parse tool arguments: {arguments}")
+        return {}
+
+
+def _log_api_error(e: "openai.APIError"):
+    import openai
+
+    if isinstance(e, openai.APIConnectionError):
+        logger.error(f"Server could not be reached: {e.__cause__}")
+    elif isinstance(e, openai.RateLimitError):
+        logger.error(f"A 429 status code was received. {e}")
+    elif isinstance(e, openai.AuthenticationError):
+        logger.error(f"There's an issue with your API key. {e}")
+    elif isinstance(e, openai.APIStatusError):
+        logger.error(f"Another non-200-range status code was received: {e.status_code}")
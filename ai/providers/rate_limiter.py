@@ -0,0 +1,414 @@
+"""
+Provider Rate Limiter Module
+
+This module keeps one shared limiter per AI provider so that bursts of Slack
+requests degrade smoothly instead of surfacing 429s to users:
+- Token buckets for requests/minute and tokens/minute that queue callers briefly
+- Jittered exponential backoff on 429 and 5xx responses
+- A circuit breaker that reports the provider as unhealthy so callers can fall back
+
+Requests refused locally, requests queued for capacity, failed provider requests (by cause)
+and the breaker state of each provider are exported as metrics.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from collections.abc import Awaitable, Callable
+from typing import TypeVar
+
+from observability.metrics import counter, register_callback
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Default limits, overridable per provider with e.g. ANTHROPIC_REQUESTS_PER_MINUTE
+DEFAULT_REQUESTS_PER_MINUTE = 50
+DEFAULT_TOKENS_PER_MINUTE = 40000
+
+# How long a caller may wait in the bucket queue before the request is rejected
+MAX_QUEUE_SECONDS = float(os.environ.get("AI_RATE_LIMIT_MAX_QUEUE_SECONDS", "10"))
+
+# Retry policy for 429/5xx responses
+MAX_RETRIES = int(os.environ.get("AI_MAX_RETRIES", "3"))
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 8.0
+
+# Circuit breaker policy
+CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get("AI_CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_SECONDS = float(os.environ.get("AI_CIRCUIT_RESET_SECONDS", "30"))
+
+# Exception class names (shared by the Anthropic and OpenAI SDKs) that indicate a transient failure
+_RETRYABLE_ERROR_NAMES = {
+    "APIConnectionError",
+    "APITimeoutError",
+    "ServiceUnavailable",
+    "DeadlineExceeded",
+}
+
+
+RATE_LIMIT_REJECTIONS = counter(
+    "llm_rate_limit_rejections_total",
+    "Requests refused before reaching the provider (circuit_open, request_limit, token_limit)",
+    ("provider", "reason"),
+)
+RATE_LIMIT_QUEUED = counter(
+    "llm_rate_limit_queued_total",
+    "Requests that waited for rate-limit capacity",
+    ("provider",),
+)
+PROVIDER_ERRORS = counter(
+    "llm_provider_errors_total",
+    "Failed provider requests by cause (rate_limited: 429, server_error: 5xx, connection, other)",
+    ("provider", "cause"),
+)
+
+
+class RateLimitExceededError(Exception):
+    """Raised when a request would have to wait longer than MAX_QUEUE_SECONDS for capacity."""
+
+
+class ProviderUnavailableError(Exception):
+    """Raised when a provider's circuit breaker is open."""
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """
+    Check whether an SDK error is a transient failure worth retrying.
+
+    Args:
+        error: Exception raised by a provider SDK
+
+    Returns:
+        True for 429s, 5xx responses and connection errors
+    """
+    return error_cause(error) != "other"
+
+
+def error_cause(error: Exception) -> str:
+    """Classify a provider error as "rate_limited", "server_error", "connection" or "other"."""
+    if type(error).__name__ in _RETRYABLE_ERROR_NAMES:
+        return "connection"
+    # Anthropic/OpenAI expose `status_code`, google.api_core exposes `code`
+    status = getattr(error, "status_code", None)
+    if not isinstance(status, int):
+        status = getattr(error, "code", None)
+    if status == 429:
+        return "rate_limited"
+    if isinstance(status, int) and status >= 500:
+        return "server_error"
+    return "other"
+
+
+def _get_retry_after(error: Exception) -> float | None:
+    """Read the Retry-After header from an SDK error, if the server sent one."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        value = headers.get("retry-after")
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def estimate_tokens(*texts: str) -> int:
+    """Roughly estimate the number of tokens in the given texts (~4 characters per token)."""
+    return max(1, sum(len(text or "") for text in texts) // 4)
+
+
+class TokenBucket:
+    """Thread-safe token bucket that hands out reservations instead of failing immediately."""
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float, max_wait: float) -> float | None:
+        """
+        Reserve capacity from the bucket.
+
+        Args:
+            amount: Number of tokens to take (clamped to the bucket capacity)
+            max_wait: Longest acceptable wait in seconds
+
+        Returns:
+            Seconds the caller must wait before proceeding, or None if that would exceed max_wait
+        """
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity,
+                self.tokens + (now - self.updated_at) * self.refill_per_second,
+            )
+            self.updated_at = now
+
+            wait = max(0.0, (amount - self.tokens) / self.refill_per_second)
+            if wait > max_wait:
+                return None
+            # Going negative queues later callers behind this reservation
+            self.tokens -= amount
+            return wait
+
+    def refund(self, amount: float):
+        """Return capacity taken by a reservation that was not used."""
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + min(amount, self.capacity))
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker with a single half-open trial request.
+
+    Whoever is let through as the trial must end it with `record_success()` (the provider
+    answered), `record_failure()` (it did not) or `release()` (the trial was abandoned);
+    until then every other caller is refused.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        """Return True if a request may be sent to the provider."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if (
+                self.state == self.OPEN
+                and time.monotonic() - self.opened_at >= self.reset_seconds
+            ):
+                # Let exactly one trial request through
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def is_open(self) -> bool:
+        """Return True if the provider is currently considered unhealthy."""
+        with self._lock:
+            if self.state == self.OPEN:
+                return time.monotonic() - self.opened_at < self.reset_seconds
+            return self.state == self.HALF_OPEN
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def release(self):
+        """End a half-open trial that never reached the provider; the next caller becomes the trial."""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                # opened_at is kept, so the reset period has already passed
+                self.state = self.OPEN
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(
+                        f"Circuit opened after {self.failures} consecutive failures"
+                    )
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class ProviderLimiter:
+    """Request/token rate limits, retries and circuit breaking for a single provider."""
+
+    def __init__(
+        self, provider_name: str, requests_per_minute: float, tokens_per_minute: float
+    ):
+        self.provider_name = provider_name
+        self.request_bucket = TokenBucket(
+            requests_per_minute, requests_per_minute / 60.0
+        )
+        self.token_bucket = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0)
+        self.breaker = CircuitBreaker(CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_SECONDS)
+
+    def _reserve(self, estimated_tokens: int) -> float:
+        """
+        Reserve capacity for one attempt. On return the breaker has let the attempt through,
+        so the caller must record its outcome (`_handle_failure`, `record_success` or `release`).
+
+        Returns:
+            Seconds to wait before sending the request
+
+        Raises:
+            ProviderUnavailableError: If the circuit breaker is open
+            RateLimitExceededError: If capacity does not free up within MAX_QUEUE_SECONDS
+        """
+        request_wait = self.request_bucket.reserve(1, MAX_QUEUE_SECONDS)
+        if request_wait is None:
+            RATE_LIMIT_REJECTIONS.labels(
+                provider=self.provider_name, reason="request_limit"
+            ).inc()
+            raise RateLimitExceededError(
+                f"{self.provider_name} request queue is full, please try again shortly"
+            )
+        token_wait = self.token_bucket.reserve(estimated_tokens, MAX_QUEUE_SECONDS)
+        if token_wait is None:
+            self.request_bucket.refund(1)
+            RATE_LIMIT_REJECTIONS.labels(
+                provider=self.provider_name, reason="token_limit"
+            ).inc()
+            raise RateLimitExceededError(
+                f"{self.provider_name} token budget is exhausted, please try again shortly"
+            )
+        # Asked last, so a half-open trial slot is only taken by a request that will be sent
+        if not self.breaker.allow_request():
+            self.request_bucket.refund(1)
+            self.token_bucket.refund(estimated_tokens)
+            RATE_LIMIT_REJECTIONS.labels(
+                provider=self.provider_name, reason="circuit_open"
+            ).inc()
+            raise ProviderUnavailableError(
+                f"{self.provider_name} is temporarily unavailable"
+            )
+
+        wait = max(request_wait, token_wait)
+        if wait > 0:
+            RATE_LIMIT_QUEUED.labels(provider=self.provider_name).inc()
+            logger.info(
+                f"Queueing {self.provider_name} request for {wait:.2f}s (rate limit)"
+            )
+        return wait
+
+    def _handle_failure(self, error: Exception, attempt: int) -> float:
+        """
+        Record a failed attempt. Errors that are not retryable (e.g. a 400) mean the provider
+        is answering, so they close the breaker like a success.
+
+        Returns:
+            Seconds to back off before the next attempt
+
+        Raises:
+            The original error if it is not retryable or retries are exhausted
+        """
+        PROVIDER_ERRORS.labels(
+            provider=self.provider_name, cause=error_cause(error)
+        ).inc()
+        if not is_retryable_error(error):
+            self.breaker.record_success()
+            raise error
+        self.breaker.record_failure()
+        if attempt == MAX_RETRIES:
+            raise error
+        # Full jitter keeps concurrent retries from synchronizing
+        delay = _get_retry_after(error) or random.uniform(
+            0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2**attempt)
+        )
+        logger.warning(
+            f"{self.provider_name} call failed ({type(error).__name__}), "
+            f"retry {attempt + 1}/{MAX_RETRIES} in {delay:.2f}s"
+        )
+        return delay
+
+    def call(self, fn: Callable[[], T], estimated_tokens: int = 1) -> T:
+        """
+        Run a provider call under this provider's rate limits and retry policy.
+
+        Args:
+            fn: Zero-argument callable that performs the provider request
+            estimated_tokens: Estimated tokens consumed by the request
+
+        Returns:
+            The result of fn()
+
+        Raises:
+            ProviderUnavailableError: If the circuit breaker is open
+            RateLimitExceededError: If capacity does not free up within MAX_QUEUE_SECONDS
+        """
+        for attempt in range(MAX_RETRIES + 1):
+            wait = self._reserve(estimated_tokens)
+            try:
+                time.sleep(wait)
+                result = fn()
+            except Exception as e:
+                delay = self._handle_failure(e, attempt)
+            except BaseException:
+                self.breaker.release()
+                raise
+            else:
+                self.breaker.record_success()
+                return result
+            time.sleep(delay)
+
+    async def acall(
+        self, fn: Callable[[], Awaitable[T]], estimated_tokens: int = 1
+    ) -> T:
+        """Async variant of call() that waits without blocking the event loop."""
+        for attempt in range(MAX_RETRIES + 1):
+            wait = self._reserve(estimated_tokens)
+            try:
+                await asyncio.sleep(wait)
+                result = await fn()
+            except Exception as e:
+                delay = self._handle_failure(e, attempt)
+            except BaseException:
+                # Cancelled (or interrupted) while waiting or in the request
+                self.breaker.release()
+                raise
+            else:
+                self.breaker.record_success()
+                return result
+            await asyncio.sleep(delay)
+
+
+_limiters: dict[str, ProviderLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider_name: str) -> ProviderLimiter:
+    """Get or create the shared limiter for a provider."""
+    key = provider_name.lower()
+    with _limiters_lock:
+        if key not in _limiters:
+            prefix = key.upper()
+            _limiters[key] = ProviderLimiter(
+                key,
+                requests_per_minute=float(
+                    os.environ.get(
+                        f"{prefix}_REQUESTS_PER_MINUTE", DEFAULT_REQUESTS_PER_MINUTE
+                    )
+                ),
+                tokens_per_minute=float(
+                    os.environ.get(
+                        f"{prefix}_TOKENS_PER_MINUTE", DEFAULT_TOKENS_PER_MINUTE
+                    )
+                ),
+            )
+        return _limiters[key]
+
+
+def _circuit_states() -> dict[tuple, float]:
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {
+        (limiter.provider_name,): float(limiter.breaker.is_open())
+        for limiter in limiters
+    }
+
+
+register_callback(
+    "llm_circuit_open",
+    "1 while a provider's circuit breaker is open",
+    _circuit_states,
+    labelnames=("provider",),
+)
@@ -1,52 +1,71 @@
+import asyncio
+import functools
 import logging
 import os
+from collections.abc import AsyncIterator
+from typing import TYPE_CHECKING
 
-import google.api_core.exceptions
-import vertexai.generative_models
-
+from ..augmentation import MAX_TOOL_ITERATIONS
+from ..augmentation.mcp_toolbox import MCPToolbox
 from .base_provider import BaseAPIProvider
 
-logging.basicConfig(level=logging.ERROR)
+# The SDK is imported on first use, so app startup does not pay for unused providers
+if TYPE_CHECKING:
+    import google.api_core.exceptions
+
 logger = logging.getLogger(__name__)
 
 
 class VertexAPI(BaseAPIProvider):
+    NAME = "vertexai"
     VERTEX_AI_PROVIDER = "VertexAI"
     MODELS = {
         "gemini-1.5-flash-001": {
             "name": "Gemini 1.5 Flash 001",
             "provider": VERTEX_AI_PROVIDER,
             "max_tokens": 8192,
+            "input_price": 0.075,
+            "output_price": 0.3,
             "system_instruction_supported": True,
         },
         "gemini-1.5-flash-002": {
             "name": "Gemini 1.5 Flash 002",
             "provider": VERTEX_AI_PROVIDER,
             "max_tokens": 8192,
+            "input_price": 0.075,
+            "output_price": 0.3,
             "system_instruction_supported": True,
         },
         "gemini-1.5-pro-002": {
             "name": "Gemini 1.5 Pro 002",
             "provider": VERTEX_AI_PROVIDER,
             "max_tokens": 8192,
+            "input_price": 1.25,
+            "output_price": 5.0,
             "system_instruction_supported": True,
         },
         "gemini-1.5-pro-001": {
             "name": "Gemini 1.5 Pro 001",
             "provider": VERTEX_AI_PROVIDER,
             "max_tokens": 8192,
+            "input_price": 1.25,
+            "output_price": 5.0,
             "system_instruction_supported": True,
         },
         "gemini-1.0-pro-002": {
             "name": "Gemini 1.0 Pro 002",
             "provider": VERTEX_AI_PROVIDER,
             "max_tokens": 8192,
+            "input_price": 0.5,
+            "output_price": 1.5,
             "system_instruction_supported": True,
         },
         "gemini-1.0-pro-001": {
             "name": "Gemini 1.0 Pro 001",
             "provider": VERTEX_AI_PROVIDER,
             "max_tokens": 8192,
+            "input_price": 0.5,
+            "output_price": 1.5,
             "system_instruction_supported": False,
         },
         "gemini-flash-experimental": {
@@ -69,13 +88,10 @@ class VertexAPI(BaseAPIProvider):
         },
     }
 
+    CONFIG_ENV_VARS = ("VERTEX_AI_PROJECT_ID", "VERTEX_AI_LOCATION")
+
     def __init__(self):
         self.enabled = bool(os.environ.get("VERTEX_AI_PROJECT_ID", ""))
-        if self.enabled:
-            vertexai.init(
-                project=os.environ.get("VERTEX_AI_PROJECT_ID"),
-                location=os.environ.get("VERTEX_AI_LOCATION"),
-            )
 
     def set_model(self, model_name: str):
         if model_name not in self.MODELS.keys():
@@ -88,44 +104,202 @@ class VertexAPI(BaseAPIProvider):
         else:
             return {}
 
-    def generate_response(self, prompt: str, system_content: str) -> str:
-        system_instruction = None
+    def _build_model(self, system_content: str):
+        import vertexai.generative_models
+
+        _init_vertexai(
+            os.environ.get("VERTEX_AI_PROJECT_ID"), os.environ.get("VERTEX_AI_LOCATION")
+        )
+        self.system_instruction = None
         if self.MODELS[self.current_model]["system_instruction_supported"]:
-            system_instruction = system_content
-        else:
-            prompt = system_content + "\n" + prompt
+            self.system_instruction = system_content
+
+        return vertexai.generative_models.GenerativeModel(
+            model_name=self.current_model,
+            generation_config={
+                "max_output_tokens": self.MODELS[self.current_model]["max_tokens"],
+            },
+            system_instruction=self.system_instruction,
+        )
+
+    def _build_contents(self, prompt: str, system_content: str) -> str:
+        if self.MODELS[self.current_model]["system_instruction_supported"]:
+            return prompt
+        return system_content + "\n" + prompt
+
+    async def _generate(self, iteration: int, **kwargs):
+        async def generate():
+            with self._llm_call(iteration) as span:
+                response = await self.client.generate_content_async(**kwargs)
+                usage = response.usage_metadata
+                self._record_usage(
+                    span, usage.prompt_token_count, usage.candidates_token_count
+                )
+                return response
+
+        return await self._limited(
+            generate, self._estimate_tokens(self.system_instruction or "", kwargs)
+        )
+
+    async def agenerate_response(
+        self,
+        prompt: str,
+        system_content: str,
+        toolbox: MCPToolbox | None = None,
+    ) -> str:
+        import google.api_core.exceptions
+        from vertexai.generative_models import Content, FunctionDeclaration, Part, Tool
 
         try:
-            self.client = vertexai.generative_models.GenerativeModel(
-                model_name=self.current_model,
-                generation_config={
-                    "max_output_tokens": self.MODELS[self.current_model]["max_tokens"],
-                },
-                system_instruction=system_instruction,
+            self.client = self._build_model(system_content)
+            contents = self._build_contents(prompt, system_content)
+            if toolbox is None or not toolbox.tools:
+                response = await self._generate(1, contents=contents)
+                return _response_text(response)
+
+            tools = [
+                Tool(
+                    function_declarations=[
+                        FunctionDeclaration(
+                            name=tool["name"],
+                            description=tool["description"],
+                            parameters=_to_vertex_schema(tool["input_schema"]),
+                        )
+                        for tool in toolbox.tools
+                    ]
+                )
+            ]
+            history = [Content(role="user", parts=[Part.from_text(contents)])]
+            for iteration in range(1, MAX_TOOL_ITERATIONS + 1):
+                response = await self._generate(
+                    iteration, contents=history, tools=tools
+                )
+                calls = response.candidates[0].function_calls
+                if not calls:
+                    return _response_text(response)
+
+                logger.debug(
+                    f"Processing {len(calls)} tool calls in iteration {iteration}"
+                )
+                results = await asyncio.gather(
+                    *(
+                        toolbox.call_tool(call.name, call.to_dict().get("args", {}))
+                        for call in calls
+                    )
+                )
+                history.append(response.candidates[0].content)
+                history.append(
+                    Content(
+                        role="user",
+                        parts=[
+                            Part.from_function_response(
+                                name=call.name, response={"content": result_content}
+                            )
+                            for call, (result_content, _) in zip(calls, results)
+                        ],
+                    )
+                )
+
+            logger.warning(f"Hit max iterations ({MAX_TOOL_ITERATIONS}) in tool loop")
+            response = await self._generate(
+                MAX_TOOL_ITERATIONS + 1, contents=history, tools=tools
             )
-            response = self.client.generate_content(
-                contents=prompt,
+            return _response_text(response) or (
+                "I've gathered information but need to limit my analysis to stay within token limits. "
+                "Please ask a more specific question."
             )
-            return "".join(part.text for part in response.candidates[0].content.parts)
-
-        except google.api_core.exceptions.Unauthorized as e:
-            logger.error(f"Client is not Authorized. {e.reason}, {e.message}")
-            raise e
-        except google.api_core.exceptions.Forbidden as e:
-            logger.error(f"Client Forbidden. {e.reason}, {e.message}")
-            raise e
-        except google.api_core.exceptions.TooManyRequests as e:
-            logger.error(f"Too many requests. {e.reason}, {e.message}")
-            raise e
-        except google.api_core.exceptions.ClientError as e:
-            logger.error(f"Client error: {e.reason}, {e.message}")
-            raise e
-        except google.api_core.exceptions.ServerError as e:
-            logger.error(f"Server error: {e.reason}, {e.message}")
-            raise e
-        except google.api_core.exceptions.GoogleAPICallError as e:
-            logger.error(f"Error: {e.reason}, {e.message}")
+        except google.api_core.exceptions.GoogleAPIError as e:
+            _log_api_error(e)
             raise e
+
+    async def agenerate_response_stream(
+        self, prompt: str, system_content: str
+    ) -> AsyncIterator[str]:
+        import google.api_core.exceptions
+
+        try:
+            self.client = self._build_model(system_content)
+            contents = self._build_contents(prompt, system_content)
+            with self._llm_call() as span:
+                responses = await self._limited(
+                    functools.partial(
+                        self.client.generate_content_async,
+                        contents=contents,
+                        stream=True,
+                    ),
+                    self._estimate_tokens(self.system_instruction or "", contents),
+                )
+                usage = None
+                async for chunk in responses:
+                    # Every chunk carries the usage so far; the last one has the totals
+                    usage = chunk.usage_metadata or usage
+                    yield _response_text(chunk)
+                if usage is not None:
+                    self._record_usage(
+                        span, usage.prompt_token_count, usage.candidates_token_count
+                    )
         except google.api_core.exceptions.GoogleAPIError as e:
-            logger.error(f"Unknown error. {e}")
+            _log_api_error(e)
             raise e
+
+
+@functools.cache
+def _init_vertexai(project: str | None, location: str | None):
+    import vertexai
+
+    vertexai.init(project=project, location=location)
+
+
+def _response_text(response) -> str:
+    # Function-call parts carry no text
+    return "".join(
+        part.text
+        for part in response.candidates[0].content.parts
+        if "text" in part.to_dict()
+    )
+
+
+# JSON schema keywords understood by Vertex function declarations
+_VERTEX_SCHEMA_KEYS = {
+    "type",
+    "format",
+    "description",
+    "nullable",
+    "enum",
+    "properties",
+    "required",
+    "items",
+}
+
+
+def _to_vertex_schema(schema: dict) -> dict:
+    """Strip JSON schema keywords (e.g. `$schema`, `additionalProperties`) that Vertex rejects."""
+    cleaned = {}
+    for key, value in schema.items():
+        if key not in _VERTEX_SCHEMA_KEYS:
+            continue
+        if key == "properties":
+            value = {name: _to_vertex_schema(prop) for name, prop in value.items()}
+        elif key == "items" and isinstance(value, dict):
+            value = _to_vertex_schema(value)
+        cleaned[key] = value
+    return cleaned
+
+
+def _log_api_error(e: "google.api_core.exceptions.GoogleAPIError"):
+    import google.api_core.exceptions
+
+    if isinstance(e, google.api_core.exceptions.Unauthorized):
+        logger.error(f"Client is not Authorized. {e.reason}, {e.message}")
+    elif isinstance(e, google.api_core.exceptions.Forbidden):
+        logger.error(f"Client Forbidden. {e.reason}, {e.message}")
+    elif isinstance(e, google.api_core.exceptions.TooManyRequests):
+        logger.error(f"Too many requests. {e.reason}, {e.message}")
+    elif isinstance(e, google.api_core.exceptions.ClientError):
+        logger.error(f"Client error: {e.reason}, {e.message}")
+    elif isinstance(e, google.api_core.exceptions.ServerError):
+        logger.error(f"Server error: {e.reason}, {e.message}")
+    elif isinstance(e, google.api_core.exceptions.GoogleAPICallError):
+        logger.error(f"Error: {e.reason}, {e.message}")
+    else:
+        logger.error(f"Unknown error. {e}")
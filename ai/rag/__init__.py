@@ -2,21 +2,39 @@
 RAG (Retrieval-Augmented Generation) Module
 
 This module provides document indexing and retrieval capabilities
-for the Anthropic AI provider.
+for every AI provider (see `ai.augmentation`).
 
 Public API:
     - initialize_rag(): Initialize the RAG system on app startup
-    - retrieve_context(query): Retrieve relevant document chunks for a query
+    - retrieve_context(query): Retrieve relevant document chunks for a query (cached)
+    - clear_retrieval_cache(): Invalidate cached retrievals
 """
 
 import logging
-from typing import List
+import threading
+import time
+from collections import OrderedDict
 
-from .vector_store import get_vector_store
-from .rag_config import get_github_article_url
+from observability import start_span
+from observability.metrics import histogram
+
+# `vector_store` (LangChain, Chroma) is imported on first use, see `_get_vector_store()`
+from .rag_config import (
+    RETRIEVAL_CACHE_SIZE,
+    RETRIEVAL_CACHE_TTL_SECONDS,
+    get_github_article_url,
+)
 
 logger = logging.getLogger(__name__)
 
+# Cache of query -> (cached_at, result), shared by every provider and command
+_retrieval_cache: "OrderedDict[str, tuple]" = OrderedDict()
+_retrieval_cache_lock = threading.Lock()
+
+RETRIEVE_SECONDS = histogram(
+    "rag_retrieve_duration_seconds", "Knowledge base retrieval latency", ("cached",)
+)
+
 
 def initialize_rag():
     """
@@ -24,11 +42,18 @@ def initialize_rag():
     Should be called once during application startup.
     """
     logger.info("Initializing RAG system...")
-    vector_store = get_vector_store()
+    vector_store = _get_vector_store()
     vector_store.initialize()
+    clear_retrieval_cache()
     logger.info("RAG system initialization complete")
 
 
+def clear_retrieval_cache():
+    """Drop all cached retrievals (call whenever the index changes)."""
+    with _retrieval_cache_lock:
+        _retrieval_cache.clear()
+
+
 def retrieve_context(query: str) -> dict:
     """
     Retrieve relevant document chunks for a given query.
@@ -42,7 +67,45 @@ def retrieve_context(query: str) -> dict:
             - 'sources': List of source metadata dicts with 'filename' keys
         Returns empty dict if no relevant documents found
     """
-    vector_store = get_vector_store()
+    started_at = time.perf_counter()
+    with start_span("rag.retrieve") as span:
+        result, cached = _retrieve_cached(query)
+        span.set_attributes(cached=cached, sources=len(result["sources"]))
+    RETRIEVE_SECONDS.labels(cached=str(cached).lower()).observe(
+        time.perf_counter() - started_at
+    )
+    return result
+
+
+def _retrieve_cached(query: str):
+    cache_key = " ".join(query.lower().split())
+    with _retrieval_cache_lock:
+        cached = _retrieval_cache.get(cache_key)
+        if cached and time.monotonic() - cached[0] < RETRIEVAL_CACHE_TTL_SECONDS:
+            _retrieval_cache.move_to_end(cache_key)
+            logger.debug("Retrieval cache hit")
+            return cached[1], True
+
+    result = _retrieve_uncached(query)
+
+    # Empty results are not cached so a late-initialized index is picked up
+    if result["sources"]:
+        with _retrieval_cache_lock:
+            _retrieval_cache[cache_key] = (time.monotonic(), result)
+            _retrieval_cache.move_to_end(cache_key)
+            while len(_retrieval_cache) > RETRIEVAL_CACHE_SIZE:
+                _retrieval_cache.popitem(last=False)
+    return result, False
+
+
+def _get_vector_store():
+    from .vector_store import get_vector_store
+
+    return get_vector_store()
+
+
+def _retrieve_uncached(query: str) -> dict:
+    vector_store = _get_vector_store()
     documents = vector_store.retrieve(query)
 
     if not documents:
@@ -62,10 +125,7 @@ def retrieve_context(query: str) -> dict:
         # Add unique sources with GitHub URLs
         if filename not in seen_sources:
             github_url = get_github_article_url(filename)
-            sources.append({
-                "filename": filename,
-                "url": github_url
-            })
+            sources.append({"filename": filename, "url": github_url})
             seen_sources.add(filename)
 
     formatted_context = "\n\n".join(context_parts)
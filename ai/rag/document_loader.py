@@ -4,51 +4,60 @@ Document Loader Module
 This module handles loading and chunking markdown documents from the knowledge base.
 """
 
-import os
 import logging
-from typing import List
-from langchain_community.document_loaders import DirectoryLoader, TextLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+import os
+
 from langchain.schema import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_community.document_loaders import DirectoryLoader, TextLoader
 
-from .rag_config import CHUNK_SIZE, CHUNK_OVERLAP, DOCS_DIRECTORY
+from .rag_config import CHUNK_OVERLAP, CHUNK_SIZE, DOCS_DIRECTORY
 
 logger = logging.getLogger(__name__)
 
 
-def load_and_chunk_documents() -> List[Document]:
+def load_and_chunk_documents(
+    chunk_size: int = CHUNK_SIZE,
+    chunk_overlap: int = CHUNK_OVERLAP,
+    docs_directory: str = DOCS_DIRECTORY,
+) -> list[Document]:
     """
     Load markdown documents from the docs directory and split them into chunks.
 
+    Args:
+        chunk_size: Characters per chunk (default from config)
+        chunk_overlap: Characters shared by neighbouring chunks (default from config)
+        docs_directory: Directory of markdown documents (default from config)
+
     Returns:
         List[Document]: List of chunked documents with metadata
     """
     try:
         # Check if docs directory exists
-        if not os.path.exists(DOCS_DIRECTORY):
-            logger.warning(f"Documents directory not found: {DOCS_DIRECTORY}")
+        if not os.path.exists(docs_directory):
+            logger.warning(f"Documents directory not found: {docs_directory}")
             return []
 
         # Load all markdown files from the directory
         loader = DirectoryLoader(
-            DOCS_DIRECTORY,
+            docs_directory,
             glob="**/*.md",
             loader_cls=TextLoader,
-            loader_kwargs={"encoding": "utf-8"}
+            loader_kwargs={"encoding": "utf-8"},
         )
 
         documents = loader.load()
-        logger.info(f"Loaded {len(documents)} documents from {DOCS_DIRECTORY}")
+        logger.info(f"Loaded {len(documents)} documents from {docs_directory}")
 
         if len(documents) == 0:
-            logger.warning(f"No markdown files found in {DOCS_DIRECTORY}")
+            logger.warning(f"No markdown files found in {docs_directory}")
             return []
 
         # Split documents into chunks
         text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=CHUNK_SIZE,
-            chunk_overlap=CHUNK_OVERLAP,
-            separators=["\n## ", "\n### ", "\n\n", "\n", " ", ""]
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            separators=["\n## ", "\n### ", "\n\n", "\n", " ", ""],
         )
 
         chunked_docs = text_splitter.split_documents(documents)
@@ -13,6 +13,10 @@ CHUNK_OVERLAP = 200  # Character overlap between chunks to preserve context
 # Retrieval parameters
 TOP_K_CHUNKS = 3  # Number of most relevant chunks to retrieve
 
+# Retrieval cache (shared by all providers; cleared when the index is rebuilt)
+RETRIEVAL_CACHE_SIZE = 512  # Number of distinct queries to keep
+RETRIEVAL_CACHE_TTL_SECONDS = 600  # How long a cached retrieval stays valid
+
 # ChromaDB configuration
 CHROMA_COLLECTION_NAME = "knowledge_docs"
 CHROMA_PERSIST_DIR = "data/chroma_db"
@@ -2,27 +2,45 @@
 Vector Store Module
 
 This module manages the ChromaDB vector database for document embeddings and retrieval.
+The index status, version (a hash of the indexed chunks) and size are exported as metrics.
 """
 
-import os
+import hashlib
 import logging
-from typing import List, Optional
-from langchain_openai import OpenAIEmbeddings
-from langchain_chroma import Chroma
-from langchain.schema import Document
+import os
+import time
+from typing import TYPE_CHECKING
+
+from observability import start_span
+from observability.metrics import histogram, register_callback
 
 from .rag_config import CHROMA_COLLECTION_NAME, CHROMA_PERSIST_DIR, TOP_K_CHUNKS
-from .document_loader import load_and_chunk_documents
+
+# LangChain and Chroma are imported only once the index is built, after the API key check
+if TYPE_CHECKING:
+    from langchain.schema import Document
+    from langchain_chroma import Chroma
 
 logger = logging.getLogger(__name__)
 
+RETRIEVAL_STAGE_SECONDS = histogram(
+    "rag_stage_duration_seconds", "Latency of the uncached retrieval stages", ("stage",)
+)
+
 
 class VectorStore:
     """Manages ChromaDB vector store for document retrieval."""
 
     def __init__(self):
-        self.vector_store: Optional[Chroma] = None
+        self.vector_store: Chroma | None = None
         self.embeddings = None
+        # "not_initialized", "disabled" (no API key or documents), "failed" or "ready"
+        self.status = "not_initialized"
+        # Changes whenever the indexed chunks do; empty until indexed
+        self.version = ""
+        self.chunk_count = 0
+        self.document_count = 0
+        self.indexed_at = 0.0
 
     def initialize(self):
         """
@@ -33,8 +51,14 @@ class VectorStore:
             # Verify OpenAI API key exists
             if not os.environ.get("OPENAI_API_KEY"):
                 logger.error("OPENAI_API_KEY not found. RAG initialization skipped.")
+                self.status = "disabled"
                 return
 
+            from langchain_chroma import Chroma
+            from langchain_openai import OpenAIEmbeddings
+
+            from .document_loader import load_and_chunk_documents
+
             # Initialize OpenAI embeddings
             self.embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
             logger.info("Initialized OpenAI embeddings")
@@ -47,6 +71,7 @@ class VectorStore:
 
             if len(documents) == 0:
                 logger.warning("No documents to index. RAG system inactive.")
+                self.status = "disabled"
                 return
 
             # Create or load ChromaDB collection
@@ -61,20 +86,41 @@ class VectorStore:
             existing_count = collection.count()
 
             if existing_count > 0:
-                logger.info(f"Found existing ChromaDB collection with {existing_count} chunks")
+                logger.info(
+                    f"Found existing ChromaDB collection with {existing_count} chunks"
+                )
                 logger.info("Clearing existing collection and re-indexing")
                 # Clear the collection
                 collection.delete(ids=collection.get()["ids"])
 
             # Add documents to vector store
             self.vector_store.add_documents(documents)
-            logger.info(f"Successfully indexed {len(documents)} document chunks")
+            self._set_indexed(documents)
+            logger.info(
+                f"Successfully indexed {len(documents)} document chunks (version {self.version})"
+            )
 
         except Exception as e:
             logger.error(f"Error initializing vector store: {e}")
             self.vector_store = None
-
-    def retrieve(self, query: str, k: int = TOP_K_CHUNKS) -> List[Document]:
+            self.status = "failed"
+
+    def _set_indexed(self, documents: list["Document"]):
+        digest = hashlib.sha1()
+        for document in documents:
+            digest.update(document.metadata.get("source", "").encode())
+            digest.update(b"\0")
+            digest.update(document.page_content.encode())
+            digest.update(b"\0")
+        self.version = digest.hexdigest()[:12]
+        self.chunk_count = len(documents)
+        self.document_count = len(
+            {document.metadata.get("source") for document in documents}
+        )
+        self.indexed_at = time.time()
+        self.status = "ready"
+
+    def retrieve(self, query: str, k: int = TOP_K_CHUNKS) -> list["Document"]:
         """
         Retrieve the top k most relevant document chunks for a query.
 
@@ -90,9 +136,21 @@ class VectorStore:
             return []
 
         try:
-            # Perform similarity search
-            results = self.vector_store.similarity_search(query, k=k)
-            logger.info(f"Retrieved {len(results)} relevant chunks for query")
+            # Embed the query and search separately, so each shows up as its own span
+            started_at = time.perf_counter()
+            with start_span("rag.embed"):
+                embedding = self.embeddings.embed_query(query)
+            embedded_at = time.perf_counter()
+            with start_span("rag.vector_search", k=k) as span:
+                results = self.vector_store.similarity_search_by_vector(embedding, k=k)
+                span.set_attribute("results", len(results))
+            RETRIEVAL_STAGE_SECONDS.labels(stage="embed").observe(
+                embedded_at - started_at
+            )
+            RETRIEVAL_STAGE_SECONDS.labels(stage="vector_search").observe(
+                time.perf_counter() - embedded_at
+            )
+            logger.debug(f"Retrieved {len(results)} relevant chunks for query")
             return results
 
         except Exception as e:
@@ -101,7 +159,7 @@ class VectorStore:
 
 
 # Global vector store instance
-_vector_store_instance: Optional[VectorStore] = None
+_vector_store_instance: VectorStore | None = None
 
 
 def get_vector_store() -> VectorStore:
@@ -110,3 +168,42 @@ def get_vector_store() -> VectorStore:
     if _vector_store_instance is None:
         _vector_store_instance = VectorStore()
     return _vector_store_instance
+
+
+def _register_metrics():
+    def index_info():
+        store = _vector_store_instance
+        if store is None:
+            return {}
+        return {(store.status, store.version): 1}
+
+    def index_size():
+        store = _vector_store_instance
+        if store is None:
+            return {}
+        return {("chunks",): store.chunk_count, ("documents",): store.document_count}
+
+    register_callback(
+        "rag_index_info",
+        "Knowledge base index status and version",
+        index_info,
+        labelnames=("status", "version"),
+    )
+    register_callback(
+        "rag_index_size",
+        "Indexed chunks and documents",
+        index_size,
+        labelnames=("unit",),
+    )
+    register_callback(
+        "rag_index_built_timestamp_seconds",
+        "Unix time the index was last built (0 until built)",
+        lambda: (
+            _vector_store_instance.indexed_at
+            if _vector_store_instance is not None
+            else 0
+        ),
+    )
+
+
+_register_metrics()
@@ -1,15 +1,19 @@
 import os
-import logging
 
 from slack_bolt import App
 from slack_bolt.adapter.socket_mode import SocketModeHandler
 
-from listeners import register_listeners
 from ai.rag import initialize_rag
+from listeners import register_listeners
+from observability.logging_setup import configure_logging
+from observability.metrics_server import start_metrics_server
+from observability.profiler import install_signal_handler
 
 # Initialization
-app = App(token=os.environ.get("SLACK_BOT_TOKEN"))
-logging.basicConfig(level=logging.DEBUG)
+# Log records are written by a background thread; levels come from LOG_LEVEL / LOG_LEVELS
+configure_logging()
+# Self events are filtered by `listeners.middleware` after the conversation cache has recorded them
+app = App(token=os.environ.get("SLACK_BOT_TOKEN"), ignoring_self_events_enabled=False)
 
 # Initialize RAG system
 initialize_rag()
@@ -19,4 +23,8 @@ register_listeners(app)
 
 # Start Bolt app
 if __name__ == "__main__":
+    # Serves /metrics on METRICS_PORT when it is set
+    start_metrics_server()
+    # `kill -USR2 <pid>` writes a sampling profile to data/profiles (see observability.profiler)
+    install_signal_handler()
     SocketModeHandler(app, os.environ.get("SLACK_APP_TOKEN")).start()
@@ -0,0 +1,40 @@
+import asyncio
+import os
+
+from slack_bolt.adapter.socket_mode.async_handler import AsyncSocketModeHandler
+from slack_bolt.async_app import AsyncApp
+
+from ai.rag import initialize_rag
+from listeners import register_async_listeners
+from observability.logging_setup import configure_logging
+from observability.metrics_server import start_metrics_server
+from observability.profiler import install_signal_handler
+
+# Initialization
+# Log records are written by a background thread; levels come from LOG_LEVEL / LOG_LEVELS
+configure_logging()
+# Every listener runs as a coroutine on one event loop, so in-flight LLM calls
+# don't each hold a worker thread (see benchmarks/concurrency_benchmark.py)
+# Self events are filtered by `listeners.middleware` after the conversation cache has recorded them
+app = AsyncApp(
+    token=os.environ.get("SLACK_BOT_TOKEN"), ignoring_self_events_enabled=False
+)
+
+# Initialize RAG system
+initialize_rag()
+
+# Register Listeners
+register_async_listeners(app)
+
+
+async def main():
+    await AsyncSocketModeHandler(app, os.environ.get("SLACK_APP_TOKEN")).start_async()
+
+
+# Start Bolt app
+if __name__ == "__main__":
+    # Serves /metrics on METRICS_PORT when it is set
+    start_metrics_server()
+    # `kill -USR2 <pid>` writes a sampling profile to data/profiles (see observability.profiler)
+    install_signal_handler()
+    asyncio.run(main())
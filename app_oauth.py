@@ -1,15 +1,17 @@
-import logging
 import os
+
 from slack_bolt import App, BoltResponse
-from slack_bolt.oauth.callback_options import CallbackOptions, SuccessArgs, FailureArgs
+from slack_bolt.oauth.callback_options import CallbackOptions, FailureArgs, SuccessArgs
 from slack_bolt.oauth.oauth_settings import OAuthSettings
-
-from slack_sdk.oauth.installation_store import FileInstallationStore
 from slack_sdk.oauth.state_store import FileOAuthStateStore
 
 from listeners import register_listeners
+from observability.logging_setup import configure_logging
+from observability.metrics_server import start_metrics_server
+from state_store.cached_installation_store import create_installation_store
 
-logging.basicConfig(level=logging.DEBUG)
+# Log records are written by a background thread; levels come from LOG_LEVEL / LOG_LEVELS
+configure_logging()
 
 
 # Callback to run on successful installation
@@ -28,7 +30,8 @@ def failure(args: FailureArgs) -> BoltResponse:
 # Initialization
 app = App(
     signing_secret=os.environ.get("SLACK_SIGNING_SECRET"),
-    installation_store=FileInstallationStore(),
+    # Authorization looks installations up in memory; saves and deletes invalidate the cache
+    installation_store=create_installation_store(os.environ.get("SLACK_CLIENT_ID")),
     oauth_settings=OAuthSettings(
         client_id=os.environ.get("SLACK_CLIENT_ID"),
         client_secret=os.environ.get("SLACK_CLIENT_SECRET"),
@@ -40,11 +43,17 @@ app = App(
         state_store=FileOAuthStateStore(expiration_seconds=600),
         callback_options=CallbackOptions(success=success, failure=failure),
     ),
+    # Self events are filtered by `listeners.middleware` after the conversation cache has recorded them
+    ignoring_self_events_enabled=False,
 )
 
 # Register Listeners
 register_listeners(app)
+# Delete (and evict from the cache) installations when the app is uninstalled or its tokens are revoked
+app.enable_token_revocation_listeners()
 
 # Start Bolt app
 if __name__ == "__main__":
+    # Bolt's built-in server only routes Slack requests, so metrics get their own port (METRICS_PORT)
+    start_metrics_server()
     app.start(3000)
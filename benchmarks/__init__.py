@@ -0,0 +1 @@
+"""Benchmarks and load-testing helpers. Run modules with `python -m benchmarks.<name>`."""
@@ -0,0 +1,158 @@
+"""
+Concurrency benchmark: threaded `App` vs `AsyncApp` listeners.
+
+Drives the `/ask` listener with N simultaneous requests against a fake provider
+and fake Slack clients. The threaded mode runs the sync callback on a
+ThreadPoolExecutor sized like Bolt's default listener executor; the async mode
+runs the async callback for every request on one event loop.
+
+Usage:
+    python -m benchmarks.concurrency_benchmark --requests 10 50 200 --llm-latency 1.0
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+# The fake provider must not be throttled by the provider rate limiter
+os.environ.setdefault("FAKE_REQUESTS_PER_MINUTE", "1000000")
+os.environ.setdefault("FAKE_TOKENS_PER_MINUTE", "1000000000")
+
+from ai.providers import PROVIDERS
+from listeners.commands.ask_command import ask_callback, async_ask_callback
+from state_store.set_user_state import set_user_state
+
+from .fakes import (
+    FakeAsyncWebClient,
+    FakeProvider,
+    FakeWebClient,
+    fake_ack,
+    fake_async_ack,
+    make_user_ids,
+)
+
+# Bolt's `App` runs listeners on ThreadPoolExecutor(max_workers=5) by default
+BOLT_DEFAULT_WORKERS = 5
+
+logger = logging.getLogger("benchmarks.concurrency")
+
+
+def _command(user_id: str, index: int) -> dict:
+    return {
+        "text": f"benchmark question {index}",
+        "user_id": user_id,
+        "channel_id": "CBENCH",
+    }
+
+
+def _context(user_id: str) -> dict:
+    return {"user_id": user_id, "channel_id": "CBENCH"}
+
+
+def run_threaded(user_ids: list[str], workers: int, slack_latency: float) -> dict:
+    client = FakeWebClient(slack_latency)
+    FakeProvider.recorder = type(FakeProvider.recorder)()
+    started_at = time.monotonic()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(
+                ask_callback,
+                client=client,
+                ack=fake_ack,
+                command=_command(user_id, i),
+                say=None,
+                logger=logger,
+                context=_context(user_id),
+            )
+            for i, user_id in enumerate(user_ids)
+        ]
+        wait(futures)
+    return _result("threaded", len(user_ids), time.monotonic() - started_at, client)
+
+
+async def _run_async(user_ids: list[str], slack_latency: float) -> dict:
+    client = FakeAsyncWebClient(slack_latency)
+    FakeProvider.recorder = type(FakeProvider.recorder)()
+    started_at = time.monotonic()
+    await asyncio.gather(
+        *(
+            async_ask_callback(
+                client=client,
+                ack=fake_async_ack,
+                command=_command(user_id, i),
+                say=None,
+                logger=logger,
+                context=_context(user_id),
+            )
+            for i, user_id in enumerate(user_ids)
+        )
+    )
+    return _result("async", len(user_ids), time.monotonic() - started_at, client)
+
+
+def run_async(user_ids: list[str], slack_latency: float) -> dict:
+    return asyncio.run(_run_async(user_ids, slack_latency))
+
+
+def _result(mode: str, requests: int, elapsed: float, client) -> dict:
+    return {
+        "mode": mode,
+        "requests": requests,
+        "seconds": elapsed,
+        "throughput": requests / elapsed,
+        "peak_llm_calls": FakeProvider.recorder.peak_in_flight,
+        "slack_calls": sum(client.calls.values()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument(
+        "--llm-latency",
+        type=float,
+        default=1.0,
+        help="Simulated LLM latency in seconds",
+    )
+    parser.add_argument(
+        "--slack-latency",
+        type=float,
+        default=0.05,
+        help="Simulated Slack API latency in seconds",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=BOLT_DEFAULT_WORKERS,
+        help="Threaded listener pool size",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    PROVIDERS["fake"] = FakeProvider
+    FakeProvider.latency_seconds = args.llm_latency
+
+    # User selections are read from ./data, so work in a scratch directory
+    os.chdir(tempfile.mkdtemp(prefix="concurrency-benchmark-"))
+    user_ids = make_user_ids(max(args.requests))
+    for user_id in user_ids:
+        set_user_state(user_id, "fake", "fake-model")
+
+    print(f"{'mode':<10}{'requests':>10}{'seconds':>10}{'req/s':>10}{'peak LLM':>10}")
+    for count in args.requests:
+        for result in (
+            run_threaded(user_ids[:count], args.workers, args.slack_latency),
+            run_async(user_ids[:count], args.slack_latency),
+        ):
+            print(
+                f"{result['mode']:<10}{result['requests']:>10}{result['seconds']:>10.2f}"
+                f"{result['throughput']:>10.1f}{result['peak_llm_calls']:>10}"
+            )
+
+
+if __name__ == "__main__":
+    main()
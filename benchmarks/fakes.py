@@ -0,0 +1,371 @@
+"""
+Fake Slack clients, AI providers, MCP tools and embeddings for benchmarks.
+
+They simulate network latency without talking to Slack or a model vendor, so
+the listeners can be driven exactly as Bolt would drive them. `RecordedProvider`
+answers from a traffic journal instead (see `benchmarks.replay`).
+"""
+
+import asyncio
+import functools
+import hashlib
+import itertools
+import json
+import math
+import random
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from collections.abc import Callable
+from types import SimpleNamespace
+
+from ai.providers.base_provider import BaseAPIProvider
+from ai.providers.rate_limiter import estimate_tokens
+from observability.journal import current_request_id
+
+
+class _Recorder:
+    """Counts calls and tracks the peak number of calls in flight."""
+
+    def __init__(self):
+        self.calls: dict[str, int] = {}
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._lock = threading.Lock()
+
+    def enter(self, method: str):
+        with self._lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def exit(self):
+        with self._lock:
+            self.in_flight -= 1
+
+
+def _fake_response(method: str, kwargs: dict) -> dict:
+    response = {
+        "ok": True,
+        "channel": kwargs.get("channel"),
+        "ts": f"{time.time():.6f}",
+    }
+    if method.startswith("conversations_"):
+        # History and replies: an empty channel/thread apart from the message being answered
+        response["messages"] = []
+    return response
+
+
+class FakeWebClient(_Recorder):
+    """Blocking stand-in for `slack_sdk.WebClient`."""
+
+    def __init__(self, latency_seconds: float = 0.05, token: str = "xoxb-benchmark"):
+        super().__init__()
+        self.latency_seconds = latency_seconds
+        # The outbox rate-limits per token, i.e. per workspace
+        self.token = token
+
+    def _api_call(self, method: str, **kwargs) -> dict:
+        self.enter(method)
+        try:
+            time.sleep(self.latency_seconds)
+            return _fake_response(method, kwargs)
+        finally:
+            self.exit()
+
+    def __getattr__(self, method: str):
+        if method.startswith("_"):
+            raise AttributeError(method)
+        return lambda **kwargs: self._api_call(method, **kwargs)
+
+
+class FakeAsyncWebClient(_Recorder):
+    """Non-blocking stand-in for `slack_sdk.web.async_client.AsyncWebClient`."""
+
+    def __init__(self, latency_seconds: float = 0.05, token: str = "xoxb-benchmark"):
+        super().__init__()
+        self.latency_seconds = latency_seconds
+        self.token = token
+
+    async def _api_call(self, method: str, **kwargs) -> dict:
+        self.enter(method)
+        try:
+            await asyncio.sleep(self.latency_seconds)
+            return _fake_response(method, kwargs)
+        finally:
+            self.exit()
+
+    def __getattr__(self, method: str):
+        if method.startswith("_"):
+            raise AttributeError(method)
+        return lambda **kwargs: self._api_call(method, **kwargs)
+
+
+class FakeProvider(BaseAPIProvider):
+    """
+    AI provider that sleeps instead of calling a model.
+
+    By default every response takes `latency_seconds` and echoes the prompt. For load tests,
+    latency and output length can follow log-normal distributions, and with a toolbox the
+    provider makes `tool_calls` MCP tool calls, one model call apart, like a real tool loop.
+    """
+
+    NAME = "fake"
+    MODELS = {
+        "fake-model": {
+            "name": "Fake Model",
+            "provider": "Fake",
+            "max_tokens": 1024,
+        },
+    }
+
+    latency_seconds = 1.0
+    # Log-normal spread around the median latency/output length (0: always exactly the median)
+    latency_sigma = 0.0
+    # Median output tokens per model call; 0 echoes the prompt instead
+    output_tokens = 0
+    output_tokens_sigma = 0.0
+    tool_calls = 0
+    random = random.Random(0)
+    recorder = _Recorder()
+
+    def set_model(self, model_name: str):
+        if model_name not in self.MODELS.keys():
+            raise ValueError("Invalid model")
+        self.current_model = model_name
+
+    def get_models(self) -> dict:
+        return self.MODELS
+
+    async def _model_call(self, iteration: int, input_tokens: int) -> int:
+        """One model request; returns its output tokens."""
+        with self._llm_call(iteration) as span:
+            await asyncio.sleep(
+                _lognormal(self.random, self.latency_seconds, self.latency_sigma)
+            )
+            output_tokens = round(
+                _lognormal(self.random, self.output_tokens, self.output_tokens_sigma)
+            )
+            self._record_usage(span, input_tokens, output_tokens)
+            return output_tokens
+
+    async def agenerate_response(
+        self, prompt: str, system_content: str, toolbox=None
+    ) -> str:
+        self.recorder.enter("generate")
+        try:
+            tools = toolbox.tools if toolbox is not None else []
+            calls = self.tool_calls if tools else 0
+            input_tokens = estimate_tokens(prompt, system_content)
+            for iteration in range(1, calls + 2):
+                output_tokens = await self._limited(
+                    functools.partial(self._model_call, iteration, input_tokens),
+                    input_tokens,
+                )
+                if iteration <= calls:
+                    tool = tools[(iteration - 1) % len(tools)]
+                    result, _ = await toolbox.call_tool(
+                        tool["name"], _tool_arguments(tool, prompt)
+                    )
+                    input_tokens += len(result) // 4
+            if not self.output_tokens:
+                return f"Echo: {prompt}"
+            return " ".join(["lorem"] * output_tokens)
+        finally:
+            self.recorder.exit()
+
+
+class TokensByRequest:
+    """Provider mixin that adds up reported token usage per journal request ID."""
+
+    lock = threading.Lock()
+    tokens: dict[str | None, list[int]] = defaultdict(lambda: [0, 0])
+
+    def _record_usage(self, span, input_tokens: int, output_tokens: int):
+        super()._record_usage(span, input_tokens, output_tokens)
+        with TokensByRequest.lock:
+            totals = TokensByRequest.tokens[current_request_id()]
+            totals[0] += input_tokens
+            totals[1] += output_tokens
+
+
+class RecordedBackend:
+    """Provider responses and tool results of a traffic journal, indexed for replay."""
+
+    def __init__(self, generations: list[dict]):
+        self.generations: dict[str, deque[dict]] = defaultdict(deque)
+        self.tool_results: dict[str, deque[dict]] = defaultdict(deque)
+        self.tool_names = set()
+        for generation in generations:
+            self.generations[generation["request"]].append(generation)
+            for tool in generation["tools"]:
+                self.tool_names.add(tool["tool"])
+                # Results served from the tool cache while recording carry no latency worth replaying
+                if not tool["cached"]:
+                    self.tool_results[
+                        self._tool_key(tool["tool"], tool["arguments"])
+                    ].append(tool)
+        self._any_generation = itertools.cycle(generations) if generations else None
+        self._lock = threading.Lock()
+        # Responses asked for by replayed requests that the journal has no match for
+        self.unmatched = 0
+
+    @staticmethod
+    def _tool_key(name: str, arguments: dict) -> str:
+        return f"{name}:{json.dumps(arguments, sort_keys=True, default=str)}"
+
+    def next_generation(self, request_id: str | None) -> dict:
+        """The request's next recorded response, or any recorded response once it has none left."""
+        with self._lock:
+            recorded = self.generations.get(request_id)
+            if recorded:
+                return recorded.popleft()
+            if self._any_generation is None:
+                raise RuntimeError("The journal has no provider responses to replay")
+            self.unmatched += 1
+            return next(self._any_generation)
+
+    def tool_result(self, name: str, arguments: dict) -> dict:
+        with self._lock:
+            recorded = self.tool_results.get(self._tool_key(name, arguments))
+            if recorded:
+                # Repeated calls cycle through the recorded results in order
+                recorded.rotate(-1)
+                return recorded[-1]
+        return {
+            "result": f"No recorded result for {name}",
+            "is_error": True,
+            "duration": 0.0,
+        }
+
+
+class RecordedToolSession:
+    """Stands in for an MCP `ClientSession`, answering with recorded tool results after the recorded latency."""
+
+    def __init__(self, backend: RecordedBackend):
+        self.backend = backend
+
+    async def call_tool(self, name: str, arguments: dict):
+        recorded = self.backend.tool_result(name, arguments)
+        await asyncio.sleep(recorded["duration"])
+        return SimpleNamespace(
+            content=[SimpleNamespace(text=recorded["result"])],
+            isError=recorded["is_error"],
+        )
+
+
+class RecordedProvider(TokensByRequest, BaseAPIProvider):
+    """
+    AI provider that replays the recorded responses of the request being replayed.
+
+    Each recorded model call takes its recorded latency and reports its recorded output
+    tokens; input tokens are scaled by how much longer or shorter the prompt is now.
+    Recorded tool calls go through the toolbox, so tool caching still applies.
+    """
+
+    NAME = "recorded"
+    backend: RecordedBackend | None = None
+
+    def set_model(self, model_name: str):
+        self.current_model = model_name
+
+    def get_models(self) -> dict:
+        # Never offered in App Home or picked as a fallback
+        return {}
+
+    async def _replay_call(self, call: dict, input_tokens: int):
+        """Replay one recorded model request with its recorded latency and output tokens."""
+        with self._llm_call(call["iteration"]) as span:
+            await asyncio.sleep(call["duration"])
+            self._record_usage(span, input_tokens, call["output_tokens"])
+
+    async def agenerate_response(
+        self, prompt: str, system_content: str, toolbox=None
+    ) -> str:
+        generation = self.backend.next_generation(current_request_id())
+        recorded_chars = generation["prompt_chars"] + generation["system_chars"]
+        scale = (
+            (len(prompt) + len(system_content)) / recorded_chars
+            if recorded_chars
+            else 1.0
+        )
+
+        for position, call in enumerate(generation["calls"], start=1):
+            # Failed attempts were retried by the rate limiter while recording; only the answers are replayed
+            if "error" not in call:
+                input_tokens = round(call["input_tokens"] * scale)
+                await self._limited(
+                    functools.partial(self._replay_call, call, input_tokens),
+                    input_tokens,
+                )
+            tools = [
+                tool for tool in generation["tools"] if tool["after_call"] == position
+            ]
+            if tools and toolbox is not None:
+                await asyncio.gather(
+                    *(
+                        toolbox.call_tool(tool["tool"], tool["arguments"])
+                        for tool in tools
+                    )
+                )
+
+        if generation["status"] == "error":
+            raise RuntimeError(f"Recorded provider failure: {generation['error']}")
+        return generation["response"]
+
+
+def _lognormal(rng: random.Random, median: float, sigma: float) -> float:
+    if median <= 0 or sigma <= 0:
+        return median
+    return rng.lognormvariate(math.log(median), sigma)
+
+
+def _tool_arguments(tool: dict, prompt: str) -> dict:
+    """Arguments for a tool call: the start of the prompt for every required parameter."""
+    required = tool.get("input_schema", {}).get("required", [])
+    return {name: prompt[:50] for name in required}
+
+
+def fake_ack(*args, **kwargs):
+    pass
+
+
+def fake_say(client: FakeWebClient, channel: str) -> Callable[..., dict]:
+    """Bolt's `say` for a listener in `channel`: posts with the given client."""
+    return lambda text="", **kwargs: client.chat_postMessage(
+        channel=channel, text=text, **kwargs
+    )
+
+
+async def fake_async_ack(*args, **kwargs):
+    pass
+
+
+def make_user_ids(count: int) -> list[str]:
+    return [f"UBENCH{i:05d}" for i in range(count)]
+
+
+class FakeEmbeddings:
+    """
+    Deterministic stand-in for `OpenAIEmbeddings`: a hashed bag of words, L2-normalized.
+
+    Texts sharing words get similar vectors, so retrieval still ranks plausibly,
+    and no embedding API is called.
+    """
+
+    def __init__(self, dimensions: int = 256):
+        self.dimensions = dimensions
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        vector = [0.0] * self.dimensions
+        for word in re.findall(r"[a-z0-9]+", text.lower()):
+            bucket = int.from_bytes(
+                hashlib.blake2b(word.encode(), digest_size=4).digest(), "big"
+            )
+            vector[bucket % self.dimensions] += 1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
@@ -0,0 +1,603 @@
+"""
+Load test: the real listener callbacks, end to end, without any external service.
+
+Requests arrive at a steady average rate (Poisson arrivals) with a configurable mix of
+/incident, /code, /ask, app mentions, DMs and the summary function. Each one runs the
+listener callback the app registers, on the listener work queue (or, with --mode async,
+the AsyncApp callback on one event loop), against local fakes:
+- Slack: `FakeWebClient` with a fixed API latency
+- LLM: `FakeProvider` with log-normal latency and output-token distributions, making
+  MCP tool calls for /code
+- RAG: the real Chroma index over data/docs, embedded with `FakeEmbeddings`
+- MCP: `benchmarks.stub_mcp_server` over stdio
+
+Latency is measured from arrival until the listener returns (queue wait included); Slack
+updates it hands to the outbox are sent after that. The outbox applies Slack's real rate
+limits per workspace (chat.update: 50/min), which a single workspace exceeds at a few
+requests per second; use --workspaces to spread the load over several bot tokens. Set TRACE_EXPORTER=jsonl as well to
+break the same run down by stage with `observability.trace_report`.
+
+Usage:
+    python -m benchmarks.load_test --rate 20 --duration 30
+    python -m benchmarks.load_test --mix incident=3,code=1 --llm-latency 2 --llm-sigma 0.5
+    python -m benchmarks.load_test --mode async --workspaces 10 --json results.json
+"""
+
+import argparse
+import asyncio
+import inspect
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future, wait
+from dataclasses import dataclass, field
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MIX = "incident=3,code=1,ask=2,mention=2,dm=1,summary=1"
+
+INCIDENT_TOPICS = [
+    "kafka outbound message backlog is growing",
+    "akka inbound node down in riverside",
+    "springfield datacenter underperforming",
+    "oracle available connections high",
+    "udp pulsar rate underperforming",
+    "deactivated message backlog overgrowing",
+]
+CODE_TOPICS = [
+    "explain how the kafka consumer acknowledges messages",
+    "where is the retry policy for outbound messages configured",
+    "what configuration variables control the akka cluster",
+]
+QUESTION_TOPICS = [
+    "what should I check first when a consumer falls behind",
+    "summarize the on-call escalation steps",
+    "how do I read a latency percentile chart",
+]
+
+
+@dataclass
+class Request:
+    """One arrival: when, which command, and how to build its listener arguments from the fakes."""
+
+    offset: float
+    name: str
+    build_kwargs: Callable[[dict], dict]
+    # Set when replaying a journal, so recorded backends can find this request's responses
+    journal_id: str | None = None
+
+
+@dataclass
+class _Outcome:
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+
+
+class ErrorCounter(logging.Handler):
+    """Counts ERROR records of one command's listener logger (callbacks log failures instead of raising)."""
+
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.count = 0
+
+    def emit(self, record: logging.LogRecord):
+        self.count += 1
+
+
+def parse_mix(spec: str) -> dict[str, float]:
+    mix = {}
+    for entry in spec.split(","):
+        name, _, weight = entry.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[
+        min(len(sorted_values) - 1, int(len(sorted_values) * fraction))
+    ]
+
+
+def prepare_environment(args: argparse.Namespace) -> str:
+    """Set up a scratch working directory and the environment the app modules read at import."""
+    workdir = tempfile.mkdtemp(prefix="load-test-")
+    os.makedirs(os.path.join(workdir, "data"))
+    os.symlink(
+        os.path.join(REPO_ROOT, "data", "docs"), os.path.join(workdir, "data", "docs")
+    )
+
+    config_path = os.path.join(workdir, "server_config.json")
+    with open(config_path, "w") as file:
+        stub = {
+            "command": sys.executable,
+            "args": ["-m", "benchmarks.stub_mcp_server"],
+            "env": {
+                "PYTHONPATH": REPO_ROOT,
+                "STUB_MCP_LATENCY_SECONDS": str(args.tool_latency),
+            },
+        }
+        json.dump({"mcpServers": {"github": stub}}, file)
+
+    os.environ["MCP_SERVER_CONFIG"] = config_path
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    # The fake provider must not be throttled by the provider rate limiter
+    os.environ.setdefault("FAKE_REQUESTS_PER_MINUTE", "1000000")
+    os.environ.setdefault("FAKE_TOKENS_PER_MINUTE", "1000000000")
+    os.environ["AI_RESPONSE_CACHE_TTL_SECONDS"] = "60" if args.response_cache else "0"
+    # RAG index, user state and traces use paths relative to the working directory
+    os.chdir(workdir)
+    return workdir
+
+
+def build_commands(mode: str) -> dict[str, dict]:
+    from listeners.commands.ask_command import ask_callback, async_ask_callback
+    from listeners.commands.code_command import async_code_callback, code_callback
+    from listeners.commands.incident_command import (
+        async_incident_callback,
+        incident_callback,
+    )
+    from listeners.events.app_mentioned import (
+        app_mentioned_callback,
+        async_app_mentioned_callback,
+    )
+    from listeners.events.app_messaged import (
+        app_messaged_callback,
+        async_app_messaged_callback,
+    )
+    from listeners.functions.summary_function import (
+        async_handle_summary_function_callback,
+        handle_summary_function_callback,
+    )
+    from listeners.listener_utils import work_queue
+
+    is_async = mode == "async"
+    return {
+        "incident": {
+            "callback": async_incident_callback if is_async else incident_callback,
+            "priority": work_queue.PRIORITY_INCIDENT,
+            "command": "/incident",
+            "topics": INCIDENT_TOPICS,
+        },
+        "code": {
+            "callback": async_code_callback if is_async else code_callback,
+            "priority": work_queue.PRIORITY_CODE,
+            "command": "/code",
+            "topics": CODE_TOPICS,
+        },
+        "ask": {
+            "callback": async_ask_callback if is_async else ask_callback,
+            "priority": work_queue.PRIORITY_ASK,
+            "command": "/ask",
+            "topics": QUESTION_TOPICS,
+        },
+        "mention": {
+            "callback": async_app_mentioned_callback
+            if is_async
+            else app_mentioned_callback,
+            "priority": work_queue.PRIORITY_MENTION,
+            "event": {"type": "app_mention"},
+            "topics": QUESTION_TOPICS,
+        },
+        "dm": {
+            "callback": async_app_messaged_callback
+            if is_async
+            else app_messaged_callback,
+            "priority": work_queue.PRIORITY_DM,
+            "event": {"type": "message", "channel_type": "im"},
+            "topics": QUESTION_TOPICS,
+        },
+        "summary": {
+            "callback": async_handle_summary_function_callback
+            if is_async
+            else handle_summary_function_callback,
+            "priority": work_queue.PRIORITY_SUMMARY,
+            "function": True,
+            "topics": [""],
+        },
+    }
+
+
+def listener_kwargs(
+    name: str, fakes: dict, client, context: dict, payload: dict
+) -> dict:
+    """
+    Everything Bolt could pass to the listener; `_call` keeps the arguments it accepts.
+
+    Args:
+        name: Key of the command in `build_commands()`
+        fakes: The runner's fake Slack client(s) and Bolt utilities
+        client: The fake client of the request's workspace
+        context: Bolt context values (user_id, channel_id)
+        payload: "command", "event" and/or "inputs" as Slack sends them
+    """
+    kwargs = {
+        "client": client,
+        "ack": fakes["ack"],
+        "say": fakes["say"](client, context.get("channel_id")),
+        "logger": logging.getLogger(f"benchmarks.load_test.{name}"),
+        "context": context,
+        **payload,
+    }
+    if "inputs" in payload:
+        kwargs["complete"] = fakes["complete"]
+        kwargs["fail"] = fakes["fail"](kwargs["logger"])
+    return kwargs
+
+
+def _synthetic_kwargs(
+    name: str, spec: dict, index: int, user_id: str, rng: random.Random, fakes: dict
+) -> dict:
+    channel_id = f"CLOAD{index % 20:03d}"
+    client = fakes["clients"][index % len(fakes["clients"])]
+    topic = rng.choice(spec["topics"])
+    # Distinct prompts, so neither retrieval nor response caches answer for the listener
+    prompt = f"{topic} (request {index})"
+    ts = f"{time.time():.6f}"
+    payload = {}
+    if "command" in spec:
+        payload["command"] = {
+            "command": spec["command"],
+            "text": prompt,
+            "user_id": user_id,
+            "channel_id": channel_id,
+        }
+    if "event" in spec:
+        payload["event"] = {
+            **spec["event"],
+            "channel": channel_id,
+            "user": user_id,
+            "text": prompt,
+            "ts": ts,
+        }
+    if spec.get("function"):
+        payload["inputs"] = {"user_context": {"id": user_id}, "channel_id": channel_id}
+    return listener_kwargs(
+        name, fakes, client, {"user_id": user_id, "channel_id": channel_id}, payload
+    )
+
+
+def _call(callback: Callable, kwargs: dict):
+    accepted = inspect.signature(callback).parameters
+    return callback(**{key: value for key, value in kwargs.items() if key in accepted})
+
+
+def _arrivals(
+    args: argparse.Namespace,
+    commands: dict[str, dict],
+    mix: dict[str, float],
+    users: list[str],
+    rng: random.Random,
+) -> list[Request]:
+    """Poisson arrivals at `args.rate` per second over `args.duration` seconds."""
+    names, weights = list(mix), list(mix.values())
+    requests, offset = [], 0.0
+    while True:
+        offset += rng.expovariate(args.rate)
+        if offset >= args.duration:
+            return requests
+        index, name, user_id = (
+            len(requests),
+            rng.choices(names, weights)[0],
+            rng.choice(users),
+        )
+        requests.append(
+            Request(
+                offset,
+                name,
+                lambda fakes, name=name, index=index, user_id=user_id: (
+                    _synthetic_kwargs(name, commands[name], index, user_id, rng, fakes)
+                ),
+            )
+        )
+
+
+def run_threaded(args, commands, requests: list[Request]) -> dict[str, _Outcome]:
+    from listeners.listener_utils.work_queue import get_work_queue
+    from observability.journal import use_request
+    from observability.usage import use_usage_attribution
+
+    from .fakes import FakeWebClient, fake_ack, fake_say
+
+    fakes = {
+        "clients": [
+            FakeWebClient(args.slack_latency, f"xoxb-load-{i}")
+            for i in range(args.workspaces)
+        ],
+        "ack": fake_ack,
+        "say": fake_say,
+        "complete": lambda outputs: None,
+        "fail": lambda logger: lambda error: logger.error(f"fail: {error}"),
+    }
+    outcomes = {name: _Outcome() for name in commands}
+    lock = threading.Lock()
+    futures: list[Future] = []
+
+    started_at = time.monotonic()
+    for request in requests:
+        delay = started_at + request.offset - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        spec = commands[request.name]
+        kwargs = request.build_kwargs(fakes)
+        arrived_at = time.monotonic()
+
+        def record(done: Future, name=request.name, arrived_at=arrived_at):
+            with lock:
+                outcomes[name].latencies.append(time.monotonic() - arrived_at)
+                if done.exception() is not None:
+                    outcomes[name].errors += 1
+
+        # The job runs in a copy of this context
+        with (
+            use_request(request.journal_id),
+            use_usage_attribution(command=request.name),
+        ):
+            future, _ = get_work_queue().submit(
+                lambda spec=spec, kwargs=kwargs: _call(spec["callback"], kwargs),
+                spec["priority"],
+                kwargs["context"].get("user_id") or "unknown",
+            )
+        future.add_done_callback(record)
+        futures.append(future)
+    wait(futures)
+    return outcomes
+
+
+def run_async(args, commands, requests: list[Request]) -> dict[str, _Outcome]:
+    from observability.journal import use_request
+    from observability.usage import use_usage_attribution
+
+    from .fakes import FakeAsyncWebClient, fake_async_ack
+
+    def say(client: FakeAsyncWebClient, channel_id: str):
+        async def async_say(text: str = "", **kwargs):
+            return await client.chat_postMessage(
+                channel=channel_id, text=text, **kwargs
+            )
+
+        return async_say
+
+    def fail(logger: logging.Logger):
+        async def async_fail(error):
+            logger.error(f"fail: {error}")
+
+        return async_fail
+
+    async def complete(outputs):
+        pass
+
+    fakes = {
+        "clients": [
+            FakeAsyncWebClient(args.slack_latency, f"xoxb-load-{i}")
+            for i in range(args.workspaces)
+        ],
+        "ack": fake_async_ack,
+        "say": say,
+        "complete": complete,
+        "fail": fail,
+    }
+    outcomes = {name: _Outcome() for name in commands}
+
+    async def handle(request: Request, kwargs: dict):
+        arrived_at = time.monotonic()
+        try:
+            with (
+                use_request(request.journal_id),
+                use_usage_attribution(command=request.name),
+            ):
+                await _call(commands[request.name]["callback"], kwargs)
+        except Exception:
+            outcomes[request.name].errors += 1
+        outcomes[request.name].latencies.append(time.monotonic() - arrived_at)
+
+    async def drive():
+        started_at = time.monotonic()
+        tasks = []
+        for request in requests:
+            await asyncio.sleep(
+                max(0.0, started_at + request.offset - time.monotonic())
+            )
+            tasks.append(
+                asyncio.create_task(handle(request, request.build_kwargs(fakes)))
+            )
+        await asyncio.gather(*tasks)
+
+    asyncio.run(drive())
+    return outcomes
+
+
+def summarize(
+    outcomes: dict[str, _Outcome],
+    error_counters: dict[str, ErrorCounter],
+    elapsed: float,
+) -> dict:
+    rows = {}
+    all_latencies: list[float] = []
+    for name, outcome in outcomes.items():
+        if not outcome.latencies:
+            continue
+        latencies = sorted(outcome.latencies)
+        all_latencies.extend(latencies)
+        rows[name] = {
+            "requests": len(latencies),
+            "errors": outcome.errors + error_counters[name].count,
+            "throughput": len(latencies) / elapsed,
+            "p50": percentile(latencies, 0.50),
+            "p95": percentile(latencies, 0.95),
+            "p99": percentile(latencies, 0.99),
+            "max": latencies[-1],
+        }
+    all_latencies.sort()
+    rows["total"] = {
+        "requests": len(all_latencies),
+        "errors": sum(row["errors"] for row in rows.values()),
+        "throughput": len(all_latencies) / elapsed,
+        "p50": percentile(all_latencies, 0.50),
+        "p95": percentile(all_latencies, 0.95),
+        "p99": percentile(all_latencies, 0.99),
+        "max": all_latencies[-1] if all_latencies else 0.0,
+    }
+    return rows
+
+
+def add_fake_arguments(parser: argparse.ArgumentParser):
+    """Options of the fake Slack, LLM and MCP backends."""
+    parser.add_argument(
+        "--llm-latency", type=float, default=1.0, help="Median seconds per model call"
+    )
+    parser.add_argument(
+        "--llm-sigma",
+        type=float,
+        default=0.3,
+        help="Log-normal sigma of model call latency",
+    )
+    parser.add_argument(
+        "--output-tokens",
+        type=int,
+        default=300,
+        help="Median output tokens per model call",
+    )
+    parser.add_argument(
+        "--tool-calls", type=int, default=2, help="MCP tool calls per /code response"
+    )
+    parser.add_argument(
+        "--tool-latency", type=float, default=0.2, help="Seconds per stub MCP tool call"
+    )
+    parser.add_argument(
+        "--slack-latency", type=float, default=0.05, help="Seconds per Slack API call"
+    )
+    parser.add_argument(
+        "--response-cache",
+        action="store_true",
+        help="Enable the shared AI response cache (60s TTL)",
+    )
+
+
+def setup_fakes(args: argparse.Namespace):
+    """Register `FakeProvider` as "fake" and build the RAG index with fake embeddings."""
+    import langchain_openai
+
+    from ai.providers import PROVIDERS
+    from ai.rag import initialize_rag
+
+    from .fakes import FakeEmbeddings, FakeProvider
+
+    PROVIDERS["fake"] = FakeProvider
+    FakeProvider.latency_seconds = args.llm_latency
+    FakeProvider.latency_sigma = args.llm_sigma
+    FakeProvider.output_tokens = args.output_tokens
+    FakeProvider.output_tokens_sigma = 0.5
+    FakeProvider.tool_calls = args.tool_calls
+    FakeProvider.random = random.Random(args.seed)
+
+    langchain_openai.OpenAIEmbeddings = lambda **kwargs: FakeEmbeddings()
+    initialize_rag()
+
+
+def count_errors(commands: dict[str, dict]) -> dict[str, ErrorCounter]:
+    """Attach an `ErrorCounter` to the listener logger of every command."""
+    error_counters = {}
+    for name in commands:
+        error_counters[name] = ErrorCounter()
+        logging.getLogger(f"benchmarks.load_test.{name}").addHandler(
+            error_counters[name]
+        )
+    return error_counters
+
+
+def print_table(rows: dict[str, dict]):
+    print(
+        f"{'command':<10}{'requests':>10}{'errors':>8}{'req/s':>8}{'p50 s':>8}{'p95 s':>8}{'p99 s':>8}{'max s':>8}"
+    )
+    for name, row in rows.items():
+        print(
+            f"{name:<10}{row['requests']:>10}{row['errors']:>8}{row['throughput']:>8.2f}"
+            f"{row['p50']:>8.2f}{row['p95']:>8.2f}{row['p99']:>8.2f}{row['max']:>8.2f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--mode", choices=["threaded", "async"], default="threaded")
+    parser.add_argument(
+        "--rate", type=float, default=10.0, help="Average requests per second"
+    )
+    parser.add_argument(
+        "--duration",
+        type=float,
+        default=20.0,
+        help="Seconds during which requests arrive",
+    )
+    parser.add_argument(
+        "--mix", default=DEFAULT_MIX, help=f"Command weights (default {DEFAULT_MIX})"
+    )
+    parser.add_argument(
+        "--users", type=int, default=50, help="Distinct users sending requests"
+    )
+    parser.add_argument(
+        "--workspaces",
+        type=int,
+        default=1,
+        help="Workspaces (bot tokens) the requests come from",
+    )
+    add_fake_arguments(parser)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    json_path = os.path.abspath(args.json) if args.json else None
+    prepare_environment(args)
+
+    from state_store.set_user_state import set_user_state
+
+    from .fakes import FakeProvider, make_user_ids
+
+    logging.basicConfig(level=logging.WARNING)
+    commands = build_commands(args.mode)
+    unknown = set(mix) - set(commands)
+    if unknown:
+        parser.error(
+            f"Unknown commands in --mix: {sorted(unknown)} (choose from {sorted(commands)})"
+        )
+    commands = {name: commands[name] for name in mix}
+    setup_fakes(args)
+
+    users = make_user_ids(args.users)
+    for user_id in users:
+        set_user_state(user_id, "fake", "fake-model")
+    error_counters = count_errors(commands)
+
+    rng = random.Random(args.seed)
+    requests = _arrivals(args, commands, mix, users, rng)
+    print(
+        f"{len(requests)} requests over {args.duration:.0f}s ({args.mode}), mix {args.mix}"
+    )
+
+    run = run_async if args.mode == "async" else run_threaded
+    started_at = time.monotonic()
+    outcomes = run(args, commands, requests)
+    elapsed = time.monotonic() - started_at
+    rows = summarize(outcomes, error_counters, elapsed)
+
+    print_table(rows)
+    print(f"peak concurrent model calls: {FakeProvider.recorder.peak_in_flight}")
+
+    if json_path:
+        with open(json_path, "w") as file:
+            json.dump(
+                {"args": vars(args), "elapsed_seconds": elapsed, "results": rows},
+                file,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
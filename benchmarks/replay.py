@@ -0,0 +1,337 @@
+"""
+Replay: recorded Slack traffic fed back through the real listener callbacks.
+
+Requests recorded with JOURNAL_PATH (see `observability.journal`) arrive at their
+recorded spacing, or --speed times faster, and run on the listener work queue (or,
+with --mode async, as AsyncApp callbacks) against the load test's fake Slack clients,
+one per recorded workspace, and one of two backends:
+- recorded (default): every provider response comes from the journal, after the
+  recorded model latency, and MCP tools answer with the recorded results after the
+  recorded tool latency. Input tokens are scaled by the length of the prompt the
+  listener builds now against the recorded one, so a change to prompts, context
+  packing or retrieval shows up in the token columns.
+- fake: `FakeProvider` and the stub MCP server, as in `benchmarks.load_test`
+
+RAG runs on the real Chroma index over data/docs with `FakeEmbeddings`. The report
+puts recorded and replayed latency and token usage side by side per command; save it
+with --json and compare a later run against it with --compare.
+
+Usage:
+    JOURNAL_PATH=data/journal.jsonl.gz python3 app.py
+    python -m benchmarks.replay data/journal.jsonl.gz --speed 10 --json before.json
+    python -m benchmarks.replay data/journal.jsonl.gz --speed 10 --compare before.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+
+from observability.journal import read_journal
+
+from .load_test import (
+    Request,
+    add_fake_arguments,
+    build_commands,
+    count_errors,
+    listener_kwargs,
+    percentile,
+    prepare_environment,
+    print_table,
+    run_async,
+    run_threaded,
+    setup_fakes,
+    summarize,
+)
+
+
+def _install_recorded_tools(backend):
+    """Serve the recorded tools from the shared MCP toolbox instead of connecting to the configured servers."""
+    from ai.augmentation.mcp_toolbox import get_mcp_toolbox
+
+    from .fakes import RecordedToolSession
+
+    toolbox = get_mcp_toolbox()
+    session = RecordedToolSession(backend)
+    for name in sorted(backend.tool_names):
+        toolbox.sessions[name] = session
+        toolbox.tools.append(
+            {"name": name, "description": "", "input_schema": {"type": "object"}}
+        )
+    # No configured servers to connect
+    toolbox._servers = {}
+
+
+def load_journal(path: str) -> tuple[list[dict], list[dict]]:
+    """
+    Read a journal.
+
+    Returns:
+        Tuple of (requests in arrival order, each with its "end" record if one was written; generations)
+    """
+    requests, ends, generations = [], {}, []
+    for record in read_journal(path):
+        if record["type"] == "request":
+            requests.append(record)
+        elif record["type"] == "request_end":
+            ends[record["id"]] = record
+        elif record["type"] == "generation":
+            generations.append(record)
+    for request in requests:
+        request["end"] = ends.get(request["id"])
+    requests.sort(key=lambda request: request["at"])
+    return requests, generations
+
+
+def _command_for(request: dict, commands: dict[str, dict]) -> str | None:
+    """Key of the listener that handles a recorded request, or None if the replay does not cover it."""
+    from listeners.events.app_messaged import is_direct_message
+
+    kind, name, payload = request["kind"], request["name"], request["payload"]
+    for key, spec in commands.items():
+        if kind == "command" and spec.get("command") == name:
+            return key
+        if kind == "function" and spec.get("function"):
+            return key
+        # Listeners that take no payload argument are recorded under their callback's name
+        if kind == "listener" and spec["callback"].__name__.removeprefix(
+            "async_"
+        ) == name.removeprefix("async_"):
+            return key
+        if kind == "event" and spec.get("event", {}).get("type") == name:
+            # The AsyncApp also hands channel messages to the DM listener, which ignores them
+            if name == "message" and not is_direct_message(payload.get("event", {})):
+                return None
+            return key
+    return None
+
+
+def _replay_requests(
+    recorded: list[tuple[str, dict]], speed: float, workspaces: dict[str, int]
+) -> list[Request]:
+    first_at = recorded[0][1]["at"] if recorded else 0.0
+
+    def build_kwargs(fakes: dict, name: str, request: dict) -> dict:
+        payload = request["payload"]
+        client = fakes["clients"][workspaces.get(payload.get("team_id"), 0)]
+        context = {
+            "user_id": payload.get("user_id"),
+            "channel_id": payload.get("channel_id"),
+        }
+        listener_payload = {
+            key: payload[key]
+            for key in ("command", "event", "inputs")
+            if key in payload
+        }
+        return listener_kwargs(
+            name, fakes, client, context, json.loads(json.dumps(listener_payload))
+        )
+
+    return [
+        Request(
+            (request["at"] - first_at) / speed,
+            name,
+            lambda fakes, name=name, request=request: build_kwargs(
+                fakes, name, request
+            ),
+            journal_id=request["id"],
+        )
+        for name, request in recorded
+    ]
+
+
+def _recorded_rows(
+    recorded: list[tuple[str, dict]], generations: list[dict]
+) -> dict[str, dict]:
+    """Latency percentiles and token usage per command, as recorded."""
+    names = {request["id"]: name for name, request in recorded}
+    latencies: dict[str, list[float]] = defaultdict(list)
+    for name, request in recorded:
+        if request["end"] is not None:
+            latencies[name].append(request["end"]["duration"])
+    tokens: dict[str, list[int]] = defaultdict(lambda: [0, 0])
+    for generation in generations:
+        name = names.get(generation["request"])
+        if name is None:
+            continue
+        for call in generation["calls"]:
+            tokens[name][0] += call["input_tokens"]
+            tokens[name][1] += call["output_tokens"]
+
+    for name in list(latencies):
+        latencies["total"].extend(latencies[name])
+    for name in list(tokens):
+        tokens["total"][0] += tokens[name][0]
+        tokens["total"][1] += tokens[name][1]
+
+    rows = {}
+    for name in list(dict.fromkeys(name for name, _ in recorded)) + ["total"]:
+        values = sorted(latencies[name])
+        rows[name] = {
+            "p50": percentile(values, 0.50),
+            "p95": percentile(values, 0.95),
+            "input_tokens": tokens[name][0],
+            "output_tokens": tokens[name][1],
+        }
+    return rows
+
+
+def _replayed_tokens(recorded: list[tuple[str, dict]]) -> dict[str, list[int]]:
+    from .fakes import TokensByRequest
+
+    names = {request["id"]: name for name, request in recorded}
+    tokens: dict[str, list[int]] = defaultdict(lambda: [0, 0])
+    with TokensByRequest.lock:
+        for request_id, (input_tokens, output_tokens) in TokensByRequest.tokens.items():
+            for name in (names.get(request_id, "unmatched"), "total"):
+                tokens[name][0] += input_tokens
+                tokens[name][1] += output_tokens
+    return tokens
+
+
+def _change(before: float, after: float) -> str:
+    if not before:
+        return "n/a"
+    return f"{(after - before) / before * 100:+.0f}%"
+
+
+def print_comparison(rows: dict[str, dict], recorded_rows: dict[str, dict]):
+    print(
+        f"{'command':<10}{'rec p50':>9}{'p50':>7}{'rec p95':>9}{'p95':>7}"
+        f"{'rec in tok':>12}{'in tok':>10}{'change':>8}{'rec out tok':>13}{'out tok':>10}"
+    )
+    for name, row in rows.items():
+        before = recorded_rows.get(name)
+        if before is None:
+            continue
+        print(
+            f"{name:<10}{before['p50']:>9.2f}{row['p50']:>7.2f}{before['p95']:>9.2f}{row['p95']:>7.2f}"
+            f"{before['input_tokens']:>12}{row['input_tokens']:>10}"
+            f"{_change(before['input_tokens'], row['input_tokens']):>8}"
+            f"{before['output_tokens']:>13}{row['output_tokens']:>10}"
+        )
+
+
+def print_baseline_comparison(rows: dict[str, dict], baseline: dict[str, dict]):
+    print("change against the baseline report:")
+    for name, row in rows.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        print(
+            f"  {name:<10} p50 {before['p50']:.2f}s -> {row['p50']:.2f}s ({_change(before['p50'], row['p50'])})"
+            f"  p95 {before['p95']:.2f}s -> {row['p95']:.2f}s ({_change(before['p95'], row['p95'])})"
+            f"  input tokens {before['input_tokens']} -> {row['input_tokens']}"
+            f" ({_change(before['input_tokens'], row['input_tokens'])})"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("journal", help="Journal file written with JOURNAL_PATH")
+    parser.add_argument("--backend", choices=["recorded", "fake"], default="recorded")
+    parser.add_argument("--mode", choices=["threaded", "async"], default="threaded")
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=1.0,
+        help="Replay arrivals this many times faster",
+    )
+    parser.add_argument("--limit", type=int, help="Replay only the first N requests")
+    add_fake_arguments(parser)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Also write the report to this file")
+    parser.add_argument(
+        "--compare", help="Report written by an earlier run to compare against"
+    )
+    args = parser.parse_args()
+    if args.speed <= 0:
+        parser.error("--speed must be positive")
+
+    journal_path = os.path.abspath(args.journal)
+    json_path = os.path.abspath(args.json) if args.json else None
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)["results"]
+    requests, generations = load_journal(journal_path)
+    # Recorded responses already include the provider's latency; the limiter must not add its own
+    os.environ.setdefault("RECORDED_REQUESTS_PER_MINUTE", "1000000")
+    os.environ.setdefault("RECORDED_TOKENS_PER_MINUTE", "1000000000")
+    prepare_environment(args)
+
+    from ai.providers import PROVIDERS
+    from state_store.set_user_state import set_user_state
+
+    from .fakes import FakeProvider, RecordedBackend, RecordedProvider, TokensByRequest
+
+    logging.basicConfig(level=logging.WARNING)
+    commands = build_commands(args.mode)
+    recorded, skipped = [], 0
+    for request in requests:
+        name = _command_for(request, commands)
+        if name is None:
+            skipped += 1
+        else:
+            recorded.append((name, request))
+    recorded = recorded[: args.limit] if args.limit else recorded
+    if not recorded:
+        parser.error(f"{journal_path} has no requests to replay")
+
+    setup_fakes(args)
+    if args.backend == "recorded":
+        RecordedProvider.backend = RecordedBackend(generations)
+        PROVIDERS["recorded"] = RecordedProvider
+        _install_recorded_tools(RecordedProvider.backend)
+        selection = ("recorded", "recorded")
+    else:
+        PROVIDERS["fake"] = type("FakeProvider", (TokensByRequest, FakeProvider), {})
+        selection = ("fake", "fake-model")
+    for user_id in {request["payload"].get("user_id") for _, request in recorded}:
+        if user_id:
+            set_user_state(user_id, *selection)
+
+    teams = sorted({request["payload"].get("team_id") or "" for _, request in recorded})
+    workspaces = {team: index for index, team in enumerate(teams)}
+    args.workspaces = len(teams)
+    error_counters = count_errors(commands)
+    span = recorded[-1][1]["at"] - recorded[0][1]["at"]
+    print(
+        f"replaying {len(recorded)} requests ({skipped} not replayable) recorded over {span:.0f}s "
+        f"at {args.speed:g}x, {len(teams)} workspace(s), {args.backend} backend ({args.mode})"
+    )
+
+    run = run_async if args.mode == "async" else run_threaded
+    started_at = time.monotonic()
+    outcomes = run(args, commands, _replay_requests(recorded, args.speed, workspaces))
+    elapsed = time.monotonic() - started_at
+    rows = summarize(outcomes, error_counters, elapsed)
+    tokens = _replayed_tokens(recorded)
+    for name, row in rows.items():
+        row["input_tokens"], row["output_tokens"] = tokens.get(name, [0, 0])
+    recorded_rows = _recorded_rows(recorded, generations)
+
+    print_table(rows)
+    print_comparison(rows, recorded_rows)
+    if args.backend == "recorded" and RecordedProvider.backend.unmatched:
+        print(
+            f"{RecordedProvider.backend.unmatched} provider calls had no recorded response and reused another one"
+        )
+    if baseline is not None:
+        print_baseline_comparison(rows, baseline)
+
+    if json_path:
+        with open(json_path, "w") as file:
+            report = {
+                "args": vars(args),
+                "elapsed_seconds": elapsed,
+                "results": rows,
+                "recorded": recorded_rows,
+            }
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,474 @@
+"""
+Retrieval evaluation: recall, MRR and latency of the runbook retriever over labeled queries.
+
+Every query in `retrieval_queries.json` (alert names, paraphrases, hostnames such as
+riv006, topic and subscription names, Riverside/Springfield variants) lists the runbooks
+in data/docs that answer it. Each retriever configuration indexes data/docs and ranks
+runbooks for every query:
+- vector: Chroma similarity search, as `ai.rag.vector_store` runs it in production
+- lexical: BM25 over the same chunks; compound identifiers count as whole tokens and parts
+- hybrid: both rankings fused with reciprocal rank fusion
+each at every chunk size given (overlap is a fifth of the chunk size, as in `rag_config`).
+
+Chunk hits are reduced to runbooks in rank order. The report gives recall@1/3/5, MRR,
+context recall (the share of expected runbooks present in the TOP_K_CHUNKS chunks the
+model actually sees), per-query latency and index build time per configuration, then
+recall@3 per query tag. The production configuration is marked with *.
+
+Everything runs offline. Embeddings come from --embeddings:
+- hashed (default): `FakeEmbeddings`, a hashed bag of words; no model, no network
+- minilm: Chroma's local all-MiniLM-L6-v2 ONNX model (downloaded once to ~/.cache/chroma)
+- openai: text-embedding-3-small, read from --cache; texts missing from the cache are
+  embedded (OPENAI_API_KEY required) and added, unless --offline makes a miss an error.
+  Query latency then excludes the embedding API round trip.
+
+Usage:
+    python -m benchmarks.retrieval_eval
+    python -m benchmarks.retrieval_eval --chunk-sizes 500,1000,2000 --retrievers vector,hybrid --verbose
+    python -m benchmarks.retrieval_eval --embeddings openai --offline --fail-under 0.9
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import re
+import sys
+import time
+from collections import Counter, defaultdict
+
+from .load_test import percentile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+QUERIES_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "retrieval_queries.json"
+)
+DEFAULT_CACHE_PATH = os.path.join(REPO_ROOT, "data", "embedding_cache.json")
+
+RETRIEVERS = ["vector", "lexical", "hybrid"]
+RECALL_AT = (1, 3, 5)
+
+# Chunks ranked per query before they are reduced to runbooks
+SEARCH_DEPTH = 20
+
+# Reciprocal rank fusion constant (Cormack et al.); damps the weight of the very top ranks
+RRF_K = 60
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[._-][a-z0-9]+)*")
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase words; identifiers such as 209731-VDF-LVDS-INT-KAFKA yield themselves and their parts."""
+    tokens = []
+    for token in _TOKEN_PATTERN.findall(text.lower()):
+        tokens.append(token)
+        parts = re.split(r"[._-]", token)
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+class CachedEmbeddings:
+    """
+    Embeddings read from a JSON file keyed by model and text hash.
+
+    Texts not in the file are embedded with the wrapped embeddings, or raise when it is None.
+    """
+
+    def __init__(self, embeddings, model: str, path: str):
+        self.embeddings = embeddings
+        self.model = model
+        self.path = path
+        self.misses = 0
+        self.vectors: dict[str, list[float]] = {}
+        if os.path.exists(path):
+            with open(path) as file:
+                self.vectors = json.load(file)
+
+    def _key(self, text: str) -> str:
+        return f"{self.model}:{hashlib.sha256(text.encode()).hexdigest()}"
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        missing = list(
+            dict.fromkeys(text for text in texts if self._key(text) not in self.vectors)
+        )
+        if missing:
+            if self.embeddings is None:
+                raise KeyError(
+                    f"{len(missing)} texts are not in the embedding cache {self.path}"
+                )
+            for text, vector in zip(missing, self.embeddings.embed_documents(missing)):
+                self.vectors[self._key(text)] = vector
+            self.misses += len(missing)
+        return [self.vectors[self._key(text)] for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+    def save(self):
+        if not self.misses:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "w") as file:
+            json.dump(self.vectors, file)
+
+
+class MiniLMEmbeddings:
+    """Chroma's bundled all-MiniLM-L6-v2 ONNX model behind the LangChain embeddings interface."""
+
+    def __init__(self, offline: bool):
+        from chromadb.utils.embedding_functions import ONNXMiniLM_L6_V2
+
+        model_path = os.path.join(
+            ONNXMiniLM_L6_V2.DOWNLOAD_PATH,
+            ONNXMiniLM_L6_V2.EXTRACTED_FOLDER_NAME,
+            "model.onnx",
+        )
+        if offline and not os.path.exists(model_path):
+            raise FileNotFoundError(
+                f"{model_path} is missing; run once without --offline to download it"
+            )
+        self.model = ONNXMiniLM_L6_V2()
+        # Download the model (if needed) and load it now rather than inside the first timed query
+        self.model(["warm up"])
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [[float(value) for value in vector] for vector in self.model(texts)]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+
+def make_embeddings(name: str, cache_path: str, offline: bool):
+    if name == "hashed":
+        from .fakes import FakeEmbeddings
+
+        return FakeEmbeddings()
+    if name == "minilm":
+        return MiniLMEmbeddings(offline)
+    embeddings = None
+    if not offline:
+        from langchain_openai import OpenAIEmbeddings
+
+        embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
+    return CachedEmbeddings(embeddings, "text-embedding-3-small", cache_path)
+
+
+class VectorRetriever:
+    """Chroma similarity search over embedded chunks, as the production `VectorStore` does it."""
+
+    def __init__(self, chunks: list, embeddings, collection_name: str):
+        from langchain_chroma import Chroma
+
+        self.embeddings = embeddings
+        self.store = Chroma(
+            collection_name=collection_name, embedding_function=embeddings
+        )
+        self.store.add_documents(chunks)
+
+    def search(self, query: str, depth: int) -> list[int]:
+        embedding = self.embeddings.embed_query(query)
+        return [
+            doc.metadata["chunk_index"]
+            for doc in self.store.similarity_search_by_vector(embedding, k=depth)
+        ]
+
+
+class BM25Retriever:
+    """Okapi BM25 over tokenized chunks."""
+
+    def __init__(self, chunks: list, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.term_counts = [Counter(tokenize(chunk.page_content)) for chunk in chunks]
+        self.lengths = [sum(counts.values()) for counts in self.term_counts]
+        self.average_length = sum(self.lengths) / len(self.lengths)
+        document_frequency = Counter(
+            term for counts in self.term_counts for term in counts
+        )
+        total = len(chunks)
+        self.idf = {
+            term: math.log(1 + (total - frequency + 0.5) / (frequency + 0.5))
+            for term, frequency in document_frequency.items()
+        }
+
+    def search(self, query: str, depth: int) -> list[int]:
+        terms = [term for term in dict.fromkeys(tokenize(query)) if term in self.idf]
+        scores = []
+        for index, counts in enumerate(self.term_counts):
+            norm = self.k1 * (
+                1 - self.b + self.b * self.lengths[index] / self.average_length
+            )
+            score = sum(
+                self.idf[term] * counts[term] * (self.k1 + 1) / (counts[term] + norm)
+                for term in terms
+                if counts[term]
+            )
+            if score > 0:
+                scores.append((score, index))
+        scores.sort(key=lambda item: (-item[0], item[1]))
+        return [index for _, index in scores[:depth]]
+
+
+class HybridRetriever:
+    """Vector and BM25 rankings combined with reciprocal rank fusion."""
+
+    def __init__(self, vector: VectorRetriever, lexical: BM25Retriever):
+        self.vector = vector
+        self.lexical = lexical
+
+    def search(self, query: str, depth: int) -> list[int]:
+        scores: dict[int, float] = defaultdict(float)
+        for ranking in (
+            self.vector.search(query, depth),
+            self.lexical.search(query, depth),
+        ):
+            for rank, index in enumerate(ranking):
+                scores[index] += 1.0 / (RRF_K + rank + 1)
+        return sorted(scores, key=lambda index: (-scores[index], index))[:depth]
+
+
+def load_chunks(chunk_size: int) -> list:
+    from ai.rag.document_loader import load_and_chunk_documents
+    from ai.rag.rag_config import DOCS_DIRECTORY
+
+    return load_and_chunk_documents(
+        chunk_size, chunk_size // 5, os.path.join(REPO_ROOT, DOCS_DIRECTORY)
+    )
+
+
+def build_retrievers(
+    names: list[str], chunks: list, embeddings, label: str
+) -> dict[str, tuple]:
+    """
+    Index the chunks for each named retriever.
+
+    Returns:
+        Dict of retriever name to (retriever, seconds to build it); hybrid reuses the other two indexes
+    """
+    built: dict[str, tuple] = {}
+    if "vector" in names or "hybrid" in names:
+        started_at = time.perf_counter()
+        vector = VectorRetriever(chunks, embeddings, f"retrieval_eval_{label}")
+        built["vector"] = (vector, time.perf_counter() - started_at)
+    if "lexical" in names or "hybrid" in names:
+        started_at = time.perf_counter()
+        built["lexical"] = (BM25Retriever(chunks), time.perf_counter() - started_at)
+    if "hybrid" in names:
+        built["hybrid"] = (
+            HybridRetriever(built["vector"][0], built["lexical"][0]),
+            built["vector"][1] + built["lexical"][1],
+        )
+    return {name: built[name] for name in names}
+
+
+def rank_documents(chunk_ranking: list[int], chunks: list) -> list[str]:
+    """Runbook file names in order of their best-ranked chunk."""
+    return list(
+        dict.fromkeys(
+            os.path.basename(chunks[index].metadata["source"])
+            for index in chunk_ranking
+        )
+    )
+
+
+def evaluate(retriever, chunks: list, queries: list[dict], context_chunks: int) -> dict:
+    """Run every query through one retriever and score the rankings."""
+    results = []
+    for query in queries:
+        started_at = time.perf_counter()
+        chunk_ranking = retriever.search(query["query"], SEARCH_DEPTH)
+        latency = time.perf_counter() - started_at
+        ranking = rank_documents(chunk_ranking, chunks)
+        expected = set(query["expected"])
+        first_hit = next(
+            (rank for rank, name in enumerate(ranking, 1) if name in expected), None
+        )
+        context = set(rank_documents(chunk_ranking[:context_chunks], chunks))
+        result = {
+            "query": query["query"],
+            "tags": query["tags"],
+            "ranking": ranking[:5],
+            "reciprocal_rank": 1.0 / first_hit if first_hit else 0.0,
+            "context_recall": len(expected & context) / len(expected),
+            "latency": latency,
+        }
+        for k in RECALL_AT:
+            result[f"recall@{k}"] = len(expected & set(ranking[:k])) / len(expected)
+        results.append(result)
+
+    latencies = sorted(result["latency"] for result in results)
+    summary = {
+        "mrr": sum(result["reciprocal_rank"] for result in results) / len(results),
+        "context_recall": sum(result["context_recall"] for result in results)
+        / len(results),
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+    }
+    for k in RECALL_AT:
+        summary[f"recall@{k}"] = sum(result[f"recall@{k}"] for result in results) / len(
+            results
+        )
+    by_tag: dict[str, list[float]] = defaultdict(list)
+    for result in results:
+        for tag in result["tags"]:
+            by_tag[tag].append(result["recall@3"])
+    summary["recall@3_by_tag"] = {
+        tag: sum(values) / len(values) for tag, values in sorted(by_tag.items())
+    }
+    summary["queries"] = results
+    return summary
+
+
+def print_report(rows: dict[str, dict], production: str):
+    recall_columns = "".join(f"{f'R@{k}':>7}" for k in RECALL_AT)
+    print(
+        f"{'configuration':<18}{'chunks':>7}{recall_columns}{'MRR':>7}{'ctx R':>7}{'p50 ms':>8}{'p95 ms':>8}{'build s':>9}"
+    )
+    for name, row in rows.items():
+        label = f"{name}{' *' if name == production else ''}"
+        recalls = "".join(f"{row[f'recall@{k}']:>7.2f}" for k in RECALL_AT)
+        print(
+            f"{label:<18}{row['chunks']:>7}{recalls}{row['mrr']:>7.2f}{row['context_recall']:>7.2f}"
+            f"{row['p50_ms']:>8.2f}{row['p95_ms']:>8.2f}{row['build_seconds']:>9.2f}"
+        )
+
+    tags = sorted({tag for row in rows.values() for tag in row["recall@3_by_tag"]})
+    print("\nrecall@3 by query tag:")
+    print(f"{'configuration':<18}" + "".join(f"{tag:>12}" for tag in tags))
+    for name, row in rows.items():
+        print(
+            f"{name:<18}"
+            + "".join(f"{row['recall@3_by_tag'].get(tag, 0.0):>12.2f}" for tag in tags)
+        )
+
+
+def print_misses(rows: dict[str, dict], queries: list[dict]):
+    expected = {query["query"]: query["expected"] for query in queries}
+    for name, row in rows.items():
+        misses = [result for result in row["queries"] if result["recall@3"] < 1.0]
+        print(
+            f"\n{name}: {len(misses)} queries missing an expected runbook in the top 3"
+        )
+        for result in misses:
+            print(
+                f"  {result['query']!r}\n    expected {expected[result['query']]}\n    got      {result['ranking'][:3]}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--queries", default=QUERIES_PATH, help="Labeled query set")
+    parser.add_argument(
+        "--retrievers",
+        default=",".join(RETRIEVERS),
+        help=f"Any of {','.join(RETRIEVERS)}",
+    )
+    parser.add_argument(
+        "--chunk-sizes",
+        help="Comma-separated chunk sizes in characters (default: CHUNK_SIZE)",
+    )
+    parser.add_argument(
+        "--embeddings", choices=["hashed", "minilm", "openai"], default="hashed"
+    )
+    parser.add_argument(
+        "--cache",
+        default=DEFAULT_CACHE_PATH,
+        help="Embedding cache for --embeddings openai",
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Fail instead of calling the embedding API",
+    )
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="List the queries each configuration misses",
+    )
+    parser.add_argument(
+        "--json", help="Also write the report, with per-query results, to this file"
+    )
+    parser.add_argument(
+        "--fail-under",
+        type=float,
+        help="Exit non-zero if the production configuration's recall@3 is lower",
+    )
+    args = parser.parse_args()
+    # The evaluation stays offline: no Chroma usage telemetry either
+    os.environ.setdefault("ANONYMIZED_TELEMETRY", "False")
+
+    from ai.rag.rag_config import CHUNK_SIZE, TOP_K_CHUNKS
+
+    retrievers = [name.strip() for name in args.retrievers.split(",") if name.strip()]
+    unknown = set(retrievers) - set(RETRIEVERS)
+    if unknown:
+        parser.error(
+            f"Unknown retrievers: {sorted(unknown)} (choose from {RETRIEVERS})"
+        )
+    chunk_sizes = (
+        [int(size) for size in args.chunk_sizes.split(",")]
+        if args.chunk_sizes
+        else [CHUNK_SIZE]
+    )
+    with open(args.queries) as file:
+        queries = json.load(file)["queries"]
+
+    try:
+        embeddings = make_embeddings(
+            args.embeddings, os.path.abspath(args.cache), args.offline
+        )
+    except Exception as e:
+        parser.error(f"Could not load {args.embeddings} embeddings: {e}")
+    print(
+        f"{len(queries)} queries, {args.embeddings} embeddings, top {TOP_K_CHUNKS} chunks as model context"
+    )
+
+    rows: dict[str, dict] = {}
+    production: str | None = None
+    try:
+        for chunk_size in chunk_sizes:
+            chunks = load_chunks(chunk_size)
+            if not chunks:
+                parser.error("No documents to index")
+            for name, (retriever, build_seconds) in build_retrievers(
+                retrievers, chunks, embeddings, f"{args.embeddings}_{chunk_size}"
+            ).items():
+                key = f"{name}/{chunk_size}"
+                rows[key] = {"chunks": len(chunks), "build_seconds": build_seconds}
+                rows[key].update(evaluate(retriever, chunks, queries, TOP_K_CHUNKS))
+                if name == "vector" and chunk_size == CHUNK_SIZE:
+                    production = key
+    except KeyError as e:
+        parser.error(f"{e.args[0]}; run once without --offline to fill it")
+    finally:
+        if isinstance(embeddings, CachedEmbeddings):
+            embeddings.save()
+
+    print_report(rows, production)
+    if args.verbose:
+        print_misses(rows, queries)
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(
+                {"args": vars(args), "production": production, "results": rows},
+                file,
+                indent=2,
+            )
+
+    if args.fail_under is not None:
+        if production is None:
+            parser.error(
+                "--fail-under needs the vector retriever at the configured CHUNK_SIZE"
+            )
+        recall = rows[production]["recall@3"]
+        if recall < args.fail_under:
+            print(
+                f"FAIL: {production} recall@3 {recall:.2f} is below {args.fail_under:.2f}"
+            )
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
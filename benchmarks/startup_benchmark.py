@@ -0,0 +1,182 @@
+"""
+Startup benchmark: cold-start cost of the `app.py` entry point.
+
+Every repetition runs in a fresh interpreter and times, in the order `app.py` runs them:
+- import: the entry point's imports (Bolt, Socket Mode adapter, listeners, RAG)
+- register_listeners: creating the `App` and registering every listener
+- initialize_rag: building the knowledge base index (with `FakeEmbeddings`, no API calls)
+- provider_sdks: importing the provider SDKs, deferred until a provider is first used
+
+The medians are compared with `startup_baseline.json`; a phase slower than the
+baseline by more than the tolerance fails the run.
+
+Usage:
+    python -m benchmarks.startup_benchmark              # compare with the baseline
+    python -m benchmarks.startup_benchmark --record     # re-record the baseline
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "startup_baseline.json"
+)
+
+PHASES = ["import", "register_listeners", "initialize_rag", "provider_sdks"]
+
+# Absolute slack so phases measured in milliseconds do not fail on noise
+MIN_REGRESSION_SECONDS = 0.05
+
+
+def _child() -> dict[str, float]:
+    """Run the phases once in this (fresh) interpreter."""
+    import logging
+
+    logging.disable(logging.CRITICAL)
+    timings = {}
+
+    started_at = time.perf_counter()
+    from slack_bolt import App
+    from slack_bolt.adapter.socket_mode import SocketModeHandler  # noqa: F401
+
+    from ai.rag import initialize_rag
+    from listeners import register_listeners
+
+    timings["import"] = time.perf_counter() - started_at
+
+    started_at = time.perf_counter()
+    app = App(
+        token="xoxb-benchmark",
+        signing_secret="benchmark",
+        token_verification_enabled=False,
+        ignoring_self_events_enabled=False,
+    )
+    register_listeners(app)
+    timings["register_listeners"] = time.perf_counter() - started_at
+
+    started_at = time.perf_counter()
+    import langchain_openai
+
+    from .fakes import FakeEmbeddings
+
+    langchain_openai.OpenAIEmbeddings = lambda **kwargs: FakeEmbeddings()
+    initialize_rag()
+    timings["initialize_rag"] = time.perf_counter() - started_at
+
+    started_at = time.perf_counter()
+    import anthropic  # noqa: F401
+    import google.api_core.exceptions  # noqa: F401
+    import openai  # noqa: F401
+    import vertexai.generative_models  # noqa: F401
+
+    timings["provider_sdks"] = time.perf_counter() - started_at
+    return timings
+
+
+def run(repeat: int) -> dict[str, list[float]]:
+    """Run `repeat` cold starts and collect the timings of each phase."""
+    samples: dict[str, list[float]] = {phase: [] for phase in PHASES}
+    env = dict(
+        os.environ,
+        PYTHONPATH=REPO_ROOT,
+        OPENAI_API_KEY="sk-benchmark",
+        PYTHONDONTWRITEBYTECODE="1",
+    )
+    for _ in range(repeat):
+        # RAG and user state use paths relative to the working directory
+        with tempfile.TemporaryDirectory(prefix="startup-benchmark-") as workdir:
+            os.makedirs(os.path.join(workdir, "data"))
+            os.symlink(
+                os.path.join(REPO_ROOT, "data", "docs"),
+                os.path.join(workdir, "data", "docs"),
+            )
+            child = subprocess.run(
+                [sys.executable, "-m", "benchmarks.startup_benchmark", "--child"],
+                cwd=workdir,
+                env=env,
+                capture_output=True,
+                text=True,
+            )
+        if child.returncode != 0:
+            sys.exit(f"Cold start failed:\n{child.stderr}")
+        timings = json.loads(child.stdout.strip().splitlines()[-1])
+        for phase in PHASES:
+            samples[phase].append(timings[phase])
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5, help="Cold starts to run")
+    parser.add_argument(
+        "--record", action="store_true", help="Write the medians as the new baseline"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Allowed slowdown vs the baseline (0.25 = 25%%)",
+    )
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(_child()))
+        return
+
+    samples = run(args.repeat)
+    medians = {phase: statistics.median(values) for phase, values in samples.items()}
+    total = sum(medians.values())
+
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, "r") as file:
+            baseline = json.load(file).get("seconds", {})
+
+    print(f"{'phase':<20}{'median s':>10}{'min s':>10}{'baseline s':>12}")
+    regressions = []
+    for phase in PHASES:
+        reference = baseline.get(phase)
+        print(
+            f"{phase:<20}{medians[phase]:>10.3f}{min(samples[phase]):>10.3f}"
+            f"{reference if reference is not None else float('nan'):>12.3f}"
+        )
+        if (
+            reference is not None
+            and medians[phase]
+            > reference * (1 + args.tolerance) + MIN_REGRESSION_SECONDS
+        ):
+            regressions.append(phase)
+    print(f"{'total':<20}{total:>10.3f}")
+
+    if args.record:
+        with open(BASELINE_PATH, "w") as file:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "recorded_at": time.strftime("%Y-%m-%d"),
+                    "repeat": args.repeat,
+                    "seconds": {
+                        phase: round(value, 4) for phase, value in medians.items()
+                    },
+                },
+                file,
+                indent=2,
+            )
+            file.write("\n")
+        print(f"Recorded baseline in {BASELINE_PATH}")
+    elif regressions:
+        print(f"Startup regression in: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Stub MCP server for benchmarks.
+
+Speaks MCP over stdio like the GitHub server in `server_config.json`, but answers
+from canned data after a configurable delay, so `/code` can be load-tested offline.
+
+Configuration:
+    STUB_MCP_LATENCY_SECONDS: Delay before each tool result (default 0.2)
+    STUB_MCP_RESULT_CHARS: Size of each tool result (default 2000)
+
+Usage (as an entry in an MCP server config):
+    {"command": "python", "args": ["-m", "benchmarks.stub_mcp_server"]}
+"""
+
+import asyncio
+import os
+
+from mcp.server.fastmcp import FastMCP
+
+STUB_MCP_LATENCY_SECONDS = float(os.environ.get("STUB_MCP_LATENCY_SECONDS", "0.2"))
+STUB_MCP_RESULT_CHARS = int(os.environ.get("STUB_MCP_RESULT_CHARS", "2000"))
+
+server = FastMCP("stub-github", log_level="WARNING")
+
+
+def _result(header: str) -> str:
+    line = "def handle(message):  # processes one inbound message and acks it\n"
+    body = line * (STUB_MCP_RESULT_CHARS // len(line) + 1)
+    return f"{header}\n{body}"[:STUB_MCP_RESULT_CHARS]
+
+
+@server.tool()
+async def search_code(q: str) -> str:
+    """Search for code across GitHub repositories."""
+    await asyncio.sleep(STUB_MCP_LATENCY_SECONDS)
+    return _result(
+        f"3 results for {q!r}: src/consumer.py, src/producer.py, src/config.py"
+    )
+
+
+@server.tool()
+async def get_file_contents(owner: str, repo: str, path: str) -> str:
+    """Get the contents of a file from a GitHub repository."""
+    await asyncio.sleep(STUB_MCP_LATENCY_SECONDS)
+    return _result(f"# {owner}/{repo}/{path}")
+
+
+if __name__ == "__main__":
+    server.run("stdio")
@@ -1,11 +1,20 @@
-from listeners import actions
-from listeners import commands
-from listeners import events
-from listeners import functions
+from listeners import actions, commands, events, functions, middleware
+
+# The async Bolt and WebClient types are imported only for type checking (and the async
+# middleware inside `register_async`), so the sync app.py does not load the async stack
 
 
 def register_listeners(app):
+    middleware.register(app)
     actions.register(app)
     commands.register(app)
     events.register(app)
     functions.register(app)
+
+
+def register_async_listeners(app):
+    middleware.register_async(app)
+    actions.register_async(app)
+    commands.register_async(app)
+    events.register_async(app)
+    functions.register_async(app)
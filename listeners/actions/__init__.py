@@ -1,6 +1,16 @@
+from typing import TYPE_CHECKING
+
 from slack_bolt import App
-from .set_user_selection import set_user_selection
+
+from .set_user_selection import async_set_user_selection, set_user_selection
+
+if TYPE_CHECKING:
+    from slack_bolt.async_app import AsyncApp
 
 
 def register(app: App):
     app.action("pick_a_provider")(set_user_selection)
+
+
+def register_async(app: "AsyncApp"):
+    app.action("pick_a_provider")(async_set_user_selection)
@@ -1,21 +1,42 @@
 from logging import Logger
+from typing import TYPE_CHECKING
+
 from slack_bolt import Ack
+
 from state_store.set_user_state import set_user_state
+from state_store.user_state_cache import get_user_state_cache
+
+if TYPE_CHECKING:
+    from slack_bolt.async_app import AsyncAck
+
+
+def _save_selection(body: dict):
+    user_id = body["user"]["id"]
+    # Drop the cached selection first so a failed save is never hidden by a stale entry
+    get_user_state_cache().invalidate(user_id)
+    value = body["actions"][0]["selected_option"]["value"]
+    if value != "null":
+        # parsing the selected option value from the options array in app_home_opened.py
+        selected_provider, selected_model = (
+            value.split(" ")[-1],
+            value.split(" ")[0],
+        )
+        set_user_state(user_id, selected_provider, selected_model)
+    else:
+        raise ValueError("Please make a selection")
 
 
 def set_user_selection(logger: Logger, ack: Ack, body: dict):
     try:
         ack()
-        user_id = body["user"]["id"]
-        value = body["actions"][0]["selected_option"]["value"]
-        if value != "null":
-            # parsing the selected option value from the options array in app_home_opened.py
-            selected_provider, selected_model = (
-                value.split(" ")[-1],
-                value.split(" ")[0],
-            )
-            set_user_state(user_id, selected_provider, selected_model)
-        else:
-            raise ValueError("Please make a selection")
+        _save_selection(body)
+    except Exception as e:
+        logger.error(e)
+
+
+async def async_set_user_selection(logger: Logger, ack: "AsyncAck", body: dict):
+    try:
+        await ack()
+        _save_selection(body)
     except Exception as e:
         logger.error(e)
@@ -1,10 +1,33 @@
+from typing import TYPE_CHECKING
+
 from slack_bolt import App
-from .ask_command import ask_callback
-from .code_command import code_callback
-from .incident_command import incident_callback
+
+from ..listener_utils.request_tracing import traced_async_listener
+from ..listener_utils.work_queue import (
+    PRIORITY_ASK,
+    PRIORITY_CODE,
+    PRIORITY_INCIDENT,
+    queued_listener,
+)
+from .ask_command import ask_callback, async_ask_callback
+from .code_command import async_code_callback, code_callback
+from .incident_command import async_incident_callback, incident_callback
+from .profile_command import async_profile_callback, profile_callback
+
+if TYPE_CHECKING:
+    from slack_bolt.async_app import AsyncApp
 
 
 def register(app: App):
-    app.command("/ask")(ask_callback)
-    app.command("/code")(code_callback)
-    app.command("/incident")(incident_callback)
+    app.command("/ask")(queued_listener(PRIORITY_ASK, ask_callback))
+    app.command("/code")(queued_listener(PRIORITY_CODE, code_callback))
+    app.command("/incident")(queued_listener(PRIORITY_INCIDENT, incident_callback))
+    # Not queued: a profile is needed most when the work queue is backed up
+    app.command("/profile")(profile_callback)
+
+
+def register_async(app: "AsyncApp"):
+    app.command("/ask")(traced_async_listener(async_ask_callback))
+    app.command("/code")(traced_async_listener(async_code_callback))
+    app.command("/incident")(traced_async_listener(async_incident_callback))
+    app.command("/profile")(traced_async_listener(async_profile_callback))
@@ -1,19 +1,49 @@
-from slack_bolt import Ack, Say, BoltContext
 from logging import Logger
-from ai.providers import get_provider_response
+from typing import TYPE_CHECKING
+
+from slack_bolt import Ack, BoltContext, Say
 from slack_sdk import WebClient
+
+from ai.providers import aget_provider_response, get_provider_response
+
 from ..listener_utils.listener_constants import ERROR_PREFIX
 from ..listener_utils.message_formatter import (
-    format_rag_response,
     format_ai_response,
     format_error_message,
+    format_fallback_text,
+    format_prompt_quote,
+    format_rag_response,
 )
+from ..listener_utils.slack_outbox import get_slack_outbox
+
+if TYPE_CHECKING:
+    from slack_bolt.async_app import AsyncAck, AsyncBoltContext, AsyncSay
+    from slack_sdk.web.async_client import AsyncWebClient
 
 """
 Callback for handling the '/ask' command. It acknowledges the command, retrieves the user's ID and prompt,
 checks if the prompt is empty, and responds with either an error message or the provider's response.
+`async_ask_callback` is the AsyncApp equivalent used by `app_async.py`; both build their replies with `_reply`.
 """
 
+EMPTY_PROMPT_TEXT = "Looks like you didn't provide a prompt. Try again."
+
+
+def _reply(prompt: str, result: dict) -> tuple[str, list[dict]]:
+    """Build the (fallback text, blocks) of the answer to a prompt from `get_provider_response()`'s result."""
+    response_text = result.get("response", "")
+    rag_sources = result.get("rag_sources", [])
+
+    # Quote the prompt, then the formatted response
+    blocks = [format_prompt_quote(prompt)]
+    if rag_sources:
+        blocks.extend(
+            format_rag_response(response_text, rag_sources, include_followup=True)
+        )
+    else:
+        blocks.extend(format_ai_response(response_text, response_type="general"))
+    return format_fallback_text(prompt, response_text), blocks
+
 
 def ask_callback(
     client: WebClient, ack: Ack, command, say: Say, logger: Logger, context: BoltContext
@@ -25,53 +55,67 @@ def ask_callback(
         prompt = command["text"]
 
         if prompt == "":
-            client.chat_postEphemeral(
+            get_slack_outbox().send(
+                client,
+                "chat_postEphemeral",
                 channel=channel_id,
                 user=user_id,
-                text="Looks like you didn't provide a prompt. Try again.",
+                text=EMPTY_PROMPT_TEXT,
             )
         else:
             # Get AI response (no RAG for general queries)
             result = get_provider_response(user_id, prompt, use_rag=False)
-
-            # Extract response components
-            response_text = result.get("response", "")
-            rag_sources = result.get("rag_sources", [])
-            provider = result.get("provider", "")
-
-            # Create blocks with prompt quote
-            blocks = [
-                {
-                    "type": "rich_text",
-                    "elements": [
-                        {
-                            "type": "rich_text_quote",
-                            "elements": [{"type": "text", "text": prompt}],
-                        }
-                    ],
-                }
-            ]
-
-            # Add formatted response blocks
-            if rag_sources and provider.lower() == "anthropic":
-                response_blocks = format_rag_response(response_text, rag_sources, include_followup=True)
-            else:
-                response_blocks = format_ai_response(response_text, response_type="general")
-
-            blocks.extend(response_blocks)
-
-            client.chat_postEphemeral(
+            text, blocks = _reply(prompt, result)
+            get_slack_outbox().send(
+                client,
+                "chat_postEphemeral",
                 channel=channel_id,
                 user=user_id,
-                text=f"Q: {prompt}\nA: {response_text}",  # Fallback text
+                text=text,
                 blocks=blocks,
             )
     except Exception as e:
         logger.error(e)
         error_blocks = format_error_message(str(e))
-        client.chat_postEphemeral(
+        get_slack_outbox().send(
+            client,
+            "chat_postEphemeral",
+            channel=channel_id,
+            user=user_id,
+            text=f"{ERROR_PREFIX}\n{e}",  # Fallback text
+            blocks=error_blocks,
+        )
+
+
+async def async_ask_callback(
+    client: "AsyncWebClient",
+    ack: "AsyncAck",
+    command,
+    say: "AsyncSay",
+    logger: Logger,
+    context: "AsyncBoltContext",
+):
+    try:
+        await ack()
+        user_id = context["user_id"]
+        channel_id = context["channel_id"]
+        prompt = command["text"]
+
+        if prompt == "":
+            await client.chat_postEphemeral(
+                channel=channel_id, user=user_id, text=EMPTY_PROMPT_TEXT
+            )
+        else:
+            result = await aget_provider_response(user_id, prompt, use_rag=False)
+            text, blocks = _reply(prompt, result)
+            await client.chat_postEphemeral(
+                channel=channel_id, user=user_id, text=text, blocks=blocks
+            )
+    except Exception as e:
+        logger.error(e)
+        await client.chat_postEphemeral(
             channel=channel_id,
             user=user_id,
             text=f"{ERROR_PREFIX}\n{e}",  # Fallback text
-            blocks=error_blocks
+            blocks=format_error_message(str(e)),
         )
@@ -1,19 +1,42 @@
-from slack_bolt import Ack, Say, BoltContext
 from logging import Logger
-from ai.providers import get_provider_response
-from ai.ai_constants import CODE_ANALYSIS_SYSTEM_CONTENT
+from typing import TYPE_CHECKING
+
+from slack_bolt import Ack, BoltContext, Say
 from slack_sdk import WebClient
+
+from ai.ai_constants import CODE_ANALYSIS_SYSTEM_CONTENT
+from ai.providers import aget_provider_response, get_provider_response
+
 from ..listener_utils.listener_constants import DEFAULT_LOADING_TEXT, ERROR_PREFIX
 from ..listener_utils.message_formatter import (
     format_code_response,
     format_error_message,
+    format_fallback_text,
+    format_loading_message,
+    format_prompt_quote,
 )
+from ..listener_utils.slack_outbox import get_slack_outbox
+
+if TYPE_CHECKING:
+    from slack_bolt.async_app import AsyncAck, AsyncBoltContext, AsyncSay
+    from slack_sdk.web.async_client import AsyncWebClient
 
 """
 Callback for handling the '/code' command for code analysis and system design questions.
 Uses MCP tools (GitHub server) instead of RAG for technical code queries.
+`async_code_callback` is the AsyncApp equivalent used by `app_async.py`; both build their replies with `_reply`.
 """
 
+EMPTY_PROMPT_TEXT = ":mag: Please provide a code-related question. Example: `/code explain the authentication flow`"
+
+
+def _reply(prompt: str, result: dict) -> tuple[str, list[dict]]:
+    """Build the (fallback text, blocks) replacing the loading message from `get_provider_response()`'s result."""
+    # Note: rag_sources should be empty for code queries
+    response_text = result.get("response", "")
+    blocks = [format_prompt_quote(prompt), *format_code_response(response_text)]
+    return format_fallback_text(prompt, response_text), blocks
+
 
 def code_callback(
     client: WebClient, ack: Ack, command, say: Say, logger: Logger, context: BoltContext
@@ -26,75 +49,45 @@ def code_callback(
         prompt = command["text"]
 
         if prompt == "":
-            client.chat_postEphemeral(
+            get_slack_outbox().send(
+                client,
+                "chat_postEphemeral",
                 channel=channel_id,
                 user=user_id,
-                text=":mag: Please provide a code-related question. Example: `/code explain the authentication flow`",
+                text=EMPTY_PROMPT_TEXT,
             )
         else:
             # Post initial message with the query and loading indicator
-            initial_blocks = [
-                {
-                    "type": "rich_text",
-                    "elements": [
-                        {
-                            "type": "rich_text_quote",
-                            "elements": [{"type": "text", "text": prompt}],
-                        }
-                    ],
-                },
-                {
-                    "type": "section",
-                    "text": {
-                        "type": "mrkdwn",
-                        "text": DEFAULT_LOADING_TEXT
-                    }
-                }
-            ]
-
-            waiting_message = client.chat_postMessage(
-                channel=channel_id,
-                text=f"Q: {prompt}\n{DEFAULT_LOADING_TEXT}",
-                blocks=initial_blocks
+            waiting_message = (
+                get_slack_outbox()
+                .send(
+                    client,
+                    "chat_postMessage",
+                    channel=channel_id,
+                    text=f"Q: {prompt}\n{DEFAULT_LOADING_TEXT}",
+                    blocks=format_loading_message(prompt, DEFAULT_LOADING_TEXT),
+                )
+                .result()
             )
 
             # Get AI response with code analysis system prompt (disable RAG, enable MCP for code queries)
             result = get_provider_response(
-                user_id, prompt, context=[], system_content=CODE_ANALYSIS_SYSTEM_CONTENT, use_rag=False, use_mcp=True
+                user_id,
+                prompt,
+                context=[],
+                system_content=CODE_ANALYSIS_SYSTEM_CONTENT,
+                use_rag=False,
+                use_mcp=True,
             )
-
-            # Extract response components
-            response_text = result.get("response", "")
-            # Note: rag_sources should be empty for code queries
-            rag_sources = result.get("rag_sources", [])
-
-            # Create blocks with prompt quote
-            blocks = [
-                {
-                    "type": "rich_text",
-                    "elements": [
-                        {
-                            "type": "rich_text_quote",
-                            "elements": [{"type": "text", "text": prompt}],
-                        }
-                    ],
-                }
-            ]
-
-            # Format code analysis response
-            response_blocks = format_code_response(response_text)
-            blocks.extend(response_blocks)
-
-            # Truncate fallback text if needed
-            fallback_text = f"Q: {prompt}\nA: {response_text}"
-            if len(fallback_text) > 3000:
-                fallback_text = fallback_text[:2997] + "..."
+            text, blocks = _reply(prompt, result)
 
             # Update the waiting message with the response
-            client.chat_update(
+            get_slack_outbox().send(
+                client,
+                "chat_update",
                 channel=channel_id,
                 ts=waiting_message["ts"],
-                text=fallback_text,
+                text=text,
                 blocks=blocks,
             )
     except Exception as e:
@@ -103,17 +96,79 @@ def code_callback(
 
         if waiting_message:
             # Update the waiting message with error
-            client.chat_update(
+            get_slack_outbox().send(
+                client,
+                "chat_update",
                 channel=channel_id,
                 ts=waiting_message["ts"],
                 text=f"{ERROR_PREFIX}\n{e}",
-                blocks=error_blocks
+                blocks=error_blocks,
             )
         else:
             # Post new error message if we haven't posted anything yet
-            client.chat_postEphemeral(
+            get_slack_outbox().send(
+                client,
+                "chat_postEphemeral",
+                channel=channel_id,
+                user=user_id,
+                text=f"{ERROR_PREFIX}\n{e}",
+                blocks=error_blocks,
+            )
+
+
+async def async_code_callback(
+    client: "AsyncWebClient",
+    ack: "AsyncAck",
+    command,
+    say: "AsyncSay",
+    logger: Logger,
+    context: "AsyncBoltContext",
+):
+    waiting_message = None
+    try:
+        await ack()
+        user_id = context["user_id"]
+        channel_id = context["channel_id"]
+        prompt = command["text"]
+
+        if prompt == "":
+            await client.chat_postEphemeral(
+                channel=channel_id, user=user_id, text=EMPTY_PROMPT_TEXT
+            )
+        else:
+            waiting_message = await client.chat_postMessage(
+                channel=channel_id,
+                text=f"Q: {prompt}\n{DEFAULT_LOADING_TEXT}",
+                blocks=format_loading_message(prompt, DEFAULT_LOADING_TEXT),
+            )
+
+            result = await aget_provider_response(
+                user_id,
+                prompt,
+                context=[],
+                system_content=CODE_ANALYSIS_SYSTEM_CONTENT,
+                use_rag=False,
+                use_mcp=True,
+            )
+            text, blocks = _reply(prompt, result)
+            await client.chat_update(
+                channel=channel_id, ts=waiting_message["ts"], text=text, blocks=blocks
+            )
+    except Exception as e:
+        logger.error(e)
+        error_blocks = format_error_message(str(e))
+
+        if waiting_message:
+            await client.chat_update(
+                channel=channel_id,
+                ts=waiting_message["ts"],
+                text=f"{ERROR_PREFIX}\n{e}",
+                blocks=error_blocks,
+            )
+        else:
+            await client.chat_postEphemeral(
                 channel=channel_id,
                 user=user_id,
                 text=f"{ERROR_PREFIX}\n{e}",
-                blocks=error_blocks
+                blocks=error_blocks,
             )
@@ -1,24 +1,105 @@
-from slack_bolt import Ack, Say, BoltContext
-from logging import Logger
-from ai.providers import get_provider_response
-from ai.ai_constants import INCIDENT_RESPONSE_SYSTEM_CONTENT
+import asyncio
+import time
+from logging import DEBUG, Logger
+from typing import TYPE_CHECKING
+
+from slack_bolt import Ack, BoltContext, Say
 from slack_sdk import WebClient
-from ..listener_utils.listener_constants import RAG_LOADING_TEXT, ERROR_PREFIX
+
+from ai.ai_constants import INCIDENT_RESPONSE_SYSTEM_CONTENT
+from ai.augmentation import aprepare_augmentation, start_augmentation
+from ai.providers import aget_provider_response, start_provider_response
+from observability.metrics import Histogram, histogram
+
+from ..listener_utils.listener_constants import (
+    ERROR_PREFIX,
+    RAG_LOADING_TEXT,
+    RAG_SUMMARY_LOADING_TEXT,
+)
 from ..listener_utils.message_formatter import (
-    format_rag_response,
     format_error_message,
+    format_fallback_text,
+    format_loading_message,
+    format_prompt_quote,
+    format_rag_response,
+    format_rag_sources,
 )
+from ..listener_utils.slack_outbox import get_slack_outbox
+
+if TYPE_CHECKING:
+    from slack_bolt.async_app import AsyncAck, AsyncBoltContext, AsyncSay
+    from slack_sdk.web.async_client import AsyncWebClient
 
 """
 Callback for handling the '/incident' command for incident response and troubleshooting.
 Uses RAG knowledge base to provide resolution steps from documentation.
+Retrieval and generation start before the loading message is posted so the Slack round trip is off the critical path.
+The reply is two-phase: knowledge base links as soon as retrieval finishes (`_sources_update`),
+then the LLM summary (`_reply`).
+`async_incident_callback` is the AsyncApp equivalent used by `app_async.py`.
+Both phases are timed from the start of the callback and exported as histograms.
 """
 
+INCIDENT_TIME_TO_USEFUL = histogram(
+    "incident_time_to_useful_seconds",
+    "Time from /incident until the knowledge base links were posted",
+)
+INCIDENT_TIME_TO_COMPLETE = histogram(
+    "incident_time_to_complete_seconds",
+    "Time from /incident until the summary replaced the loading message",
+)
+
+EMPTY_PROMPT_TEXT = ":rotating_light: Please describe the incident or alert. Example: `/incident kafka backlog is growing`"
+
+
+def _sources_update(prompt: str, sources: list[dict]) -> tuple[str, list[dict]]:
+    """Build the (fallback text, blocks) listing the matching articles while the summary is generated."""
+    blocks = [
+        *format_loading_message(prompt, RAG_SUMMARY_LOADING_TEXT),
+        *format_rag_sources(sources),
+    ]
+    return f"Q: {prompt}\n{RAG_SUMMARY_LOADING_TEXT}", blocks
+
+
+def _reply(prompt: str, result: dict, logger: Logger) -> tuple[str, list[dict]]:
+    """Build the (fallback text, blocks) replacing the loading message from `get_provider_response()`'s result."""
+    response_text = result.get("response", "")
+    rag_sources = result.get("rag_sources", [])
+
+    if rag_sources:
+        if logger.isEnabledFor(DEBUG):
+            filenames = ", ".join(
+                source.get("filename", "Unknown") for source in rag_sources
+            )
+            logger.debug(
+                f"Incident response - Provider: {result.get('provider', '')}, RAG sources: {filenames}"
+            )
+    else:
+        logger.warning(f"⚠️  NO RAG SOURCES RETRIEVED for query: '{prompt}'")
+
+    # For /incident commands, ALWAYS use Knowledge Base formatting: with citations when RAG
+    # found sources, without them otherwise
+    blocks = [
+        format_prompt_quote(prompt),
+        *format_rag_response(response_text, rag_sources, include_followup=False),
+    ]
+    return format_fallback_text(prompt, response_text), blocks
+
+
+def _record_phase(
+    metric: Histogram, phase: str, started_at: float, logger: Logger, detail: str = ""
+):
+    seconds = time.monotonic() - started_at
+    metric.observe(seconds)
+    logger.info(f"/incident {phase}={seconds:.2f}s{detail}")
+
 
 def incident_callback(
     client: WebClient, ack: Ack, command, say: Say, logger: Logger, context: BoltContext
 ):
     waiting_message = None
+    response_future = None
+    started_at = time.monotonic()
     try:
         ack()
         user_id = context["user_id"]
@@ -26,114 +107,190 @@ def incident_callback(
         prompt = command["text"]
 
         if prompt == "":
-            client.chat_postEphemeral(
+            get_slack_outbox().send(
+                client,
+                "chat_postEphemeral",
                 channel=channel_id,
                 user=user_id,
-                text=":rotating_light: Please describe the incident or alert. Example: `/incident kafka backlog is growing`",
+                text=EMPTY_PROMPT_TEXT,
             )
         else:
+            # Kick off retrieval (query embedding + vector search) and generation, which waits
+            # for it, in the background; both overlap with posting the loading message
+            augmentation = start_augmentation(
+                prompt, INCIDENT_RESPONSE_SYSTEM_CONTENT, use_rag=True
+            )
+            logger.debug(
+                f"Requesting incident response for user {user_id} with query: '{prompt[:100]}'"
+            )
+            response_future = start_provider_response(
+                user_id, prompt, context=[], augmentation=augmentation
+            )
+
             # Post initial message with the query and loading indicator
-            initial_blocks = [
-                {
-                    "type": "rich_text",
-                    "elements": [
-                        {
-                            "type": "rich_text_quote",
-                            "elements": [{"type": "text", "text": prompt}],
-                        }
-                    ],
-                },
-                {
-                    "type": "section",
-                    "text": {
-                        "type": "mrkdwn",
-                        "text": RAG_LOADING_TEXT
-                    }
-                }
-            ]
-
-            waiting_message = client.chat_postMessage(
-                channel=channel_id,
-                text=f"Q: {prompt}\n{RAG_LOADING_TEXT}",
-                blocks=initial_blocks
-            )
-
-            # Get AI response with incident response system prompt (enable RAG for incidents)
-            logger.info(f"Requesting incident response for user {user_id} with query: '{prompt[:100]}'")
-            logger.info("RAG is ENABLED for this request")
-
-            result = get_provider_response(
-                user_id, prompt, context=[], system_content=INCIDENT_RESPONSE_SYSTEM_CONTENT, use_rag=True
-            )
-
-            # Extract response components
-            response_text = result.get("response", "")
-            rag_sources = result.get("rag_sources", [])
-            provider = result.get("provider", "")
-
-            # Log for debugging
-            logger.info(f"Incident response - Provider: {provider}, RAG sources: {len(rag_sources)}")
-            if rag_sources:
-                logger.info("RAG sources retrieved:")
-                for idx, source in enumerate(rag_sources, 1):
-                    logger.info(f"  {idx}. {source.get('filename', 'Unknown')}")
-            else:
-                logger.warning(f"⚠️  NO RAG SOURCES RETRIEVED for query: '{prompt}'")
-
-            # Create blocks with prompt quote
-            blocks = [
-                {
-                    "type": "rich_text",
-                    "elements": [
-                        {
-                            "type": "rich_text_quote",
-                            "elements": [{"type": "text", "text": prompt}],
-                        }
-                    ],
-                }
-            ]
-
-            # For /incident commands, ALWAYS use Knowledge Base formatting
-            # (RAG should be enabled, but use KB formatting regardless)
-            if len(rag_sources) > 0:
-                # RAG found sources - use Knowledge Base Resolution format with citations
-                response_blocks = format_rag_response(response_text, rag_sources, include_followup=False)
-            else:
-                # No sources found, but still use Knowledge Base format (without citations)
-                logger.warning("No RAG sources found for incident query - using KB format anyway")
-                response_blocks = format_rag_response(response_text, sources=[], include_followup=False)
-
-            blocks.extend(response_blocks)
-
-            # Truncate fallback text if needed (Slack has 40k char limit for text field)
-            fallback_text = f"Q: {prompt}\nA: {response_text}"
-            if len(fallback_text) > 3000:
-                fallback_text = fallback_text[:2997] + "..."
+            waiting_message = (
+                get_slack_outbox()
+                .send(
+                    client,
+                    "chat_postMessage",
+                    channel=channel_id,
+                    text=f"Q: {prompt}\n{RAG_LOADING_TEXT}",
+                    blocks=format_loading_message(prompt, RAG_LOADING_TEXT),
+                )
+                .result()
+            )
+
+            # Phase 1: show the matching runbook links as soon as retrieval finishes
+            sources = augmentation.result().rag_sources
+            if sources:
+                text, blocks = _sources_update(prompt, sources)
+                get_slack_outbox().send(
+                    client,
+                    "chat_update",
+                    channel=channel_id,
+                    ts=waiting_message["ts"],
+                    text=text,
+                    blocks=blocks,
+                )
+                _record_phase(
+                    INCIDENT_TIME_TO_USEFUL,
+                    "time_to_useful",
+                    started_at,
+                    logger,
+                    f" ({len(sources)} articles)",
+                )
+
+            # Phase 2: fill in the summary once generation completes
+            text, blocks = _reply(prompt, response_future.result(), logger)
 
             # Update the waiting message with the response
-            client.chat_update(
+            get_slack_outbox().send(
+                client,
+                "chat_update",
                 channel=channel_id,
                 ts=waiting_message["ts"],
-                text=fallback_text,
+                text=text,
                 blocks=blocks,
             )
+            _record_phase(
+                INCIDENT_TIME_TO_COMPLETE, "time_to_complete", started_at, logger
+            )
     except Exception as e:
         logger.error(e)
+        if response_future is not None:
+            # Don't keep generating a summary nobody will see
+            response_future.cancel()
         error_blocks = format_error_message(str(e))
 
         if waiting_message:
             # Update the waiting message with error
-            client.chat_update(
+            get_slack_outbox().send(
+                client,
+                "chat_update",
                 channel=channel_id,
                 ts=waiting_message["ts"],
                 text=f"{ERROR_PREFIX}\n{e}",
-                blocks=error_blocks
+                blocks=error_blocks,
             )
         else:
             # Post new error message if we haven't posted anything yet
-            client.chat_postEphemeral(
+            get_slack_outbox().send(
+                client,
+                "chat_postEphemeral",
+                channel=channel_id,
+                user=user_id,
+                text=f"{ERROR_PREFIX}\n{e}",
+                blocks=error_blocks,
+            )
+
+
+async def async_incident_callback(
+    client: "AsyncWebClient",
+    ack: "AsyncAck",
+    command,
+    say: "AsyncSay",
+    logger: Logger,
+    context: "AsyncBoltContext",
+):
+    waiting_message = None
+    started_at = time.monotonic()
+    try:
+        await ack()
+        user_id = context["user_id"]
+        channel_id = context["channel_id"]
+        prompt = command["text"]
+
+        if prompt == "":
+            await client.chat_postEphemeral(
+                channel=channel_id, user=user_id, text=EMPTY_PROMPT_TEXT
+            )
+        else:
+            augmentation = asyncio.create_task(
+                aprepare_augmentation(
+                    prompt, INCIDENT_RESPONSE_SYSTEM_CONTENT, use_rag=True
+                )
+            )
+
+            response_task = asyncio.create_task(
+                aget_provider_response(
+                    user_id, prompt, context=[], augmentation=augmentation
+                )
+            )
+
+            try:
+                waiting_message = await client.chat_postMessage(
+                    channel=channel_id,
+                    text=f"Q: {prompt}\n{RAG_LOADING_TEXT}",
+                    blocks=format_loading_message(prompt, RAG_LOADING_TEXT),
+                )
+
+                # Phase 1: show the matching runbook links as soon as retrieval finishes
+                sources = (await augmentation).rag_sources
+                if sources:
+                    text, blocks = _sources_update(prompt, sources)
+                    await client.chat_update(
+                        channel=channel_id,
+                        ts=waiting_message["ts"],
+                        text=text,
+                        blocks=blocks,
+                    )
+                    _record_phase(
+                        INCIDENT_TIME_TO_USEFUL,
+                        "time_to_useful",
+                        started_at,
+                        logger,
+                        f" ({len(sources)} articles)",
+                    )
+
+                # Phase 2: fill in the summary once generation completes
+                result = await response_task
+            except BaseException:
+                # Retrieval, a post or this callback failed: stop generating an answer nobody will see
+                response_task.cancel()
+                raise
+
+            text, blocks = _reply(prompt, result, logger)
+            await client.chat_update(
+                channel=channel_id, ts=waiting_message["ts"], text=text, blocks=blocks
+            )
+            _record_phase(
+                INCIDENT_TIME_TO_COMPLETE, "time_to_complete", started_at, logger
+            )
+    except Exception as e:
+        logger.error(e)
+        error_blocks = format_error_message(str(e))
+
+        if waiting_message:
+            await client.chat_update(
+                channel=channel_id,
+                ts=waiting_message["ts"],
+                text=f"{ERROR_PREFIX}\n{e}",
+                blocks=error_blocks,
+            )
+        else:
+            await client.chat_postEphemeral(
                 channel=channel_id,
                 user=user_id,
                 text=f"{ERROR_PREFIX}\n{e}",
-                blocks=error_blocks
+                blocks=error_blocks,
             )
@@ -0,0 +1,129 @@
+import asyncio
+from collections.abc import Callable
+from logging import Logger
+from typing import TYPE_CHECKING
+
+from slack_bolt import Ack, BoltContext
+from slack_sdk import WebClient
+
+from observability.profiler import (
+    PROFILE_MAX_SECONDS,
+    PROFILE_SECONDS,
+    Profile,
+    start_profile,
+)
+
+from ..listener_utils.admin import is_admin
+from ..listener_utils.slack_outbox import get_slack_outbox
+
+if TYPE_CHECKING:
+    from slack_bolt.async_app import AsyncAck, AsyncBoltContext
+    from slack_sdk.web.async_client import AsyncWebClient
+
+"""
+Callback for handling the '/profile [seconds]' command. For users in ADMIN_USER_IDS it starts the
+sampling profiler (`observability.profiler`) over every thread of this process and replies, once the
+profile is written, with the path of the speedscope and collapsed-stack files under PROFILE_DIR.
+The command is not put on the work queue: it is most useful when that queue is backed up.
+`async_profile_callback` is the AsyncApp equivalent used by `app_async.py`.
+"""
+
+NOT_ADMIN_TEXT = (
+    ":no_entry: `/profile` is restricted to the bot's operators (ADMIN_USER_IDS)."
+)
+USAGE_TEXT = f"Usage: `/profile [seconds]` (default {PROFILE_SECONDS:g}, at most {PROFILE_MAX_SECONDS:g})"
+ALREADY_RUNNING_TEXT = (
+    ":hourglass: A profile is already running; try again when it has been written."
+)
+
+
+def _parse_seconds(text: str) -> float | None:
+    text = (text or "").strip()
+    if not text:
+        return PROFILE_SECONDS
+    try:
+        seconds = float(text)
+    except ValueError:
+        return None
+    return seconds if 0 < seconds <= PROFILE_MAX_SECONDS else None
+
+
+def _start(
+    user_id: str, text: str, on_complete: Callable[[Profile], None]
+) -> tuple[str, Profile | None]:
+    """Start a profile for the command; returns the reply text and the profile (None if none was started)."""
+    if not is_admin(user_id):
+        return NOT_ADMIN_TEXT, None
+    seconds = _parse_seconds(text)
+    if seconds is None:
+        return USAGE_TEXT, None
+    profile = start_profile(seconds, trigger="command", on_complete=on_complete)
+    if profile is None:
+        return ALREADY_RUNNING_TEXT, None
+    return (
+        f":stopwatch: Sampling every thread for {seconds:g}s. I'll post the file paths when it's done.",
+        profile,
+    )
+
+
+def _finished_text(profile: Profile) -> str:
+    if profile.error is not None:
+        return f":warning: Profiling failed: {profile.error}"
+    return (
+        f":white_check_mark: Profile of {profile.samples} samples written to "
+        f"`{profile.path}.speedscope.json` (open it at https://www.speedscope.app) "
+        f"and `{profile.path}.collapsed`."
+    )
+
+
+def profile_callback(
+    client: WebClient, ack: Ack, command, logger: Logger, context: BoltContext
+):
+    try:
+        ack()
+        user_id = context["user_id"]
+        channel_id = context["channel_id"]
+
+        def on_complete(profile: Profile):
+            get_slack_outbox().send(
+                client,
+                "chat_postEphemeral",
+                channel=channel_id,
+                user=user_id,
+                text=_finished_text(profile),
+            )
+
+        text, _ = _start(user_id, command["text"], on_complete)
+        get_slack_outbox().send(
+            client, "chat_postEphemeral", channel=channel_id, user=user_id, text=text
+        )
+    except Exception as e:
+        logger.error(e)
+
+
+async def async_profile_callback(
+    client: "AsyncWebClient",
+    ack: "AsyncAck",
+    command,
+    logger: Logger,
+    context: "AsyncBoltContext",
+):
+    try:
+        await ack()
+        user_id = context["user_id"]
+        channel_id = context["channel_id"]
+        loop = asyncio.get_running_loop()
+
+        def on_complete(profile: Profile):
+            # Runs on the profiler thread; the reply is sent from the event loop
+            asyncio.run_coroutine_threadsafe(
+                client.chat_postEphemeral(
+                    channel=channel_id, user=user_id, text=_finished_text(profile)
+                ),
+                loop,
+            )
+
+        text, _ = _start(user_id, command["text"], on_complete)
+        await client.chat_postEphemeral(channel=channel_id, user=user_id, text=text)
+    except Exception as e:
+        logger.error(e)
@@ -1,10 +1,33 @@
+from typing import TYPE_CHECKING
+
 from slack_bolt import App
-from .app_home_opened import app_home_opened_callback
-from .app_mentioned import app_mentioned_callback
-from .app_messaged import app_messaged_callback
+
+from ..listener_utils.request_tracing import traced_async_listener
+from ..listener_utils.work_queue import PRIORITY_DM, PRIORITY_MENTION, queued_listener
+from .app_home_opened import app_home_opened_callback, async_app_home_opened_callback
+from .app_mentioned import app_mentioned_callback, async_app_mentioned_callback
+from .app_messaged import (
+    app_messaged_callback,
+    async_app_messaged_callback,
+    async_is_direct_message,
+    is_direct_message,
+)
+
+if TYPE_CHECKING:
+    from slack_bolt.async_app import AsyncApp
 
 
 def register(app: App):
     app.event("app_home_opened")(app_home_opened_callback)
-    app.event("app_mention")(app_mentioned_callback)
-    app.event("message")(app_messaged_callback)
+    app.event("app_mention")(queued_listener(PRIORITY_MENTION, app_mentioned_callback))
+    app.event("message", matchers=[is_direct_message])(
+        queued_listener(PRIORITY_DM, app_messaged_callback)
+    )
+
+
+def register_async(app: "AsyncApp"):
+    app.event("app_home_opened")(traced_async_listener(async_app_home_opened_callback))
+    app.event("app_mention")(traced_async_listener(async_app_mentioned_callback))
+    app.event("message", matchers=[async_is_direct_message])(
+        traced_async_listener(async_app_messaged_callback)
+    )
@@ -1,38 +1,151 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
 from logging import Logger
-from ai.providers import get_available_providers
+from typing import TYPE_CHECKING
+
 from slack_sdk import WebClient
+
+from ai.providers import get_provider_catalog
+from observability.health import get_health_summary
 from state_store.get_user_state import get_user_state
 
+from ..listener_utils.admin import is_admin
+
+if TYPE_CHECKING:
+    from slack_sdk.web.async_client import AsyncWebClient
+
 """
 Callback for handling the 'app_home_opened' event. It checks if the event is for the 'home' tab,
 generates a list of model options for a dropdown menu, retrieves the user's state to set the initial option,
 and publishes a view to the user's home tab in Slack.
+Users listed in ADMIN_USER_IDS also see a bot health panel: p50/p95 latency per command, provider
+errors and rate limiting, cache hit rates and the knowledge base index, from the summary that
+`observability.health` refreshes every HEALTH_SNAPSHOT_SECONDS (HOME_HEALTH_PANEL=false hides it).
+Dropdown options are built once per provider catalog version, the health panel once per summary,
+rendered views are cached per user keyed by (selected model, catalog version, summary time), and
+`views_publish` is skipped when the user's Home tab already shows the same view. Both per-user caches
+are LRUs of at most HOME_VIEW_CACHE_SIZE users whose entries expire after HOME_VIEW_CACHE_TTL_SECONDS.
+`async_app_home_opened_callback` is the AsyncApp equivalent used by `app_async.py`.
 """
 
+HOME_HEALTH_PANEL = os.environ.get("HOME_HEALTH_PANEL", "true").lower() == "true"
 
-def app_home_opened_callback(event: dict, logger: Logger, client: WebClient):
-    if event["tab"] != "home":
-        return
+HOME_VIEW_CACHE_SIZE = int(os.environ.get("HOME_VIEW_CACHE_SIZE", "10000"))
+# An expired published hash only costs one redundant `views_publish`
+HOME_VIEW_CACHE_TTL_SECONDS = float(
+    os.environ.get("HOME_VIEW_CACHE_TTL_SECONDS", "3600")
+)
+
+# catalog version -> dropdown options
+_options_cache: dict[str, list[dict]] = {}
+# (summary time, health panel blocks) for the latest health summary
+_health_blocks: tuple[float, list[dict]] = (0.0, [])
+# user_id -> (expires_at, ((selected model, catalog version, summary time), view, view hash))
+_rendered_views: "OrderedDict[str, tuple[float, tuple[tuple, dict, str]]]" = (
+    OrderedDict()
+)
+# user_id -> (expires_at, hash of the view last published to their Home tab)
+_published_hashes: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+_lock = threading.Lock()
 
-    # create a list of options for the dropdown menu each containing the model name and provider
-    options = [
-        {
-            "text": {
-                "type": "plain_text",
-                "text": f"{model_info['name']} ({model_info['provider']})",
-                "emoji": True,
-            },
-            "value": f"{model_name} {model_info['provider'].lower()}",
-        }
-        for model_name, model_info in get_available_providers().items()
-    ]
+
+def _cache_get(cache: OrderedDict, user_id: str):
+    # Callers hold _lock
+    entry = cache.get(user_id)
+    if entry is None or entry[0] <= time.monotonic():
+        return None
+    cache.move_to_end(user_id)
+    return entry[1]
+
+
+def _cache_put(cache: OrderedDict, user_id: str, value):
+    # Callers hold _lock
+    cache[user_id] = (time.monotonic() + HOME_VIEW_CACHE_TTL_SECONDS, value)
+    cache.move_to_end(user_id)
+    while len(cache) > HOME_VIEW_CACHE_SIZE:
+        cache.popitem(last=False)
+
+
+def _get_options() -> tuple[str, list[dict]]:
+    catalog_version, models = get_provider_catalog()
+    with _lock:
+        options = _options_cache.get(catalog_version)
+        if options is None:
+            # create a list of options for the dropdown menu each containing the model name and provider
+            options = [
+                {
+                    "text": {
+                        "type": "plain_text",
+                        "text": f"{model_info['name']} ({model_info['provider']})",
+                        "emoji": True,
+                    },
+                    "value": f"{model_name} {model_info['provider'].lower()}",
+                }
+                for model_name, model_info in models.items()
+            ]
+            _options_cache.clear()
+            _options_cache[catalog_version] = options
+        return catalog_version, options
+
+
+def _get_health_blocks() -> tuple[float, list[dict]]:
+    """Return the health panel for the latest summary and the summary's time, rendering it once per summary."""
+    global _health_blocks
+    summary = get_health_summary()
+    with _lock:
+        if _health_blocks[0] != summary["taken_at"]:
+            _health_blocks = (summary["taken_at"], _build_health_blocks(summary))
+        return _health_blocks
+
+
+def _get_home_view(user_id: str) -> tuple[dict, str]:
+    """Return the user's Home view and its hash, rendering it only when the selection, catalog or health changed."""
+    catalog_version, options = _get_options()
 
     # retrieve user's state to determine if they already have a selected model
-    user_state = get_user_state(event["user"], True)
+    user_state = get_user_state(user_id, True)
+    selected_model = user_state[1] if user_state else None
+
+    health_version, health_blocks = 0.0, []
+    if HOME_HEALTH_PANEL and is_admin(user_id):
+        health_version, health_blocks = _get_health_blocks()
+
+    key = (selected_model, catalog_version, health_version)
+    with _lock:
+        cached = _cache_get(_rendered_views, user_id)
+    if cached is not None and cached[0] == key:
+        return cached[1], cached[2]
+
+    view = _build_home_view(options, selected_model)
+    # the panel blocks are shared between operators, and the view is never modified after this
+    view["blocks"].extend(health_blocks)
+    view_hash = hashlib.sha1(json.dumps(view, sort_keys=True).encode()).hexdigest()
+    with _lock:
+        _cache_put(_rendered_views, user_id, (key, view, view_hash))
+    return view, view_hash
+
+
+def _needs_publish(user_id: str, view_hash: str) -> bool:
+    with _lock:
+        return _cache_get(_published_hashes, user_id) != view_hash
+
+
+def _mark_published(user_id: str, view_hash: str):
+    with _lock:
+        _cache_put(_published_hashes, user_id, view_hash)
+
+
+def _build_home_view(options: list[dict], initial_model: str | None) -> dict:
+    # the cached options are shared between users, so never modify them in place
+    options = list(options)
     initial_option = None
 
-    if user_state:
-        initial_model = get_user_state(event["user"], True)[1]
+    if initial_model:
         # set the initial option to the user's previously selected model
         initial_option = list(
             filter(lambda x: x["value"].startswith(initial_model), options)
@@ -50,59 +163,173 @@ def app_home_opened_callback(event: dict, logger: Logger, client: WebClient):
             }
         )
 
-    try:
-        client.views_publish(
-            user_id=event["user"],
-            view={
-                "type": "home",
-                "blocks": [
-                    {
-                        "type": "header",
-                        "text": {
-                            "type": "plain_text",
-                            "text": "LVDS On-Call Agent",
-                            "emoji": True,
-                        },
-                    },
-                    {"type": "divider"},
-                    {
-                        "type": "section",
-                        "text": {
-                            "type": "mrkdwn",
-                            "text": "*Professional technical support for LVDS application operations*\n\nI can help with:\n• Incident response and troubleshooting\n• Code analysis and system architecture\n• Software engineering questions\n\n*Available Commands:*\n• `/ask [question]` - Ask general technical questions\n• `/incident [description]` - Get resolution steps from knowledge base\n• `/code [question]` - Analyze codebase and system design\n• Mention me or DM for general technical support"
-                        }
-                    },
-                    {"type": "divider"},
+    return {
+        "type": "home",
+        "blocks": [
+            {
+                "type": "header",
+                "text": {
+                    "type": "plain_text",
+                    "text": "LVDS On-Call Agent",
+                    "emoji": True,
+                },
+            },
+            {"type": "divider"},
+            {
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": "*Professional technical support for LVDS application operations*\n\nI can help with:\n• Incident response and troubleshooting\n• Code analysis and system architecture\n• Software engineering questions\n\n*Available Commands:*\n• `/ask [question]` - Ask general technical questions\n• `/incident [description]` - Get resolution steps from knowledge base\n• `/code [question]` - Analyze codebase and system design\n• Mention me or DM for general technical support",
+                },
+            },
+            {"type": "divider"},
+            {
+                "type": "rich_text",
+                "elements": [
                     {
-                        "type": "rich_text",
+                        "type": "rich_text_section",
                         "elements": [
                             {
-                                "type": "rich_text_section",
-                                "elements": [
-                                    {
-                                        "type": "text",
-                                        "text": "AI Provider Selection",
-                                        "style": {"bold": True},
-                                    }
-                                ],
+                                "type": "text",
+                                "text": "AI Provider Selection",
+                                "style": {"bold": True},
                             }
                         ],
-                    },
+                    }
+                ],
+            },
+            {
+                "type": "actions",
+                "elements": [
                     {
-                        "type": "actions",
-                        "elements": [
-                            {
-                                "type": "static_select",
-                                "initial_option": initial_option[0]
-                                if initial_option
-                                else options[-1],
-                                "options": options,
-                                "action_id": "pick_a_provider",
-                            }
-                        ],
-                    },
+                        "type": "static_select",
+                        "initial_option": initial_option[0]
+                        if initial_option
+                        else options[-1],
+                        "options": options,
+                        "action_id": "pick_a_provider",
+                    }
                 ],
             },
+        ],
+    }
+
+
+def _format_seconds(seconds: float | None) -> str:
+    if seconds is None:
+        return "-"
+    return f"{seconds * 1000:.0f}ms" if seconds < 1 else f"{seconds:.1f}s"
+
+
+def _format_counts(counts: dict[str, int]) -> str:
+    return ", ".join(
+        f"{count} {name.replace('_', ' ')}" for name, count in sorted(counts.items())
+    )
+
+
+def _build_health_blocks(summary: dict) -> list[dict]:
+    window_minutes = max(1, round(summary["window_seconds"] / 60))
+    taken_at = time.strftime("%H:%M:%S UTC", time.gmtime(summary["taken_at"]))
+
+    command_lines = [
+        f"`{command['name']}`  p50 {_format_seconds(command['p50'])} · p95 {_format_seconds(command['p95'])}"
+        f" · {command['requests']} requests"
+        + (f" · *{command['errors']} failed*" if command["errors"] else "")
+        for command in summary["commands"]
+    ]
+
+    provider_lines = []
+    for provider in summary["providers"]:
+        line = f"`{provider['provider']}`  {provider['requests']} requests · p95 {_format_seconds(provider['p95'])}"
+        if provider["failed"]:
+            line += f" · *{provider['failed']} failed*"
+        if provider["errors"]:
+            line += f" · errors: {_format_counts(provider['errors'])}"
+        if provider["rejected"]:
+            line += f" · refused: {_format_counts(provider['rejected'])}"
+        if provider["queued"]:
+            line += f" · {provider['queued']} queued for capacity"
+        if provider["circuit_open"]:
+            line += " · :red_circle: *circuit open*"
+        provider_lines.append(line)
+
+    cache_parts = [
+        f"{name} {cache['hit_rate'] * 100:.0f}% ({cache['hits']}/{cache['lookups']})"
+        for name, cache in summary["caches"].items()
+        if cache["lookups"]
+    ]
+
+    index = summary["index"]
+    if index["status"] == "ready":
+        built_at = time.strftime("%Y-%m-%d %H:%M UTC", time.gmtime(index["built_at"]))
+        index_text = (
+            f"ready · version `{index['version']}` · {index['chunks']} chunks from {index['documents']} documents"
+            f" · built {built_at}"
         )
+    else:
+        index_text = index["status"].replace("_", " ")
+
+    queue = summary["queue"]
+    text = "\n".join(
+        [
+            "*Latency by command*",
+            *(command_lines or ["_No requests_"]),
+            "",
+            "*Providers*",
+            *(provider_lines or ["_No model requests_"]),
+            "",
+            f"*Cache hit rates*  {' · '.join(cache_parts) if cache_parts else '_No lookups_'}",
+            f"*Work queue*  {queue['waiting']} waiting · {queue['busy_workers']} workers busy",
+            f"*Knowledge base*  {index_text}",
+        ]
+    )
+    return [
+        {"type": "divider"},
+        {
+            "type": "header",
+            "text": {"type": "plain_text", "text": "Bot Health", "emoji": True},
+        },
+        {
+            "type": "context",
+            "elements": [
+                {
+                    "type": "mrkdwn",
+                    "text": f"Last {window_minutes} min as of {taken_at} · reopen the tab to refresh"
+                    " · operators only",
+                }
+            ],
+        },
+        # a section's text is limited to 3000 characters
+        {"type": "section", "text": {"type": "mrkdwn", "text": text[:3000]}},
+    ]
+
+
+def app_home_opened_callback(event: dict, logger: Logger, client: WebClient):
+    if event["tab"] != "home":
+        return
+
+    try:
+        user_id = event["user"]
+        view, view_hash = _get_home_view(user_id)
+        if _needs_publish(user_id, view_hash):
+            client.views_publish(user_id=user_id, view=view)
+            _mark_published(user_id, view_hash)
+    except Exception as e:
+        logger.error(e)
+
+
+async def async_app_home_opened_callback(
+    event: dict, logger: Logger, client: "AsyncWebClient"
+):
+    if event["tab"] != "home":
+        return
+
+    try:
+        user_id = event["user"]
+        # Rendering reads the user state store, the provider catalog and the health snapshot
+        view, view_hash = await asyncio.to_thread(_get_home_view, user_id)
+        if _needs_publish(user_id, view_hash):
+            await client.views_publish(user_id=user_id, view=view)
+            _mark_published(user_id, view_hash)
     except Exception as e:
         logger.error(e)
@@ -1,27 +1,50 @@
-from ai.providers import get_provider_response
 from logging import Logger
+from typing import TYPE_CHECKING
+
+from slack_bolt import BoltContext, Say
 from slack_sdk import WebClient
-from slack_bolt import Say
+
+from ai.providers import aget_provider_response, get_provider_response
+
+from ..listener_utils.conversation_cache import get_conversation_cache
 from ..listener_utils.listener_constants import (
     DEFAULT_LOADING_TEXT,
-    MENTION_WITHOUT_TEXT,
     ERROR_PREFIX,
+    MENTION_WITHOUT_TEXT,
 )
-from ..listener_utils.parse_conversation import parse_conversation
 from ..listener_utils.message_formatter import (
-    format_rag_response,
     format_ai_response,
     format_error_message,
-    format_simple_message,
+    format_rag_response,
 )
+from ..listener_utils.parse_conversation import parse_conversation
+from ..listener_utils.slack_outbox import get_slack_outbox
+
+if TYPE_CHECKING:
+    from slack_bolt.async_app import AsyncSay
+    from slack_sdk.web.async_client import AsyncWebClient
 
 """
 Handles the event when the app is mentioned in a Slack channel, retrieves the conversation context,
-and generates an AI response if text is provided, otherwise sends a default response
+and generates an AI response if text is provided, otherwise sends a default response.
+`async_app_mentioned_callback` is the AsyncApp equivalent used by `app_async.py`.
 """
 
 
-def app_mentioned_callback(client: WebClient, event: dict, logger: Logger, say: Say):
+def _reply(result: dict) -> tuple[str, list[dict]]:
+    """Build the (fallback text, blocks) of the answer from `get_provider_response()`'s result."""
+    response_text = result.get("response", "")
+    rag_sources = result.get("rag_sources", [])
+
+    # Format with Block Kit based on whether RAG was used
+    if rag_sources:
+        return response_text, format_rag_response(response_text, rag_sources)
+    return response_text, format_ai_response(response_text, response_type="general")
+
+
+def app_mentioned_callback(
+    client: WebClient, event: dict, logger: Logger, say: Say, context: BoltContext
+):
     waiting_message = None
     try:
         channel_id = event.get("channel")
@@ -29,38 +52,29 @@ def app_mentioned_callback(client: WebClient, event: dict, logger: Logger, say:
         user_id = event.get("user")
         text = event.get("text")
 
-        if thread_ts:
-            conversation = client.conversations_replies(
-                channel=channel_id, ts=thread_ts, limit=10
-            )["messages"]
-        else:
-            conversation = client.conversations_history(channel=channel_id, limit=10)[
-                "messages"
-            ]
+        # Recent messages come from the event-fed cache; Slack is only called on a miss
+        conversation = get_conversation_cache().get(
+            client, channel_id, thread_ts=thread_ts, exclude_ts=event["ts"], limit=10
+        )
+        if not thread_ts:
             thread_ts = event["ts"]
 
-        conversation_context = parse_conversation(conversation[:-1])
+        conversation_context = parse_conversation(conversation)
 
         if text:
             waiting_message = say(text=DEFAULT_LOADING_TEXT, thread_ts=thread_ts)
-            result = get_provider_response(user_id, text, conversation_context, use_rag=False)
-
-            # Extract response components
-            response_text = result.get("response", "")
-            rag_sources = result.get("rag_sources", [])
-            provider = result.get("provider", "")
-
-            # Format with Block Kit based on whether RAG was used
-            if rag_sources and provider.lower() == "anthropic":
-                blocks = format_rag_response(response_text, rag_sources)
-            else:
-                blocks = format_ai_response(response_text, response_type="general")
+            result = get_provider_response(
+                user_id, text, conversation_context, use_rag=False
+            )
 
-            client.chat_update(
+            response_text, blocks = _reply(result)
+            get_slack_outbox().send(
+                client,
+                "chat_update",
                 channel=channel_id,
                 ts=waiting_message["ts"],
                 text=response_text,  # Fallback text for notifications
-                blocks=blocks
+                blocks=blocks,
             )
         else:
             waiting_message = say(text=MENTION_WITHOUT_TEXT, thread_ts=thread_ts)
@@ -69,9 +83,56 @@ def app_mentioned_callback(client: WebClient, event: dict, logger: Logger, say:
         logger.error(e)
         error_blocks = format_error_message(str(e))
         if waiting_message:
-            client.chat_update(
+            get_slack_outbox().send(
+                client,
+                "chat_update",
+                channel=channel_id,
+                ts=waiting_message["ts"],
+                text=f"{ERROR_PREFIX}\n{e}",  # Fallback text
+                blocks=error_blocks,
+            )
+
+
+async def async_app_mentioned_callback(
+    client: "AsyncWebClient", event: dict, logger: Logger, say: "AsyncSay"
+):
+    waiting_message = None
+    try:
+        channel_id = event.get("channel")
+        thread_ts = event.get("thread_ts")
+        user_id = event.get("user")
+        text = event.get("text")
+
+        conversation = await get_conversation_cache().aget(
+            client, channel_id, thread_ts=thread_ts, exclude_ts=event["ts"], limit=10
+        )
+        if not thread_ts:
+            thread_ts = event["ts"]
+
+        conversation_context = parse_conversation(conversation)
+
+        if text:
+            waiting_message = await say(text=DEFAULT_LOADING_TEXT, thread_ts=thread_ts)
+            result = await aget_provider_response(
+                user_id, text, conversation_context, use_rag=False
+            )
+
+            response_text, blocks = _reply(result)
+            await client.chat_update(
+                channel=channel_id,
+                ts=waiting_message["ts"],
+                text=response_text,  # Fallback text for notifications
+                blocks=blocks,
+            )
+        else:
+            waiting_message = await say(text=MENTION_WITHOUT_TEXT, thread_ts=thread_ts)
+
+    except Exception as e:
+        logger.error(e)
+        if waiting_message:
+            await client.chat_update(
                 channel=channel_id,
                 ts=waiting_message["ts"],
                 text=f"{ERROR_PREFIX}\n{e}",  # Fallback text
-                blocks=error_blocks
+                blocks=format_error_message(str(e)),
             )
@@ -1,23 +1,57 @@
-from ai.ai_constants import DM_SYSTEM_CONTENT
-from ai.providers import get_provider_response
 from logging import Logger
-from slack_bolt import Say
+from typing import TYPE_CHECKING
+
+from slack_bolt import BoltContext, Say
 from slack_sdk import WebClient
+
+from ai.ai_constants import DM_SYSTEM_CONTENT
+from ai.providers import aget_provider_response, get_provider_response
+
+from ..listener_utils.conversation_cache import get_conversation_cache
 from ..listener_utils.listener_constants import DEFAULT_LOADING_TEXT, ERROR_PREFIX
-from ..listener_utils.parse_conversation import parse_conversation
 from ..listener_utils.message_formatter import (
-    format_rag_response,
     format_ai_response,
     format_error_message,
+    format_rag_response,
 )
+from ..listener_utils.parse_conversation import parse_conversation
+from ..listener_utils.slack_outbox import get_slack_outbox
+
+if TYPE_CHECKING:
+    from slack_bolt.async_app import AsyncSay
+    from slack_sdk.web.async_client import AsyncWebClient
 
 """
 Handles the event when a direct message is sent to the bot, retrieves the conversation context,
 and generates an AI response.
+`async_app_messaged_callback` is the AsyncApp equivalent used by `app_async.py`.
 """
 
 
-def app_messaged_callback(client: WebClient, event: dict, logger: Logger, say: Say):
+def _reply(result: dict) -> tuple[str, list[dict]]:
+    """Build the (fallback text, blocks) of the answer from `get_provider_response()`'s result."""
+    response_text = result.get("response", "")
+    rag_sources = result.get("rag_sources", [])
+
+    # Format with Block Kit based on whether RAG was used
+    if rag_sources:
+        return response_text, format_rag_response(response_text, rag_sources)
+    return response_text, format_ai_response(response_text, response_type="dm")
+
+
+def is_direct_message(event: dict) -> bool:
+    # Listener matcher: only DMs to the bot are answered (and queued)
+    return event.get("channel_type") == "im"
+
+
+async def async_is_direct_message(event: dict) -> bool:
+    # AsyncApp awaits its listener matchers
+    return is_direct_message(event)
+
+
+def app_messaged_callback(
+    client: WebClient, event: dict, logger: Logger, say: Say, context: BoltContext
+):
     channel_id = event.get("channel")
     thread_ts = event.get("thread_ts")
     user_id = event.get("user")
@@ -29,40 +63,84 @@ def app_messaged_callback(client: WebClient, event: dict, logger: Logger, say: S
             conversation_context = ""
 
             if thread_ts:  # Retrieves context to continue the conversation in a thread.
-                conversation = client.conversations_replies(
-                    channel=channel_id, limit=10, ts=thread_ts
-                )["messages"]
-                conversation_context = parse_conversation(conversation[:-1])
+                conversation = get_conversation_cache().get(
+                    client,
+                    channel_id,
+                    thread_ts=thread_ts,
+                    exclude_ts=event.get("ts"),
+                    limit=10,
+                )
+                conversation_context = parse_conversation(conversation)
 
             waiting_message = say(text=DEFAULT_LOADING_TEXT, thread_ts=thread_ts)
             result = get_provider_response(
                 user_id, text, conversation_context, DM_SYSTEM_CONTENT, use_rag=False
             )
 
-            # Extract response components
-            response_text = result.get("response", "")
-            rag_sources = result.get("rag_sources", [])
-            provider = result.get("provider", "")
+            response_text, blocks = _reply(result)
+            get_slack_outbox().send(
+                client,
+                "chat_update",
+                channel=channel_id,
+                ts=waiting_message["ts"],
+                text=response_text,  # Fallback text for notifications
+                blocks=blocks,
+            )
+    except Exception as e:
+        logger.error(e)
+        error_blocks = format_error_message(str(e))
+        if waiting_message:
+            get_slack_outbox().send(
+                client,
+                "chat_update",
+                channel=channel_id,
+                ts=waiting_message["ts"],
+                text=f"{ERROR_PREFIX}\n{e}",  # Fallback text
+                blocks=error_blocks,
+            )
+
+
+async def async_app_messaged_callback(
+    client: "AsyncWebClient", event: dict, logger: Logger, say: "AsyncSay"
+):
+    channel_id = event.get("channel")
+    thread_ts = event.get("thread_ts")
+    user_id = event.get("user")
+    text = event.get("text")
+    waiting_message = None
 
-            # Format with Block Kit based on whether RAG was used
-            if rag_sources and provider.lower() == "anthropic":
-                blocks = format_rag_response(response_text, rag_sources)
-            else:
-                blocks = format_ai_response(response_text, response_type="dm")
+    try:
+        if event.get("channel_type") == "im":
+            conversation_context = ""
 
-            client.chat_update(
+            if thread_ts:  # Retrieves context to continue the conversation in a thread.
+                conversation = await get_conversation_cache().aget(
+                    client,
+                    channel_id,
+                    thread_ts=thread_ts,
+                    exclude_ts=event.get("ts"),
+                    limit=10,
+                )
+                conversation_context = parse_conversation(conversation)
+
+            waiting_message = await say(text=DEFAULT_LOADING_TEXT, thread_ts=thread_ts)
+            result = await aget_provider_response(
+                user_id, text, conversation_context, DM_SYSTEM_CONTENT, use_rag=False
+            )
+
+            response_text, blocks = _reply(result)
+            await client.chat_update(
                 channel=channel_id,
                 ts=waiting_message["ts"],
                 text=response_text,  # Fallback text for notifications
-                blocks=blocks
+                blocks=blocks,
             )
     except Exception as e:
         logger.error(e)
-        error_blocks = format_error_message(str(e))
         if waiting_message:
-            client.chat_update(
+            await client.chat_update(
                 channel=channel_id,
                 ts=waiting_message["ts"],
                 text=f"{ERROR_PREFIX}\n{e}",  # Fallback text
-                blocks=error_blocks
+                blocks=format_error_message(str(e)),
             )
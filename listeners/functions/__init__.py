@@ -1,6 +1,25 @@
+from typing import TYPE_CHECKING
+
 from slack_bolt import App
-from .summary_function import handle_summary_function_callback
+
+from ..listener_utils.request_tracing import traced_async_listener
+from ..listener_utils.work_queue import PRIORITY_SUMMARY, queued_listener
+from .summary_function import (
+    async_handle_summary_function_callback,
+    handle_summary_function_callback,
+)
+
+if TYPE_CHECKING:
+    from slack_bolt.async_app import AsyncApp
 
 
 def register(app: App):
-    app.function("summary_function")(handle_summary_function_callback)
+    app.function("summary_function")(
+        queued_listener(PRIORITY_SUMMARY, handle_summary_function_callback)
+    )
+
+
+def register_async(app: "AsyncApp"):
+    app.function("summary_function")(
+        traced_async_listener(async_handle_summary_function_callback)
+    )
@@ -1,14 +1,26 @@
-from ai.providers import get_provider_response
 from logging import Logger
-from slack_bolt import Complete, Fail, Ack
+from typing import TYPE_CHECKING
+
+from slack_bolt import Ack, BoltContext, Complete, Fail
 from slack_sdk import WebClient
+
+from ai.providers import aget_provider_response, get_provider_response
+
+from ..listener_utils.conversation_cache import get_conversation_cache
 from ..listener_utils.listener_constants import SUMMARIZE_CHANNEL_WORKFLOW
 from ..listener_utils.parse_conversation import parse_conversation
 
+if TYPE_CHECKING:
+    from slack_bolt.async_app import AsyncAck
+    from slack_bolt.context.complete.async_complete import AsyncComplete
+    from slack_bolt.context.fail.async_fail import AsyncFail
+    from slack_sdk.web.async_client import AsyncWebClient
+
 """
 Handles the event to summarize a Slack channel's conversation history.
 It retrieves the conversation history, parses it, generates a summary using an AI response,
 and completes the workflow with the summary or fails if an error occurs.
+`async_handle_summary_function_callback` is the AsyncApp equivalent used by `app_async.py`.
 """
 
 
@@ -19,12 +31,13 @@ def handle_summary_function_callback(
     logger: Logger,
     client: WebClient,
     complete: Complete,
+    context: BoltContext,
 ):
     ack()
     try:
         user_context = inputs["user_context"]
         channel_id = inputs["channel_id"]
-        history = client.conversations_history(channel=channel_id, limit=10)["messages"]
+        history = get_conversation_cache().get(client, channel_id, limit=10)
         conversation = parse_conversation(history)
 
         summary = get_provider_response(
@@ -35,3 +48,28 @@ def handle_summary_function_callback(
     except Exception as e:
         logger.exception(e)
         fail(e)
+
+
+async def async_handle_summary_function_callback(
+    ack: "AsyncAck",
+    inputs: dict,
+    fail: "AsyncFail",
+    logger: Logger,
+    client: "AsyncWebClient",
+    complete: "AsyncComplete",
+):
+    await ack()
+    try:
+        user_context = inputs["user_context"]
+        channel_id = inputs["channel_id"]
+        history = await get_conversation_cache().aget(client, channel_id, limit=10)
+        conversation = parse_conversation(history)
+
+        summary = await aget_provider_response(
+            user_context["id"], SUMMARIZE_CHANNEL_WORKFLOW, conversation, use_rag=False
+        )
+
+        await complete({"user_context": user_context, "response": summary})
+    except Exception as e:
+        logger.exception(e)
+        await fail(e)
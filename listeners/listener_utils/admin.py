@@ -0,0 +1,19 @@
+"""
+Admin Users Module
+
+Operator-only features (such as `/profile`) are limited to the Slack user IDs in
+ADMIN_USER_IDS, a comma-separated list. With it unset, nobody is an admin.
+"""
+
+import os
+
+ADMIN_USER_IDS = frozenset(
+    user_id.strip()
+    for user_id in os.environ.get("ADMIN_USER_IDS", "").split(",")
+    if user_id.strip()
+)
+
+
+def is_admin(user_id: str) -> bool:
+    """Whether the user may use operator-only features."""
+    return user_id in ADMIN_USER_IDS
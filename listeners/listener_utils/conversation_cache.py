@@ -0,0 +1,238 @@
+"""
+Conversation Cache Module
+
+Keeps the most recent messages of channels and threads in memory so listeners can
+build conversation context without a rate-limited `conversations.history` /
+`conversations.replies` round trip on every request:
+- Message events (including edits and deletions) are recorded as they arrive
+- On a miss, the conversation is backfilled once from the Slack API
+- Entries expire after a TTL so messages missed while disconnected cannot linger
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+from slack_sdk import WebClient
+
+from observability import start_span
+from observability.metrics import register_cache
+
+if TYPE_CHECKING:
+    from slack_sdk.web.async_client import AsyncWebClient
+
+logger = logging.getLogger(__name__)
+
+# Number of channels/threads kept, and how long a backfilled conversation is trusted
+CONVERSATION_CACHE_SIZE = int(os.environ.get("CONVERSATION_CACHE_SIZE", "1000"))
+CONVERSATION_CACHE_TTL_SECONDS = float(
+    os.environ.get("CONVERSATION_CACHE_TTL_SECONDS", "600")
+)
+
+# Messages kept per conversation (listeners use the latest 10)
+CONVERSATION_CACHE_MESSAGES = 20
+
+# Message subtypes that describe a change to another message rather than a new one
+_CHANGE_SUBTYPES = {"message_changed", "message_deleted", "message_replied"}
+
+# (channel_id, thread_ts); thread_ts is None for a channel's top-level messages
+ConversationKey = tuple[str, str | None]
+
+
+@dataclass
+class _Conversation:
+    # Messages ordered oldest first
+    messages: list[dict] = field(default_factory=list)
+    fetched_at: float = field(default_factory=time.monotonic)
+
+
+class ConversationCache:
+    """Bounded LRU cache of recent channel and thread messages."""
+
+    def __init__(
+        self,
+        max_size: int = CONVERSATION_CACHE_SIZE,
+        ttl_seconds: float = CONVERSATION_CACHE_TTL_SECONDS,
+    ):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[ConversationKey, _Conversation] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record_event(self, event: dict):
+        """
+        Apply a `message` event to any cached conversation it belongs to.
+
+        Conversations that are not cached yet are left alone; they are backfilled on first use.
+        """
+        channel_id = event.get("channel")
+        subtype = event.get("subtype")
+        if subtype == "message_changed":
+            message = event.get("message", {})
+            for key in _keys_for(channel_id, message):
+                self._replace(key, message)
+        elif subtype == "message_deleted":
+            previous = event.get("previous_message", {})
+            for key in _keys_for(channel_id, previous):
+                self._remove(key, event.get("deleted_ts"))
+        elif subtype not in _CHANGE_SUBTYPES:
+            for key in _keys_for(channel_id, event):
+                self._append(key, event)
+
+    def get(
+        self,
+        client: WebClient,
+        channel_id: str,
+        thread_ts: str | None = None,
+        exclude_ts: str | None = None,
+        limit: int = 10,
+    ) -> list[dict]:
+        """
+        Return the latest messages of a channel or thread, backfilling from Slack on a miss.
+
+        Args:
+            client: Slack client used for the backfill
+            channel_id: Channel (or DM) ID
+            thread_ts: Parent message ts for a thread, None for the channel itself
+            exclude_ts: ts of the message being answered, which is not part of its own context
+            limit: Maximum number of messages to return
+
+        Returns:
+            Up to `limit` messages, oldest first
+        """
+        key = (channel_id, thread_ts)
+        with start_span(
+            "slack.history", channel_id=channel_id, thread=bool(thread_ts)
+        ) as span:
+            messages = self._lookup(key)
+            span.set_attribute("cached", messages is not None)
+            if messages is None:
+                if thread_ts:
+                    response = client.conversations_replies(
+                        channel=channel_id, ts=thread_ts, limit=limit + 1
+                    )
+                else:
+                    response = client.conversations_history(
+                        channel=channel_id, limit=limit + 1
+                    )
+                messages = self._backfill(key, response["messages"])
+            return _select(messages, exclude_ts, limit)
+
+    async def aget(
+        self,
+        client: "AsyncWebClient",
+        channel_id: str,
+        thread_ts: str | None = None,
+        exclude_ts: str | None = None,
+        limit: int = 10,
+    ) -> list[dict]:
+        """Async variant of get() for `AsyncWebClient`."""
+        key = (channel_id, thread_ts)
+        with start_span(
+            "slack.history", channel_id=channel_id, thread=bool(thread_ts)
+        ) as span:
+            messages = self._lookup(key)
+            span.set_attribute("cached", messages is not None)
+            if messages is None:
+                if thread_ts:
+                    response = await client.conversations_replies(
+                        channel=channel_id, ts=thread_ts, limit=limit + 1
+                    )
+                else:
+                    response = await client.conversations_history(
+                        channel=channel_id, limit=limit + 1
+                    )
+                messages = self._backfill(key, response["messages"])
+            return _select(messages, exclude_ts, limit)
+
+    def _lookup(self, key: ConversationKey) -> list[dict] | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if (
+                entry is not None
+                and time.monotonic() - entry.fetched_at < self.ttl_seconds
+            ):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return list(entry.messages)
+            self.misses += 1
+            return None
+
+    def _backfill(self, key: ConversationKey, fetched: list[dict]) -> list[dict]:
+        messages = sorted(fetched, key=lambda message: float(message.get("ts", 0)))
+        with self._lock:
+            self._entries[key] = _Conversation(
+                messages=messages[-CONVERSATION_CACHE_MESSAGES:]
+            )
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        logger.debug(f"Backfilled {len(messages)} messages for {key}")
+        return messages
+
+    def _append(self, key: ConversationKey, message: dict):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or any(
+                m.get("ts") == message.get("ts") for m in entry.messages
+            ):
+                return
+            entry.messages.append(message)
+            entry.messages.sort(key=lambda m: float(m.get("ts", 0)))
+            del entry.messages[:-CONVERSATION_CACHE_MESSAGES]
+
+    def _replace(self, key: ConversationKey, message: dict):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry.messages = [
+                message if m.get("ts") == message.get("ts") else m
+                for m in entry.messages
+            ]
+
+    def _remove(self, key: ConversationKey, ts: str | None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.messages = [m for m in entry.messages if m.get("ts") != ts]
+
+
+def _keys_for(channel_id: str | None, message: dict) -> list[ConversationKey]:
+    """Conversations a message appears in: its thread, the channel, or both for broadcasts."""
+    if not channel_id or not message.get("ts"):
+        return []
+    thread_ts = message.get("thread_ts")
+    if not thread_ts:
+        return [(channel_id, None)]
+    keys = [(channel_id, thread_ts)]
+    if thread_ts == message["ts"] or message.get("subtype") == "thread_broadcast":
+        keys.append((channel_id, None))
+    return keys
+
+
+def _select(messages: list[dict], exclude_ts: str | None, limit: int) -> list[dict]:
+    selected = [m for m in messages if m.get("ts") != exclude_ts]
+    return selected[-limit:]
+
+
+_conversation_cache: ConversationCache | None = None
+_conversation_cache_lock = threading.Lock()
+
+
+def get_conversation_cache() -> ConversationCache:
+    """Get or create the global conversation cache."""
+    global _conversation_cache
+    with _conversation_cache_lock:
+        if _conversation_cache is None:
+            _conversation_cache = ConversationCache()
+        return _conversation_cache
+
+
+register_cache("conversation", lambda: _conversation_cache)
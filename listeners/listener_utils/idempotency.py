@@ -0,0 +1,179 @@
+"""
+Idempotency Store Module
+
+Slack redelivers events it considers unacknowledged (`x-slack-retry-num` /
+`retry_attempt`), which would otherwise run a second full LLM generation for the
+same message. Each delivery is claimed under a key derived from the event; only
+the first claim within the TTL succeeds.
+
+Backends:
+- InMemoryIdempotencyStore: per process (default)
+- SqliteIdempotencyStore: shared by every process on the host (IDEMPOTENCY_BACKEND=sqlite)
+- SharedStateIdempotencyStore: shared by every replica through SHARED_STATE_URL (IDEMPOTENCY_BACKEND=shared)
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from observability.metrics import register_callback
+from shared_state import SharedState, get_shared_state
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_BACKEND = os.environ.get("IDEMPOTENCY_BACKEND", "memory")
+IDEMPOTENCY_DB_PATH = os.environ.get(
+    "IDEMPOTENCY_DB_PATH", "./data/idempotency.sqlite3"
+)
+
+# Slack retries up to three times over about five minutes
+IDEMPOTENCY_TTL_SECONDS = float(os.environ.get("IDEMPOTENCY_TTL_SECONDS", "900"))
+IDEMPOTENCY_MAX_KEYS = 50000
+
+
+def event_idempotency_key(body: dict) -> str | None:
+    """
+    Build the idempotency key for an Events API payload.
+
+    The event type is part of the key because one user message produces both a
+    `message` and an `app_mention` event with the same `client_msg_id`.
+
+    Returns:
+        The key, or None for payloads that are not events
+    """
+    event = body.get("event")
+    if body.get("type") != "event_callback" or not isinstance(event, dict):
+        return None
+    delivery_id = event.get("client_msg_id") or body.get("event_id")
+    if not delivery_id:
+        return None
+    return f"{event.get('type')}:{event.get('subtype') or ''}:{delivery_id}"
+
+
+class IdempotencyStore:
+    def __init__(self):
+        self.duplicates = 0
+        self._duplicates_lock = threading.Lock()
+
+    def claim(self, key: str) -> bool:
+        """Return True the first time a key is seen within the TTL, False for duplicates."""
+        if self._claim(key):
+            return True
+        with self._duplicates_lock:
+            self.duplicates += 1
+        return False
+
+    def _claim(self, key: str) -> bool:
+        raise NotImplementedError()
+
+
+class InMemoryIdempotencyStore(IdempotencyStore):
+    def __init__(
+        self,
+        ttl_seconds: float = IDEMPOTENCY_TTL_SECONDS,
+        max_keys: int = IDEMPOTENCY_MAX_KEYS,
+    ):
+        super().__init__()
+        self.ttl_seconds = ttl_seconds
+        self.max_keys = max_keys
+        # key -> expiry; insertion order is expiry order because the TTL is fixed
+        self._keys: OrderedDict[str, float] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _claim(self, key: str) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            while self._keys and (
+                next(iter(self._keys.values())) <= now
+                or len(self._keys) >= self.max_keys
+            ):
+                self._keys.popitem(last=False)
+            if key in self._keys:
+                return False
+            self._keys[key] = now + self.ttl_seconds
+            return True
+
+
+class SqliteIdempotencyStore(IdempotencyStore):
+    def __init__(
+        self,
+        path: str = IDEMPOTENCY_DB_PATH,
+        ttl_seconds: float = IDEMPOTENCY_TTL_SECONDS,
+    ):
+        super().__init__()
+        self.ttl_seconds = ttl_seconds
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(
+            path, timeout=5, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS idempotency_keys (key TEXT PRIMARY KEY, expires_at REAL NOT NULL)"
+        )
+        self._lock = threading.Lock()
+        self._claims = 0
+
+    def _claim(self, key: str) -> bool:
+        # Wall-clock time: expiries are compared across processes
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO idempotency_keys (key, expires_at) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET expires_at = excluded.expires_at "
+                "WHERE idempotency_keys.expires_at <= ?",
+                (key, now + self.ttl_seconds, now),
+            )
+            self._claims += 1
+            if self._claims % 1000 == 0:
+                self._conn.execute(
+                    "DELETE FROM idempotency_keys WHERE expires_at <= ?", (now,)
+                )
+            return cursor.rowcount == 1
+
+
+class SharedStateIdempotencyStore(IdempotencyStore):
+    def __init__(
+        self,
+        state: SharedState | None = None,
+        ttl_seconds: float = IDEMPOTENCY_TTL_SECONDS,
+    ):
+        super().__init__()
+        self.state = state or get_shared_state()
+        self.ttl_seconds = ttl_seconds
+
+    def _claim(self, key: str) -> bool:
+        # SET NX PX: one round trip, and the backend expires the key
+        return self.state.set(
+            f"idempotency:{key}", "1", ttl_seconds=self.ttl_seconds, only_if_absent=True
+        )
+
+
+_store: IdempotencyStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_idempotency_store() -> IdempotencyStore:
+    """Get or create the global idempotency store selected by IDEMPOTENCY_BACKEND."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            if IDEMPOTENCY_BACKEND == "shared":
+                _store = SharedStateIdempotencyStore()
+            elif IDEMPOTENCY_BACKEND == "sqlite":
+                _store = SqliteIdempotencyStore()
+            else:
+                _store = InMemoryIdempotencyStore()
+        return _store
+
+
+register_callback(
+    "slack_duplicate_events_total",
+    "Redelivered events dropped before reaching a listener",
+    lambda: _store.duplicates if _store is not None else 0,
+    kind="counter",
+)
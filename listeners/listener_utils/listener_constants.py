@@ -15,4 +15,9 @@ Don't use user IDs or names in your response.
 # Loading messages with emojis
 DEFAULT_LOADING_TEXT = ":thought_balloon: Thinking..."
 RAG_LOADING_TEXT = ":books: Searching knowledge base..."
+RAG_SUMMARY_LOADING_TEXT = ":thought_balloon: Found matching articles, summarizing..."
 ERROR_PREFIX = ":warning: Oops! Something went wrong"
+
+# Work queue notices (see `work_queue.py`)
+WORK_QUEUED_TEXT = ":hourglass_flowing_sand: I'm busy right now, you're number {position} in line. I'll reply as soon as I can."
+WORK_QUEUE_FULL_TEXT = ":hourglass: I'm handling too many requests right now. Please try again in a few minutes."
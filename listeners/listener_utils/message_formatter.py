@@ -8,8 +8,8 @@ This module provides functions to format AI responses using Block Kit with:
 - Short, succinct responses with follow-up questions
 """
 
-from typing import List, Dict, Optional, Any
 import logging
+from typing import Any
 
 logger = logging.getLogger(__name__)
 
@@ -18,7 +18,9 @@ MAX_BLOCKS_PER_MESSAGE = 50
 MAX_TEXT_LENGTH_PER_BLOCK = 3000
 
 
-def limit_blocks(blocks: List[Dict[str, Any]], max_blocks: int = MAX_BLOCKS_PER_MESSAGE) -> List[Dict[str, Any]]:
+def limit_blocks(
+    blocks: list[dict[str, Any]], max_blocks: int = MAX_BLOCKS_PER_MESSAGE
+) -> list[dict[str, Any]]:
     """
     Limit the number of blocks to Slack's maximum.
 
@@ -35,16 +37,18 @@ def limit_blocks(blocks: List[Dict[str, Any]], max_blocks: int = MAX_BLOCKS_PER_
     logger.warning(f"Truncating {len(blocks)} blocks to {max_blocks} (Slack limit)")
 
     # Keep header and first blocks, add truncation notice
-    truncated = blocks[:max_blocks - 1]
-    truncated.append({
-        "type": "context",
-        "elements": [
-            {
-                "type": "mrkdwn",
-                "text": ":warning: _Response truncated due to length. Ask for specific details if needed._"
-            }
-        ]
-    })
+    truncated = blocks[: max_blocks - 1]
+    truncated.append(
+        {
+            "type": "context",
+            "elements": [
+                {
+                    "type": "mrkdwn",
+                    "text": ":warning: _Response truncated due to length. Ask for specific details if needed._",
+                }
+            ],
+        }
+    )
 
     return truncated
 
@@ -66,20 +70,20 @@ def shorten_response(text: str, max_length: int = 2500) -> tuple[str, bool]:
         return text, False
 
     # Find a good breaking point (end of sentence)
-    break_point = text.rfind('. ', 0, max_length)
+    break_point = text.rfind(". ", 0, max_length)
     if break_point == -1:
-        break_point = text.rfind('\n', 0, max_length)
+        break_point = text.rfind("\n", 0, max_length)
     if break_point == -1:
-        break_point = text.rfind(' ', 0, max_length)
+        break_point = text.rfind(" ", 0, max_length)
 
     if break_point == -1:
         break_point = max_length
 
-    shortened = text[:break_point + 1].strip()
+    shortened = text[: break_point + 1].strip()
     return shortened, True
 
 
-def format_rag_sources(sources: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+def format_rag_sources(sources: list[dict[str, str]]) -> list[dict[str, Any]]:
     """
     Format RAG source citations as Block Kit blocks with clickable buttons.
 
@@ -95,31 +99,30 @@ def format_rag_sources(sources: List[Dict[str, str]]) -> List[Dict[str, Any]]:
     blocks = [{"type": "divider"}]
 
     # Header for referenced articles
-    blocks.append({
-        "type": "context",
-        "elements": [
-            {
-                "type": "mrkdwn",
-                "text": ":page_facing_up: *Referenced Knowledge Base Articles*"
-            }
-        ]
-    })
+    blocks.append(
+        {
+            "type": "context",
+            "elements": [
+                {
+                    "type": "mrkdwn",
+                    "text": ":page_facing_up: *Referenced Knowledge Base Articles*",
+                }
+            ],
+        }
+    )
 
     # Add each source with a clickable button
     for source in sources:
-        filename = source.get('filename', 'Unknown')
-        url = source.get('url', '')
+        filename = source.get("filename", "Unknown")
+        url = source.get("url", "")
 
         # Clean up filename - remove number prefix and extension
-        clean_name = filename.replace('.md', '').replace('209731_', '')
+        clean_name = filename.replace(".md", "").replace("209731_", "")
 
         # Create section with article name and button
         section_block = {
             "type": "section",
-            "text": {
-                "type": "mrkdwn",
-                "text": f"• *{clean_name}*"
-            }
+            "text": {"type": "mrkdwn", "text": f"• *{clean_name}*"},
         }
 
         # Add button if URL is available
@@ -129,10 +132,10 @@ def format_rag_sources(sources: List[Dict[str, str]]) -> List[Dict[str, Any]]:
                 "text": {
                     "type": "plain_text",
                     "text": "📄 View Article",
-                    "emoji": True
+                    "emoji": True,
                 },
                 "url": url,
-                "style": "primary"
+                "style": "primary",
             }
 
         blocks.append(section_block)
@@ -142,9 +145,9 @@ def format_rag_sources(sources: List[Dict[str, str]]) -> List[Dict[str, Any]]:
 
 def format_rag_response(
     response_text: str,
-    sources: Optional[List[Dict[str, str]]] = None,
-    include_followup: bool = False
-) -> List[Dict[str, Any]]:
+    sources: list[dict[str, str]] | None = None,
+    include_followup: bool = False,
+) -> list[dict[str, Any]]:
     """
     Format an AI response that used RAG context with citations.
 
@@ -159,14 +162,16 @@ def format_rag_response(
     blocks = []
 
     # Header for incident resolution
-    blocks.append({
-        "type": "header",
-        "text": {
-            "type": "plain_text",
-            "text": ":books: Knowledge Base Resolution",
-            "emoji": True
+    blocks.append(
+        {
+            "type": "header",
+            "text": {
+                "type": "plain_text",
+                "text": ":books: Knowledge Base Resolution",
+                "emoji": True,
+            },
         }
-    })
+    )
 
     # Check if response needs shortening (using higher limit for technical content)
     shortened_text, was_shortened = shorten_response(response_text, max_length=2500)
@@ -174,36 +179,30 @@ def format_rag_response(
     # Main response with mrkdwn for formatting
     # Split into chunks if needed (Slack has 3000 char limit per text block)
     if len(shortened_text) <= 2500:
-        blocks.append({
-            "type": "section",
-            "text": {
-                "type": "mrkdwn",
-                "text": shortened_text
-            }
-        })
+        blocks.append(
+            {"type": "section", "text": {"type": "mrkdwn", "text": shortened_text}}
+        )
     else:
         # Split into multiple section blocks
         chunks = _split_into_chunks(shortened_text, 2500)
         for chunk in chunks:
-            blocks.append({
-                "type": "section",
-                "text": {
-                    "type": "mrkdwn",
-                    "text": chunk
-                }
-            })
+            blocks.append(
+                {"type": "section", "text": {"type": "mrkdwn", "text": chunk}}
+            )
 
     # Add follow-up encouragement only if shortened
     if was_shortened:
-        blocks.append({
-            "type": "context",
-            "elements": [
-                {
-                    "type": "mrkdwn",
-                    "text": "_Response was shortened. Ask for more details if needed!_ :mag:"
-                }
-            ]
-        })
+        blocks.append(
+            {
+                "type": "context",
+                "elements": [
+                    {
+                        "type": "mrkdwn",
+                        "text": "_Response was shortened. Ask for more details if needed!_ :mag:",
+                    }
+                ],
+            }
+        )
 
     # Add sources if available
     if sources:
@@ -212,7 +211,7 @@ def format_rag_response(
     return limit_blocks(blocks)
 
 
-def _split_into_chunks(text: str, max_chunk_size: int = 3000) -> List[str]:
+def _split_into_chunks(text: str, max_chunk_size: int = 3000) -> list[str]:
     """
     Split text into chunks that fit within Slack's block text limits.
 
@@ -235,16 +234,16 @@ def _split_into_chunks(text: str, max_chunk_size: int = 3000) -> List[str]:
 
         if end_pos < len(text):
             # Try to break at paragraph
-            break_point = text.rfind('\n\n', current_pos, end_pos)
+            break_point = text.rfind("\n\n", current_pos, end_pos)
             if break_point == -1 or break_point <= current_pos:
                 # Try to break at newline
-                break_point = text.rfind('\n', current_pos, end_pos)
+                break_point = text.rfind("\n", current_pos, end_pos)
             if break_point == -1 or break_point <= current_pos:
                 # Try to break at sentence
-                break_point = text.rfind('. ', current_pos, end_pos)
+                break_point = text.rfind(". ", current_pos, end_pos)
             if break_point == -1 or break_point <= current_pos:
                 # Break at word boundary
-                break_point = text.rfind(' ', current_pos, end_pos)
+                break_point = text.rfind(" ", current_pos, end_pos)
             if break_point == -1 or break_point <= current_pos:
                 # Last resort: hard break
                 break_point = end_pos
@@ -260,10 +259,8 @@ def _split_into_chunks(text: str, max_chunk_size: int = 3000) -> List[str]:
 
 
 def format_ai_response(
-    response_text: str,
-    response_type: str = "general",
-    include_emoji: bool = True
-) -> List[Dict[str, Any]]:
+    response_text: str, response_type: str = "general", include_emoji: bool = True
+) -> list[dict[str, Any]]:
     """
     Format a general AI response using Block Kit.
 
@@ -282,40 +279,36 @@ def format_ai_response(
 
     # Main response - split into chunks if needed
     if len(shortened_text) <= 2500:
-        blocks.append({
-            "type": "section",
-            "text": {
-                "type": "mrkdwn",
-                "text": shortened_text
-            }
-        })
+        blocks.append(
+            {"type": "section", "text": {"type": "mrkdwn", "text": shortened_text}}
+        )
     else:
         chunks = _split_into_chunks(shortened_text, 2500)
         for chunk in chunks:
-            blocks.append({
-                "type": "section",
-                "text": {
-                    "type": "mrkdwn",
-                    "text": chunk
-                }
-            })
+            blocks.append(
+                {"type": "section", "text": {"type": "mrkdwn", "text": chunk}}
+            )
 
     # Encourage follow-up if shortened
     if was_shortened:
-        blocks.append({
-            "type": "context",
-            "elements": [
-                {
-                    "type": "mrkdwn",
-                    "text": "_Response shortened. Ask for more details!_ :mag:"
-                }
-            ]
-        })
+        blocks.append(
+            {
+                "type": "context",
+                "elements": [
+                    {
+                        "type": "mrkdwn",
+                        "text": "_Response shortened. Ask for more details!_ :mag:",
+                    }
+                ],
+            }
+        )
 
     return limit_blocks(blocks)
 
 
-def format_error_message(error_text: str, error_type: str = "general") -> List[Dict[str, Any]]:
+def format_error_message(
+    error_text: str, error_type: str = "general"
+) -> list[dict[str, Any]]:
     """
     Format an error message with professional styling.
 
@@ -332,32 +325,25 @@ def format_error_message(error_text: str, error_type: str = "general") -> List[D
             "text": {
                 "type": "plain_text",
                 "text": ":warning: Oops! Something went wrong",
-                "emoji": True
-            }
-        },
-        {
-            "type": "section",
-            "text": {
-                "type": "mrkdwn",
-                "text": f"```{error_text}```"
-            }
+                "emoji": True,
+            },
         },
+        {"type": "section", "text": {"type": "mrkdwn", "text": f"```{error_text}```"}},
         {
             "type": "context",
             "elements": [
                 {
                     "type": "mrkdwn",
-                    "text": "_Try again or rephrase your question!_ :arrows_counterclockwise:"
+                    "text": "_Try again or rephrase your question!_ :arrows_counterclockwise:",
                 }
-            ]
-        }
+            ],
+        },
     ]
 
 
 def format_code_response(
-    response_text: str,
-    include_emoji: bool = True
-) -> List[Dict[str, Any]]:
+    response_text: str, include_emoji: bool = True
+) -> list[dict[str, Any]]:
     """
     Format a code analysis response using Block Kit.
 
@@ -372,53 +358,45 @@ def format_code_response(
 
     # Header for code analysis
     header_text = ":computer: Code Analysis" if include_emoji else "Code Analysis"
-    blocks.append({
-        "type": "header",
-        "text": {
-            "type": "plain_text",
-            "text": header_text,
-            "emoji": True
+    blocks.append(
+        {
+            "type": "header",
+            "text": {"type": "plain_text", "text": header_text, "emoji": True},
         }
-    })
+    )
 
     # Check if response needs shortening
     shortened_text, was_shortened = shorten_response(response_text, max_length=2500)
 
     # Main response - split into chunks if needed
     if len(shortened_text) <= 2500:
-        blocks.append({
-            "type": "section",
-            "text": {
-                "type": "mrkdwn",
-                "text": shortened_text
-            }
-        })
+        blocks.append(
+            {"type": "section", "text": {"type": "mrkdwn", "text": shortened_text}}
+        )
     else:
         chunks = _split_into_chunks(shortened_text, 2500)
         for chunk in chunks:
-            blocks.append({
-                "type": "section",
-                "text": {
-                    "type": "mrkdwn",
-                    "text": chunk
-                }
-            })
+            blocks.append(
+                {"type": "section", "text": {"type": "mrkdwn", "text": chunk}}
+            )
 
     # Add context footer for code analysis
-    blocks.append({
-        "type": "context",
-        "elements": [
-            {
-                "type": "mrkdwn",
-                "text": ":information_source: _Analyzed using MCP tools_"
-            }
-        ]
-    })
+    blocks.append(
+        {
+            "type": "context",
+            "elements": [
+                {
+                    "type": "mrkdwn",
+                    "text": ":information_source: _Analyzed using MCP tools_",
+                }
+            ],
+        }
+    )
 
     return limit_blocks(blocks)
 
 
-def format_simple_message(text: str, emoji: Optional[str] = None) -> List[Dict[str, Any]]:
+def format_simple_message(text: str, emoji: str | None = None) -> list[dict[str, Any]]:
     """
     Format a simple text message with optional emoji.
 
@@ -431,12 +409,62 @@ def format_simple_message(text: str, emoji: Optional[str] = None) -> List[Dict[s
     """
     formatted_text = f"{emoji} {text}" if emoji else text
 
-    return [
-        {
-            "type": "section",
-            "text": {
-                "type": "mrkdwn",
-                "text": formatted_text
+    return [{"type": "section", "text": {"type": "mrkdwn", "text": formatted_text}}]
+
+
+def format_prompt_quote(prompt: str) -> dict[str, Any]:
+    """
+    Quote the user's prompt at the top of a command reply.
+
+    Args:
+        prompt: The text the user sent with the command
+
+    Returns:
+        A rich text Block Kit block
+    """
+    return {
+        "type": "rich_text",
+        "elements": [
+            {
+                "type": "rich_text_quote",
+                "elements": [{"type": "text", "text": prompt}],
             }
-        }
+        ],
+    }
+
+
+def format_loading_message(prompt: str, loading_text: str) -> list[dict[str, Any]]:
+    """
+    Format the placeholder a command posts while its response is generated.
+
+    Args:
+        prompt: The text the user sent with the command
+        loading_text: Progress text shown under the quoted prompt
+
+    Returns:
+        List of Block Kit blocks
+    """
+    return [
+        format_prompt_quote(prompt),
+        {"type": "section", "text": {"type": "mrkdwn", "text": loading_text}},
     ]
+
+
+def format_fallback_text(
+    prompt: str, response_text: str, max_length: int = 3000
+) -> str:
+    """
+    Build the notification text of a command reply, truncated to max_length characters.
+
+    Args:
+        prompt: The text the user sent with the command
+        response_text: The AI-generated response
+        max_length: Maximum length of the text
+
+    Returns:
+        "Q: <prompt>\nA: <response>", truncated with an ellipsis if needed
+    """
+    fallback_text = f"Q: {prompt}\nA: {response_text}"
+    if len(fallback_text) > max_length:
+        fallback_text = fallback_text[: max_length - 3] + "..."
+    return fallback_text
@@ -1,8 +1,7 @@
-from typing import Optional, List
-from slack_sdk.web.slack_response import SlackResponse
 import logging
 
-logging.basicConfig(level=logging.ERROR)
+from slack_sdk.web.slack_response import SlackResponse
+
 logger = logging.getLogger(__name__)
 
 """
@@ -12,7 +11,7 @@ Used in `app_mentioned_callback`, `dm_sent_callback`,
 and `handle_summary_function_callback`."""
 
 
-def parse_conversation(conversation: SlackResponse) -> Optional[List[dict]]:
+def parse_conversation(conversation: SlackResponse) -> list[dict] | None:
     parsed = []
     try:
         for message in conversation:
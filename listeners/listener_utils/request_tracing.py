@@ -0,0 +1,125 @@
+"""
+Request Tracing Module
+
+Every listener invocation is the root span of a trace, named after what Slack sent:
+`slack.command /incident`, `slack.event app_mention`, `slack.function summary_function`.
+Sync listeners are traced by `queued_listener()`; AsyncApp listeners are wrapped
+with `traced_async_listener()`. Both also record the request count and latency metrics,
+journal the request when JOURNAL_PATH is set (see `observability.journal`), and attribute
+the token usage of the work to the command or event (see `observability.usage`).
+"""
+
+import functools
+import time
+from collections.abc import Callable
+
+from observability import Span, start_span
+from observability.journal import begin_request, end_request, use_request
+from observability.metrics import counter, histogram
+from observability.usage import use_usage_attribution
+
+REQUESTS = counter(
+    "slack_requests_total",
+    "Listener invocations by outcome",
+    ("kind", "name", "status"),
+)
+REQUEST_SECONDS = histogram(
+    "slack_request_duration_seconds",
+    "Listener latency from dispatch until its work finished",
+    ("kind", "name"),
+)
+
+
+def request_kind(kwargs: dict[str, object], callback: Callable) -> tuple[str, str]:
+    """Return (kind, name) of a listener invocation, e.g. ("command", "/incident")."""
+    command = kwargs.get("command")
+    if isinstance(command, dict) and command.get("command"):
+        return "command", command["command"]
+    event = kwargs.get("event")
+    if isinstance(event, dict) and event.get("type"):
+        if event["type"] == "function_executed":
+            return "function", event.get("function", {}).get(
+                "callback_id", callback.__name__
+            )
+        return "event", event["type"]
+    return "listener", callback.__name__
+
+
+def request_span_name(kwargs: dict[str, object], callback: Callable) -> str:
+    kind, name = request_kind(kwargs, callback)
+    return f"slack.{kind} {name}"
+
+
+def record_request(
+    kind: tuple[str, str],
+    started_at: float,
+    error: BaseException | None = None,
+    journal_id: str | None = None,
+):
+    """Record one finished listener invocation; `started_at` is a `time.monotonic()` value."""
+    duration = time.monotonic() - started_at
+    REQUESTS.labels(
+        kind=kind[0], name=kind[1], status="error" if error is not None else "ok"
+    ).inc()
+    REQUEST_SECONDS.labels(kind=kind[0], name=kind[1]).observe(duration)
+    end_request(journal_id, duration, error)
+
+
+def journal_request(kwargs: dict[str, object], kind: tuple[str, str]) -> str | None:
+    """Journal what Slack sent to a listener; returns the journal ID (None when not recorded)."""
+    context = kwargs.get("context") or {}
+    payload = {
+        key: context.get(key)
+        for key in ("user_id", "channel_id", "team_id")
+        if context.get(key)
+    }
+    for key in ("command", "event", "inputs"):
+        if isinstance(kwargs.get(key), dict):
+            payload[key] = kwargs[key]
+    return begin_request(kind[0], kind[1], payload)
+
+
+def start_request_span(kwargs: dict[str, object], callback: Callable) -> Span:
+    """Start the root span for one listener invocation."""
+    context = kwargs.get("context") or {}
+    return start_span(
+        request_span_name(kwargs, callback),
+        parent=None,
+        listener=callback.__name__,
+        user_id=context.get("user_id") or "",
+        channel_id=context.get("channel_id") or "",
+    )
+
+
+def traced_async_listener(callback: Callable) -> Callable:
+    """Wrap an AsyncApp listener so each invocation (and its `ack`) is traced."""
+
+    @functools.wraps(callback)
+    async def listener(**kwargs):
+        started_at = time.monotonic()
+        kind = request_kind(kwargs, callback)
+        journal_id = journal_request(kwargs, kind)
+        try:
+            with (
+                start_request_span(kwargs, callback),
+                use_request(journal_id),
+                use_usage_attribution(command=kind[1]),
+            ):
+                if "ack" in kwargs:
+                    kwargs["ack"] = _traced_async_ack(kwargs["ack"])
+                result = await callback(**kwargs)
+        except Exception as e:
+            record_request(kind, started_at, e, journal_id)
+            raise
+        record_request(kind, started_at, journal_id=journal_id)
+        return result
+
+    return listener
+
+
+def _traced_async_ack(ack: Callable) -> Callable:
+    async def traced_ack(*args, **kwargs):
+        with start_span("slack.ack"):
+            return await ack(*args, **kwargs)
+
+    return traced_ack
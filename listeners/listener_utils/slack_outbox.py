@@ -0,0 +1,353 @@
+"""
+Slack Outbox Module
+
+Sends Slack Web API calls from background threads so listeners do not block on
+Slack I/O they do not need the result of:
+- Per-method rate limits that follow Slack's tiers (chat.postMessage is limited per channel)
+- Pending `chat.update`s for the same message are coalesced into the latest one
+- `ratelimited` responses are retried after the server's Retry-After delay
+- Calls with the same method and channel are sent in order; a lane waiting for rate-limit
+  capacity or a Retry-After delay is set aside instead of blocking a sender thread
+- Each call is traced as a `slack.<method>` span under the span that queued it
+- Call latency (queued until resolved), pending calls, coalesced updates and retries are exported as metrics
+
+Every call returns a future; use `.result()` only when the response is needed (e.g. the ts of a new message).
+"""
+
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+
+from slack_sdk import WebClient
+from slack_sdk.errors import SlackApiError
+
+from ai.providers.rate_limiter import TokenBucket
+from observability import Span, current_span, start_span
+from observability.metrics import histogram, register_callback
+
+logger = logging.getLogger(__name__)
+
+# Requests per minute per method and workspace (https://api.slack.com/apis/rate-limits)
+METHOD_REQUESTS_PER_MINUTE = {
+    "chat.postMessage": 60,  # Special tier: about one message per second per channel
+    "chat.update": 50,  # Tier 3
+    "chat.delete": 50,  # Tier 3
+    "chat.postEphemeral": 100,  # Tier 4
+    "views.publish": 100,  # Tier 4
+    "conversations.history": 50,  # Tier 3
+    "conversations.replies": 50,  # Tier 3
+}
+DEFAULT_REQUESTS_PER_MINUTE = 20  # Tier 2
+
+# Methods whose limit applies per channel rather than per workspace
+PER_CHANNEL_METHODS = {"chat.postMessage"}
+
+# Short bursts above the steady rate are tolerated by Slack
+BURST_SECONDS = 6
+
+OUTBOX_WORKERS = int(os.environ.get("SLACK_OUTBOX_WORKERS", "4"))
+OUTBOX_MAX_RETRIES = int(os.environ.get("SLACK_OUTBOX_MAX_RETRIES", "3"))
+DEFAULT_RETRY_AFTER_SECONDS = 1.0
+
+SLACK_API_SECONDS = histogram(
+    "slack_api_call_duration_seconds",
+    "Outbox Web API calls from queued to resolved, including rate-limit waits",
+    ("method", "status"),
+)
+
+
+@dataclass
+class _Call:
+    client: WebClient
+    method: str
+    kwargs: dict
+    futures: list[Future] = field(default_factory=list)
+    # Span that queued the call, and when; each send attempt is traced as its child
+    parent_span: Span | None = field(default_factory=current_span)
+    queued_at: float = field(default_factory=time.monotonic)
+    attempts: int = 0
+    # Rate-limit capacity for the next attempt has been reserved
+    reserved: bool = False
+
+
+class _Lane:
+    """Calls with the same method and channel, sent one at a time in order."""
+
+    def __init__(self, key: tuple[str, str]):
+        self.key = key
+        self.calls: deque[_Call] = deque()
+        # monotonic time before which the next call must not be sent
+        self.not_before = 0.0
+        # A call from this lane is being sent
+        self.busy = False
+        # The lane is in the ready heap
+        self.scheduled = False
+
+
+def _api_method(method: str) -> str:
+    """Convert a WebClient method name (`chat_postMessage`) to its API name (`chat.postMessage`)."""
+    return method.replace("_", ".", 1)
+
+
+def _get_retry_after(error: SlackApiError) -> float | None:
+    if error.response.status_code != 429:
+        return None
+    for name, value in (error.response.headers or {}).items():
+        if name.lower() == "retry-after":
+            try:
+                return float(value[0] if isinstance(value, list) else value)
+            except (TypeError, ValueError):
+                break
+    return DEFAULT_RETRY_AFTER_SECONDS
+
+
+class SlackOutbox:
+    """
+    Background, rate-limit-aware sender for Slack Web API calls.
+
+    Calls are queued in lanes keyed by (method, channel). A lane that is out of rate-limit
+    capacity, or was told to retry later, is given a "send not before" time and set aside,
+    so sender threads only ever block on a Web API request and a burst of rate-limited
+    updates in one channel does not hold up other channels or methods.
+    """
+
+    def __init__(self, workers: int = OUTBOX_WORKERS):
+        self._buckets: dict[tuple[str, ...], TokenBucket] = {}
+        # (channel, ts) -> chat.update call that has not been sent yet
+        self._pending_updates: dict[tuple[str, str], _Call] = {}
+        self._lock = threading.Lock()
+        # (method, channel) -> lane with queued calls or a call being sent
+        self._lanes: dict[tuple[str, str], _Lane] = {}
+        # (not before, sequence, lane) for lanes with a call that can be sent
+        self._ready: list[tuple[float, int, _Lane]] = []
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+        self.coalesced = 0
+        self.retried = 0
+        self._threads = [
+            threading.Thread(target=self._run, name=f"slack-outbox-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def send(self, client: WebClient, method: str, **kwargs) -> Future:
+        """
+        Queue a Web API call.
+
+        Args:
+            client: The listener's WebClient (its token selects the workspace)
+            method: WebClient method name, e.g. "chat_update"
+            **kwargs: Arguments for the method
+
+        Returns:
+            Future resolving to the SlackResponse
+        """
+        future = Future()
+        future.add_done_callback(_log_failure)
+        channel = kwargs.get("channel") or ""
+
+        if method == "chat_update":
+            key = (channel, kwargs.get("ts"))
+            with self._lock:
+                pending = self._pending_updates.get(key)
+                if pending is not None:
+                    # Not sent yet: send the latest content once and resolve every caller with it
+                    pending.kwargs = kwargs
+                    pending.futures.append(future)
+                    self.coalesced += 1
+                    return future
+                call = _Call(client, method, kwargs, [future])
+                self._pending_updates[key] = call
+        else:
+            call = _Call(client, method, kwargs, [future])
+
+        with self._cond:
+            lane = self._lanes.get((method, channel))
+            if lane is None:
+                lane = self._lanes[(method, channel)] = _Lane((method, channel))
+            lane.calls.append(call)
+            self._schedule(lane)
+        return future
+
+    def _schedule(self, lane: _Lane):
+        """Put a lane with calls that is not being sent in the ready heap (holding `_cond`)."""
+        if lane.busy or lane.scheduled or not lane.calls:
+            return
+        lane.scheduled = True
+        heapq.heappush(self._ready, (lane.not_before, next(self._sequence), lane))
+        self._cond.notify()
+
+    def _next_call(self) -> tuple[_Lane, _Call]:
+        """Wait for a lane whose "not before" time has passed and take its first call (holding `_cond`)."""
+        while True:
+            if self._ready:
+                not_before = self._ready[0][0]
+                now = time.monotonic()
+                if not_before <= now:
+                    _, _, lane = heapq.heappop(self._ready)
+                    lane.scheduled = False
+                    call = lane.calls[0]
+                    if not call.reserved:
+                        call.reserved = True
+                        bucket = self._bucket(
+                            call.client, _api_method(call.method), lane.key[1]
+                        )
+                        wait = bucket.reserve(1, float("inf"))
+                        if wait > 0:
+                            lane.not_before = now + wait
+                            self._schedule(lane)
+                            continue
+                    lane.calls.popleft()
+                    lane.busy = True
+                    return lane, call
+                self._cond.wait(not_before - now)
+            else:
+                self._cond.wait()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                lane, call = self._next_call()
+            retry_after = self._send(call)
+            with self._cond:
+                lane.busy = False
+                if retry_after is not None:
+                    # Retried before any later call of the lane, so the lane stays in order
+                    call.reserved = False
+                    lane.calls.appendleft(call)
+                    lane.not_before = time.monotonic() + retry_after
+                if lane.calls:
+                    self._schedule(lane)
+                else:
+                    del self._lanes[lane.key]
+
+    def _bucket(self, client: WebClient, api_method: str, channel: str) -> TokenBucket:
+        key = (client.token or "", api_method)
+        if api_method in PER_CHANNEL_METHODS:
+            key += (channel,)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                per_minute = METHOD_REQUESTS_PER_MINUTE.get(
+                    api_method, DEFAULT_REQUESTS_PER_MINUTE
+                )
+                bucket = TokenBucket(
+                    max(1.0, per_minute * BURST_SECONDS / 60), per_minute / 60.0
+                )
+                self._buckets[key] = bucket
+            return bucket
+
+    def pending(self) -> int:
+        """Number of calls queued and not yet being sent."""
+        with self._cond:
+            return sum(len(lane.calls) for lane in self._lanes.values())
+
+    def _send(self, call: _Call) -> float | None:
+        """
+        Make one attempt at a call.
+
+        Returns:
+            Seconds to wait before retrying, or None once the call's futures are resolved
+        """
+        api_method = _api_method(call.method)
+        channel = call.kwargs.get("channel") or ""
+        if call.method == "chat_update" and call.attempts == 0:
+            # Stop coalescing: later updates for this message become a new call
+            with self._lock:
+                self._pending_updates.pop((channel, call.kwargs.get("ts")), None)
+        call.attempts += 1
+        status = None
+        with start_span(
+            f"slack.{api_method}",
+            parent=call.parent_span,
+            channel_id=channel,
+            queued_ms=round((time.monotonic() - call.queued_at) * 1000, 1),
+            attempt=call.attempts,
+            coalesced=len(call.futures),
+        ) as span:
+            try:
+                response = getattr(call.client, call.method)(**call.kwargs)
+            except SlackApiError as e:
+                retry_after = _get_retry_after(e)
+                if retry_after is not None and call.attempts <= OUTBOX_MAX_RETRIES:
+                    self.retried += 1
+                    logger.warning(
+                        f"{api_method} was rate limited, retrying in {retry_after:.1f}s"
+                    )
+                    span.set_attribute("retry_after", retry_after)
+                    return retry_after
+                span.record_error(e)
+                _resolve(call, error=e)
+                status = "ratelimited" if retry_after is not None else "error"
+            except Exception as e:
+                span.record_error(e)
+                _resolve(call, error=e)
+                status = "error"
+            else:
+                _resolve(call, response=response)
+                status = "ok"
+        SLACK_API_SECONDS.labels(method=api_method, status=status).observe(
+            time.monotonic() - call.queued_at
+        )
+        return None
+
+
+def _resolve(call: _Call, response=None, error: Exception | None = None):
+    for future in call.futures:
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(response)
+
+
+def _log_failure(future: Future):
+    error = future.exception()
+    if error is not None:
+        logger.error(f"Slack API call failed: {error}")
+
+
+_outbox: SlackOutbox | None = None
+_outbox_lock = threading.Lock()
+
+
+def get_slack_outbox() -> SlackOutbox:
+    """Get or create the global Slack outbox."""
+    global _outbox
+    with _outbox_lock:
+        if _outbox is None:
+            _outbox = SlackOutbox()
+        return _outbox
+
+
+def _register_metrics():
+    # Read from the outbox only once it exists; a scrape must not start its sender threads
+    def read(attribute: str):
+        return lambda: getattr(_outbox, attribute) if _outbox is not None else 0
+
+    register_callback(
+        "slack_outbox_pending_calls",
+        "Outbox calls waiting for a sender",
+        lambda: _outbox.pending() if _outbox is not None else 0,
+    )
+    register_callback(
+        "slack_outbox_coalesced_total",
+        "chat.update calls merged into a pending update",
+        read("coalesced"),
+        kind="counter",
+    )
+    register_callback(
+        "slack_outbox_retries_total",
+        "Calls retried after a ratelimited response",
+        read("retried"),
+        kind="counter",
+    )
+
+
+_register_metrics()
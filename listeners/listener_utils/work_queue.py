@@ -0,0 +1,381 @@
+"""
+Listener Work Queue Module
+
+Listeners acknowledge Slack right away and hand their heavy work (provider calls,
+Slack updates) to this dispatcher instead of running it on Bolt's small listener
+thread pool:
+- A bounded queue with priority classes, so a burst of DMs cannot starve /incident
+- Round-robin between users inside a priority class, so one user cannot monopolize workers
+- A fast "queued, position N" notice when work has to wait, and a degraded reply when the queue is full
+- Queue depth and wait-time statistics via `get_work_queue().stats()`, also exported as metrics
+- A trace per invocation, with the ack and the queue wait as spans (see `request_tracing`)
+"""
+
+import contextvars
+import functools
+import inspect
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from collections.abc import Callable
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+
+from observability import start_span, use_span
+from observability.journal import use_request
+from observability.metrics import histogram, register_callback
+from observability.usage import use_usage_attribution
+
+from .listener_constants import WORK_QUEUE_FULL_TEXT, WORK_QUEUED_TEXT
+from .request_tracing import (
+    journal_request,
+    record_request,
+    request_kind,
+    start_request_span,
+)
+from .slack_outbox import get_slack_outbox
+
+logger = logging.getLogger(__name__)
+
+# Priority classes, most urgent first
+PRIORITY_INCIDENT = 0
+PRIORITY_MENTION = 1
+PRIORITY_CODE = 2
+PRIORITY_ASK = 3
+PRIORITY_DM = 4
+PRIORITY_SUMMARY = 5
+
+PRIORITY_NAMES = ["incident", "mention", "code", "ask", "dm", "summary"]
+
+# Number of threads running listener work, and how many jobs may wait for them
+WORK_QUEUE_WORKERS = int(os.environ.get("WORK_QUEUE_WORKERS", "8"))
+WORK_QUEUE_MAX_DEPTH = int(os.environ.get("WORK_QUEUE_MAX_DEPTH", "100"))
+
+# Recent wait times kept for percentile statistics
+WAIT_TIME_SAMPLES = 1000
+
+QUEUE_WAIT_SECONDS = histogram(
+    "work_queue_wait_seconds",
+    "Time jobs waited in the work queue for a worker",
+    ("priority",),
+)
+
+
+class WorkQueueFullError(Exception):
+    """Raised when a job cannot be queued (or was evicted) because the queue is saturated."""
+
+
+@dataclass
+class _Job:
+    fn: Callable[[], object]
+    priority: int
+    user_id: str
+    future: Future = field(default_factory=Future)
+    enqueued_at: float = field(default_factory=time.monotonic)
+    # The submitter's context (e.g. its current trace span), restored while the job runs
+    context: contextvars.Context = field(default_factory=contextvars.copy_context)
+
+
+class WorkQueue:
+    """Bounded, per-user fair priority queue served by a fixed pool of worker threads."""
+
+    def __init__(
+        self, workers: int = WORK_QUEUE_WORKERS, max_depth: int = WORK_QUEUE_MAX_DEPTH
+    ):
+        self.workers = workers
+        self.max_depth = max_depth
+        # One OrderedDict per priority class: user_id -> that user's pending jobs
+        self._classes: list[OrderedDict[str, deque[_Job]]] = [
+            OrderedDict() for _ in PRIORITY_NAMES
+        ]
+        self._depth = 0
+        self._idle_workers = 0
+        self._threads: list[threading.Thread] = []
+        self._cond = threading.Condition()
+        self._submitted = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_times: deque[float] = deque(maxlen=WAIT_TIME_SAMPLES)
+
+    def submit(
+        self, fn: Callable[[], object], priority: int, user_id: str
+    ) -> tuple[Future, int]:
+        """
+        Queue a job.
+
+        Args:
+            fn: Zero-argument callable that performs the work
+            priority: One of the PRIORITY_* classes
+            user_id: Slack user the work is for (used for fairness)
+
+        Returns:
+            Tuple of (future, position); position 0 means a worker starts the job right away
+
+        Raises:
+            WorkQueueFullError: If the queue is full of work at the same or higher priority
+        """
+        job = _Job(fn=fn, priority=priority, user_id=user_id)
+        evicted = None
+        with self._cond:
+            self._ensure_workers()
+            if self._depth >= self.max_depth:
+                # Make room by shedding the newest job of the least urgent class, if there is one
+                evicted = self._evict_lower_than(priority)
+                if evicted is None:
+                    self._rejected += 1
+                    raise WorkQueueFullError(
+                        f"Work queue is full ({self._depth} jobs waiting)"
+                    )
+
+            ahead = sum(self._class_depth(p) for p in range(priority + 1))
+            position = (
+                ahead - self._idle_workers + 1 if ahead >= self._idle_workers else 0
+            )
+
+            self._classes[priority].setdefault(user_id, deque()).append(job)
+            self._depth += 1
+            self._submitted += 1
+            self._cond.notify()
+
+        if evicted is not None:
+            logger.warning(
+                f"Work queue full, shed a {PRIORITY_NAMES[evicted.priority]} job for {evicted.user_id}"
+            )
+            evicted.future.set_exception(WorkQueueFullError("Work queue is full"))
+        return job.future, position
+
+    def stats(self) -> dict:
+        """Return queue depth, worker utilization and wait-time statistics."""
+        with self._cond:
+            waits = sorted(self._wait_times)
+            return {
+                "depth": self._depth,
+                "depth_by_priority": {
+                    name: self._class_depth(p) for p, name in enumerate(PRIORITY_NAMES)
+                },
+                "workers": len(self._threads),
+                "busy_workers": len(self._threads) - self._idle_workers,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "wait_seconds_p50": _percentile(waits, 0.50),
+                "wait_seconds_p95": _percentile(waits, 0.95),
+                "wait_seconds_max": waits[-1] if waits else 0.0,
+            }
+
+    def _class_depth(self, priority: int) -> int:
+        return sum(len(jobs) for jobs in self._classes[priority].values())
+
+    def _evict_lower_than(self, priority: int) -> _Job | None:
+        for p in range(len(self._classes) - 1, priority, -1):
+            users = self._classes[p]
+            if users:
+                user_id, jobs = next(reversed(users.items()))
+                job = jobs.pop()
+                if not jobs:
+                    del users[user_id]
+                self._depth -= 1
+                self._rejected += 1
+                return job
+        return None
+
+    def _next_job(self) -> _Job:
+        for users in self._classes:
+            if users:
+                # Take one job from the user at the front, then move them to the back
+                user_id, jobs = next(iter(users.items()))
+                job = jobs.popleft()
+                if jobs:
+                    users.move_to_end(user_id)
+                else:
+                    del users[user_id]
+                self._depth -= 1
+                return job
+        raise RuntimeError("Work queue is empty")
+
+    def _ensure_workers(self):
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(
+                target=self._worker,
+                name=f"work-queue-{len(self._threads)}",
+                daemon=True,
+            )
+            self._threads.append(thread)
+            self._idle_workers += 1
+            thread.start()
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while self._depth == 0:
+                    self._cond.wait()
+                job = self._next_job()
+                self._idle_workers -= 1
+                wait = time.monotonic() - job.enqueued_at
+                self._wait_times.append(wait)
+            QUEUE_WAIT_SECONDS.labels(priority=PRIORITY_NAMES[job.priority]).observe(
+                wait
+            )
+
+            if wait > 1:
+                logger.info(
+                    f"{PRIORITY_NAMES[job.priority]} job for {job.user_id} waited {wait:.2f}s in the work queue"
+                )
+            if job.future.set_running_or_notify_cancel():
+                try:
+                    job.future.set_result(job.context.run(job.fn))
+                except BaseException as e:
+                    job.future.set_exception(e)
+
+            with self._cond:
+                self._idle_workers += 1
+                self._completed += 1
+
+
+def _percentile(sorted_values: list[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[
+        min(len(sorted_values) - 1, int(len(sorted_values) * fraction))
+    ]
+
+
+_work_queue: WorkQueue | None = None
+_work_queue_lock = threading.Lock()
+
+
+def get_work_queue() -> WorkQueue:
+    """Get or create the global listener work queue."""
+    global _work_queue
+    with _work_queue_lock:
+        if _work_queue is None:
+            _work_queue = WorkQueue()
+        return _work_queue
+
+
+def _register_metrics():
+    def depth():
+        stats = get_work_queue().stats()
+        return {(name,): depth for name, depth in stats["depth_by_priority"].items()}
+
+    register_callback(
+        "work_queue_depth", "Jobs waiting for a worker", depth, labelnames=("priority",)
+    )
+    register_callback(
+        "work_queue_busy_workers",
+        "Workers running a job",
+        lambda: get_work_queue().stats()["busy_workers"],
+    )
+    register_callback(
+        "work_queue_jobs_total",
+        "Jobs by outcome (rejected: refused or shed because the queue was full)",
+        lambda: {
+            (outcome,): get_work_queue().stats()[outcome]
+            for outcome in ("submitted", "completed", "rejected")
+        },
+        kind="counter",
+        labelnames=("outcome",),
+    )
+
+
+_register_metrics()
+
+
+def _noop_ack(*args, **kwargs):
+    pass
+
+
+def _notify(kwargs: dict[str, object], text: str, failed: bool = False):
+    """Tell the requesting user about queueing; failures to notify are only logged."""
+    context = kwargs["context"]
+    channel_id = context.get("channel_id")
+    user_id = context.get("user_id")
+    try:
+        if channel_id and user_id:
+            get_slack_outbox().send(
+                kwargs["client"],
+                "chat_postEphemeral",
+                channel=channel_id,
+                user=user_id,
+                text=text,
+            )
+        if failed and kwargs.get("fail"):
+            kwargs["fail"](text)
+    except Exception as e:
+        logger.error(f"Failed to send work queue notice: {e}")
+
+
+def queued_listener(priority: int, callback: Callable) -> Callable:
+    """
+    Wrap a sync Bolt listener so its work runs on the shared work queue.
+
+    The listener must accept `client` and `context`. If it accepts `ack`, the request
+    is acknowledged right away and the listener receives a no-op `ack` instead.
+
+    Args:
+        priority: One of the PRIORITY_* classes
+        callback: The Bolt listener function
+
+    Returns:
+        A listener to register with Bolt in place of `callback`
+    """
+    missing = {"client", "context"} - set(inspect.getfullargspec(callback).args)
+    if missing:
+        raise ValueError(
+            f"{callback.__name__} must accept {sorted(missing)} to be queued"
+        )
+
+    @functools.wraps(callback)
+    def listener(**kwargs):
+        started_at = time.monotonic()
+        kind = request_kind(kwargs, callback)
+        journal_id = journal_request(kwargs, kind)
+        # Ends when the queued work finishes, not when this function returns
+        request_span = start_request_span(kwargs, callback)
+        # The work queue runs the job in a copy of this context: span, journal ID and usage attribution
+        with (
+            use_span(request_span),
+            use_request(journal_id),
+            use_usage_attribution(command=kind[1]),
+        ):
+            if "ack" in kwargs:
+                with start_span("slack.ack"):
+                    kwargs["ack"]()
+                kwargs["ack"] = _noop_ack
+            user_id = kwargs["context"].get("user_id") or "unknown"
+            wait_span = start_span("work_queue.wait", priority=PRIORITY_NAMES[priority])
+
+            def run():
+                wait_span.end()
+                return callback(**kwargs)
+
+            try:
+                future, position = get_work_queue().submit(run, priority, user_id)
+            except WorkQueueFullError as e:
+                request_span.record_error(e)
+                request_span.end()
+                record_request(kind, started_at, e, journal_id)
+                _notify(kwargs, WORK_QUEUE_FULL_TEXT, failed=True)
+                return
+            request_span.set_attribute("queue_position", position)
+
+            if position > 0:
+                _notify(kwargs, WORK_QUEUED_TEXT.format(position=position))
+
+        def on_done(done: Future):
+            error = done.exception()
+            wait_span.end()
+            if error is not None:
+                request_span.record_error(error)
+            request_span.end()
+            record_request(kind, started_at, error, journal_id)
+            if isinstance(error, WorkQueueFullError):
+                _notify(kwargs, WORK_QUEUE_FULL_TEXT, failed=True)
+            elif error is not None:
+                logger.error(f"{callback.__name__} failed: {error}")
+
+        future.add_done_callback(on_done)
+
+    return listener
@@ -0,0 +1,33 @@
+from typing import TYPE_CHECKING
+
+from slack_bolt import App
+from slack_bolt.middleware import IgnoringSelfEvents
+
+from .conversation_messages import (
+    async_record_conversation_messages,
+    record_conversation_messages,
+)
+from .deduplication import async_drop_duplicate_events, drop_duplicate_events
+
+if TYPE_CHECKING:
+    from slack_bolt.async_app import AsyncApp
+
+"""
+Global middleware, applied in order. Redelivered events are dropped first.
+The apps are created with `ignoring_self_events_enabled=False` so the conversation
+cache also records the bot's own messages; self events are dropped right after that instead.
+"""
+
+
+def register(app: App):
+    app.use(drop_duplicate_events)
+    app.use(record_conversation_messages)
+    app.use(IgnoringSelfEvents())
+
+
+def register_async(app: "AsyncApp"):
+    from slack_bolt.middleware.async_builtins import AsyncIgnoringSelfEvents
+
+    app.use(async_drop_duplicate_events)
+    app.use(async_record_conversation_messages)
+    app.use(AsyncIgnoringSelfEvents())
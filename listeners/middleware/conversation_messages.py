@@ -0,0 +1,25 @@
+from collections.abc import Awaitable, Callable
+
+from ..listener_utils.conversation_cache import get_conversation_cache
+
+"""
+Global middleware that feeds every `message` event, including the bot's own replies
+and message edits/deletions, into the conversation cache before any listener runs.
+`async_record_conversation_messages` is the AsyncApp equivalent used by `app_async.py`.
+"""
+
+
+def record_conversation_messages(body: dict, next: Callable[[], None]):
+    event = body.get("event") or {}
+    if event.get("type") == "message":
+        get_conversation_cache().record_event(event)
+    next()
+
+
+async def async_record_conversation_messages(
+    body: dict, next: Callable[[], Awaitable[None]]
+):
+    event = body.get("event") or {}
+    if event.get("type") == "message":
+        get_conversation_cache().record_event(event)
+    await next()
@@ -0,0 +1,48 @@
+import asyncio
+from collections.abc import Awaitable, Callable
+from logging import Logger
+
+from slack_bolt import BoltResponse
+
+from ..listener_utils.idempotency import (
+    InMemoryIdempotencyStore,
+    event_idempotency_key,
+    get_idempotency_store,
+)
+
+"""
+Global middleware that acknowledges and drops redelivered events (Slack retries)
+before they reach a listener, so the same message is never answered twice.
+`async_drop_duplicate_events` is the AsyncApp equivalent used by `app_async.py`.
+"""
+
+
+def _is_duplicate(body: dict, logger: Logger) -> bool:
+    key = event_idempotency_key(body)
+    if key is None or get_idempotency_store().claim(key):
+        return False
+    logger.info(
+        f"Dropped duplicate delivery of {key} ({get_idempotency_store().duplicates} dropped so far)"
+    )
+    return True
+
+
+def drop_duplicate_events(
+    body: dict, logger: Logger, next: Callable[[], None]
+) -> BoltResponse | None:
+    if _is_duplicate(body, logger):
+        return BoltResponse(status=200, body="")
+    next()
+
+
+async def async_drop_duplicate_events(
+    body: dict, logger: Logger, next: Callable[[], Awaitable[None]]
+) -> BoltResponse | None:
+    if isinstance(get_idempotency_store(), InMemoryIdempotencyStore):
+        duplicate = _is_duplicate(body, logger)
+    else:
+        # The SQLite and shared state stores block on I/O; claim off the event loop
+        duplicate = await asyncio.to_thread(_is_duplicate, body, logger)
+    if duplicate:
+        return BoltResponse(status=200, body="")
+    await next()
@@ -0,0 +1,51 @@
+"""
+Observability Package
+
+Request tracing and metrics for the bot. Every listener invocation is a trace whose
+spans cover the Slack ack, the work queue wait, history fetches, user-state lookups,
+retrieval (embedding and vector search), each LLM call, each MCP tool call and
+each Slack Web API call. Request rates, latency histograms, token usage, queue depth
+and cache hit counts are kept in `observability.metrics` and served by
+`observability.metrics_server`. `observability.journal` records requests, provider
+responses and tool calls for replay benchmarks. `observability.profiler` samples every
+thread's stack on demand (signal or `/profile`) and writes speedscope profiles.
+`observability.usage` accounts token usage and cost per user, command, model and cache status.
+`observability.health` summarizes recent latency, errors and cache hit rates for the App Home panel.
+
+Configuration:
+    TRACE_EXPORTER: "" (disabled, default), "jsonl" or "otlp"
+    TRACE_JSONL_PATH: File for the jsonl exporter (default ./data/traces.jsonl)
+    TRACE_OTLP_ENDPOINT: OTLP/HTTP JSON endpoint (default http://127.0.0.1:4318/v1/traces)
+    METRICS_PORT: Port for the Prometheus-format /metrics endpoint (unset: disabled)
+    METRICS_HOST: Interface the metrics endpoint binds (default 127.0.0.1)
+    JOURNAL_PATH: Record-and-replay journal (unset: disabled); see `observability.journal`
+    PROFILE_DIR: Where on-demand profiles are written (default ./data/profiles); see `observability.profiler`
+    USAGE_DB_PATH: Token usage and cost totals (default ./data/usage.sqlite3; empty disables)
+    HEALTH_SNAPSHOT_SECONDS / HEALTH_WINDOW_SECONDS: Health summary refresh and window (default 30 / 900)
+
+Public API:
+    - start_span(): Start a span (child of the current span by default)
+    - current_span(): The span the calling code runs in
+    - use_span(): Make a span current without ending it (for spans that outlive a block)
+    - flush(): Export finished spans now
+"""
+
+from .tracing import (
+    NOOP_SPAN,
+    Span,
+    current_span,
+    flush,
+    set_exporter,
+    start_span,
+    use_span,
+)
+
+__all__ = [
+    "NOOP_SPAN",
+    "Span",
+    "current_span",
+    "flush",
+    "set_exporter",
+    "start_span",
+    "use_span",
+]
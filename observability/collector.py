@@ -0,0 +1,98 @@
+"""
+Local stand-in for an OTLP/HTTP trace collector.
+
+Accepts OTLP/JSON `POST /v1/traces` requests and appends the spans to a JSONL file
+in the same format as `JsonlSpanExporter`, so `observability.trace_report` works on
+either. Meant for local runs and load tests, not production.
+
+Usage:
+    python -m observability.collector --port 4318 --output data/traces.jsonl
+    TRACE_EXPORTER=otlp TRACE_OTLP_ENDPOINT=http://127.0.0.1:4318/v1/traces python3 app.py
+"""
+
+import argparse
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .exporters import JsonlSpanExporter, from_otlp
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        if self.path != "/v1/traces":
+            self.send_error(404)
+            return
+        try:
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            spans = from_otlp(json.loads(body))
+        except (ValueError, KeyError) as e:
+            self.send_error(400, str(e))
+            return
+        self.server.receive(spans)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, format, *args):
+        pass
+
+
+class LocalTraceCollector(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self, host: str = "127.0.0.1", port: int = 0, output_path: str | None = None
+    ):
+        super().__init__((host, port), _Handler)
+        self.exporter = JsonlSpanExporter(output_path) if output_path else None
+        # Kept in memory as well, for tests and benchmarks
+        self.spans: list[dict] = []
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1/traces"
+
+    def receive(self, spans: list[dict]):
+        with self._lock:
+            self.spans.extend(spans)
+        if self.exporter is not None:
+            self.exporter.export(spans)
+
+    def start(self) -> "LocalTraceCollector":
+        self._thread = threading.Thread(
+            target=self.serve_forever, name="local-trace-collector", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4318)
+    parser.add_argument(
+        "--output",
+        default="data/traces.jsonl",
+        help="JSONL file the spans are appended to",
+    )
+    args = parser.parse_args()
+
+    collector = LocalTraceCollector(args.host, args.port, args.output)
+    print(f"Collecting traces at {collector.url} into {args.output}")
+    try:
+        collector.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Span exporters.
+
+- JsonlSpanExporter: appends one JSON object per span to a local file
+- OtlpHttpSpanExporter: posts OTLP/HTTP JSON to a collector (e.g. an OpenTelemetry
+  Collector, or `observability.collector` locally)
+
+Both receive spans as the flat dicts produced by `Span.to_dict()`.
+"""
+
+import json
+import logging
+import os
+import threading
+import urllib.request
+
+logger = logging.getLogger(__name__)
+
+TRACE_JSONL_PATH = os.environ.get("TRACE_JSONL_PATH", "./data/traces.jsonl")
+TRACE_OTLP_ENDPOINT = os.environ.get(
+    "TRACE_OTLP_ENDPOINT", "http://127.0.0.1:4318/v1/traces"
+)
+TRACE_SERVICE_NAME = os.environ.get("TRACE_SERVICE_NAME", "slack-on-call-agent")
+
+OTLP_TIMEOUT_SECONDS = 5.0
+
+
+class SpanExporter:
+    def export(self, spans: list[dict]):
+        raise NotImplementedError()
+
+
+class JsonlSpanExporter(SpanExporter):
+    def __init__(self, path: str = TRACE_JSONL_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def export(self, spans: list[dict]):
+        lines = "".join(json.dumps(span, default=str) + "\n" for span in spans)
+        with self._lock, open(self.path, "a") as file:
+            file.write(lines)
+
+
+class OtlpHttpSpanExporter(SpanExporter):
+    def __init__(
+        self,
+        endpoint: str = TRACE_OTLP_ENDPOINT,
+        service_name: str = TRACE_SERVICE_NAME,
+    ):
+        self.endpoint = endpoint
+        self.service_name = service_name
+
+    def export(self, spans: list[dict]):
+        body = json.dumps(to_otlp(spans, self.service_name)).encode()
+        request = urllib.request.Request(
+            self.endpoint,
+            data=body,
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=OTLP_TIMEOUT_SECONDS) as response:
+            response.read()
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _from_otlp_value(value: dict):
+    if "intValue" in value:
+        return int(value["intValue"])
+    for kind in ("boolValue", "doubleValue", "stringValue"):
+        if kind in value:
+            return value[kind]
+    return None
+
+
+def to_otlp(spans: list[dict], service_name: str = TRACE_SERVICE_NAME) -> dict:
+    """Convert flat span dicts to an OTLP/JSON `ExportTraceServiceRequest`."""
+    otlp_spans = []
+    for span in spans:
+        start_ns = int(span["start"] * 1e9)
+        otlp_span = {
+            "traceId": span["trace_id"],
+            "spanId": span["span_id"],
+            "name": span["name"],
+            "kind": 1,
+            "startTimeUnixNano": str(start_ns),
+            "endTimeUnixNano": str(start_ns + int(span["duration_ms"] * 1e6)),
+            "attributes": [
+                {"key": key, "value": _otlp_value(value)}
+                for key, value in span["attributes"].items()
+            ],
+            "status": {"code": 2, "message": span["error"]}
+            if span["error"]
+            else {"code": 1},
+        }
+        if span["parent_id"]:
+            otlp_span["parentSpanId"] = span["parent_id"]
+        otlp_spans.append(otlp_span)
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [
+                        {"key": "service.name", "value": {"stringValue": service_name}}
+                    ]
+                },
+                "scopeSpans": [
+                    {"scope": {"name": "observability.tracing"}, "spans": otlp_spans}
+                ],
+            }
+        ]
+    }
+
+
+def from_otlp(request: dict) -> list[dict]:
+    """Convert an OTLP/JSON `ExportTraceServiceRequest` back to flat span dicts."""
+    spans = []
+    for resource_spans in request.get("resourceSpans", []):
+        for scope_spans in resource_spans.get("scopeSpans", []):
+            for span in scope_spans.get("spans", []):
+                start_ns = int(span["startTimeUnixNano"])
+                status = span.get("status", {})
+                spans.append(
+                    {
+                        "trace_id": span["traceId"],
+                        "span_id": span["spanId"],
+                        "parent_id": span.get("parentSpanId") or None,
+                        "name": span["name"],
+                        "start": start_ns / 1e9,
+                        "duration_ms": (int(span["endTimeUnixNano"]) - start_ns) / 1e6,
+                        "attributes": {
+                            attribute["key"]: _from_otlp_value(attribute["value"])
+                            for attribute in span.get("attributes", [])
+                        },
+                        "status": "error" if status.get("code") == 2 else "ok",
+                        "error": status.get("message")
+                        if status.get("code") == 2
+                        else None,
+                    }
+                )
+    return spans
+
+
+def create_exporter(name: str) -> SpanExporter | None:
+    """Create the exporter selected by TRACE_EXPORTER, or None when tracing is disabled."""
+    if not name:
+        return None
+    if name == "jsonl":
+        return JsonlSpanExporter()
+    if name == "otlp":
+        return OtlpHttpSpanExporter()
+    raise ValueError(f"Unknown TRACE_EXPORTER: {name}")
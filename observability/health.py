@@ -0,0 +1,319 @@
+"""
+Bot health summary.
+
+A summary of recent latency and error rates, built from the in-process metrics for the
+operator panel in the App Home tab. Every HEALTH_SNAPSHOT_SECONDS a daemon thread copies the
+counters and histogram buckets it needs, and summarizes the difference to the oldest copy
+within HEALTH_WINDOW_SECONDS (everything since startup, until the process is that old):
+- p50/p95 latency, requests and errors per command or event
+- requests, p95 latency, errors by cause, local rate-limit rejections/queueing and
+  circuit breaker state per provider
+- hit rates of the response, retrieval and in-process caches
+- work queue depth and knowledge base index status/version
+
+Readers get the latest summary with `get_health_summary()`, a dict lookup; nothing is computed
+on their path. The thread starts on the first call, so the summary costs nothing unless read.
+
+Configuration:
+    HEALTH_SNAPSHOT_SECONDS: Seconds between summaries (default 30)
+    HEALTH_WINDOW_SECONDS: Period the summary covers (default 900)
+"""
+
+import logging
+import os
+import threading
+import time
+
+from .metrics import REGISTRY, Histogram, histogram_quantile
+
+logger = logging.getLogger(__name__)
+
+HEALTH_SNAPSHOT_SECONDS = float(os.environ.get("HEALTH_SNAPSHOT_SECONDS", "30"))
+HEALTH_WINDOW_SECONDS = float(os.environ.get("HEALTH_WINDOW_SECONDS", "900"))
+
+# Commands shown, busiest first
+MAX_COMMANDS = 10
+
+# Metrics whose increase over the window is summarized
+_WINDOWED = (
+    "slack_request_duration_seconds",
+    "slack_requests_total",
+    "llm_generate_duration_seconds",
+    "llm_provider_errors_total",
+    "llm_rate_limit_rejections_total",
+    "llm_rate_limit_queued_total",
+    "ai_response_cache_total",
+    "rag_retrieve_duration_seconds",
+    "cache_requests_total",
+)
+
+# metric name -> label values -> value, or (bucket counts, sum) for histograms
+_Snapshot = dict[str, dict[tuple, object]]
+
+_process_started_at = time.time()
+
+
+def _read(name: str) -> dict[tuple, object]:
+    metric = REGISTRY.get(name)
+    if metric is None:
+        return {}
+    try:
+        return metric.values()
+    except Exception as e:
+        logger.debug(f"Could not read metric {name}: {e}")
+        return {}
+
+
+def _delta(
+    current: dict[tuple, object], baseline: dict[tuple, object]
+) -> dict[tuple, object]:
+    delta = {}
+    for key, value in current.items():
+        previous = baseline.get(key)
+        if isinstance(value, tuple):
+            counts, total = value
+            if previous is not None:
+                counts = [count - before for count, before in zip(counts, previous[0])]
+                total -= previous[1]
+            delta[key] = (counts, total)
+        else:
+            delta[key] = value - (previous or 0)
+    return delta
+
+
+def _buckets(name: str) -> tuple[float, ...]:
+    metric = REGISTRY.get(name)
+    return metric.buckets if isinstance(metric, Histogram) else ()
+
+
+def _merge_counts(series: list[list[int]]) -> list[int]:
+    return [sum(counts) for counts in zip(*series)] if series else []
+
+
+def _hit_rate(hits: float, misses: float) -> dict:
+    total = hits + misses
+    return {
+        "hits": int(hits),
+        "lookups": int(total),
+        "hit_rate": hits / total if total else None,
+    }
+
+
+def summarize(
+    window: _Snapshot, current: _Snapshot, window_seconds: float, taken_at: float
+) -> dict:
+    """
+    Build the health summary from the increase of each metric over the window.
+
+    Args:
+        window: Increase of each _WINDOWED metric over the window
+        current: Current value of the gauges (circuit breakers, queue, index)
+        window_seconds: Length of the window
+        taken_at: Unix time of the snapshot
+
+    Returns:
+        Dict with "taken_at", "window_seconds", "commands", "providers", "caches", "queue" and "index"
+    """
+    request_buckets = _buckets("slack_request_duration_seconds")
+    commands = []
+    outcomes = window.get("slack_requests_total", {})
+    for (kind, name), (counts, _) in window.get(
+        "slack_request_duration_seconds", {}
+    ).items():
+        requests = sum(counts)
+        if requests <= 0:
+            continue
+        commands.append(
+            {
+                "kind": kind,
+                "name": name,
+                "requests": requests,
+                "errors": int(outcomes.get((kind, name, "error"), 0)),
+                "p50": histogram_quantile(0.5, request_buckets, counts),
+                "p95": histogram_quantile(0.95, request_buckets, counts),
+            }
+        )
+    commands.sort(key=lambda command: -command["requests"])
+
+    generate_buckets = _buckets("llm_generate_duration_seconds")
+    provider_counts: dict[str, list[list[int]]] = {}
+    provider_failures: dict[str, int] = {}
+    for (provider, _, status), (counts, _) in window.get(
+        "llm_generate_duration_seconds", {}
+    ).items():
+        provider_counts.setdefault(provider, []).append(counts)
+        if status == "error":
+            provider_failures[provider] = provider_failures.get(provider, 0) + sum(
+                counts
+            )
+    errors: dict[str, dict[str, int]] = {}
+    for (provider, cause), value in window.get("llm_provider_errors_total", {}).items():
+        if value > 0:
+            errors.setdefault(provider, {})[cause] = int(value)
+    rejections: dict[str, dict[str, int]] = {}
+    for (provider, reason), value in window.get(
+        "llm_rate_limit_rejections_total", {}
+    ).items():
+        if value > 0:
+            rejections.setdefault(provider, {})[reason] = int(value)
+    queued = {
+        provider: int(value)
+        for (provider,), value in window.get("llm_rate_limit_queued_total", {}).items()
+    }
+    circuits = {
+        provider: bool(value)
+        for (provider,), value in current.get("llm_circuit_open", {}).items()
+    }
+
+    providers = []
+    for provider in sorted(
+        set(provider_counts)
+        | set(errors)
+        | set(rejections)
+        | set(queued)
+        | set(circuits)
+    ):
+        counts = _merge_counts(provider_counts.get(provider, []))
+        providers.append(
+            {
+                "provider": provider,
+                "requests": sum(counts),
+                "failed": provider_failures.get(provider, 0),
+                "p95": histogram_quantile(0.95, generate_buckets, counts)
+                if counts
+                else None,
+                "errors": errors.get(provider, {}),
+                "rejected": rejections.get(provider, {}),
+                "queued": queued.get(provider, 0),
+                "circuit_open": circuits.get(provider, False),
+            }
+        )
+
+    response_cache = window.get("ai_response_cache_total", {})
+    caches = {
+        "response": _hit_rate(
+            response_cache.get(("hit",), 0), response_cache.get(("miss",), 0)
+        )
+    }
+    retrievals = window.get("rag_retrieve_duration_seconds", {})
+    caches["retrieval"] = _hit_rate(
+        sum(retrievals.get(("true",), ([], 0))[0]),
+        sum(retrievals.get(("false",), ([], 0))[0]),
+    )
+    in_process = window.get("cache_requests_total", {})
+    for name in sorted({name for name, _ in in_process}):
+        caches[name] = _hit_rate(
+            in_process.get((name, "hit"), 0), in_process.get((name, "miss"), 0)
+        )
+
+    index = {
+        "status": "not_loaded",
+        "version": "",
+        "chunks": 0,
+        "documents": 0,
+        "built_at": 0.0,
+    }
+    for status, version in current.get("rag_index_info", {}):
+        index.update(status=status, version=version)
+    size = current.get("rag_index_size", {})
+    index.update(
+        chunks=int(size.get(("chunks",), 0)), documents=int(size.get(("documents",), 0))
+    )
+    index["built_at"] = float(
+        current.get("rag_index_built_timestamp_seconds", {}).get((), 0.0)
+    )
+
+    return {
+        "taken_at": taken_at,
+        "window_seconds": window_seconds,
+        "commands": commands[:MAX_COMMANDS],
+        "providers": providers,
+        "caches": caches,
+        "queue": {
+            "waiting": int(sum(current.get("work_queue_depth", {}).values())),
+            "busy_workers": int(current.get("work_queue_busy_workers", {}).get((), 0)),
+        },
+        "index": index,
+    }
+
+
+class HealthMonitor:
+    """Takes metric snapshots on a daemon thread and keeps the summary of the latest window."""
+
+    def __init__(
+        self,
+        snapshot_seconds: float = HEALTH_SNAPSHOT_SECONDS,
+        window_seconds: float = HEALTH_WINDOW_SECONDS,
+    ):
+        self.snapshot_seconds = snapshot_seconds
+        self.window_seconds = window_seconds
+        # (taken_at, snapshot), oldest first; starts with all-zero counters at process start
+        self._snapshots: list[tuple[float, _Snapshot]] = [(_process_started_at, {})]
+        self._summary: dict | None = None
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def snapshot(self) -> dict:
+        """Copy the metrics, summarize the window ending now and make it the latest summary."""
+        taken_at = time.time()
+        current = {name: _read(name) for name in _WINDOWED}
+        with self._lock:
+            self._snapshots.append((taken_at, current))
+            # Keep the newest snapshot that is at least a window old as the baseline
+            while (
+                len(self._snapshots) > 2
+                and self._snapshots[1][0] <= taken_at - self.window_seconds
+            ):
+                self._snapshots.pop(0)
+            baseline_at, baseline = self._snapshots[0]
+        window = {
+            name: _delta(values, baseline.get(name, {}))
+            for name, values in current.items()
+        }
+        gauges = {
+            name: _read(name)
+            for name in (
+                "llm_circuit_open",
+                "work_queue_depth",
+                "work_queue_busy_workers",
+                "rag_index_info",
+                "rag_index_size",
+                "rag_index_built_timestamp_seconds",
+            )
+        }
+        summary = summarize(window, gauges, taken_at - baseline_at, taken_at)
+        with self._lock:
+            self._summary = summary
+        return summary
+
+    def summary(self) -> dict:
+        """The latest summary; the first call takes a snapshot and starts the snapshot thread."""
+        with self._lock:
+            summary = self._summary
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="health-snapshots", daemon=True
+                )
+                self._thread.start()
+        return summary if summary is not None else self.snapshot()
+
+    def _run(self):
+        while True:
+            time.sleep(self.snapshot_seconds)
+            try:
+                self.snapshot()
+            except Exception as e:
+                logger.error(f"Health snapshot failed: {e}")
+
+
+_monitor: HealthMonitor | None = None
+_monitor_lock = threading.Lock()
+
+
+def get_health_summary() -> dict:
+    """The latest health summary (see `summarize()`), at most HEALTH_SNAPSHOT_SECONDS old."""
+    global _monitor
+    with _monitor_lock:
+        if _monitor is None:
+            _monitor = HealthMonitor()
+    return _monitor.summary()
@@ -0,0 +1,442 @@
+"""
+Traffic journal for record-and-replay benchmarks.
+
+When JOURNAL_PATH is set, every listener invocation is written to a JSONL journal
+(gzip-compressed when the path ends in ".gz") by a background thread:
+- "request": what Slack sent (the command, event or function inputs, plus user,
+  channel and team IDs), with its wall-clock arrival time
+- "generation": one provider response: provider, model, prompt, system prompt and
+  response, each model request's latency and token usage, and every MCP tool call
+  made in between (arguments, result, latency)
+- "request_end": the listener's latency and outcome
+
+`benchmarks.replay` feeds a journal back through the listeners. Credentials are
+always redacted; with JOURNAL_REDACT=text, message text, prompts, responses and tool
+input/output are also replaced by placeholders of the same length, so replayed token
+estimates stay realistic.
+
+Configuration:
+    JOURNAL_PATH: Journal file (unset: recording disabled)
+    JOURNAL_REDACT: "secrets" (default) or "text"
+    JOURNAL_SAMPLE_RATE: Fraction of requests recorded (default 1.0)
+    JOURNAL_MAX_FIELD_CHARS: Longer strings are truncated; their full length is kept (default 4000)
+"""
+
+import atexit
+import contextlib
+import contextvars
+import gzip
+import json
+import logging
+import os
+import queue
+import random
+import re
+import secrets
+import threading
+import time
+from collections.abc import Iterator
+from typing import Any, Optional
+
+from .metrics import register_callback
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_PATH = os.environ.get("JOURNAL_PATH", "")
+JOURNAL_REDACT = os.environ.get("JOURNAL_REDACT", "secrets")
+JOURNAL_SAMPLE_RATE = float(os.environ.get("JOURNAL_SAMPLE_RATE", "1.0"))
+JOURNAL_MAX_FIELD_CHARS = int(os.environ.get("JOURNAL_MAX_FIELD_CHARS", "4000"))
+
+# Queued records are written this often
+JOURNAL_WRITE_INTERVAL_SECONDS = 1.0
+# Records beyond this many waiting to be written are dropped rather than growing memory
+JOURNAL_MAX_QUEUED_RECORDS = 10000
+
+REDACTED = "[REDACTED]"
+
+# Values under these keys are credentials, whatever they look like
+_SECRET_KEY = re.compile(
+    r"token|secret|password|authorization|api_?key|signature|cookie", re.IGNORECASE
+)
+# Credentials embedded in free text: Slack, OpenAI/Anthropic, GitHub and AWS keys, bearer tokens
+_SECRET_VALUE = re.compile(
+    r"xox[a-z]-[A-Za-z0-9-]+|xapp-[A-Za-z0-9-]+|sk-[A-Za-z0-9_-]{16,}|gh[pousr]_[A-Za-z0-9]{20,}"
+    r"|github_pat_[A-Za-z0-9_]{20,}|AKIA[0-9A-Z]{16}|[Bb]earer\s+[A-Za-z0-9._~+/=-]{8,}"
+)
+# With JOURNAL_REDACT=text, strings under these keys are kept: they identify, they do not say anything
+_STRUCTURAL_KEYS = {
+    "type",
+    "subtype",
+    "channel_type",
+    "command",
+    "callback_id",
+    "ts",
+    "thread_ts",
+    "event_ts",
+    "user",
+    "user_id",
+    "channel",
+    "channel_id",
+    "team",
+    "team_id",
+    "enterprise_id",
+    "api_app_id",
+    "bot_id",
+    "app_id",
+    "id",
+    "function_execution_id",
+}
+
+_current_request: contextvars.ContextVar[str | None] = contextvars.ContextVar(
+    "journal_request", default=None
+)
+_current_generation: contextvars.ContextVar[Optional["GenerationRecord"]] = (
+    contextvars.ContextVar("journal_generation", default=None)
+)
+
+
+def _truncate(text: str) -> str:
+    if len(text) <= JOURNAL_MAX_FIELD_CHARS:
+        return text
+    return (
+        text[:JOURNAL_MAX_FIELD_CHARS]
+        + f"[... {len(text) - JOURNAL_MAX_FIELD_CHARS} more characters]"
+    )
+
+
+def _mask(text: str) -> str:
+    # Same length and word boundaries, so token estimates of replayed prompts still hold
+    return re.sub(r"\S", "x", text)
+
+
+def redact(
+    value: Any, mode: str = JOURNAL_REDACT, mask_text: bool | None = None
+) -> Any:
+    """
+    Redact a value before it is journaled.
+
+    Args:
+        value: A string, or a JSON-like structure of dicts and lists
+        mode: "secrets" removes credentials; "text" also masks free text
+        mask_text: Whether plain strings are free text; by default they are in "text" mode
+
+    Returns:
+        The redacted copy, with long strings truncated
+    """
+    if mask_text is None:
+        mask_text = mode == "text"
+    if isinstance(value, dict):
+        redacted = {}
+        for key, item in value.items():
+            if _SECRET_KEY.search(str(key)) and isinstance(item, str):
+                redacted[key] = REDACTED
+            elif isinstance(item, str) and key in _STRUCTURAL_KEYS:
+                redacted[key] = redact(item, mode, False)
+            else:
+                redacted[key] = redact(item, mode, mask_text)
+        return redacted
+    if isinstance(value, (list, tuple)):
+        return [redact(item, mode, mask_text) for item in value]
+    if isinstance(value, str):
+        text = _mask(value) if mask_text else _SECRET_VALUE.sub(REDACTED, value)
+        return _truncate(text)
+    return value
+
+
+class Journal:
+    """Writes journal records from a background thread; the request thread only queues them."""
+
+    def __init__(
+        self,
+        path: str,
+        redact_mode: str = JOURNAL_REDACT,
+        sample_rate: float = JOURNAL_SAMPLE_RATE,
+    ):
+        self.path = path
+        self.redact_mode = redact_mode
+        self.sample_rate = sample_rate
+        self.enabled = bool(path)
+        self.dropped = 0
+        self.written = 0
+        self._queue: queue.Queue[dict] = queue.Queue(maxsize=JOURNAL_MAX_QUEUED_RECORDS)
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def write(self, record: dict):
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            return
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name="journal-writer", daemon=True
+                    )
+                    self._thread.start()
+
+    def flush(self):
+        """Write everything queued so far."""
+        if not self.enabled:
+            return
+        with self._write_lock:
+            records = []
+            while True:
+                try:
+                    records.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if records:
+                self._append(records)
+
+    def _append(self, records: list[dict]):
+        lines = "".join(
+            json.dumps(record, separators=(",", ":"), default=str) + "\n"
+            for record in records
+        )
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            opener = gzip.open if self.path.endswith(".gz") else open
+            with opener(self.path, "at") as file:
+                file.write(lines)
+            self.written += len(records)
+        except Exception as e:
+            logger.warning(f"Failed to write {len(records)} journal records: {e}")
+
+    def _run(self):
+        while True:
+            time.sleep(JOURNAL_WRITE_INTERVAL_SECONDS)
+            self.flush()
+
+
+_journal = Journal(JOURNAL_PATH)
+
+
+def get_journal() -> Journal:
+    return _journal
+
+
+def set_journal(journal: Journal):
+    """Replace the journal (e.g. to record a benchmark run); the current one is flushed first."""
+    global _journal
+    _journal.flush()
+    _journal = journal
+
+
+def current_request_id() -> str | None:
+    """Journal ID of the request the calling code runs in (the recorded ID while replaying)."""
+    return _current_request.get()
+
+
+@contextlib.contextmanager
+def use_request(request_id: str | None):
+    """Make `request_id` the current journaled request for the block."""
+    token = _current_request.set(request_id)
+    try:
+        yield request_id
+    finally:
+        _current_request.reset(token)
+
+
+def begin_request(kind: str, name: str, payload: dict[str, Any]) -> str | None:
+    """
+    Journal an incoming Slack request.
+
+    Args:
+        kind: "command", "event", "function" or "listener"
+        name: E.g. "/incident" or "app_mention"
+        payload: The command, event or function inputs, and the user/channel/team IDs
+
+    Returns:
+        The request's journal ID, or None when it is not recorded
+    """
+    journal = _journal
+    if not journal.enabled or (
+        journal.sample_rate < 1.0 and random.random() >= journal.sample_rate
+    ):
+        return None
+    request_id = secrets.token_hex(8)
+    journal.write(
+        {
+            "type": "request",
+            "id": request_id,
+            "at": time.time(),
+            "kind": kind,
+            "name": name,
+            "payload": redact(payload, journal.redact_mode),
+        }
+    )
+    return request_id
+
+
+def end_request(
+    request_id: str | None, duration_seconds: float, error: BaseException | None = None
+):
+    """Journal how long a recorded request took and whether it failed."""
+    if request_id is None:
+        return
+    _journal.write(
+        {
+            "type": "request_end",
+            "id": request_id,
+            "duration": round(duration_seconds, 6),
+            "status": "error" if error is not None else "ok",
+            "error": f"{type(error).__name__}: {error}" if error is not None else None,
+        }
+    )
+
+
+class GenerationRecord:
+    """Model requests and tool calls of one provider response, written when the response is done."""
+
+    def __init__(
+        self,
+        request_id: str,
+        provider: str,
+        model: str,
+        system_content: str,
+        prompt: str,
+    ):
+        self.request_id = request_id
+        self.provider = provider
+        self.model = model
+        self.system_content = system_content
+        self.prompt = prompt
+        self.response: str | None = None
+        self.calls: list[dict] = []
+        self.tools: list[dict] = []
+
+    def to_dict(
+        self, duration_seconds: float, error: BaseException | None, redact_mode: str
+    ) -> dict:
+        return {
+            "type": "generation",
+            "request": self.request_id,
+            "provider": self.provider,
+            "model": self.model,
+            "duration": round(duration_seconds, 6),
+            "status": "error" if error is not None else "ok",
+            "error": f"{type(error).__name__}: {error}" if error is not None else None,
+            "system": redact(self.system_content, redact_mode, redact_mode == "text"),
+            "system_chars": len(self.system_content),
+            "prompt": redact(self.prompt, redact_mode, redact_mode == "text"),
+            "prompt_chars": len(self.prompt),
+            "response": redact(self.response or "", redact_mode, redact_mode == "text"),
+            "response_chars": len(self.response or ""),
+            "calls": self.calls,
+            "tools": self.tools,
+        }
+
+
+@contextlib.contextmanager
+def record_generation(
+    provider: str, model: str, system_content: str, prompt: str
+) -> Iterator[GenerationRecord | None]:
+    """
+    Journal one provider response of the current request; set `.response` on the yielded record.
+
+    Yields None (and records nothing) outside a recorded request.
+    """
+    request_id = _current_request.get()
+    if request_id is None or not _journal.enabled:
+        yield None
+        return
+    generation = GenerationRecord(request_id, provider, model, system_content, prompt)
+    token = _current_generation.set(generation)
+    started_at = time.perf_counter()
+    error = None
+    try:
+        yield generation
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        _current_generation.reset(token)
+        _journal.write(
+            generation.to_dict(
+                time.perf_counter() - started_at, error, _journal.redact_mode
+            )
+        )
+
+
+def record_llm_call(
+    iteration: int,
+    duration_seconds: float,
+    input_tokens: int,
+    output_tokens: int,
+    error: BaseException | None = None,
+):
+    """Add one model request to the provider response being recorded, if any."""
+    generation = _current_generation.get()
+    if generation is None:
+        return
+    call = {
+        "iteration": iteration,
+        "duration": round(duration_seconds, 6),
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+    }
+    if error is not None:
+        call["error"] = f"{type(error).__name__}: {error}"
+    generation.calls.append(call)
+
+
+def record_tool_call(
+    tool: str,
+    arguments: dict,
+    result: str,
+    is_error: bool,
+    cached: bool,
+    duration_seconds: float,
+):
+    """Add one MCP tool call to the provider response being recorded, if any."""
+    generation = _current_generation.get()
+    if generation is None:
+        return
+    redact_mode = _journal.redact_mode
+    generation.tools.append(
+        {
+            # Number of model requests made before the call, i.e. the tool-use turn it answers
+            "after_call": len(generation.calls),
+            "tool": tool,
+            "arguments": redact(arguments, redact_mode),
+            "result": redact(result, redact_mode, redact_mode == "text"),
+            "result_chars": len(result),
+            "is_error": is_error,
+            "cached": cached,
+            "duration": round(duration_seconds, 6),
+        }
+    )
+
+
+def read_journal(path: str) -> Iterator[dict]:
+    """Iterate over the records of a journal file (plain or gzip-compressed)."""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt") as file:
+        for line in file:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def _register_metrics():
+    register_callback(
+        "journal_records_total",
+        "Journal records written",
+        lambda: _journal.written,
+        kind="counter",
+    )
+    register_callback(
+        "journal_records_dropped_total",
+        "Journal records dropped because the write queue was full",
+        lambda: _journal.dropped,
+        kind="counter",
+    )
+
+
+_register_metrics()
+atexit.register(lambda: _journal.flush())
@@ -0,0 +1,250 @@
+"""
+Non-blocking logging pipeline.
+
+Request threads only put log records on a queue; a single background thread formats
+them and writes them out (`logging.handlers.QueueListener`). On the way in, records
+get the current trace and span IDs, and DEBUG/INFO lines from one call site are
+sampled once they exceed LOG_SAMPLE_LIMIT per window, so a hot loop cannot flood the
+log. WARNING and above are never sampled.
+
+Configuration:
+    LOG_LEVEL: Root level (default INFO)
+    LOG_LEVELS: Per-logger levels, e.g. "slack_bolt=DEBUG,ai.augmentation=WARNING"
+    LOG_FORMAT: "text" (default) or "json" (one object per line)
+    LOG_FILE: Also append to this file (default: stderr only)
+    LOG_SAMPLE_LIMIT / LOG_SAMPLE_WINDOW_SECONDS: Lines per call site per window (0 disables sampling)
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+
+from .metrics import register_callback
+from .tracing import current_span
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+LOG_LEVELS = os.environ.get("LOG_LEVELS", "")
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "text")
+LOG_FILE = os.environ.get("LOG_FILE", "")
+LOG_SAMPLE_LIMIT = int(os.environ.get("LOG_SAMPLE_LIMIT", "20"))
+LOG_SAMPLE_WINDOW_SECONDS = float(os.environ.get("LOG_SAMPLE_WINDOW_SECONDS", "10"))
+
+# Records waiting to be written; beyond this, new records are dropped rather than blocking a request
+LOG_QUEUE_SIZE = 10000
+
+# Libraries that log every request/payload at DEBUG or INFO; LOG_LEVELS overrides these
+DEFAULT_LOGGER_LEVELS = {
+    "slack_sdk": "WARNING",
+    "urllib3": "WARNING",
+    "httpx": "WARNING",
+    "httpcore": "WARNING",
+    "openai": "WARNING",
+    "anthropic": "WARNING",
+    "chromadb": "WARNING",
+}
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s [%(threadName)s] %(message)s"
+
+# Attributes every LogRecord has; anything else was passed with `extra=` and goes into JSON output
+_STANDARD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {
+    "message",
+    "asctime",
+}
+
+
+def parse_levels(spec: str) -> dict[str, str]:
+    """Parse "logger=LEVEL,other.logger=LEVEL" into a dict."""
+    levels = {}
+    for entry in spec.split(","):
+        if "=" in entry:
+            name, level = entry.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+class TraceContextFilter(logging.Filter):
+    """Adds `trace_id` and `span_id` of the span the logging code runs in (empty outside a trace)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        span = current_span()
+        record.trace_id = span.trace_id if span is not None else ""
+        record.span_id = span.span_id if span is not None else ""
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Lets at most `limit` records below WARNING per call site through per window.
+
+    The first record let through after some were dropped says how many.
+    """
+
+    def __init__(
+        self,
+        limit: int = LOG_SAMPLE_LIMIT,
+        window_seconds: float = LOG_SAMPLE_WINDOW_SECONDS,
+    ):
+        super().__init__()
+        self.limit = limit
+        self.window_seconds = window_seconds
+        # (pathname, lineno) -> [window_start, emitted, suppressed]
+        self._sites: dict[tuple[str, int], list[float]] = {}
+        self._lock = threading.Lock()
+        self.suppressed = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.limit <= 0 or record.levelno >= logging.WARNING:
+            return True
+        now = time.monotonic()
+        site = (record.pathname, record.lineno)
+        with self._lock:
+            state = self._sites.get(site)
+            if state is None or now - state[0] >= self.window_seconds:
+                suppressed = int(state[2]) if state is not None else 0
+                self._sites[site] = [now, 1, 0]
+            elif state[1] < self.limit:
+                state[1] += 1
+                suppressed = 0
+            else:
+                state[2] += 1
+                self.suppressed += 1
+                return False
+        if suppressed:
+            record.msg = f"{record.msg} [{suppressed} similar lines suppressed]"
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, including `extra=` fields and the trace context."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRIBUTES and value not in ("", None):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Puts records on a bounded queue without formatting them; drops them when the queue is full."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The listener runs in this process, so the record (and its exc_info) is passed as is
+        # and formatted there; only %-style arguments are merged now, while they are unchanged
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener: logging.handlers.QueueListener | None = None
+_queue_handler: NonBlockingQueueHandler | None = None
+_sampling_filter: SamplingFilter | None = None
+_setup_lock = threading.Lock()
+
+
+def configure_logging(
+    level: str = LOG_LEVEL,
+    levels: str = LOG_LEVELS,
+    log_format: str = LOG_FORMAT,
+    log_file: str = LOG_FILE,
+) -> logging.handlers.QueueListener:
+    """
+    Route the root logger through the background log writer; calling it again is a no-op.
+
+    Args:
+        level: Root level
+        levels: Per-logger levels, see `parse_levels()`
+        log_format: "text" or "json"
+        log_file: Optional file to append to besides stderr
+
+    Returns:
+        The running QueueListener
+    """
+    global _listener, _queue_handler, _sampling_filter
+    with _setup_lock:
+        if _listener is not None:
+            return _listener
+
+        formatter = (
+            JsonFormatter() if log_format == "json" else logging.Formatter(TEXT_FORMAT)
+        )
+        handlers: list[logging.Handler] = [logging.StreamHandler()]
+        if log_file:
+            directory = os.path.dirname(log_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            handlers.append(logging.FileHandler(log_file))
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+        log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        _queue_handler = NonBlockingQueueHandler(log_queue)
+        _sampling_filter = SamplingFilter()
+        _queue_handler.addFilter(_sampling_filter)
+        _queue_handler.addFilter(TraceContextFilter())
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(_queue_handler)
+        root.setLevel(level.upper())
+        for name, logger_level in {
+            **DEFAULT_LOGGER_LEVELS,
+            **parse_levels(levels),
+        }.items():
+            logging.getLogger(name).setLevel(logger_level)
+
+        _listener = logging.handlers.QueueListener(
+            log_queue, *handlers, respect_handler_level=True
+        )
+        _listener.start()
+        # Write out what is still queued when the process exits
+        atexit.register(_listener.stop)
+        return _listener
+
+
+def _register_metrics():
+    register_callback(
+        "log_records_dropped_total",
+        "Log records dropped because the log queue was full",
+        lambda: _queue_handler.dropped if _queue_handler is not None else 0,
+        kind="counter",
+    )
+    register_callback(
+        "log_records_sampled_out_total",
+        "DEBUG/INFO log records dropped by per-call-site sampling",
+        lambda: _sampling_filter.suppressed if _sampling_filter is not None else 0,
+        kind="counter",
+    )
+    register_callback(
+        "log_queue_depth",
+        "Log records waiting to be written",
+        lambda: _queue_handler.queue.qsize() if _queue_handler is not None else 0,
+    )
+
+
+_register_metrics()
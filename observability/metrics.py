@@ -0,0 +1,401 @@
+"""
+In-process metrics.
+
+Counters, gauges and histograms with labels, rendered in the Prometheus text format
+by `render()` (served by `observability.metrics_server`). Recording is meant for the
+hot path: a labelled child is looked up in a dict and updated under its own lock, so
+concurrent requests only contend when they update the very same series.
+
+Values that modules already track (queue depth, cache hit counts) are exported with
+`register_callback()` and read only when metrics are scraped.
+
+`MetricsRegistry.get()` and `values()` give in-process readers (`observability.health`)
+the raw series without going through the text format.
+"""
+
+import bisect
+import math
+import threading
+import time
+from collections.abc import Callable, Iterator, Sequence
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from a Slack ack up to a long multi-tool LLM request
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    120.0,
+)
+# Token counts per LLM call
+TOKEN_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144)
+
+LabelValues = tuple[str, ...]
+# A callback returns one value, or label values -> value for a labelled metric
+CallbackResult = float | dict[LabelValues, float]
+
+
+class _Value:
+    __slots__ = ("_lock", "value")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class _HistogramValue:
+    __slots__ = ("_lock", "buckets", "counts", "sum")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        # One slot per bucket plus +Inf; made cumulative only when rendered
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        """Observe the duration of the block in seconds."""
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started_at)
+
+    def snapshot(self) -> tuple[list[int], float]:
+        with self._lock:
+            return list(self.counts), self.sum
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[LabelValues, object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, **labels: object):
+        """Return the series for these label values, creating it on first use."""
+        key = tuple([labels[name] for name in self.labelnames])
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _unlabelled(self):
+        if self.labelnames:
+            raise ValueError(f"{self.name} needs labels {self.labelnames}")
+        return self.labels()
+
+    def _new_child(self):
+        raise NotImplementedError()
+
+    def samples(self) -> Iterator[tuple[str, dict[str, str], float]]:
+        raise NotImplementedError()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1.0):
+        self._unlabelled().inc(amount)
+
+    def values(self) -> dict[LabelValues, float]:
+        """Label values -> current value of every series."""
+        return {key: child.value for key, child in list(self._children.items())}
+
+    def samples(self):
+        for key, child in list(self._children.items()):
+            yield self.name, dict(zip(self.labelnames, key)), child.value
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float):
+        self._unlabelled().set(value)
+
+    def dec(self, amount: float = 1.0):
+        self._unlabelled().dec(amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramValue:
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self._unlabelled().observe(value)
+
+    def time(self):
+        return self._unlabelled().time()
+
+    def values(self) -> dict[LabelValues, tuple[list[int], float]]:
+        """Label values -> (per-bucket counts including +Inf, sum) of every series."""
+        return {key: child.snapshot() for key, child in list(self._children.items())}
+
+    def samples(self):
+        for key, child in list(self._children.items()):
+            labels = dict(zip(self.labelnames, key))
+            counts, total = child.snapshot()
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                yield (
+                    f"{self.name}_bucket",
+                    {**labels, "le": _format_value(bound)},
+                    cumulative,
+                )
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, cumulative
+
+
+class _CallbackMetric(_Metric):
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        kind: str,
+        callback: Callable[[], CallbackResult],
+        labelnames: Sequence[str],
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.kind = kind
+        self.callback = callback
+
+    def values(self) -> dict[LabelValues, float]:
+        result = self.callback()
+        return dict(result) if isinstance(result, dict) else {(): result}
+
+    def samples(self):
+        result = self.callback()
+        if isinstance(result, dict):
+            for key, value in result.items():
+                yield self.name, dict(zip(self.labelnames, key)), value
+        else:
+            yield self.name, {}, result
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def get_or_create(self, metric: _Metric) -> _Metric:
+        """Register a metric; a metric registered earlier under the same name is returned instead."""
+        with self._lock:
+            existing = self._metrics.setdefault(metric.name, metric)
+        if (
+            type(existing) is not type(metric)
+            or existing.labelnames != metric.labelnames
+        ):
+            raise ValueError(
+                f"Metric {metric.name} is already registered with a different type or labels"
+            )
+        return existing
+
+    def replace(self, metric: _Metric):
+        with self._lock:
+            self._metrics[metric.name] = metric
+
+    def get(self, name: str) -> _Metric | None:
+        """The metric registered under `name`, if any."""
+        with self._lock:
+            return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines = []
+        for metric in metrics:
+            try:
+                samples = list(metric.samples())
+            except Exception as e:
+                lines.append(f"# {metric.name} unavailable: {type(e).__name__}")
+                continue
+            lines.append(f"# HELP {metric.name} {_escape_help(metric.documentation)}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in samples:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _escape_label_value(value: object) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return (
+        "{"
+        + ",".join(
+            f'{name}="{_escape_label_value(value)}"' for name, value in labels.items()
+        )
+        + "}"
+    )
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+REGISTRY = MetricsRegistry()
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    return REGISTRY.get_or_create(Counter(name, documentation, labelnames))
+
+
+def gauge(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+    return REGISTRY.get_or_create(Gauge(name, documentation, labelnames))
+
+
+def histogram(
+    name: str,
+    documentation: str,
+    labelnames: Sequence[str] = (),
+    buckets: Sequence[float] = DEFAULT_BUCKETS,
+) -> Histogram:
+    return REGISTRY.get_or_create(Histogram(name, documentation, labelnames, buckets))
+
+
+def register_callback(
+    name: str,
+    documentation: str,
+    callback: Callable[[], CallbackResult],
+    kind: str = "gauge",
+    labelnames: Sequence[str] = (),
+):
+    """
+    Export a value that is computed when metrics are scraped.
+
+    Args:
+        name: Metric name
+        documentation: HELP text
+        callback: Returns the value, or label values -> value when `labelnames` is given
+        kind: "gauge" or "counter" (for monotonic totals kept elsewhere)
+        labelnames: Label names matching the tuples returned by the callback
+
+    A later registration under the same name replaces the earlier one.
+    """
+    REGISTRY.replace(_CallbackMetric(name, documentation, kind, callback, labelnames))
+
+
+# Cache name -> function returning the cache object (None until it exists)
+_caches: dict[str, Callable[[], object]] = {}
+
+
+def _cache_requests() -> dict[LabelValues, float]:
+    values = {}
+    for name, get_cache in list(_caches.items()):
+        cache = get_cache()
+        if cache is not None:
+            values[(name, "hit")] = cache.hits
+            values[(name, "miss")] = cache.misses
+    return values
+
+
+def register_cache(name: str, get_cache: Callable[[], object]):
+    """
+    Export the `hits` and `misses` counts a cache keeps as `cache_requests_total{cache=name}`.
+
+    Args:
+        name: Cache label, e.g. "conversation"
+        get_cache: Returns the cache object, or None while it has not been created
+    """
+    _caches[name] = get_cache
+    register_callback(
+        "cache_requests_total",
+        "Cache lookups by cache and result",
+        _cache_requests,
+        kind="counter",
+        labelnames=("cache", "result"),
+    )
+
+
+def histogram_quantile(
+    quantile: float, buckets: Sequence[float], counts: Sequence[int]
+) -> float | None:
+    """
+    Estimate a quantile from per-bucket counts, interpolating linearly within the bucket (as Prometheus does).
+
+    Args:
+        quantile: Between 0 and 1, e.g. 0.95
+        buckets: Upper bounds of the finite buckets
+        counts: Observations per bucket, with the +Inf bucket last
+
+    Returns:
+        The estimate (the largest finite bound if it falls in the +Inf bucket), or None without observations
+    """
+    total = sum(counts)
+    if total <= 0:
+        return None
+    rank = quantile * total
+    cumulative = 0
+    for index, count in enumerate(counts):
+        if count and cumulative + count >= rank:
+            if index >= len(buckets):
+                return buckets[-1]
+            lower = buckets[index - 1] if index > 0 else 0.0
+            return lower + (buckets[index] - lower) * (rank - cumulative) / count
+        cumulative += count
+    return buckets[-1]
+
+
+def render() -> str:
+    return REGISTRY.render()
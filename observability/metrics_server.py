@@ -0,0 +1,89 @@
+"""
+HTTP endpoint for scraping metrics.
+
+Serves `GET /metrics` in the Prometheus text format from a daemon thread, next to the
+Socket Mode handler or the OAuth app's own HTTP server. Disabled unless METRICS_PORT is set.
+
+Usage:
+    METRICS_PORT=9464 python3 app.py
+    curl -s http://127.0.0.1:9464/metrics
+"""
+
+import logging
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .metrics import render
+
+logger = logging.getLogger(__name__)
+
+METRICS_PORT = os.environ.get("METRICS_PORT", "")
+# Loopback by default; set to 0.0.0.0 to let a Prometheus server on another host scrape it
+METRICS_HOST = os.environ.get("METRICS_HOST", "127.0.0.1")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def start(self) -> "MetricsServer":
+        threading.Thread(
+            target=self.serve_forever, name="metrics-server", daemon=True
+        ).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+_metrics_server: MetricsServer | None = None
+_metrics_server_lock = threading.Lock()
+
+
+def start_metrics_server(
+    port: int | None = None, host: str = METRICS_HOST
+) -> MetricsServer | None:
+    """
+    Start the metrics endpoint once per process.
+
+    Args:
+        port: Port to listen on; defaults to METRICS_PORT (0 picks a free port)
+        host: Interface to bind
+
+    Returns:
+        The running server, or None when no port is configured
+    """
+    global _metrics_server
+    if port is None:
+        if not METRICS_PORT:
+            return None
+        port = int(METRICS_PORT)
+    with _metrics_server_lock:
+        if _metrics_server is None:
+            _metrics_server = MetricsServer((host, port), _Handler).start()
+            logger.info(f"Serving metrics at {_metrics_server.url}")
+        return _metrics_server
@@ -0,0 +1,280 @@
+"""
+On-demand sampling profiler.
+
+While a profile runs, a daemon thread reads the stack of every other thread with
+`sys._current_frames()` every PROFILE_INTERVAL_MS and counts identical stacks. Nothing is
+sampled, and no thread exists, until a profile is started, so the profiler costs nothing
+while it is off. Samples are wall-clock: threads blocked on a socket or a queue show up
+too, under the call they are blocked in, which is what a slow (rather than busy) bot needs.
+
+A profile is started by:
+- sending PROFILE_SIGNAL (default SIGUSR2) to the process: `kill -USR2 <pid>`
+- the `/profile [seconds]` slash command, for users listed in ADMIN_USER_IDS
+
+and written under PROFILE_DIR as:
+- `<timestamp>.speedscope.json`: one sampled profile per thread, for https://www.speedscope.app
+- `<timestamp>.collapsed`: "thread;frame;frame count" lines for flamegraph.pl (or speedscope)
+
+Configuration:
+    PROFILE_DIR: Output directory (default ./data/profiles)
+    PROFILE_INTERVAL_MS: Milliseconds between samples (default 10)
+    PROFILE_SECONDS: Duration of a signal-triggered profile (default 30)
+    PROFILE_MAX_SECONDS: Longest profile that can be requested (default 300)
+    PROFILE_SIGNAL: Signal that starts a profile; empty to not install a handler (default SIGUSR2)
+"""
+
+import json
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable
+
+from .metrics import counter
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "./data/profiles")
+PROFILE_INTERVAL_MS = float(os.environ.get("PROFILE_INTERVAL_MS", "10"))
+PROFILE_SECONDS = float(os.environ.get("PROFILE_SECONDS", "30"))
+PROFILE_MAX_SECONDS = float(os.environ.get("PROFILE_MAX_SECONDS", "300"))
+PROFILE_SIGNAL = os.environ.get("PROFILE_SIGNAL", "SIGUSR2")
+
+# Deeper stacks are cut at the root end; listener stacks are far shallower
+MAX_STACK_DEPTH = 128
+
+PROFILES = counter(
+    "profiles_total", "Sampling profiles by how they were started", ("trigger",)
+)
+
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _short_path(filename: str) -> str:
+    """Path relative to the repository or to the site-packages directory it is installed in."""
+    if filename.startswith(_REPO_ROOT + os.sep):
+        return filename[len(_REPO_ROOT) + 1 :]
+    marker = f"{os.sep}site-packages{os.sep}"
+    if marker in filename:
+        return filename.split(marker, 1)[1]
+    return os.path.basename(filename)
+
+
+class Profile:
+    """One sampling run: collects stacks on its own thread, then writes the output files."""
+
+    def __init__(
+        self,
+        seconds: float,
+        interval: float,
+        trigger: str,
+        on_complete: Callable | None = None,
+    ):
+        self.seconds = seconds
+        self.interval = interval
+        self.trigger = trigger
+        self.on_complete = on_complete
+        self.started_at = time.time()
+        self.path = os.path.join(
+            PROFILE_DIR, time.strftime("%Y%m%d-%H%M%S", time.localtime(self.started_at))
+        )
+        self.samples = 0
+        self.error: BaseException | None = None
+        # (thread name, stack from the root) -> samples
+        self.stacks: Counter = Counter()
+        # thread ID -> (thread name, the stack seen at each sample), for speedscope's time-ordered view
+        self.timelines: dict[int, tuple[str, list[tuple[int, ...]]]] = {}
+        self._frame_ids: dict[object, int] = {}
+        self._frames: list[dict] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="sampling-profiler", daemon=True
+        )
+
+    @property
+    def running(self) -> bool:
+        return self._thread.is_alive()
+
+    def start(self) -> "Profile":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """End the profile early; the files are still written."""
+        self._stop.set()
+
+    def wait(self, timeout: float | None = None):
+        self._thread.join(timeout)
+
+    def _frame_id(self, code) -> int:
+        frame_id = self._frame_ids.get(code)
+        if frame_id is None:
+            frame_id = self._frame_ids[code] = len(self._frames)
+            self._frames.append(
+                {
+                    "name": code.co_qualname,
+                    "file": _short_path(code.co_filename),
+                    "line": code.co_firstlineno,
+                }
+            )
+        return frame_id
+
+    def _sample(self, names: dict[int, str]):
+        own_id = threading.get_ident()
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            stack = []
+            while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                stack.append(self._frame_id(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()
+            name = names.get(thread_id) or f"thread-{thread_id}"
+            stack = tuple(stack)
+            self.stacks[(name, stack)] += 1
+            self.timelines.setdefault(thread_id, (name, []))[1].append(stack)
+        self.samples += 1
+
+    def _run(self):
+        deadline = time.monotonic() + self.seconds
+        try:
+            names: dict[int, str] = {}
+            next_at = time.monotonic()
+            while not self._stop.is_set() and next_at < deadline:
+                # Thread names only change as workers start; refresh them once a second, not per sample
+                if self.samples % max(1, int(1 / self.interval)) == 0:
+                    names = {
+                        thread.ident: thread.name for thread in threading.enumerate()
+                    }
+                self._sample(names)
+                next_at += self.interval
+                self._stop.wait(max(0.0, next_at - time.monotonic()))
+            self.write()
+            logger.info(
+                f"Profile of {self.samples} samples written to {self.path}.speedscope.json"
+            )
+        except Exception as e:
+            self.error = e
+            logger.error(f"Profiling failed: {e}")
+        if self.on_complete is not None:
+            try:
+                self.on_complete(self)
+            except Exception as e:
+                logger.error(f"Profile completion callback failed: {e}")
+
+    def collapsed(self) -> list[str]:
+        """Stacks in the collapsed format: "thread;outermost;...;innermost count"."""
+        lines = []
+        for (name, stack), count in sorted(
+            self.stacks.items(), key=lambda item: -item[1]
+        ):
+            frames = [
+                f"{self._frames[i]['name']} ({self._frames[i]['file']})" for i in stack
+            ]
+            lines.append(f"{';'.join([name] + frames)} {count}")
+        return lines
+
+    def speedscope(self) -> dict:
+        """The profile in speedscope's file format: one "sampled" profile per thread."""
+        interval_ms = self.interval * 1000
+        profiles = []
+        for name, stacks in sorted(
+            self.timelines.values(), key=lambda timeline: timeline[0]
+        ):
+            profiles.append(
+                {
+                    "type": "sampled",
+                    "name": name,
+                    "unit": "milliseconds",
+                    "startValue": 0,
+                    "endValue": len(stacks) * interval_ms,
+                    "samples": [list(stack) for stack in stacks],
+                    "weights": [interval_ms] * len(stacks),
+                }
+            )
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": self._frames},
+            "profiles": profiles,
+            "name": f"on-call-agent {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.started_at))}",
+            "exporter": "observability.profiler",
+        }
+
+    def write(self):
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        with open(f"{self.path}.collapsed", "w") as file:
+            file.write("\n".join(self.collapsed()) + "\n")
+        with open(f"{self.path}.speedscope.json", "w") as file:
+            json.dump(self.speedscope(), file)
+
+
+_active: Profile | None = None
+_active_lock = threading.Lock()
+
+
+def start_profile(
+    seconds: float | None = None,
+    trigger: str = "api",
+    on_complete: Callable[[Profile], None] | None = None,
+    interval: float | None = None,
+) -> Profile | None:
+    """
+    Start a profile unless one is already running.
+
+    Args:
+        seconds: How long to sample (default PROFILE_SECONDS, capped at PROFILE_MAX_SECONDS)
+        trigger: What started it, for the profiles_total metric ("signal", "command", ...)
+        on_complete: Called with the profile on the profiler thread once its files are written
+        interval: Seconds between samples (default PROFILE_INTERVAL_MS)
+
+    Returns:
+        The started profile, or None if another profile is still running
+    """
+    global _active
+    seconds = min(PROFILE_SECONDS if seconds is None else seconds, PROFILE_MAX_SECONDS)
+    interval = PROFILE_INTERVAL_MS / 1000 if interval is None else interval
+    with _active_lock:
+        if _active is not None and _active.running:
+            return None
+        _active = Profile(seconds, interval, trigger, on_complete).start()
+    PROFILES.labels(trigger=trigger).inc()
+    logger.info(
+        f"Sampling all threads every {interval * 1000:g}ms for {seconds:g}s ({trigger})"
+    )
+    return _active
+
+
+def active_profile() -> Profile | None:
+    """The running profile, if any."""
+    with _active_lock:
+        return _active if _active is not None and _active.running else None
+
+
+def _on_signal(signum, frame):
+    if start_profile(trigger="signal") is None:
+        logger.warning("Profile requested by signal while one is already running")
+
+
+def install_signal_handler(signal_name: str = PROFILE_SIGNAL) -> bool:
+    """
+    Start a profile whenever the process receives `signal_name` (must run on the main thread).
+
+    Returns:
+        True if the handler was installed
+    """
+    if not signal_name:
+        return False
+    signum = getattr(signal, signal_name, None)
+    if signum is None:
+        logger.warning(
+            f"PROFILE_SIGNAL {signal_name} is not available on this platform"
+        )
+        return False
+    signal.signal(signum, _on_signal)
+    logger.info(
+        f"Send {signal_name} to pid {os.getpid()} to profile for {PROFILE_SECONDS:g}s"
+    )
+    return True
@@ -0,0 +1,96 @@
+"""
+Per-stage latency breakdown of traced requests.
+
+Groups the spans of a JSONL trace file by trace, keeps the traces whose root span
+matches (e.g. every `/incident` command), and reports for each stage how often it
+occurs and its total time per request at p50/p95/max.
+
+Usage:
+    python -m observability.trace_report data/traces.jsonl --root "/incident"
+"""
+
+import argparse
+import json
+from collections import defaultdict
+from collections.abc import Iterable
+
+
+def load_spans(path: str) -> list[dict]:
+    with open(path, "r") as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def _percentile(sorted_values: list[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[
+        min(len(sorted_values) - 1, int(len(sorted_values) * fraction))
+    ]
+
+
+def stage_breakdown(spans: Iterable[dict], root_filter: str = "") -> dict[str, dict]:
+    """
+    Summarize stage latencies per request.
+
+    Args:
+        spans: Flat span dicts as written by the JSONL exporter or the local collector
+        root_filter: Only traces whose root span name contains this text
+
+    Returns:
+        Stage name -> {"requests", "calls", "p50_ms", "p95_ms", "max_ms"}; a stage's time
+        per request is the sum of its spans in that request. The root itself is reported
+        under its own name.
+    """
+    traces: dict[str, list[dict]] = defaultdict(list)
+    for span in spans:
+        traces[span["trace_id"]].append(span)
+
+    per_stage: dict[str, list[float]] = defaultdict(list)
+    calls: dict[str, int] = defaultdict(int)
+    for trace in traces.values():
+        roots = [span for span in trace if not span["parent_id"]]
+        if not roots or root_filter not in roots[0]["name"]:
+            continue
+        totals: dict[str, float] = defaultdict(float)
+        for span in trace:
+            totals[span["name"]] += span["duration_ms"]
+            calls[span["name"]] += 1
+        for name, total in totals.items():
+            per_stage[name].append(total)
+
+    report = {}
+    for name, values in per_stage.items():
+        values.sort()
+        report[name] = {
+            "requests": len(values),
+            "calls": calls[name],
+            "p50_ms": _percentile(values, 0.50),
+            "p95_ms": _percentile(values, 0.95),
+            "max_ms": values[-1],
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("path", help="JSONL trace file")
+    parser.add_argument(
+        "--root",
+        default="",
+        help='Only requests whose root span contains this, e.g. "/incident"',
+    )
+    args = parser.parse_args()
+
+    report = stage_breakdown(load_spans(args.path), args.root)
+    print(
+        f"{'stage':<32}{'requests':>10}{'calls':>8}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}"
+    )
+    for name, stats in sorted(report.items(), key=lambda item: -item[1]["p50_ms"]):
+        print(
+            f"{name:<32}{stats['requests']:>10}{stats['calls']:>8}"
+            f"{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['max_ms']:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""
+In-process tracing.
+
+A span records one stage of a request (Slack ack, history fetch, retrieval, an LLM
+call, a tool call, a Slack update) with its start/end time, attributes and parent.
+The current span is kept in a context variable, so children link to it across
+`await`, `asyncio.to_thread()` and the shared provider loop; work handed to other
+threads passes its parent explicitly (see `start_span(parent=...)`).
+
+Finished spans are exported in batches by a background thread, never by the
+request thread. With TRACE_EXPORTER unset, spans are no-ops.
+"""
+
+import atexit
+import contextlib
+import contextvars
+import logging
+import os
+import queue
+import secrets
+import threading
+import time
+from typing import Any, Optional
+
+from .exporters import SpanExporter, create_exporter
+
+logger = logging.getLogger(__name__)
+
+# "" (disabled), "jsonl" (TRACE_JSONL_PATH) or "otlp" (TRACE_OTLP_ENDPOINT)
+TRACE_EXPORTER = os.environ.get("TRACE_EXPORTER", "")
+
+# Finished spans are exported in batches this often
+TRACE_EXPORT_INTERVAL_SECONDS = float(
+    os.environ.get("TRACE_EXPORT_INTERVAL_SECONDS", "1.0")
+)
+TRACE_EXPORT_BATCH_SIZE = 512
+# Spans beyond this many waiting for export are dropped rather than growing memory
+TRACE_MAX_QUEUED_SPANS = 10000
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar(
+    "current_span", default=None
+)
+
+# Sentinel for "use the current span as parent"
+_CURRENT = object()
+
+
+class Span:
+    """One timed stage of a request. Use as a context manager to make it the current span."""
+
+    __slots__ = (
+        "_token",
+        "attributes",
+        "end_ns",
+        "error",
+        "name",
+        "parent_id",
+        "span_id",
+        "start_ns",
+        "trace_id",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        parent_id: str | None,
+        attributes: dict[str, Any],
+    ):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns: int | None = None
+        self.attributes = attributes
+        self.error: str | None = None
+        self._token = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes: Any):
+        self.attributes.update(attributes)
+
+    def record_error(self, error: BaseException):
+        self.error = f"{type(error).__name__}: {error}"
+
+    def end(self):
+        """Finish the span and queue it for export; ending twice is a no-op."""
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            _processor.on_end(self)
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start_ns / 1e9,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "status": "error" if self.error else "ok",
+            "error": self.error,
+        }
+
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.record_error(exc)
+        _current_span.reset(self._token)
+        self.end()
+        return False
+
+
+class _NoopSpan(Span):
+    """Returned while tracing is disabled; keeps call sites free of `if enabled` checks."""
+
+    def __init__(self):
+        super().__init__("noop", "0" * 32, None, {})
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def set_attributes(self, **attributes: Any):
+        pass
+
+    def record_error(self, error: BaseException):
+        pass
+
+    def end(self):
+        pass
+
+    def __enter__(self) -> "Span":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def start_span(name: str, parent: Any = _CURRENT, **attributes: Any) -> Span:
+    """
+    Start a span.
+
+    Args:
+        name: Stage name, e.g. "llm.call" or "slack.chat_update"
+        parent: Parent span; defaults to the current span, None starts a new trace
+        **attributes: Initial attributes
+
+    Returns:
+        The started span; end it with `end()` or use it as a context manager
+    """
+    if not _processor.enabled:
+        return NOOP_SPAN
+    if parent is _CURRENT:
+        parent = _current_span.get()
+    if parent is None or parent is NOOP_SPAN:
+        return Span(name, secrets.token_hex(16), None, attributes)
+    return Span(name, parent.trace_id, parent.span_id, attributes)
+
+
+def current_span() -> Span | None:
+    """The span the calling code runs in, if any."""
+    return _current_span.get()
+
+
+@contextlib.contextmanager
+def use_span(span: Span):
+    """Make `span` the current span for the block without ending it afterwards."""
+    token = _current_span.set(span)
+    try:
+        yield span
+    finally:
+        _current_span.reset(token)
+
+
+class _BatchSpanProcessor:
+    """Queues finished spans and exports them from a background thread."""
+
+    def __init__(self, exporter: SpanExporter | None):
+        self.exporter = exporter
+        self.enabled = exporter is not None
+        self.dropped = 0
+        self._queue: queue.Queue[Span] = queue.Queue(maxsize=TRACE_MAX_QUEUED_SPANS)
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._export_lock = threading.Lock()
+
+    def on_end(self, span: Span):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+            return
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name="trace-exporter", daemon=True
+                    )
+                    self._thread.start()
+
+    def flush(self):
+        """Export everything queued so far."""
+        if not self.enabled:
+            return
+        # Serialized, so a flush returns only after the background export in progress is written
+        with self._export_lock:
+            batch = self._drain()
+            while batch:
+                self._export(batch)
+                batch = self._drain()
+
+    def _drain(self) -> list[Span]:
+        batch = []
+        while len(batch) < TRACE_EXPORT_BATCH_SIZE:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            time.sleep(TRACE_EXPORT_INTERVAL_SECONDS)
+            self.flush()
+
+    def _export(self, spans: list[Span]):
+        if not spans:
+            return
+        try:
+            self.exporter.export([span.to_dict() for span in spans])
+        except Exception as e:
+            logger.warning(f"Failed to export {len(spans)} spans: {e}")
+
+
+_processor = _BatchSpanProcessor(create_exporter(TRACE_EXPORTER))
+
+
+def set_exporter(exporter: SpanExporter | None):
+    """Replace the exporter (None disables tracing); used by tools and benchmarks."""
+    global _processor
+    _processor.flush()
+    _processor = _BatchSpanProcessor(exporter)
+
+
+def flush():
+    """Export every finished span now."""
+    _processor.flush()
+
+
+atexit.register(flush)
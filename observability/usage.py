@@ -0,0 +1,291 @@
+"""
+Token usage and cost accounting.
+
+Every model request (`BaseAPIProvider._llm_call`) and every response handed to a listener
+(`ai.providers.aget_provider_response`) is added to hourly totals keyed by
+(user, command, provider, model, cache status). Totals are kept in memory and merged into a
+SQLite table by a background thread every USAGE_FLUSH_SECONDS, so recording costs a dict
+update on the request path. The command comes from the listener wrappers
+(`use_usage_attribution`), and the cache status from the response cache:
+- uncached: the request cannot be cached (conversation context or MCP tools)
+- miss: the response was generated and cached
+- hit: the response came from the cache (or an identical in-flight request); no tokens spent
+
+Cost is computed from the USD prices per million tokens in each provider's `MODELS`
+("input_price", "output_price"); models without prices count zero. Read the totals with
+`python -m observability.usage_report`.
+
+Configuration:
+    USAGE_DB_PATH: SQLite database (default ./data/usage.sqlite3; empty disables accounting)
+    USAGE_FLUSH_SECONDS: Seconds between merges into the database (default 10)
+"""
+
+import atexit
+import contextvars
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+USAGE_DB_PATH = os.environ.get("USAGE_DB_PATH", "./data/usage.sqlite3")
+USAGE_FLUSH_SECONDS = float(os.environ.get("USAGE_FLUSH_SECONDS", "10"))
+
+BUCKET_SECONDS = 3600
+
+# Columns usage can be grouped by, in key order
+GROUP_COLUMNS = ("user_id", "command", "provider", "model", "cache")
+# Summed columns, in the order `_Totals` keeps them
+VALUE_COLUMNS = (
+    "requests",
+    "calls",
+    "errors",
+    "input_tokens",
+    "output_tokens",
+    "cost_usd",
+    "llm_seconds",
+    "request_seconds",
+)
+
+_CREATE_TABLE = (
+    "CREATE TABLE IF NOT EXISTS usage (hour INTEGER NOT NULL, user_id TEXT NOT NULL, command TEXT NOT NULL, "
+    "provider TEXT NOT NULL, model TEXT NOT NULL, cache TEXT NOT NULL, requests INTEGER NOT NULL, "
+    "calls INTEGER NOT NULL, errors INTEGER NOT NULL, input_tokens INTEGER NOT NULL, "
+    "output_tokens INTEGER NOT NULL, cost_usd REAL NOT NULL, llm_seconds REAL NOT NULL, "
+    "request_seconds REAL NOT NULL, PRIMARY KEY (hour, user_id, command, provider, model, cache))"
+)
+_UPSERT = (
+    f"INSERT INTO usage (hour, {', '.join(GROUP_COLUMNS)}, {', '.join(VALUE_COLUMNS)}) "
+    f"VALUES ({', '.join('?' * (1 + len(GROUP_COLUMNS) + len(VALUE_COLUMNS)))}) "
+    f"ON CONFLICT(hour, {', '.join(GROUP_COLUMNS)}) DO UPDATE SET "
+    + ", ".join(f"{column} = {column} + excluded.{column}" for column in VALUE_COLUMNS)
+)
+
+_command: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "usage_command", default=""
+)
+_user_id: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "usage_user_id", default=""
+)
+_cache: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "usage_cache", default="uncached"
+)
+
+# (hour, user_id, command, provider, model, cache)
+_Key = tuple[int, str, str, str, str, str]
+
+
+@contextmanager
+def use_usage_attribution(
+    command: str | None = None, user_id: str | None = None, cache: str | None = None
+):
+    """Attribute the usage recorded in the block to a command, user and/or cache status."""
+    tokens = [
+        (var, var.set(value))
+        for var, value in ((_command, command), (_user_id, user_id), (_cache, cache))
+        if value is not None
+    ]
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+def model_cost(model_info: dict, input_tokens: int, output_tokens: int) -> float:
+    """USD cost of a request from the per-million-token prices in a provider's `MODELS` entry."""
+    return (
+        input_tokens * model_info.get("input_price", 0.0)
+        + output_tokens * model_info.get("output_price", 0.0)
+    ) / 1_000_000
+
+
+class UsageLedger:
+    """Hourly usage totals, aggregated in memory and merged into SQLite by a writer thread."""
+
+    def __init__(self, db_path: str, flush_seconds: float = USAGE_FLUSH_SECONDS):
+        self.db_path = db_path
+        self.flush_seconds = flush_seconds
+        self._pending: dict[_Key, list[float]] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._writer: threading.Thread | None = None
+
+    def _add(self, provider: str, model: str, values: dict[str, float]):
+        key = (
+            int(time.time() // BUCKET_SECONDS * BUCKET_SECONDS),
+            _user_id.get() or "unknown",
+            _command.get() or "other",
+            provider,
+            model,
+            _cache.get(),
+        )
+        with self._lock:
+            totals = self._pending.get(key)
+            if totals is None:
+                totals = self._pending[key] = [0] * len(VALUE_COLUMNS)
+            for index, column in enumerate(VALUE_COLUMNS):
+                totals[index] += values.get(column, 0)
+            if self._writer is None:
+                self._writer = threading.Thread(
+                    target=self._write_loop, name="usage-writer", daemon=True
+                )
+                self._writer.start()
+                # Merge the last totals on interpreter shutdown
+                atexit.register(self.flush)
+
+    def record_call(
+        self,
+        provider: str,
+        model: str,
+        input_tokens: int,
+        output_tokens: int,
+        seconds: float,
+        cost_usd: float,
+        error: bool = False,
+    ):
+        """Add one model request."""
+        self._add(
+            provider,
+            model,
+            {
+                "calls": 1,
+                "errors": int(error),
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "cost_usd": cost_usd,
+                "llm_seconds": seconds,
+            },
+        )
+
+    def record_request(self, provider: str, model: str, seconds: float):
+        """Add one response handed to a listener; `seconds` includes rate-limit waits and cache lookups."""
+        self._add(provider, model, {"requests": 1, "request_seconds": seconds})
+
+    def _connection(self) -> sqlite3.Connection:
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(_CREATE_TABLE)
+        return conn
+
+    def flush(self):
+        """Merge the totals recorded so far into the database."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return
+            try:
+                conn = self._connection()
+                try:
+                    with conn:
+                        conn.executemany(
+                            _UPSERT,
+                            [key + tuple(totals) for key, totals in batch.items()],
+                        )
+                finally:
+                    conn.close()
+            except sqlite3.Error as e:
+                logger.error(
+                    f"Failed to write {len(batch)} usage rows to {self.db_path}: {e}"
+                )
+                # Merge them back so they are retried with the next batch
+                with self._lock:
+                    for key, totals in batch.items():
+                        pending = self._pending.setdefault(
+                            key, [0] * len(VALUE_COLUMNS)
+                        )
+                        for index, value in enumerate(totals):
+                            pending[index] += value
+
+    def _write_loop(self):
+        while True:
+            time.sleep(self.flush_seconds)
+            self.flush()
+
+
+def query_usage(
+    db_path: str = USAGE_DB_PATH,
+    since: float = 0.0,
+    group_by: tuple[str, ...] = ("command", "model"),
+) -> list[dict]:
+    """
+    Usage totals from the database, grouped and sorted by cost then tokens.
+
+    Args:
+        db_path: Database written by the ledger
+        since: Unix time; hours that started before it are left out
+        group_by: Any of GROUP_COLUMNS
+
+    Returns:
+        One dict per group with the group columns and every VALUE_COLUMNS total
+    """
+    unknown = set(group_by) - set(GROUP_COLUMNS)
+    if unknown:
+        raise ValueError(f"Cannot group usage by {sorted(unknown)}")
+    if not os.path.exists(db_path):
+        return []
+    columns = list(group_by)
+    sums = ", ".join(f"SUM({column})" for column in VALUE_COLUMNS)
+    group = f"GROUP BY {', '.join(columns)}" if columns else ""
+    query = (
+        f"SELECT {', '.join(columns + [sums])} FROM usage WHERE hour >= ? {group} "
+        "ORDER BY SUM(cost_usd) DESC, SUM(input_tokens) + SUM(output_tokens) DESC"
+    )
+    conn = sqlite3.connect(db_path, timeout=10)
+    try:
+        rows = conn.execute(
+            query, (int(since // BUCKET_SECONDS * BUCKET_SECONDS),)
+        ).fetchall()
+    except sqlite3.OperationalError:
+        # Nothing recorded yet
+        return []
+    finally:
+        conn.close()
+    return [
+        dict(zip(columns + list(VALUE_COLUMNS), row))
+        for row in rows
+        if row[len(columns)] is not None
+    ]
+
+
+_ledger: UsageLedger | None = UsageLedger(USAGE_DB_PATH) if USAGE_DB_PATH else None
+
+
+def get_usage_ledger() -> UsageLedger | None:
+    """The process-wide ledger, or None when USAGE_DB_PATH is empty."""
+    return _ledger
+
+
+def set_usage_ledger(ledger: UsageLedger | None):
+    """Replace the process-wide ledger (benchmarks point it at a temporary database)."""
+    global _ledger
+    _ledger = ledger
+
+
+def record_llm_usage(
+    provider: str,
+    model: str,
+    input_tokens: int,
+    output_tokens: int,
+    seconds: float,
+    cost_usd: float,
+    error: bool,
+):
+    """Add one model request to the ledger, attributed to the current user, command and cache status."""
+    if _ledger is not None:
+        _ledger.record_call(
+            provider, model, input_tokens, output_tokens, seconds, cost_usd, error
+        )
+
+
+def record_response_usage(provider: str, model: str, seconds: float):
+    """Add one response handed to a listener to the ledger."""
+    if _ledger is not None:
+        _ledger.record_request(provider, model, seconds)
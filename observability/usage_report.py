@@ -0,0 +1,125 @@
+"""
+Token usage and cost report.
+
+Reads the hourly totals written by `observability.usage` and reports, per group, the
+responses handed to listeners, the share served from the response cache, model requests,
+errors, input/output tokens, estimated cost, and the average model and response latency.
+Groups are sorted by cost, so the commands, users and models that dominate spend come first.
+
+Usage:
+    python -m observability.usage_report
+    python -m observability.usage_report --since 24h --by command,model
+    python -m observability.usage_report --since 7d --by user_id --limit 10 --json usage.json
+"""
+
+import argparse
+import json
+import re
+import time
+
+from .usage import GROUP_COLUMNS, USAGE_DB_PATH, query_usage
+
+_DURATION_UNITS = {"m": 60, "h": 3600, "d": 86400}
+
+
+def parse_since(spec: str) -> float:
+    """Unix time of a lookback like "90m", "24h" or "7d"; "all" for everything."""
+    if spec == "all":
+        return 0.0
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)([mhd])", spec)
+    if match is None:
+        raise ValueError(f"Invalid duration: {spec} (e.g. 90m, 24h, 7d or all)")
+    return time.time() - float(match.group(1)) * _DURATION_UNITS[match.group(2)]
+
+
+def print_report(rows: list[dict], group_by: list[str]):
+    widths = {
+        column: max([len(column)] + [len(str(row[column])) for row in rows]) + 2
+        for column in group_by
+    }
+    print(
+        "".join(f"{column:<{widths[column]}}" for column in group_by)
+        + f"{'responses':>10}{'cached':>8}{'calls':>7}{'errors':>7}{'input tok':>12}{'output tok':>12}"
+        f"{'cost $':>10}{'llm s/call':>11}{'s/resp':>8}"
+    )
+    for row in rows:
+        responses = row["requests"]
+        cached = (
+            f"{row.get('hit_share', 0.0) * 100:.0f}%" if "hit_share" in row else "-"
+        )
+        print(
+            "".join(f"{row[column]!s:<{widths[column]}}" for column in group_by)
+            + f"{responses:>10}{cached:>8}{row['calls']:>7}{row['errors']:>7}"
+            f"{row['input_tokens']:>12}{row['output_tokens']:>12}{row['cost_usd']:>10.4f}"
+            f"{row['llm_seconds'] / row['calls'] if row['calls'] else 0.0:>11.2f}"
+            f"{row['request_seconds'] / responses if responses else 0.0:>8.2f}"
+        )
+    if len(rows) > 1:
+        totals = {
+            key: sum(row[key] for row in rows)
+            for key in ("requests", "calls", "input_tokens", "output_tokens")
+        }
+        cost = sum(row["cost_usd"] for row in rows)
+        print(
+            f"total: {totals['requests']} responses, {totals['calls']} model requests, "
+            f"{totals['input_tokens']} input and {totals['output_tokens']} output tokens, ${cost:.4f}"
+        )
+
+
+def add_hit_shares(rows: list[dict], db_path: str, since: float, group_by: list[str]):
+    """Set each row's "hit_share": the fraction of its responses served from the response cache."""
+    if "cache" in group_by:
+        for row in rows:
+            row["hit_share"] = 1.0 if row["cache"] == "hit" else 0.0
+        return
+    hits = {
+        tuple(row[column] for column in group_by): row["requests"]
+        for row in query_usage(db_path, since, tuple(group_by) + ("cache",))
+        if row["cache"] == "hit"
+    }
+    for row in rows:
+        if row["requests"]:
+            row["hit_share"] = (
+                hits.get(tuple(row[column] for column in group_by), 0) / row["requests"]
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--db", default=USAGE_DB_PATH, help=f"Usage database (default {USAGE_DB_PATH})"
+    )
+    parser.add_argument(
+        "--since", default="7d", help="Lookback: 90m, 24h, 7d or all (default 7d)"
+    )
+    parser.add_argument(
+        "--by",
+        default="command,model",
+        help=f"Comma-separated grouping, any of {','.join(GROUP_COLUMNS)}",
+    )
+    parser.add_argument("--limit", type=int, help="Only the N most expensive groups")
+    parser.add_argument("--json", help="Also write the rows to this file")
+    args = parser.parse_args()
+
+    group_by = [column.strip() for column in args.by.split(",") if column.strip()]
+    try:
+        since = parse_since(args.since)
+        rows = query_usage(args.db, since, tuple(group_by))
+    except ValueError as e:
+        parser.error(str(e))
+    if not rows:
+        print(f"No usage recorded in {args.db} over {args.since}")
+        return
+    add_hit_shares(rows, args.db, since, group_by)
+    rows = rows[: args.limit] if args.limit else rows
+
+    print_report(rows, group_by)
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(
+                {"since": since, "group_by": group_by, "rows": rows}, file, indent=2
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Shared State Package
+
+State that must be consistent across bot replicas (user selections, event
+idempotency keys, cached responses and single-flight locks) goes through the
+`SharedState` interface:
+- InMemorySharedState: process-local (default, single replica)
+- RespSharedState: any Redis-protocol server, selected with SHARED_STATE_URL=redis://host:6379/0
+- LocalRespServer: in-process Redis stand-in for local testing
+
+Public API:
+    - get_shared_state(): The process-wide shared state
+    - asingle_flight(): Compute a value once across replicas and cache it
+"""
+
+import logging
+import os
+import threading
+
+from .base import InMemorySharedState, Pipeline, SharedState
+from .resp import RespSharedState
+from .single_flight import asingle_flight
+
+__all__ = [
+    "InMemorySharedState",
+    "Pipeline",
+    "RespSharedState",
+    "SharedState",
+    "asingle_flight",
+    "get_shared_state",
+]
+
+logger = logging.getLogger(__name__)
+
+SHARED_STATE_URL = os.environ.get("SHARED_STATE_URL", "")
+
+_shared_state: SharedState | None = None
+_shared_state_lock = threading.Lock()
+
+
+def get_shared_state() -> SharedState:
+    """Get or create the process-wide shared state selected by SHARED_STATE_URL."""
+    global _shared_state
+    with _shared_state_lock:
+        if _shared_state is None:
+            if SHARED_STATE_URL.startswith(("redis://", "rediss://")):
+                if SHARED_STATE_URL.startswith("rediss://"):
+                    raise ValueError("TLS (rediss://) shared state is not supported")
+                _shared_state = RespSharedState(SHARED_STATE_URL)
+                logger.info(f"Using shared state at {SHARED_STATE_URL.split('@')[-1]}")
+            elif SHARED_STATE_URL:
+                raise ValueError(f"Unsupported SHARED_STATE_URL: {SHARED_STATE_URL}")
+            else:
+                _shared_state = InMemorySharedState()
+        return _shared_state
@@ -0,0 +1,141 @@
+"""
+Shared-state interface and the in-process implementation.
+
+Every operation is queued on a `Pipeline` and executed in one round trip, so
+callers on the hot path can batch a lookup with a lock acquisition.
+"""
+
+import threading
+import time
+from typing import Any
+
+# Expired keys that are never read again are dropped by a full sweep at most this often
+SWEEP_INTERVAL_SECONDS = 60.0
+
+
+class Pipeline:
+    """Batch of operations executed together by `execute()`; each method returns the pipeline."""
+
+    def __init__(self, state: "SharedState"):
+        self._state = state
+        self._ops: list[tuple[Any, ...]] = []
+
+    def get(self, key: str) -> "Pipeline":
+        self._ops.append(("get", key))
+        return self
+
+    def set(
+        self,
+        key: str,
+        value: str,
+        ttl_seconds: float | None = None,
+        only_if_absent: bool = False,
+    ) -> "Pipeline":
+        self._ops.append(("set", key, value, ttl_seconds, only_if_absent))
+        return self
+
+    def delete(self, key: str) -> "Pipeline":
+        self._ops.append(("delete", key))
+        return self
+
+    def delete_if_equals(self, key: str, value: str) -> "Pipeline":
+        self._ops.append(("delete_if_equals", key, value))
+        return self
+
+    def execute(self) -> list[Any]:
+        """
+        Run the queued operations.
+
+        Returns:
+            One result per operation: the value (or None) for get, True/False for set
+            (False when only_if_absent and the key exists), and True/False for the deletes
+        """
+        ops, self._ops = self._ops, []
+        return self._state._execute(ops) if ops else []
+
+
+class SharedState:
+    """Key/value state shared by every replica of the bot, with per-key expiry."""
+
+    def pipeline(self) -> Pipeline:
+        return Pipeline(self)
+
+    def get(self, key: str) -> str | None:
+        return self.pipeline().get(key).execute()[0]
+
+    def set(
+        self,
+        key: str,
+        value: str,
+        ttl_seconds: float | None = None,
+        only_if_absent: bool = False,
+    ) -> bool:
+        return self.pipeline().set(key, value, ttl_seconds, only_if_absent).execute()[0]
+
+    def delete(self, key: str) -> bool:
+        return self.pipeline().delete(key).execute()[0]
+
+    def delete_if_equals(self, key: str, value: str) -> bool:
+        """Delete a key only while it still holds `value` (e.g. releasing a lock you own)."""
+        return self.pipeline().delete_if_equals(key, value).execute()[0]
+
+    def _execute(self, ops: list[tuple[Any, ...]]) -> list[Any]:
+        raise NotImplementedError()
+
+
+class InMemorySharedState(SharedState):
+    """Process-local implementation, used when no shared backend is configured."""
+
+    def __init__(self, sweep_interval_seconds: float = SWEEP_INTERVAL_SECONDS):
+        # key -> (value, expires_at or None)
+        self._data: dict[str, tuple[str, float | None]] = {}
+        self._lock = threading.Lock()
+        self.sweep_interval_seconds = sweep_interval_seconds
+        self._next_sweep = time.monotonic() + sweep_interval_seconds
+
+    def _execute(self, ops: list[tuple[Any, ...]]) -> list[Any]:
+        with self._lock:
+            now = time.monotonic()
+            if now >= self._next_sweep:
+                self._sweep(now)
+            return [self._apply(op, now) for op in ops]
+
+    def _sweep(self, now: float):
+        # Reads only expire the key they touch; keys written once (e.g. idempotency claims) need this
+        expired = [
+            key
+            for key, (_, expires_at) in self._data.items()
+            if expires_at is not None and expires_at <= now
+        ]
+        for key in expired:
+            del self._data[key]
+        self._next_sweep = now + self.sweep_interval_seconds
+
+    def _live_value(self, key: str, now: float) -> str | None:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] <= now:
+            del self._data[key]
+            return None
+        return entry[0]
+
+    def _apply(self, op: tuple[Any, ...], now: float) -> Any:
+        name, key = op[0], op[1]
+        current = self._live_value(key, now)
+        if name == "get":
+            return current
+        if name == "set":
+            _, _, value, ttl_seconds, only_if_absent = op
+            if only_if_absent and current is not None:
+                return False
+            self._data[key] = (value, now + ttl_seconds if ttl_seconds else None)
+            return True
+        if name == "delete":
+            return self._data.pop(key, None) is not None and current is not None
+        if name == "delete_if_equals":
+            if current is not None and current == op[2]:
+                del self._data[key]
+                return True
+            return False
+        raise ValueError(f"Unknown shared state operation: {name}")
@@ -0,0 +1,120 @@
+"""
+In-process stand-in for a Redis server.
+
+Speaks enough RESP2 for `RespSharedState` (PING, GET, SET with EX/PX/NX/XX, DEL,
+EXISTS, FLUSHALL, AUTH/SELECT and the delete-if-equals EVAL script), so the
+Redis-protocol code path can be exercised locally and in benchmarks without
+installing Redis. It is not meant for production use.
+
+Usage:
+    server = LocalRespServer().start()
+    state = RespSharedState(server.url)
+"""
+
+import socketserver
+import threading
+from typing import Any
+
+from .base import InMemorySharedState
+from .resp import DELETE_IF_EQUALS_SCRIPT, RespError, read_reply
+
+
+def _encode_reply(reply: Any) -> bytes:
+    if isinstance(reply, RespError):
+        return f"-{reply}\r\n".encode()
+    if reply is None:
+        return b"$-1\r\n"
+    if isinstance(reply, bool):
+        return f":{int(reply)}\r\n".encode()
+    if isinstance(reply, int):
+        return f":{reply}\r\n".encode()
+    if isinstance(reply, _Simple):
+        return f"+{reply}\r\n".encode()
+    data = str(reply).encode()
+    return f"${len(data)}\r\n".encode() + data + b"\r\n"
+
+
+class _Simple(str):
+    """Simple-string reply such as +OK."""
+
+
+OK = _Simple("OK")
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                command = read_reply(self.rfile)
+            except (ConnectionError, OSError, ValueError):
+                return
+            if not isinstance(command, list) or not command:
+                self.wfile.write(_encode_reply(RespError("ERR protocol error")))
+                continue
+            self.wfile.write(_encode_reply(self.server.execute(command)))
+
+
+class LocalRespServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), _Handler)
+        self.state = InMemorySharedState()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"redis://{host}:{port}/0"
+
+    def start(self) -> "LocalRespServer":
+        self._thread = threading.Thread(
+            target=self.serve_forever, name="local-resp-server", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def execute(self, command: list[str]) -> Any:
+        name, args = command[0].upper(), command[1:]
+        if name == "PING":
+            return _Simple("PONG")
+        if name in ("AUTH", "SELECT"):
+            return OK
+        if name == "GET" and len(args) == 1:
+            return self.state.get(args[0])
+        if name == "SET" and len(args) >= 2:
+            return self._set(args)
+        if name == "DEL" and args:
+            return sum(self.state.delete(key) for key in args)
+        if name == "EXISTS" and args:
+            return sum(self.state.get(key) is not None for key in args)
+        if name == "FLUSHALL":
+            self.state = InMemorySharedState()
+            return OK
+        if (
+            name == "EVAL"
+            and len(args) == 4
+            and args[0] == DELETE_IF_EQUALS_SCRIPT
+            and args[1] == "1"
+        ):
+            return int(self.state.delete_if_equals(args[2], args[3]))
+        return RespError(f"ERR unsupported command '{command[0]}'")
+
+    def _set(self, args: list[str]) -> Any:
+        key, value, options = args[0], args[1], [a.upper() for a in args[2:]]
+        ttl_seconds = None
+        if "EX" in options:
+            ttl_seconds = float(args[2 + options.index("EX") + 1])
+        elif "PX" in options:
+            ttl_seconds = float(args[2 + options.index("PX") + 1]) / 1000
+        if "XX" in options and self.state.get(key) is None:
+            return None
+        stored = self.state.set(
+            key, value, ttl_seconds=ttl_seconds, only_if_absent="NX" in options
+        )
+        return OK if stored else None
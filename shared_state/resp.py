@@ -0,0 +1,167 @@
+"""
+Redis-protocol (RESP2) implementation of the shared-state interface.
+
+Only the handful of commands the bot needs are used (GET, SET with PX/NX, DEL and
+one EVAL script), so any Redis-compatible server works, including the in-process
+stand-in in `local_server.py`. A pipeline is written to the socket in one go and
+its replies are read back in order: one network round trip per `execute()`.
+"""
+
+import queue
+import socket
+import threading
+from typing import Any
+from urllib.parse import unquote, urlparse
+
+from .base import SharedState
+
+# Deletes the key only while it still holds the caller's value
+DELETE_IF_EQUALS_SCRIPT = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) else return 0 end"
+
+# Connections per process; callers beyond that wait up to POOL_TIMEOUT_SECONDS for one
+DEFAULT_POOL_SIZE = 8
+POOL_TIMEOUT_SECONDS = 5.0
+SOCKET_TIMEOUT_SECONDS = 5.0
+
+
+class RespError(Exception):
+    """Error reply (`-ERR ...`) returned by the server."""
+
+
+def encode_command(*args: Any) -> bytes:
+    parts = [f"*{len(args)}\r\n".encode()]
+    for arg in args:
+        data = arg if isinstance(arg, bytes) else str(arg).encode()
+        parts.append(f"${len(data)}\r\n".encode() + data + b"\r\n")
+    return b"".join(parts)
+
+
+def read_reply(reader) -> Any:
+    """Read one RESP2 reply; error replies are returned as RespError instances."""
+    line = reader.readline()
+    if not line:
+        raise ConnectionError("Connection closed by server")
+    kind, payload = line[:1], line[1:-2]
+    if kind == b"+":
+        return payload.decode()
+    if kind == b"-":
+        return RespError(payload.decode())
+    if kind == b":":
+        return int(payload)
+    if kind == b"$":
+        length = int(payload)
+        if length == -1:
+            return None
+        data = reader.read(length + 2)
+        return data[:-2].decode()
+    if kind == b"*":
+        length = int(payload)
+        if length == -1:
+            return None
+        return [read_reply(reader) for _ in range(length)]
+    raise RespError(f"Unexpected reply: {line!r}")
+
+
+class _Connection:
+    def __init__(self, host: str, port: int, password: str | None, db: int):
+        self.sock = socket.create_connection(
+            (host, port), timeout=SOCKET_TIMEOUT_SECONDS
+        )
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile("rb")
+        setup = []
+        if password:
+            setup.append(("AUTH", password))
+        if db:
+            setup.append(("SELECT", db))
+        for reply in self.call(setup):
+            if isinstance(reply, RespError):
+                raise reply
+
+    def call(self, commands: list[tuple[Any, ...]]) -> list[Any]:
+        if not commands:
+            return []
+        self.sock.sendall(b"".join(encode_command(*command) for command in commands))
+        return [read_reply(self.reader) for _ in commands]
+
+    def close(self):
+        try:
+            self.reader.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class RespSharedState(SharedState):
+    """Shared state stored in a Redis-compatible server, e.g. `redis://:password@host:6379/0`."""
+
+    def __init__(
+        self,
+        url: str,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        pool_timeout_seconds: float = POOL_TIMEOUT_SECONDS,
+    ):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.pool_timeout_seconds = pool_timeout_seconds
+        # Idle connections; each one in use or idle holds one of the `pool_size` slots
+        self._pool: queue.LifoQueue[_Connection] = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(pool_size)
+
+    def _execute(self, ops: list[tuple[Any, ...]]) -> list[Any]:
+        commands = [self._to_command(op) for op in ops]
+        if not self._slots.acquire(timeout=self.pool_timeout_seconds):
+            raise TimeoutError(
+                f"No shared state connection became free within {self.pool_timeout_seconds}s"
+            )
+        try:
+            try:
+                connection = self._pool.get_nowait()
+            except queue.Empty:
+                connection = _Connection(self.host, self.port, self.password, self.db)
+            try:
+                replies = connection.call(commands)
+            except (OSError, ConnectionError):
+                # Never reuse a connection whose replies may be out of sync
+                connection.close()
+                raise
+            self._pool.put_nowait(connection)
+        finally:
+            self._slots.release()
+
+        results = []
+        for op, reply in zip(ops, replies):
+            if isinstance(reply, RespError):
+                raise reply
+            results.append(self._to_result(op[0], reply))
+        return results
+
+    @staticmethod
+    def _to_command(op: tuple[Any, ...]) -> tuple[Any, ...]:
+        name, key = op[0], op[1]
+        if name == "get":
+            return ("GET", key)
+        if name == "set":
+            _, _, value, ttl_seconds, only_if_absent = op
+            command: tuple[Any, ...] = ("SET", key, value)
+            if ttl_seconds:
+                command += ("PX", max(1, int(ttl_seconds * 1000)))
+            if only_if_absent:
+                command += ("NX",)
+            return command
+        if name == "delete":
+            return ("DEL", key)
+        if name == "delete_if_equals":
+            return ("EVAL", DELETE_IF_EQUALS_SCRIPT, 1, key, op[2])
+        raise ValueError(f"Unknown shared state operation: {name}")
+
+    @staticmethod
+    def _to_result(name: str, reply: Any) -> Any:
+        if name == "get":
+            return reply
+        if name == "set":
+            return reply == "OK"
+        return bool(reply)
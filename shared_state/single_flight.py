@@ -0,0 +1,139 @@
+"""
+Distributed single-flight with result caching.
+
+Concurrent callers asking for the same key, on any replica, share one computation:
+the first caller takes a lock in shared state, computes and publishes the result;
+the others wait for the result to appear. The cache lookup and lock attempt are
+pipelined into a single round trip.
+
+With the in-memory backend there are no other replicas, so waiters await the
+computing caller's future instead of polling shared state.
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+import threading
+import uuid
+from collections.abc import Awaitable, Callable
+
+from .base import InMemorySharedState, SharedState
+
+logger = logging.getLogger(__name__)
+
+# A lock outlives a crashed holder by at most this long
+LOCK_TTL_SECONDS = 120.0
+POLL_INTERVAL_SECONDS = 0.25
+
+# (id of the in-memory state, key) -> future of the computation in flight; resolves to None if it failed
+_local_flights: dict[tuple[int, str], concurrent.futures.Future] = {}
+_local_flights_lock = threading.Lock()
+
+
+async def asingle_flight(
+    state: SharedState,
+    key: str,
+    compute: Callable[[], Awaitable[str]],
+    ttl_seconds: float,
+    lock_ttl_seconds: float = LOCK_TTL_SECONDS,
+) -> str:
+    """
+    Return the cached value for `key`, or compute it exactly once across replicas.
+
+    Args:
+        state: Shared state holding the results and locks
+        key: Cache key for the computation
+        compute: Coroutine function producing the value (a string)
+        ttl_seconds: How long the result stays cached
+        lock_ttl_seconds: Upper bound on how long one computation may hold the lock
+
+    Returns:
+        The cached or freshly computed value
+    """
+    if isinstance(state, InMemorySharedState):
+        return await _alocal_single_flight(state, key, compute, ttl_seconds)
+
+    result_key, lock_key = f"result:{key}", f"lock:{key}"
+    token = uuid.uuid4().hex
+    waited = 0.0
+
+    while True:
+        # Shared state is blocking network I/O, keep it off the event loop
+        cached, acquired = await asyncio.to_thread(
+            state.pipeline()
+            .get(result_key)
+            .set(lock_key, token, lock_ttl_seconds, only_if_absent=True)
+            .execute
+        )
+        if cached is not None:
+            if acquired:
+                await asyncio.to_thread(state.delete_if_equals, lock_key, token)
+            if waited:
+                logger.info(
+                    f"Single-flight {key[:16]} served after waiting {waited:.2f}s"
+                )
+            return cached
+        if acquired:
+            break
+        if waited >= lock_ttl_seconds:
+            # The holder must have died without releasing; compute without the lock
+            logger.warning(
+                f"Single-flight {key[:16]} timed out waiting for another replica"
+            )
+            return await compute()
+        await asyncio.sleep(POLL_INTERVAL_SECONDS)
+        waited += POLL_INTERVAL_SECONDS
+
+    try:
+        value = await compute()
+        await asyncio.to_thread(
+            state.pipeline()
+            .set(result_key, value, ttl_seconds)
+            .delete_if_equals(lock_key, token)
+            .execute
+        )
+        return value
+    except BaseException:
+        # Let a waiting caller take over
+        await asyncio.to_thread(state.delete_if_equals, lock_key, token)
+        raise
+
+
+async def _alocal_single_flight(
+    state: InMemorySharedState,
+    key: str,
+    compute: Callable[[], Awaitable[str]],
+    ttl_seconds: float,
+) -> str:
+    """`asingle_flight()` within one process; callers may be on different event loops."""
+    result_key, flight_key = f"result:{key}", (id(state), key)
+    while True:
+        # In-memory lookups do not block, so they stay on the event loop
+        cached = state.get(result_key)
+        if cached is not None:
+            return cached
+        with _local_flights_lock:
+            flight = _local_flights.get(flight_key)
+            if flight is None:
+                flight = _local_flights[flight_key] = concurrent.futures.Future()
+                break
+        # Shielded: a cancelled waiter must not cancel the computation it shares
+        value = await asyncio.shield(asyncio.wrap_future(flight))
+        if value is not None:
+            return value
+        # The computing caller failed; take over
+
+    value = None
+    try:
+        value = await compute()
+        state.set(result_key, value, ttl_seconds)
+        return value
+    finally:
+        with _local_flights_lock:
+            _local_flights.pop(flight_key, None)
+        flight.set_result(value)
+
+
+def get_cached(state: SharedState, key: str) -> str | None:
+    """Read a result published by `asingle_flight()` without computing it."""
+    return state.get(f"result:{key}")
@@ -0,0 +1,200 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+from slack_sdk.oauth.installation_store import (
+    Bot,
+    FileInstallationStore,
+    Installation,
+    InstallationStore,
+)
+from slack_sdk.oauth.installation_store.sqlite3 import SQLite3InstallationStore
+
+from observability.metrics import register_cache
+
+"""
+In-memory LRU + TTL cache in front of an installation store, so authorizing an incoming
+request in the OAuth app does not read installation data from disk.
+Saves and deletes go to the backing store first and then invalidate every cached entry
+for the workspace (or the whole org for enterprise installs). Lookups that find nothing
+are cached for a shorter time, since Bolt looks up a user installation on every event.
+"""
+
+logger = logging.getLogger(__name__)
+
+# "file" (FileInstallationStore's JSON files) or "sqlite"
+INSTALLATION_STORE_BACKEND = os.environ.get("INSTALLATION_STORE_BACKEND", "file")
+INSTALLATION_STORE_DB_PATH = os.environ.get(
+    "INSTALLATION_STORE_DB_PATH", "./data/installations.sqlite3"
+)
+
+INSTALLATION_CACHE_SIZE = int(os.environ.get("INSTALLATION_CACHE_SIZE", "1000"))
+INSTALLATION_CACHE_TTL_SECONDS = float(
+    os.environ.get("INSTALLATION_CACHE_TTL_SECONDS", "300")
+)
+INSTALLATION_CACHE_NEGATIVE_TTL_SECONDS = float(
+    os.environ.get("INSTALLATION_CACHE_NEGATIVE_TTL_SECONDS", "30")
+)
+
+# (kind, enterprise_id, team_id, user_id, is_enterprise_install)
+_CacheKey = tuple[str, str | None, str | None, str | None, bool | None]
+
+
+class CachedInstallationStore(InstallationStore):
+    def __init__(
+        self,
+        store: InstallationStore,
+        *,
+        max_size: int = INSTALLATION_CACHE_SIZE,
+        ttl_seconds: float = INSTALLATION_CACHE_TTL_SECONDS,
+        negative_ttl_seconds: float = INSTALLATION_CACHE_NEGATIVE_TTL_SECONDS,
+    ):
+        self.store = store
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        # key -> (expires_at, bot / installation or None for "not installed")
+        self._entries: OrderedDict[_CacheKey, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by every invalidation, so a lookup that raced with a save is not cached
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def logger(self) -> logging.Logger:
+        return self.store.logger
+
+    def save(self, installation: Installation):
+        self.store.save(installation)
+        self.invalidate(
+            installation.enterprise_id,
+            installation.team_id,
+            installation.is_enterprise_install,
+        )
+
+    def save_bot(self, bot: Bot):
+        self.store.save_bot(bot)
+        self.invalidate(bot.enterprise_id, bot.team_id, bot.is_enterprise_install)
+
+    def find_bot(
+        self,
+        *,
+        enterprise_id: str | None,
+        team_id: str | None,
+        is_enterprise_install: bool | None = False,
+    ) -> Bot | None:
+        key = ("bot", enterprise_id, team_id, None, is_enterprise_install)
+        return self._get(
+            key,
+            lambda: self.store.find_bot(
+                enterprise_id=enterprise_id,
+                team_id=team_id,
+                is_enterprise_install=is_enterprise_install,
+            ),
+        )
+
+    def find_installation(
+        self,
+        *,
+        enterprise_id: str | None,
+        team_id: str | None,
+        user_id: str | None = None,
+        is_enterprise_install: bool | None = False,
+    ) -> Installation | None:
+        key = ("installation", enterprise_id, team_id, user_id, is_enterprise_install)
+        return self._get(
+            key,
+            lambda: self.store.find_installation(
+                enterprise_id=enterprise_id,
+                team_id=team_id,
+                user_id=user_id,
+                is_enterprise_install=is_enterprise_install,
+            ),
+        )
+
+    def delete_bot(self, *, enterprise_id: str | None, team_id: str | None) -> None:
+        self.store.delete_bot(enterprise_id=enterprise_id, team_id=team_id)
+        self.invalidate(enterprise_id, team_id)
+
+    def delete_installation(
+        self,
+        *,
+        enterprise_id: str | None,
+        team_id: str | None,
+        user_id: str | None = None,
+    ) -> None:
+        self.store.delete_installation(
+            enterprise_id=enterprise_id, team_id=team_id, user_id=user_id
+        )
+        self.invalidate(enterprise_id, team_id)
+
+    def delete_all(self, *, enterprise_id: str | None, team_id: str | None):
+        self.store.delete_all(enterprise_id=enterprise_id, team_id=team_id)
+        self.invalidate(enterprise_id, team_id)
+
+    def invalidate(
+        self,
+        enterprise_id: str | None,
+        team_id: str | None,
+        is_enterprise_install: bool | None = False,
+    ):
+        """Drop every cached lookup for a workspace, or for the whole org when it is an org-wide install."""
+        with self._lock:
+            self._generation += 1
+            for key in list(self._entries):
+                if key[1] != enterprise_id:
+                    continue
+                if (
+                    is_enterprise_install
+                    or team_id is None
+                    or key[2] is None
+                    or key[2] == team_id
+                ):
+                    del self._entries[key]
+
+    def _get(self, key: _CacheKey, load):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generation
+
+        value = load()
+        ttl = self.ttl_seconds if value is not None else self.negative_ttl_seconds
+        with self._lock:
+            if generation != self._generation:
+                return value
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return value
+
+
+def create_installation_store(client_id: str | None) -> CachedInstallationStore:
+    """Create the cached installation store for the OAuth app, backed by INSTALLATION_STORE_BACKEND."""
+    if INSTALLATION_STORE_BACKEND == "sqlite":
+        directory = os.path.dirname(INSTALLATION_STORE_DB_PATH)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        store = SQLite3InstallationStore(
+            database=INSTALLATION_STORE_DB_PATH, client_id=client_id
+        )
+    elif INSTALLATION_STORE_BACKEND == "file":
+        store = FileInstallationStore()
+    else:
+        raise ValueError(
+            f"Unknown INSTALLATION_STORE_BACKEND: {INSTALLATION_STORE_BACKEND}"
+        )
+    logger.info(f"Using {type(store).__name__} for installations")
+    cached_store = CachedInstallationStore(store)
+    register_cache("installation", lambda: cached_store)
+    return cached_store
@@ -1,12 +1,16 @@
-from .user_state_store import UserStateStore
-from .user_identity import UserIdentity
-import logging
-from pathlib import Path
 import json
+import logging
 import os
+from pathlib import Path
+
+from .user_identity import UserIdentity
+from .user_state_store import UserStateStore
 
 
 class FileStateStore(UserStateStore):
+    # ./data is the single-process default; processes sharing one host should use the sqlite backend
+    written_by_other_processes = False
+
     def __init__(
         self,
         *,
@@ -16,6 +20,13 @@ class FileStateStore(UserStateStore):
         self.base_dir = base_dir
         self.logger = logger
 
+    def get_state(self, user_id: str) -> UserIdentity | None:
+        filepath = f"{self.base_dir}/{user_id}"
+        if not os.path.exists(filepath):
+            return None
+        with open(filepath, "r") as file:
+            return json.load(file)
+
     def set_state(self, user_identity: UserIdentity):
         state = user_identity["user_id"]
         self._mkdir(self.base_dir)
@@ -1,23 +1,22 @@
-import json
-import os
-from state_store.user_identity import UserIdentity
 import logging
 
-logging.basicConfig(level=logging.ERROR)
+from observability import start_span
+from state_store.user_state_cache import get_user_state_cache
+
 logger = logging.getLogger(__name__)
 
 
 def get_user_state(user_id: str, is_app_home: bool):
-    filepath = f"./data/{user_id}"
-    if not is_app_home and not os.path.exists(filepath):
-        raise FileNotFoundError(
-            "No provider selection found. Please navigate to the App Home and make a selection."
-        )
     try:
-        if os.path.exists(filepath):
-            with open(filepath, "r") as file:
-                user_identity: UserIdentity = json.load(file)
-                return user_identity["provider"], user_identity["model"]
+        with start_span("user_state.get"):
+            user_identity = get_user_state_cache().get(user_id)
     except Exception as e:
         logger.error(e)
         raise e
+    if user_identity is None:
+        if not is_app_home:
+            raise FileNotFoundError(
+                "No provider selection found. Please navigate to the App Home and make a selection."
+            )
+        return None
+    return user_identity["provider"], user_identity["model"]
@@ -0,0 +1,45 @@
+import json
+import logging
+
+from shared_state import SharedState, get_shared_state
+
+from .user_identity import UserIdentity
+from .user_state_store import UserStateStore
+
+"""
+User state store kept in the shared state backend (SHARED_STATE_URL), so every replica
+of the bot sees the same provider selections.
+"""
+
+
+class SharedStateStore(UserStateStore):
+    # Every replica
+    written_by_other_processes = True
+
+    def __init__(
+        self,
+        *,
+        state: SharedState | None = None,
+        key_prefix: str = "user_state:",
+        logger: logging.Logger = logging.getLogger(__name__),
+    ):
+        self.state = state or get_shared_state()
+        self.key_prefix = key_prefix
+        self.logger = logger
+
+    def get_state(self, user_id: str) -> UserIdentity | None:
+        data = self.state.get(f"{self.key_prefix}{user_id}")
+        if data is None:
+            return None
+        return json.loads(data)
+
+    def set_state(self, user_identity: UserIdentity):
+        state = user_identity["user_id"]
+        self.state.set(f"{self.key_prefix}{state}", json.dumps(user_identity))
+        return state
+
+    def unset_state(self, user_identity: UserIdentity):
+        state = user_identity["user_id"]
+        if not self.state.delete(f"{self.key_prefix}{state}"):
+            self.logger.warning(f"Failed to find data for {user_identity}")
+        return state
@@ -0,0 +1,228 @@
+import atexit
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from .user_identity import UserIdentity
+from .user_state_store import UserStateStore
+
+"""
+SQLite (WAL mode) user state store that can be shared by several worker processes on one host.
+Reads use one connection per thread; writes are queued and committed in batches by a single
+writer thread. On first use, selections saved by `FileStateStore` are migrated into the database.
+A batch that keeps failing is dropped (and logged) after WRITE_MAX_ATTEMPTS, and shutdown waits
+at most SHUTDOWN_FLUSH_SECONDS for queued writes.
+"""
+
+# Writes queued within this window are committed in one transaction
+WRITE_BATCH_SECONDS = 0.05
+# A failing batch is retried every WRITE_RETRY_SECONDS, up to WRITE_MAX_ATTEMPTS attempts in all
+WRITE_MAX_ATTEMPTS = 5
+WRITE_RETRY_SECONDS = 1.0
+# Longest wait for queued writes at interpreter shutdown
+SHUTDOWN_FLUSH_SECONDS = 5.0
+
+# Slack user IDs, as used for the file names written by `FileStateStore`
+_USER_ID_FILE_PATTERN = re.compile(r"^[UW][A-Z0-9]+$")
+
+_SELECT_STATE = "SELECT user_id, provider, model FROM user_state WHERE user_id = ?"
+_UPSERT_STATE = (
+    "INSERT INTO user_state (user_id, provider, model, updated_at) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT(user_id) DO UPDATE SET provider = excluded.provider, model = excluded.model, "
+    "updated_at = excluded.updated_at"
+)
+_DELETE_STATE = "DELETE FROM user_state WHERE user_id = ?"
+# Rows already in the database win over the legacy files
+_MIGRATE_STATE = (
+    "INSERT INTO user_state (user_id, provider, model, updated_at) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT(user_id) DO NOTHING"
+)
+
+
+class SqliteStateStore(UserStateStore):
+    # Every process on the host using the same database
+    written_by_other_processes = True
+
+    def __init__(
+        self,
+        *,
+        db_path: str = "./data/user_state.sqlite3",
+        migrate_from_dir: str | None = "./data",
+        logger: logging.Logger = logging.getLogger(__name__),
+    ):
+        self.db_path = db_path
+        self.logger = logger
+        self._local = threading.local()
+        # user_id -> state to write, or None to delete; flushed by the writer thread
+        self._pending: dict[str, UserIdentity | None] = {}
+        self._pending_cond = threading.Condition()
+        self._flushed = threading.Condition(self._pending_cond)
+
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS user_state ("
+            "user_id TEXT PRIMARY KEY, provider TEXT NOT NULL, model TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS migrations (name TEXT PRIMARY KEY, applied_at REAL NOT NULL)"
+        )
+        conn.commit()
+        if migrate_from_dir:
+            self._migrate_files(migrate_from_dir)
+
+        self._writer = threading.Thread(
+            target=self._write_loop, name="user-state-writer", daemon=True
+        )
+        self._writer.start()
+        # Commit the last batch on interpreter shutdown
+        atexit.register(self._flush_at_exit)
+
+    def get_state(self, user_id: str) -> UserIdentity | None:
+        with self._pending_cond:
+            if user_id in self._pending:
+                # Read your own writes before the batch is committed
+                return self._pending[user_id]
+        row = self._connection().execute(_SELECT_STATE, (user_id,)).fetchone()
+        if row is None:
+            return None
+        return UserIdentity(user_id=row[0], provider=row[1], model=row[2])
+
+    def set_state(self, user_identity: UserIdentity):
+        state = user_identity["user_id"]
+        with self._pending_cond:
+            self._pending[state] = user_identity
+            self._pending_cond.notify()
+        return state
+
+    def unset_state(self, user_identity: UserIdentity):
+        state = user_identity["user_id"]
+        with self._pending_cond:
+            self._pending[state] = None
+            self._pending_cond.notify()
+        return state
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """
+        Block until every queued write has been committed (or dropped after repeated failures).
+
+        Args:
+            timeout: Longest wait in seconds (default: no limit)
+
+        Returns:
+            False if writes were still queued when the timeout passed
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._pending_cond:
+            while self._pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._flushed.wait(remaining)
+        return True
+
+    def _flush_at_exit(self):
+        if not self.flush(timeout=SHUTDOWN_FLUSH_SECONDS):
+            with self._pending_cond:
+                user_ids = sorted(self._pending)
+            self.logger.error(
+                f"Dropped {len(user_ids)} unwritten user states at shutdown: {', '.join(user_ids)}"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared between threads; each one caches its prepared statements
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _write_loop(self):
+        conn = self._connection()
+        failures = 0
+        while True:
+            with self._pending_cond:
+                while not self._pending:
+                    self._pending_cond.wait()
+            time.sleep(WRITE_BATCH_SECONDS)
+            with self._pending_cond:
+                batch = dict(self._pending)
+            try:
+                now = time.time()
+                with conn:
+                    conn.executemany(
+                        _UPSERT_STATE,
+                        [
+                            (s["user_id"], s["provider"], s["model"], now)
+                            for s in batch.values()
+                            if s is not None
+                        ],
+                    )
+                    conn.executemany(
+                        _DELETE_STATE,
+                        [(user_id,) for user_id, s in batch.items() if s is None],
+                    )
+            except sqlite3.Error as e:
+                failures += 1
+                if failures < WRITE_MAX_ATTEMPTS:
+                    self.logger.warning(
+                        f"Failed to write {len(batch)} user states (attempt {failures}/{WRITE_MAX_ATTEMPTS}): {e}"
+                    )
+                    time.sleep(WRITE_RETRY_SECONDS)
+                    continue
+                self.logger.error(
+                    f"Dropped {len(batch)} user states after {failures} failed writes: {e}; "
+                    f"users: {', '.join(sorted(batch))}"
+                )
+            failures = 0
+            with self._pending_cond:
+                for user_id, state in batch.items():
+                    # Keep entries that were changed again while the batch was being written
+                    if self._pending.get(user_id, state) is state:
+                        self._pending.pop(user_id, None)
+                self._flushed.notify_all()
+
+    def _migrate_files(self, base_dir: str):
+        """One-shot import of the per-user JSON files written by `FileStateStore`."""
+        conn = self._connection()
+        if conn.execute(
+            "SELECT 1 FROM migrations WHERE name = 'file_state_store'"
+        ).fetchone():
+            return
+        rows = []
+        if os.path.isdir(base_dir):
+            for name in os.listdir(base_dir):
+                path = os.path.join(base_dir, name)
+                if not _USER_ID_FILE_PATTERN.match(name) or not os.path.isfile(path):
+                    continue
+                try:
+                    with open(path, "r") as file:
+                        state = json.load(file)
+                    rows.append(
+                        (
+                            state["user_id"],
+                            state["provider"],
+                            state["model"],
+                            os.path.getmtime(path),
+                        )
+                    )
+                except (OSError, ValueError, KeyError) as e:
+                    self.logger.warning(
+                        f"Skipping unreadable user state file {path} - {e}"
+                    )
+        with conn:
+            conn.executemany(_MIGRATE_STATE, rows)
+            conn.execute(
+                "INSERT OR IGNORE INTO migrations (name, applied_at) VALUES ('file_state_store', ?)",
+                (time.time(),),
+            )
+        self.logger.info(
+            f"Migrated {len(rows)} user states from {base_dir} into {self.db_path}"
+        )
@@ -0,0 +1,133 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from observability.metrics import register_cache
+
+from .file_state_store import FileStateStore
+from .shared_state_store import SharedStateStore
+from .sqlite_state_store import SqliteStateStore
+from .user_identity import UserIdentity
+from .user_state_store import UserStateStore
+
+"""
+Process-level cache over the user state store, so the per-message lookup of a user's
+provider selection does not touch the filesystem.
+Writes go through to the backing store before the cache is updated, users without a
+selection are cached too (for a shorter time), and entries can be invalidated explicitly.
+"""
+
+logger = logging.getLogger(__name__)
+
+# "file" (one JSON file per user in ./data), "sqlite" (shared by the processes on one host)
+# or "shared" (shared by every replica through SHARED_STATE_URL)
+USER_STATE_BACKEND = os.environ.get("USER_STATE_BACKEND", "file")
+USER_STATE_DB_PATH = os.environ.get("USER_STATE_DB_PATH", "./data/user_state.sqlite3")
+
+USER_STATE_CACHE_SIZE = int(os.environ.get("USER_STATE_CACHE_SIZE", "10000"))
+# Applies to the single-process "file" backend; the "sqlite" and "shared" backends, which other
+# processes write, cap it at USER_STATE_NEGATIVE_TTL_SECONDS
+USER_STATE_CACHE_TTL_SECONDS = float(
+    os.environ.get("USER_STATE_CACHE_TTL_SECONDS", "300")
+)
+# Users without a selection are re-checked sooner, so a selection made elsewhere shows up quickly
+USER_STATE_NEGATIVE_TTL_SECONDS = float(
+    os.environ.get("USER_STATE_NEGATIVE_TTL_SECONDS", "30")
+)
+
+
+class UserStateCache:
+    def __init__(
+        self,
+        store: UserStateStore,
+        *,
+        max_size: int = USER_STATE_CACHE_SIZE,
+        ttl_seconds: float = USER_STATE_CACHE_TTL_SECONDS,
+        negative_ttl_seconds: float = USER_STATE_NEGATIVE_TTL_SECONDS,
+    ):
+        self.store = store
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        # user_id -> (expires_at, state or None for "no selection")
+        self._entries: OrderedDict[str, tuple[float, UserIdentity | None]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: str) -> UserIdentity | None:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        state = self.store.get_state(user_id)
+        self._put(user_id, state)
+        return state
+
+    def set(self, user_identity: UserIdentity):
+        # Write through: the backing store is updated first, so a failed write leaves the cache untouched
+        self.store.set_state(user_identity)
+        self._put(user_identity["user_id"], user_identity)
+
+    def invalidate(self, user_id: str):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def _put(self, user_id: str, state: UserIdentity | None):
+        ttl = self.ttl_seconds if state is not None else self.negative_ttl_seconds
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + ttl, state)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+_store: UserStateStore | None = None
+_cache: UserStateCache | None = None
+_lock = threading.Lock()
+
+
+def get_user_state_store() -> UserStateStore:
+    """Get the process-wide backing store for user state, selected by USER_STATE_BACKEND."""
+    global _store
+    with _lock:
+        if _store is None:
+            if USER_STATE_BACKEND == "shared":
+                _store = SharedStateStore()
+            elif USER_STATE_BACKEND == "sqlite":
+                _store = SqliteStateStore(db_path=USER_STATE_DB_PATH)
+            elif USER_STATE_BACKEND == "file":
+                _store = FileStateStore()
+            else:
+                raise ValueError(f"Unknown USER_STATE_BACKEND: {USER_STATE_BACKEND}")
+            logger.info(f"Using {type(_store).__name__} for user state")
+        return _store
+
+
+def get_user_state_cache() -> UserStateCache:
+    """Get the process-wide user state cache."""
+    global _cache
+    store = get_user_state_store()
+    with _lock:
+        if _cache is None:
+            if store.written_by_other_processes:
+                # Another process may change the selection; bound how long this one serves a stale copy
+                ttl_seconds = min(
+                    USER_STATE_CACHE_TTL_SECONDS, USER_STATE_NEGATIVE_TTL_SECONDS
+                )
+                _cache = UserStateCache(store, ttl_seconds=ttl_seconds)
+            else:
+                _cache = UserStateCache(store)
+        return _cache
+
+
+register_cache("user_state", lambda: _cache)
@@ -2,6 +2,12 @@ from .user_identity import UserIdentity
 
 
 class UserStateStore:
+    # Whether other processes (workers, replicas) can change the stored state behind this one's back
+    written_by_other_processes = False
+
+    def get_state(self, user_id: str) -> UserIdentity | None:
+        raise NotImplementedError()
+
     def set_state(user_identity: UserIdentity):
         raise NotImplementedError()
 
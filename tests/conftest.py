@@ -0,0 +1,13 @@
+import pytest
+
+from observability.usage import get_usage_ledger, set_usage_ledger
+
+
+@pytest.fixture(autouse=True)
+def isolated_from_repo(monkeypatch, tmp_path):
+    """Keep test runs from writing into the checkout: no usage ledger, and ./data is per test."""
+    ledger = get_usage_ledger()
+    set_usage_ledger(None)
+    monkeypatch.chdir(tmp_path)
+    yield
+    set_usage_ledger(ledger)
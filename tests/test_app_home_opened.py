@@ -0,0 +1,62 @@
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+
+import pytest
+
+from listeners.events import app_home_opened
+
+
+@pytest.fixture(autouse=True)
+def empty_caches(monkeypatch):
+    monkeypatch.setattr(app_home_opened, "_rendered_views", OrderedDict())
+    monkeypatch.setattr(app_home_opened, "_published_hashes", OrderedDict())
+
+
+def test_unchanged_view_is_published_once():
+    assert app_home_opened._needs_publish("U1", "hash")
+    app_home_opened._mark_published("U1", "hash")
+    assert not app_home_opened._needs_publish("U1", "hash")
+    assert app_home_opened._needs_publish("U1", "other hash")
+
+
+def test_published_hashes_are_bounded_lru(monkeypatch):
+    monkeypatch.setattr(app_home_opened, "HOME_VIEW_CACHE_SIZE", 2)
+    app_home_opened._mark_published("U1", "hash")
+    app_home_opened._mark_published("U2", "hash")
+    # U1 is used again, so U2 is the least recently used when U3 arrives
+    assert not app_home_opened._needs_publish("U1", "hash")
+    app_home_opened._mark_published("U3", "hash")
+
+    assert list(app_home_opened._published_hashes) == ["U1", "U3"]
+    assert app_home_opened._needs_publish("U2", "hash")
+
+
+def test_published_hashes_expire(monkeypatch):
+    monkeypatch.setattr(app_home_opened, "HOME_VIEW_CACHE_TTL_SECONDS", 0)
+    app_home_opened._mark_published("U1", "hash")
+    assert app_home_opened._needs_publish("U1", "hash")
+
+
+def test_async_callback_renders_off_the_event_loop(monkeypatch):
+    rendered_on = []
+    published = []
+
+    def get_home_view(user_id: str):
+        rendered_on.append(threading.current_thread())
+        return {"type": "home", "blocks": []}, "hash"
+
+    class Client:
+        async def views_publish(self, **kwargs):
+            published.append(kwargs["user_id"])
+
+    monkeypatch.setattr(app_home_opened, "_get_home_view", get_home_view)
+    asyncio.run(
+        app_home_opened.async_app_home_opened_callback(
+            {"tab": "home", "user": "U1"}, logging.getLogger(__name__), Client()
+        )
+    )
+
+    assert published == ["U1"]
+    assert rendered_on and threading.main_thread() not in rendered_on
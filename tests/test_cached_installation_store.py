@@ -0,0 +1,80 @@
+from slack_sdk.oauth.installation_store import InstallationStore
+
+from state_store.cached_installation_store import CachedInstallationStore
+
+
+class CountingStore(InstallationStore):
+    """Bots by (enterprise_id, team_id); `during_load` runs after the next lookup has read."""
+
+    def __init__(self):
+        self.bots = {}
+        self.loads = []
+        self.during_load = None
+
+    def find_bot(self, *, enterprise_id, team_id, is_enterprise_install=False):
+        self.loads.append((enterprise_id, team_id))
+        bot = self.bots.get((enterprise_id, team_id))
+        if self.during_load is not None:
+            during_load, self.during_load = self.during_load, None
+            during_load()
+        return bot
+
+
+def find(cache: CachedInstallationStore, enterprise_id, team_id):
+    return cache.find_bot(enterprise_id=enterprise_id, team_id=team_id)
+
+
+def cached_teams(cache: CachedInstallationStore) -> set:
+    return {(key[1], key[2]) for key in cache._entries}
+
+
+def test_workspace_invalidation_keeps_other_workspaces():
+    store = CountingStore()
+    cache = CachedInstallationStore(store)
+    for enterprise_id, team_id in [("E1", "T1"), ("E1", "T2"), (None, "T1")]:
+        find(cache, enterprise_id, team_id)
+
+    cache.invalidate("E1", "T1")
+
+    assert cached_teams(cache) == {("E1", "T2"), (None, "T1")}
+
+
+def test_org_wide_invalidation_drops_every_workspace_of_the_org():
+    store = CountingStore()
+    cache = CachedInstallationStore(store)
+    for enterprise_id, team_id in [("E1", "T1"), ("E1", "T2"), ("E2", "T1")]:
+        find(cache, enterprise_id, team_id)
+
+    cache.invalidate("E1", None, is_enterprise_install=True)
+
+    assert cached_teams(cache) == {("E2", "T1")}
+
+
+def test_invalidation_replaces_a_cached_not_installed():
+    store = CountingStore()
+    cache = CachedInstallationStore(store)
+    assert find(cache, None, "T1") is None
+    assert find(cache, None, "T1") is None
+    assert len(store.loads) == 1
+
+    store.bots[(None, "T1")] = "bot"
+    cache.invalidate(None, "T1")
+
+    assert find(cache, None, "T1") == "bot"
+    assert len(store.loads) == 2
+
+
+def test_lookup_racing_an_invalidation_is_not_cached():
+    store = CountingStore()
+    cache = CachedInstallationStore(store)
+
+    def reinstall():
+        # Saved (and invalidated) after the lookup read the old state
+        store.bots[(None, "T1")] = "bot"
+        cache.invalidate(None, "T1")
+
+    store.during_load = reinstall
+
+    assert find(cache, None, "T1") is None
+    assert find(cache, None, "T1") == "bot"
+    assert len(store.loads) == 2
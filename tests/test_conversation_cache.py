@@ -0,0 +1,115 @@
+from listeners.listener_utils.conversation_cache import ConversationCache
+
+
+class HistoryClient:
+    """Serves conversations.history/replies from `messages` and counts the calls."""
+
+    def __init__(self, messages: list[dict]):
+        self.messages = messages
+        self.calls = []
+
+    def conversations_history(self, channel: str, limit: int):
+        self.calls.append(("history", channel))
+        return {"messages": list(reversed(self.messages))[:limit]}
+
+    def conversations_replies(self, channel: str, ts: str, limit: int):
+        self.calls.append(("replies", channel, ts))
+        return {"messages": self.messages[:limit]}
+
+
+def message(ts: str, text: str, **fields) -> dict:
+    return {"type": "message", "ts": ts, "text": text, **fields}
+
+
+def texts(messages: list[dict]) -> list[str]:
+    return [m["text"] for m in messages]
+
+
+def test_new_messages_are_appended_to_cached_conversations():
+    cache = ConversationCache()
+    client = HistoryClient([message("1.0", "first")])
+    cache.get(client, "C1")
+
+    cache.record_event(message("2.0", "second", channel="C1"))
+    # Not cached yet, so left for the backfill
+    cache.record_event(message("3.0", "elsewhere", channel="C2"))
+
+    assert texts(cache.get(client, "C1")) == ["first", "second"]
+    assert client.calls == [("history", "C1")]
+    assert cache._lookup(("C2", None)) is None
+
+
+def test_edits_replace_the_cached_message():
+    cache = ConversationCache()
+    client = HistoryClient([message("1.0", "dsik full"), message("2.0", "help")])
+    cache.get(client, "C1")
+
+    cache.record_event(
+        {
+            "type": "message",
+            "subtype": "message_changed",
+            "channel": "C1",
+            "message": message("1.0", "disk full"),
+        }
+    )
+
+    assert texts(cache.get(client, "C1")) == ["disk full", "help"]
+
+
+def test_deletes_remove_the_cached_message():
+    cache = ConversationCache()
+    client = HistoryClient([message("1.0", "oops"), message("2.0", "help")])
+    cache.get(client, "C1")
+
+    cache.record_event(
+        {
+            "type": "message",
+            "subtype": "message_deleted",
+            "channel": "C1",
+            "deleted_ts": "1.0",
+            "previous_message": message("1.0", "oops"),
+        }
+    )
+
+    assert texts(cache.get(client, "C1")) == ["help"]
+
+
+def test_thread_edits_reach_the_thread_and_its_broadcast():
+    cache = ConversationCache()
+    parent = message("1.0", "incident", thread_ts="1.0")
+    cache.get(HistoryClient([parent]), "C1", thread_ts="1.0")
+    cache.get(HistoryClient([parent]), "C1")
+
+    cache.record_event(
+        {
+            "type": "message",
+            "subtype": "message_changed",
+            "channel": "C1",
+            "message": message("1.0", "incident resolved", thread_ts="1.0"),
+        }
+    )
+
+    assert texts(cache._lookup(("C1", "1.0"))) == ["incident resolved"]
+    assert texts(cache._lookup(("C1", None))) == ["incident resolved"]
+
+
+def test_expired_conversations_are_backfilled_again():
+    cache = ConversationCache(ttl_seconds=0)
+    client = HistoryClient([message("1.0", "first")])
+    cache.get(client, "C1")
+    cache.get(client, "C1")
+    assert client.calls == [("history", "C1"), ("history", "C1")]
+
+
+def test_least_recently_used_conversation_is_evicted():
+    cache = ConversationCache(max_size=2)
+    client = HistoryClient([message("1.0", "first")])
+    cache.get(client, "C1")
+    cache.get(client, "C2")
+    # C1 is used again, so C2 is the least recently used when C3 arrives
+    cache.get(client, "C1")
+    cache.get(client, "C3")
+
+    assert list(cache._entries) == [("C1", None), ("C3", None)]
+    cache.get(client, "C2")
+    assert client.calls.count(("history", "C2")) == 2
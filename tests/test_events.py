@@ -0,0 +1,20 @@
+import asyncio
+
+from slack_bolt.async_app import AsyncApp
+
+from listeners.events import register_async
+from listeners.events.app_messaged import async_is_direct_message
+
+
+def test_async_message_listener_only_matches_direct_messages():
+    app = AsyncApp(token="xoxb-test", signing_secret="secret")
+    register_async(app)
+    matchers = [
+        getattr(matcher, "func", None)
+        for listener in app._async_listeners
+        for matcher in listener.matchers
+    ]
+    assert async_is_direct_message in matchers
+
+    assert asyncio.run(async_is_direct_message({"channel_type": "im"}))
+    assert not asyncio.run(async_is_direct_message({"channel_type": "channel"}))
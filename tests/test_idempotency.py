@@ -0,0 +1,139 @@
+import asyncio
+import logging
+import threading
+
+import pytest
+
+from listeners.listener_utils import idempotency
+from listeners.listener_utils.idempotency import (
+    InMemoryIdempotencyStore,
+    SharedStateIdempotencyStore,
+    SqliteIdempotencyStore,
+    event_idempotency_key,
+)
+from listeners.middleware.deduplication import (
+    async_drop_duplicate_events,
+    drop_duplicate_events,
+)
+from shared_state import InMemorySharedState
+
+
+def event_body(event_type: str = "message", **event) -> dict:
+    return {
+        "type": "event_callback",
+        "event_id": "Ev1",
+        "event": {"type": event_type, "client_msg_id": "msg-1", **event},
+    }
+
+
+def test_retried_delivery_has_the_same_key():
+    first = event_body(text="hello")
+    retry = {**event_body(text="hello"), "event_id": "Ev2", "retry_attempt": 1}
+    assert event_idempotency_key(first) == event_idempotency_key(retry)
+
+
+def test_mention_and_message_of_one_post_have_different_keys():
+    assert event_idempotency_key(event_body("message")) != event_idempotency_key(
+        event_body("app_mention")
+    )
+    assert event_idempotency_key(event_body("message")) != event_idempotency_key(
+        event_body("message", subtype="message_changed")
+    )
+
+
+def test_event_id_is_used_without_client_msg_id():
+    body = {
+        "type": "event_callback",
+        "event_id": "Ev9",
+        "event": {"type": "app_home_opened"},
+    }
+    assert event_idempotency_key(body) == "app_home_opened::Ev9"
+
+
+def test_non_event_payloads_have_no_key():
+    assert event_idempotency_key({"type": "block_actions"}) is None
+    assert event_idempotency_key({"command": "/ask", "text": "hi"}) is None
+    assert (
+        event_idempotency_key({"type": "event_callback", "event": {"type": "message"}})
+        is None
+    )
+
+
+def test_in_memory_store_claims_once_within_ttl():
+    store = InMemoryIdempotencyStore(ttl_seconds=60)
+    assert store.claim("k")
+    assert not store.claim("k")
+    assert store.duplicates == 1
+
+    expired = InMemoryIdempotencyStore(ttl_seconds=0)
+    assert expired.claim("k")
+    assert expired.claim("k")
+
+
+def test_in_memory_store_is_bounded():
+    store = InMemoryIdempotencyStore(ttl_seconds=60, max_keys=2)
+    for key in ("a", "b", "c"):
+        assert store.claim(key)
+    assert len(store._keys) == 2
+    # The oldest key was dropped to make room
+    assert store.claim("a")
+
+
+def test_sqlite_store_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "idempotency.sqlite3")
+    first, second = SqliteIdempotencyStore(path), SqliteIdempotencyStore(path)
+    assert first.claim("k")
+    assert not second.claim("k")
+
+    expired = SqliteIdempotencyStore(str(tmp_path / "expired.sqlite3"), ttl_seconds=-1)
+    assert expired.claim("k")
+    assert expired.claim("k")
+
+
+def test_shared_state_store_claims_once():
+    store = SharedStateIdempotencyStore(InMemorySharedState(), ttl_seconds=60)
+    assert store.claim("k")
+    assert not store.claim("k")
+
+
+@pytest.mark.parametrize("retry_body", [{"retry_attempt": 1}, {"event_id": "Ev2"}])
+def test_middleware_drops_redelivered_events(monkeypatch, retry_body):
+    monkeypatch.setattr(idempotency, "_store", InMemoryIdempotencyStore())
+    calls = []
+    logger = logging.getLogger(__name__)
+
+    assert drop_duplicate_events(event_body(), logger, lambda: calls.append(1)) is None
+    response = drop_duplicate_events(
+        {**event_body(), **retry_body}, logger, lambda: calls.append(1)
+    )
+
+    assert calls == [1]
+    assert response.status == 200
+
+
+def test_async_middleware_claims_blocking_stores_off_the_loop(monkeypatch):
+    claimed_on = []
+
+    class RecordingStore(SharedStateIdempotencyStore):
+        def _claim(self, key: str) -> bool:
+            claimed_on.append(threading.current_thread())
+            return super()._claim(key)
+
+    monkeypatch.setattr(
+        idempotency, "_store", RecordingStore(InMemorySharedState(), ttl_seconds=60)
+    )
+    calls = []
+
+    async def next():
+        calls.append(1)
+
+    async def deliver_twice():
+        logger = logging.getLogger(__name__)
+        await async_drop_duplicate_events(event_body(), logger, next)
+        return await async_drop_duplicate_events(event_body(), logger, next)
+
+    response = asyncio.run(deliver_twice())
+
+    assert calls == [1]
+    assert response.status == 200
+    assert threading.main_thread() not in claimed_on
@@ -0,0 +1,164 @@
+import asyncio
+import concurrent.futures
+import logging
+
+from ai.augmentation import Augmentation
+from listeners.commands import incident_command
+from listeners.commands.incident_command import (
+    async_incident_callback,
+    incident_callback,
+)
+
+
+class AsyncClient:
+    def __init__(self):
+        self.calls = []
+
+    async def chat_postMessage(self, **kwargs):
+        self.calls.append(("chat_postMessage", kwargs))
+        return {"ts": "1.0"}
+
+    async def chat_update(self, **kwargs):
+        self.calls.append(("chat_update", kwargs))
+        return {"ts": kwargs["ts"]}
+
+    async def chat_postEphemeral(self, **kwargs):
+        self.calls.append(("chat_postEphemeral", kwargs))
+        return {}
+
+
+async def ack():
+    pass
+
+
+async def arun_incident(client: AsyncClient):
+    command = {"text": "kafka backlog is growing"}
+    context = {"user_id": "U1", "channel_id": "C1"}
+    await async_incident_callback(
+        client, ack, command, None, logging.getLogger(__name__), context
+    )
+
+
+def run_incident(client: AsyncClient):
+    asyncio.run(arun_incident(client))
+
+
+class Client:
+    """Sync WebClient stand-in; appends each call's method name to `events`."""
+
+    def __init__(self, events: list):
+        self.token = "xoxb-test"
+        self.events = events
+
+    def _call(self, method: str, kwargs: dict):
+        self.events.append(method)
+        return {"ok": True, "ts": kwargs.get("ts", "1.0")}
+
+    def __getattr__(self, method: str):
+        if method.startswith("chat_"):
+            return lambda **kwargs: self._call(method, kwargs)
+        raise AttributeError(method)
+
+
+def run_sync_incident(client: Client):
+    command = {"text": "kafka backlog is growing"}
+    context = {"user_id": "U1", "channel_id": "C1"}
+    incident_callback(
+        client, lambda: None, command, None, logging.getLogger(__name__), context
+    )
+
+
+def histogram_count(metric) -> int:
+    return sum(sum(counts) for counts, _ in metric.values().values())
+
+
+def test_phases_are_exported_as_histograms(monkeypatch):
+    async def prepare(*args, **kwargs):
+        return Augmentation(
+            system_content="system",
+            rag_sources=[{"filename": "kafka.md", "content": "Scale out"}],
+        )
+
+    async def respond(user_id, prompt, context=None, augmentation=None):
+        return {
+            "response": "Scale out the consumers",
+            "rag_sources": (await augmentation).rag_sources,
+        }
+
+    monkeypatch.setattr(incident_command, "aprepare_augmentation", prepare)
+    monkeypatch.setattr(incident_command, "aget_provider_response", respond)
+    useful = histogram_count(incident_command.INCIDENT_TIME_TO_USEFUL)
+    complete = histogram_count(incident_command.INCIDENT_TIME_TO_COMPLETE)
+
+    run_incident(AsyncClient())
+
+    assert histogram_count(incident_command.INCIDENT_TIME_TO_USEFUL) == useful + 1
+    assert histogram_count(incident_command.INCIDENT_TIME_TO_COMPLETE) == complete + 1
+
+
+def test_failed_retrieval_cancels_generation(monkeypatch):
+    generation = {}
+
+    async def prepare(*args, **kwargs):
+        await asyncio.sleep(0.01)
+        raise RuntimeError("vector store unavailable")
+
+    async def respond(*args, **kwargs):
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            generation["cancelled"] = True
+            raise
+
+    monkeypatch.setattr(incident_command, "aprepare_augmentation", prepare)
+    monkeypatch.setattr(incident_command, "aget_provider_response", respond)
+    client = AsyncClient()
+
+    async def scenario():
+        await arun_incident(client)
+        await asyncio.sleep(0)
+        # Cancelled by the callback, not left running until the event loop shuts down
+        return generation.get("cancelled", False)
+
+    assert asyncio.run(scenario())
+    method, kwargs = client.calls[-1]
+    assert method == "chat_update" and "vector store unavailable" in kwargs["text"]
+
+
+def test_sync_generation_starts_before_the_loading_post(monkeypatch):
+    events = []
+    augmentation = concurrent.futures.Future()
+    augmentation.set_result(Augmentation(system_content="system"))
+    response = concurrent.futures.Future()
+    response.set_result({"response": "Scale out the consumers"})
+
+    def respond(user_id, prompt, context=None, augmentation=None):
+        events.append("generation")
+        return response
+
+    monkeypatch.setattr(
+        incident_command, "start_augmentation", lambda *args, **kwargs: augmentation
+    )
+    monkeypatch.setattr(incident_command, "start_provider_response", respond)
+    complete = histogram_count(incident_command.INCIDENT_TIME_TO_COMPLETE)
+
+    run_sync_incident(Client(events))
+
+    assert events.index("generation") < events.index("chat_postMessage")
+    assert histogram_count(incident_command.INCIDENT_TIME_TO_COMPLETE) == complete + 1
+
+
+def test_sync_failed_retrieval_cancels_generation(monkeypatch):
+    augmentation = concurrent.futures.Future()
+    augmentation.set_exception(RuntimeError("vector store unavailable"))
+    response = concurrent.futures.Future()
+    monkeypatch.setattr(
+        incident_command, "start_augmentation", lambda *args, **kwargs: augmentation
+    )
+    monkeypatch.setattr(
+        incident_command, "start_provider_response", lambda *args, **kwargs: response
+    )
+
+    run_sync_incident(Client([]))
+
+    assert response.cancelled()
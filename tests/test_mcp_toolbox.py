@@ -0,0 +1,68 @@
+from types import SimpleNamespace
+
+from ai.augmentation import mcp_toolbox
+from ai.augmentation.mcp_toolbox import MCPToolbox
+from ai.event_loop import run_sync
+
+
+class FakeSession:
+    def __init__(self):
+        self.calls = []
+
+    async def call_tool(self, name, arguments):
+        self.calls.append((name, arguments))
+        text = SimpleNamespace(text=f"{name} #{len(self.calls)}")
+        return SimpleNamespace(content=[text], isError=False)
+
+
+def toolbox_with(*names):
+    toolbox = MCPToolbox()
+    session = FakeSession()
+    for name in names:
+        toolbox.sessions[name] = session
+    return toolbox, session
+
+
+def test_read_only_tool_results_are_cached():
+    toolbox, session = toolbox_with("search_code")
+    first = run_sync(toolbox.call_tool("search_code", {"q": "kafka"}))
+    second = run_sync(toolbox.call_tool("search_code", {"q": "kafka"}))
+    assert first == second == ("search_code #1", False)
+    assert len(session.calls) == 1
+
+
+def test_write_tools_are_always_called():
+    toolbox, session = toolbox_with("create_issue")
+    arguments = {"owner": "o", "repo": "r", "title": "Disk full"}
+    run_sync(toolbox.call_tool("create_issue", arguments))
+    result = run_sync(toolbox.call_tool("create_issue", arguments))
+    assert result == ("create_issue #2", False)
+    assert len(session.calls) == 2
+
+
+def test_failed_server_is_reopened_without_the_healthy_one(tmp_path, monkeypatch):
+    config = tmp_path / "server_config.json"
+    config.write_text('{"mcpServers": {"github": {}, "broken": {}}}')
+    monkeypatch.setattr(mcp_toolbox, "MCP_SERVER_CONFIG", str(config))
+    monkeypatch.setattr(mcp_toolbox, "MCP_RECONNECT_SECONDS", 0)
+    toolbox = MCPToolbox()
+    attempts = []
+
+    async def connect(exit_stack, server):
+        attempts.append(server.name)
+        if server.name == "broken":
+            return False
+        server.session = FakeSession()
+        server.tools = [{"name": "search_code", "description": "", "input_schema": {}}]
+        return True
+
+    monkeypatch.setattr(toolbox, "_connect_to_mcp_server", connect)
+
+    run_sync(toolbox.start())
+    session = toolbox.sessions["search_code"]
+    run_sync(toolbox.start())
+
+    assert sorted(attempts) == ["broken", "broken", "github"]
+    assert toolbox.sessions["search_code"] is session
+    assert [tool["name"] for tool in toolbox.tools] == ["search_code"]
+    toolbox.close()
@@ -0,0 +1,152 @@
+import asyncio
+import functools
+from types import SimpleNamespace
+
+import pytest
+
+from ai import providers
+from ai.augmentation import Augmentation
+from ai.providers import rate_limiter
+from ai.providers.anthropic import AnthropicAPI
+from ai.providers.base_provider import BaseAPIProvider
+
+
+class StatusError(Exception):
+    def __init__(self, status_code: int, retry_after: str = "0.01"):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers={"retry-after": retry_after})
+
+
+class Toolbox:
+    tools = [{"name": "search", "description": "", "input_schema": {}}]
+
+    def __init__(self):
+        self.calls = []
+
+    async def call_tool(self, name: str, arguments: dict):
+        self.calls.append(name)
+        return "result", False
+
+
+class EventStream:
+    """Async iterable and context manager over canned SDK stream events."""
+
+    def __init__(self, events: list):
+        self.events = events
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def __aiter__(self):
+        for event in self.events:
+            yield event
+
+
+class ToolLoopProvider(BaseAPIProvider):
+    """Two model requests with a tool call in between; `failures` lists errors to raise per request."""
+
+    NAME = "toolloop"
+    MODELS = {"loop-model": {"name": "Loop", "provider": "Test", "max_tokens": 16}}
+    failures = {}
+    requests = []
+
+    def set_model(self, model_name: str):
+        self.current_model = model_name
+
+    def get_models(self) -> dict:
+        return self.MODELS
+
+    async def _request(self, iteration: int) -> str:
+        with self._llm_call(iteration):
+            ToolLoopProvider.requests.append(iteration)
+            errors = self.failures.get(iteration)
+            if errors:
+                raise errors.pop(0)
+            return f"answer {iteration}"
+
+    async def agenerate_response(
+        self, prompt: str, system_content: str, toolbox=None
+    ) -> str:
+        for iteration in (1, 2):
+            answer = await self._limited(
+                functools.partial(self._request, iteration),
+                self._estimate_tokens(prompt, system_content),
+            )
+            if iteration == 1:
+                await toolbox.call_tool("search", {})
+        return answer
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    monkeypatch.setitem(providers.PROVIDERS, "toolloop", ToolLoopProvider)
+    monkeypatch.setattr(rate_limiter, "_limiters", {})
+    monkeypatch.setattr(rate_limiter, "MAX_RETRIES", 2)
+    ToolLoopProvider.requests = []
+    return ToolLoopProvider
+
+
+def test_retry_repeats_only_the_failed_request(provider):
+    provider.failures = {2: [StatusError(429)]}
+    toolbox = Toolbox()
+    augmentation = Augmentation(system_content="system", toolbox=toolbox)
+
+    response = asyncio.run(
+        providers._agenerate("toolloop", "loop-model", "prompt", augmentation)
+    )
+
+    assert response == "answer 2"
+    assert provider.requests == [1, 2, 2]
+    assert toolbox.calls == ["search"]
+
+
+def test_exhausted_retries_propagate_for_fallback(provider):
+    provider.failures = {2: [StatusError(503) for _ in range(3)]}
+    augmentation = Augmentation(system_content="system", toolbox=Toolbox())
+
+    with pytest.raises(StatusError):
+        asyncio.run(
+            providers._agenerate("toolloop", "loop-model", "prompt", augmentation)
+        )
+    assert provider.requests == [1, 2, 2, 2]
+
+
+def test_stream_is_opened_through_the_rate_limiter(provider, monkeypatch):
+    events = [
+        SimpleNamespace(
+            type="message_start",
+            message=SimpleNamespace(usage=SimpleNamespace(input_tokens=12)),
+        ),
+        *(
+            SimpleNamespace(
+                type="content_block_delta",
+                delta=SimpleNamespace(type="text_delta", text=text),
+            )
+            for text in ("Scale ", "out")
+        ),
+        SimpleNamespace(type="message_delta", usage=SimpleNamespace(output_tokens=2)),
+    ]
+    requests = []
+
+    async def create(**params):
+        requests.append(params)
+        if len(requests) == 1:
+            raise StatusError(429)
+        return EventStream(events)
+
+    anthropic = AnthropicAPI()
+    anthropic.set_model("claude-3-haiku-20240307")
+    client = SimpleNamespace(messages=SimpleNamespace(create=create))
+    monkeypatch.setattr(anthropic, "_get_client", lambda: client)
+
+    async def collect():
+        return [text async for text in anthropic.agenerate_response_stream("p", "s")]
+
+    assert asyncio.run(collect()) == ["Scale ", "out"]
+    # The 429 was retried by the limiter before any text was yielded
+    assert len(requests) == 2 and requests[1]["stream"]
+    assert "anthropic" in rate_limiter._limiters
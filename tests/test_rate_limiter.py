@@ -0,0 +1,148 @@
+import asyncio
+
+import pytest
+
+from ai.providers import rate_limiter
+from ai.providers.rate_limiter import (
+    CircuitBreaker,
+    ProviderLimiter,
+    ProviderUnavailableError,
+    RateLimitExceededError,
+)
+
+
+class StatusError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+@pytest.fixture(autouse=True)
+def no_retries(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "MAX_RETRIES", 0)
+
+
+def open_limiter(reset_seconds: float = 30.0) -> ProviderLimiter:
+    """A limiter whose breaker has just opened."""
+    limiter = ProviderLimiter("test", requests_per_minute=600, tokens_per_minute=600000)
+    limiter.breaker = CircuitBreaker(failure_threshold=1, reset_seconds=reset_seconds)
+    limiter.breaker.record_failure()
+    assert limiter.breaker.state == CircuitBreaker.OPEN
+    return limiter
+
+
+def elapse_reset(limiter: ProviderLimiter):
+    limiter.breaker.opened_at -= limiter.breaker.reset_seconds
+
+
+def fail(status_code: int):
+    def fn():
+        raise StatusError(status_code)
+
+    return fn
+
+
+def test_breaker_opens_after_threshold_and_refuses_until_reset():
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=30)
+    breaker.record_failure()
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.is_open()
+    assert not breaker.allow_request()
+
+    breaker.opened_at -= 30
+    assert breaker.allow_request()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # Only one trial at a time
+    assert not breaker.allow_request()
+
+
+def test_open_breaker_refuses_without_calling_provider():
+    limiter = open_limiter()
+    calls = []
+    with pytest.raises(ProviderUnavailableError):
+        limiter.call(lambda: calls.append(1))
+    assert calls == []
+
+
+def test_successful_trial_closes_breaker():
+    limiter = open_limiter()
+    elapse_reset(limiter)
+    assert limiter.call(lambda: "ok") == "ok"
+    assert limiter.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_retryable_trial_failure_reopens_breaker():
+    limiter = open_limiter()
+    elapse_reset(limiter)
+    with pytest.raises(StatusError):
+        limiter.call(fail(503))
+    assert limiter.breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(ProviderUnavailableError):
+        limiter.call(lambda: "ok")
+
+
+def test_non_retryable_trial_failure_closes_breaker():
+    limiter = open_limiter()
+    elapse_reset(limiter)
+    with pytest.raises(StatusError):
+        limiter.call(fail(400))
+    assert limiter.breaker.state == CircuitBreaker.CLOSED
+    assert limiter.call(lambda: "ok") == "ok"
+
+
+def test_rate_limited_request_does_not_take_trial_slot(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "MAX_QUEUE_SECONDS", 0)
+    limiter = open_limiter()
+    elapse_reset(limiter)
+    limiter.request_bucket.tokens = 0
+    with pytest.raises(RateLimitExceededError):
+        limiter.call(lambda: "ok")
+    assert limiter.breaker.state == CircuitBreaker.OPEN
+
+    limiter.request_bucket.tokens = limiter.request_bucket.capacity
+    assert limiter.call(lambda: "ok") == "ok"
+    assert limiter.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_cancelled_trial_releases_slot():
+    limiter = open_limiter()
+    elapse_reset(limiter)
+
+    async def scenario():
+        started = asyncio.Event()
+
+        async def hang():
+            started.set()
+            await asyncio.sleep(60)
+
+        task = asyncio.create_task(limiter.acall(hang))
+        await started.wait()
+        assert limiter.breaker.state == CircuitBreaker.HALF_OPEN
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        async def ok():
+            return "ok"
+
+        return await limiter.acall(ok)
+
+    assert asyncio.run(scenario()) == "ok"
+    assert limiter.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_sequence_does_not_leave_breaker_half_open():
+    """A mix of trial outcomes must never lock the provider out for good."""
+    limiter = open_limiter()
+    for fn, error in (
+        (fail(400), StatusError),
+        (fail(503), StatusError),
+        (fail(422), StatusError),
+    ):
+        elapse_reset(limiter)
+        with pytest.raises(error):
+            limiter.call(fn)
+        assert limiter.breaker.state != CircuitBreaker.HALF_OPEN
+    elapse_reset(limiter)
+    assert limiter.call(lambda: "ok") == "ok"
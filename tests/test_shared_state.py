@@ -0,0 +1,78 @@
+import threading
+import time
+
+import pytest
+
+from shared_state import InMemorySharedState, RespSharedState, resp
+from shared_state.local_server import LocalRespServer
+
+
+@pytest.fixture
+def server():
+    server = LocalRespServer().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def connections(monkeypatch):
+    """Every connection the RESP client opens; `hold` makes the next calls block until set."""
+    opened = []
+    hold = threading.Event()
+    hold.set()
+
+    class RecordingConnection(resp._Connection):
+        def __init__(self, *args):
+            super().__init__(*args)
+            opened.append(self)
+
+        def call(self, commands):
+            hold.wait(5)
+            return super().call(commands)
+
+    monkeypatch.setattr(resp, "_Connection", RecordingConnection)
+    return opened, hold
+
+
+def test_expired_keys_are_swept_without_being_read():
+    state = InMemorySharedState(sweep_interval_seconds=0)
+    for i in range(100):
+        state.set(f"claim:{i}", "1", ttl_seconds=0.01)
+    state.set("selection", "claude")
+    time.sleep(0.02)
+
+    assert state.get("selection") == "claude"
+    assert list(state._data) == ["selection"]
+
+
+def test_pool_caps_connections_under_concurrency(server, connections):
+    opened, _ = connections
+    state = RespSharedState(server.url, pool_size=2)
+
+    def work(worker: int):
+        for i in range(20):
+            state.set(f"k{worker}", str(i))
+            assert state.get(f"k{worker}") == str(i)
+
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert 1 <= len(opened) <= 2
+
+
+def test_caller_times_out_while_every_connection_is_busy(server, connections):
+    _, hold = connections
+    state = RespSharedState(server.url, pool_size=1, pool_timeout_seconds=0.05)
+    hold.clear()
+    busy = threading.Thread(target=state.set, args=("k", "v"))
+    busy.start()
+    time.sleep(0.05)
+
+    with pytest.raises(TimeoutError):
+        state.get("k")
+    hold.set()
+    busy.join()
+    assert state.get("k") == "v"
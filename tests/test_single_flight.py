@@ -0,0 +1,103 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from shared_state import InMemorySharedState, asingle_flight
+
+
+def test_concurrent_callers_share_one_computation():
+    state = InMemorySharedState()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "value"
+
+    async def scenario():
+        return await asyncio.gather(
+            *(asingle_flight(state, "k", compute, 60) for _ in range(5))
+        )
+
+    started_at = time.monotonic()
+    assert asyncio.run(scenario()) == ["value"] * 5
+    assert len(calls) == 1
+    # Waiters are woken by the result, not by a 0.25s poll
+    assert time.monotonic() - started_at < 0.2
+    assert asyncio.run(asingle_flight(state, "k", compute, 60)) == "value"
+    assert len(calls) == 1
+
+
+def test_waiter_takes_over_when_computation_fails():
+    state = InMemorySharedState()
+    attempts = []
+
+    async def compute():
+        attempts.append(1)
+        await asyncio.sleep(0.02)
+        if len(attempts) == 1:
+            raise RuntimeError("provider down")
+        return "second"
+
+    async def scenario():
+        return await asyncio.gather(
+            asingle_flight(state, "k", compute, 60),
+            asingle_flight(state, "k", compute, 60),
+            return_exceptions=True,
+        )
+
+    first, second = asyncio.run(scenario())
+    assert isinstance(first, RuntimeError)
+    assert second == "second"
+    assert len(attempts) == 2
+
+
+def test_callers_on_different_event_loops_share_one_computation():
+    state = InMemorySharedState()
+    calls = []
+    release = threading.Event()
+
+    async def compute():
+        calls.append(1)
+        await asyncio.to_thread(release.wait)
+        return "value"
+
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(
+                asyncio.run(asingle_flight(state, "k", compute, 60))
+            )
+        )
+        for _ in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert results == ["value"] * 3
+    assert len(calls) == 1
+
+
+def test_cancelled_waiter_does_not_cancel_computation():
+    state = InMemorySharedState()
+
+    async def compute():
+        await asyncio.sleep(0.05)
+        return "value"
+
+    async def scenario():
+        owner = asyncio.create_task(asingle_flight(state, "k", compute, 60))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(asingle_flight(state, "k", compute, 60))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return await owner
+
+    assert asyncio.run(scenario()) == "value"
@@ -0,0 +1,163 @@
+import threading
+import time
+
+import pytest
+from slack_sdk.errors import SlackApiError
+
+from listeners.listener_utils import slack_outbox
+from listeners.listener_utils.slack_outbox import SlackOutbox
+
+
+class FakeResponse:
+    def __init__(self, status_code: int, headers: dict):
+        self.status_code = status_code
+        self.headers = headers
+
+    def get(self, key, default=None):
+        return default
+
+
+class FakeClient:
+    """Records (method, kwargs) in send order; `fail` maps a text to the errors to raise for it first."""
+
+    def __init__(self, token: str = "xoxb-test", fail=None):
+        self.token = token
+        self.sent = []
+        self.fail = fail or {}
+        self._lock = threading.Lock()
+
+    def _call(self, method: str, kwargs: dict):
+        with self._lock:
+            self.sent.append((method, kwargs))
+            errors = self.fail.get(kwargs.get("text"))
+            if errors:
+                raise errors.pop(0)
+        return {"ok": True, "ts": kwargs.get("ts", "1.0"), "text": kwargs.get("text")}
+
+    def __getattr__(self, method: str):
+        if method.startswith(("chat_", "views_")):
+            return lambda **kwargs: self._call(method, kwargs)
+        raise AttributeError(method)
+
+
+def ratelimited(retry_after: float = 0.05) -> SlackApiError:
+    return SlackApiError(
+        "ratelimited", FakeResponse(429, {"Retry-After": str(retry_after)})
+    )
+
+
+def throttle(
+    outbox: SlackOutbox,
+    client: FakeClient,
+    method: str,
+    channel: str = "",
+    per_second: float = 10.0,
+):
+    """Empty a method's bucket so its next call waits 1 / per_second."""
+    bucket = outbox._bucket(client, method, channel)
+    bucket.tokens = 0
+    bucket.refill_per_second = per_second
+    bucket.updated_at = time.monotonic()
+    return bucket
+
+
+def test_calls_in_a_lane_are_sent_in_order(monkeypatch):
+    monkeypatch.setitem(
+        slack_outbox.METHOD_REQUESTS_PER_MINUTE, "chat.postEphemeral", 60000
+    )
+    outbox = SlackOutbox(workers=4)
+    client = FakeClient()
+    futures = [
+        outbox.send(client, "chat_postEphemeral", channel="C1", user="U1", text=str(i))
+        for i in range(20)
+    ]
+    for future in futures:
+        future.result(timeout=5)
+    assert [kwargs["text"] for _, kwargs in client.sent] == [str(i) for i in range(20)]
+
+
+def test_ratelimited_call_is_retried_before_later_calls_of_its_lane():
+    outbox = SlackOutbox(workers=4)
+    client = FakeClient(fail={"first": [ratelimited()]})
+    first = outbox.send(
+        client, "chat_postEphemeral", channel="C1", user="U1", text="first"
+    )
+    second = outbox.send(
+        client, "chat_postEphemeral", channel="C1", user="U1", text="second"
+    )
+    assert first.result(timeout=5)["text"] == "first"
+    assert second.result(timeout=5)["text"] == "second"
+    assert [kwargs["text"] for _, kwargs in client.sent] == ["first", "first", "second"]
+    assert outbox.retried == 1
+
+
+def test_retries_are_bounded(monkeypatch):
+    monkeypatch.setattr(slack_outbox, "OUTBOX_MAX_RETRIES", 1)
+    outbox = SlackOutbox(workers=1)
+    client = FakeClient(fail={"x": [ratelimited(), ratelimited(), ratelimited()]})
+    future = outbox.send(
+        client, "chat_postEphemeral", channel="C1", user="U1", text="x"
+    )
+    with pytest.raises(SlackApiError):
+        future.result(timeout=5)
+    assert len(client.sent) == 2
+
+
+def test_other_errors_are_not_retried():
+    outbox = SlackOutbox(workers=1)
+    error = SlackApiError("channel_not_found", FakeResponse(200, {}))
+    client = FakeClient(fail={"x": [error]})
+    with pytest.raises(SlackApiError):
+        outbox.send(client, "chat_postMessage", channel="C1", text="x").result(
+            timeout=5
+        )
+    assert len(client.sent) == 1
+
+
+def test_pending_updates_are_coalesced():
+    outbox = SlackOutbox(workers=2)
+    client = FakeClient()
+    throttle(outbox, client, "chat.update", per_second=5.0)
+    futures = [
+        outbox.send(client, "chat_update", channel="C1", ts="1.0", text=f"v{i}")
+        for i in range(5)
+    ]
+    results = [future.result(timeout=5) for future in futures]
+    assert [kwargs["text"] for _, kwargs in client.sent] == ["v4"]
+    assert all(result["text"] == "v4" for result in results)
+    assert outbox.coalesced == 4
+
+
+def test_throttled_updates_do_not_hold_up_other_lanes():
+    outbox = SlackOutbox(workers=1)
+    client = FakeClient()
+    # 12 updates at 2 per second would hold a worker that sleeps for capacity for 6 seconds
+    throttle(outbox, client, "chat.update", per_second=2.0)
+    for i in range(12):
+        outbox.send(
+            client, "chat_update", channel="C1", ts=f"{i}.0", text=f"update {i}"
+        )
+
+    started_at = time.monotonic()
+    outbox.send(client, "chat_postMessage", channel="C1", text="same channel").result(
+        timeout=5
+    )
+    outbox.send(
+        client, "chat_postEphemeral", channel="C2", user="U1", text="other channel"
+    ).result(timeout=5)
+    assert time.monotonic() - started_at < 1.0
+    assert outbox.pending() > 0
+
+
+def test_lanes_are_dropped_once_drained():
+    outbox = SlackOutbox(workers=2)
+    client = FakeClient()
+    for channel in ("C1", "C2", "C3"):
+        outbox.send(
+            client, "chat_postEphemeral", channel=channel, user="U1", text=channel
+        ).result(timeout=5)
+    deadline = time.monotonic() + 2
+    while outbox._lanes and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert outbox._lanes == {}
+    assert outbox.pending() == 0
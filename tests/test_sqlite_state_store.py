@@ -0,0 +1,82 @@
+import logging
+import time
+
+import pytest
+
+from state_store import sqlite_state_store
+from state_store.sqlite_state_store import SqliteStateStore
+from state_store.user_identity import UserIdentity
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "user_state.sqlite3")
+
+
+def identity(user_id: str, model: str = "claude") -> UserIdentity:
+    return UserIdentity(user_id=user_id, provider="anthropic", model=model)
+
+
+def test_flush_commits_queued_writes_for_other_processes(db_path):
+    store = SqliteStateStore(db_path=db_path, migrate_from_dir=None)
+    store.set_state(identity("U1"))
+    store.set_state(identity("U2", "gpt"))
+    # Read your own writes before the batch is committed
+    assert store.get_state("U1")["model"] == "claude"
+    assert store.flush(timeout=5)
+
+    other = SqliteStateStore(db_path=db_path, migrate_from_dir=None)
+    assert other.get_state("U2")["model"] == "gpt"
+
+    store.unset_state(identity("U1"))
+    assert store.flush(timeout=5)
+    assert other.get_state("U1") is None
+
+
+def test_last_write_wins_within_a_batch(db_path):
+    store = SqliteStateStore(db_path=db_path, migrate_from_dir=None)
+    for model in ("a", "b", "c"):
+        store.set_state(identity("U1", model))
+    assert store.flush(timeout=5)
+    assert (
+        SqliteStateStore(db_path=db_path, migrate_from_dir=None).get_state("U1")[
+            "model"
+        ]
+        == "c"
+    )
+
+
+def test_persistent_write_failure_is_dropped_and_logged(db_path, monkeypatch, caplog):
+    monkeypatch.setattr(sqlite_state_store, "WRITE_MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(sqlite_state_store, "WRITE_RETRY_SECONDS", 0.01)
+    monkeypatch.setattr(
+        sqlite_state_store,
+        "_UPSERT_STATE",
+        "INSERT INTO missing_table VALUES (?, ?, ?, ?)",
+    )
+    store = SqliteStateStore(db_path=db_path, migrate_from_dir=None)
+    with caplog.at_level(logging.ERROR):
+        store.set_state(identity("U1"))
+        assert store.flush(timeout=5)
+    assert "Dropped 1 user states after 3 failed writes" in caplog.text
+    assert "U1" in caplog.text
+
+
+def test_shutdown_flush_does_not_hang(db_path, monkeypatch, caplog):
+    monkeypatch.setattr(sqlite_state_store, "WRITE_MAX_ATTEMPTS", 1000)
+    monkeypatch.setattr(sqlite_state_store, "WRITE_RETRY_SECONDS", 0.01)
+    monkeypatch.setattr(sqlite_state_store, "SHUTDOWN_FLUSH_SECONDS", 0.2)
+    monkeypatch.setattr(
+        sqlite_state_store,
+        "_UPSERT_STATE",
+        "INSERT INTO missing_table VALUES (?, ?, ?, ?)",
+    )
+    store = SqliteStateStore(db_path=db_path, migrate_from_dir=None)
+    store.set_state(identity("U1"))
+
+    assert not store.flush(timeout=0.1)
+    started_at = time.monotonic()
+    with caplog.at_level(logging.ERROR):
+        store._flush_at_exit()
+    assert time.monotonic() - started_at < 1
+    assert "Dropped 1 unwritten user states at shutdown: U1" in caplog.text
@@ -0,0 +1,116 @@
+import logging
+
+import pytest
+
+from listeners.actions.set_user_selection import set_user_selection
+from state_store import user_state_cache
+from state_store.file_state_store import FileStateStore
+from state_store.shared_state_store import SharedStateStore
+from state_store.user_identity import UserIdentity
+from state_store.user_state_cache import UserStateCache
+from state_store.user_state_store import UserStateStore
+
+
+class CountingStore(UserStateStore):
+    """Dict-backed store counting reads; `fail_writes` makes set_state raise."""
+
+    def __init__(self):
+        self.states = {}
+        self.reads = 0
+        self.fail_writes = False
+
+    def get_state(self, user_id: str) -> UserIdentity | None:
+        self.reads += 1
+        return self.states.get(user_id)
+
+    def set_state(self, user_identity: UserIdentity):
+        if self.fail_writes:
+            raise OSError("disk full")
+        self.states[user_identity["user_id"]] = user_identity
+
+
+def identity(user_id: str, model: str = "claude") -> UserIdentity:
+    return UserIdentity(user_id=user_id, provider="anthropic", model=model)
+
+
+def selection(user_id: str, value: str) -> dict:
+    return {"user": {"id": user_id}, "actions": [{"selected_option": {"value": value}}]}
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = CountingStore()
+    monkeypatch.setattr(user_state_cache, "_cache", UserStateCache(store))
+    return store
+
+
+def test_writes_go_through_to_the_store(store):
+    cache = UserStateCache(store)
+    cache.set(identity("U1"))
+    assert store.states["U1"]["model"] == "claude"
+    assert cache.get("U1")["model"] == "claude"
+    assert store.reads == 0
+
+    store.fail_writes = True
+    with pytest.raises(OSError):
+        cache.set(identity("U1", "gpt"))
+    assert cache.get("U1")["model"] == "claude"
+
+
+def test_users_without_a_selection_are_cached_briefly(store):
+    cache = UserStateCache(store, negative_ttl_seconds=60)
+    assert cache.get("U1") is None
+    assert cache.get("U1") is None
+    assert store.reads == 1
+
+    expired = UserStateCache(store, negative_ttl_seconds=0)
+    expired.get("U1")
+    expired.get("U1")
+    assert store.reads == 3
+
+
+def test_selection_replaces_the_cached_state(store):
+    cache = user_state_cache.get_user_state_cache()
+    store.states["U1"] = identity("U1")
+    assert cache.get("U1")["model"] == "claude"
+
+    set_user_selection(
+        logging.getLogger(__name__), lambda: None, selection("U1", "gpt-4o OpenAI")
+    )
+
+    assert store.states["U1"] == UserIdentity(
+        user_id="U1", provider="OpenAI", model="gpt-4o"
+    )
+    assert cache.get("U1")["model"] == "gpt-4o"
+
+
+def test_failed_selection_still_drops_the_cached_state(store):
+    cache = user_state_cache.get_user_state_cache()
+    store.states["U1"] = identity("U1")
+    cache.get("U1")
+    store.fail_writes = True
+
+    set_user_selection(
+        logging.getLogger(__name__), lambda: None, selection("U1", "gpt-4o OpenAI")
+    )
+
+    # Read again from the store rather than served from the dropped entry
+    assert cache.get("U1")["model"] == "claude"
+    assert store.reads == 2
+
+
+@pytest.mark.parametrize(
+    ("backend", "ttl_seconds"),
+    [
+        (lambda tmp_path: FileStateStore(base_dir=str(tmp_path)), 300),
+        (lambda tmp_path: SharedStateStore(), 30),
+    ],
+)
+def test_ttl_is_capped_only_for_stores_other_processes_write(
+    monkeypatch, tmp_path, backend, ttl_seconds
+):
+    monkeypatch.setattr(user_state_cache, "USER_STATE_CACHE_TTL_SECONDS", 300)
+    monkeypatch.setattr(user_state_cache, "USER_STATE_NEGATIVE_TTL_SECONDS", 30)
+    monkeypatch.setattr(user_state_cache, "_store", backend(tmp_path))
+    monkeypatch.setattr(user_state_cache, "_cache", None)
+    assert user_state_cache.get_user_state_cache().ttl_seconds == ttl_seconds
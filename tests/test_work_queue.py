@@ -0,0 +1,90 @@
+import threading
+
+import pytest
+
+from listeners.listener_utils.work_queue import (
+    PRIORITY_DM,
+    PRIORITY_INCIDENT,
+    PRIORITY_SUMMARY,
+    WorkQueue,
+    WorkQueueFullError,
+)
+
+
+class BusyQueue:
+    """A one-worker queue whose worker is held by a blocking job until `release()`."""
+
+    def __init__(self, max_depth: int = 100):
+        self.queue = WorkQueue(workers=1, max_depth=max_depth)
+        self.ran = []
+        self._started = threading.Event()
+        self._release = threading.Event()
+        self.blocker, _ = self.queue.submit(self._block, PRIORITY_INCIDENT, "blocker")
+        assert self._started.wait(5)
+
+    def _block(self):
+        self._started.set()
+        self._release.wait(5)
+
+    def submit(self, name: str, priority: int, user_id: str):
+        return self.queue.submit(lambda: self.ran.append(name), priority, user_id)
+
+    def release(self, *futures):
+        self._release.set()
+        for future in futures:
+            future.result(timeout=5)
+
+
+def test_users_take_turns_within_a_priority_class():
+    busy = BusyQueue()
+    futures = [busy.submit(f"u1-{i}", PRIORITY_DM, "U1")[0] for i in range(3)]
+    futures.append(busy.submit("u2-0", PRIORITY_DM, "U2")[0])
+    busy.release(*futures)
+    assert busy.ran == ["u1-0", "u2-0", "u1-1", "u1-2"]
+
+
+def test_more_urgent_classes_run_first_and_positions_count_them():
+    busy = BusyQueue()
+    summary, summary_position = busy.submit("summary", PRIORITY_SUMMARY, "U1")
+    incident, incident_position = busy.submit("incident", PRIORITY_INCIDENT, "U2")
+    busy.release(summary, incident)
+    assert busy.ran == ["incident", "summary"]
+    assert (summary_position, incident_position) == (1, 1)
+
+
+def test_full_queue_sheds_newest_less_urgent_job():
+    busy = BusyQueue(max_depth=2)
+    kept, _ = busy.submit("dm-1", PRIORITY_DM, "U1")
+    shed, _ = busy.submit("dm-2", PRIORITY_DM, "U2")
+    incident, _ = busy.submit("incident", PRIORITY_INCIDENT, "U3")
+
+    with pytest.raises(WorkQueueFullError):
+        shed.result(timeout=5)
+    busy.release(kept, incident)
+    assert busy.ran == ["incident", "dm-1"]
+    assert busy.queue.stats()["rejected"] == 1
+
+
+def test_full_queue_rejects_when_nothing_is_less_urgent():
+    busy = BusyQueue(max_depth=1)
+    queued, _ = busy.submit("incident-1", PRIORITY_INCIDENT, "U1")
+    with pytest.raises(WorkQueueFullError):
+        busy.submit("incident-2", PRIORITY_INCIDENT, "U2")
+    with pytest.raises(WorkQueueFullError):
+        busy.submit("dm", PRIORITY_DM, "U3")
+    busy.release(queued)
+    assert busy.ran == ["incident-1"]
+
+
+def test_stats_report_depth_and_outcomes():
+    busy = BusyQueue()
+    futures = [busy.submit(f"dm-{i}", PRIORITY_DM, "U1")[0] for i in range(2)]
+    stats = busy.queue.stats()
+    assert stats["depth"] == 2
+    assert stats["depth_by_priority"]["dm"] == 2
+    assert stats["busy_workers"] == 1
+
+    busy.release(busy.blocker, *futures)
+    stats = busy.queue.stats()
+    assert stats["depth"] == 0
+    assert stats["submitted"] == 3